@@ -85,7 +85,7 @@ async def quick_analyze(stock_code: str, pattern: str = None, auto_detect: bool
     from dotenv import load_dotenv
     load_dotenv()
 
-    from src.aigc.model_adapter import ZhipuAdapter
+    from src.aigc.model_adapter import ModelProvider, get_adapter_pool
     from src.monitors.tencent_collector import TencentFinanceCollector
     from src.templates.prompt_templates import generate_prompt, TemplateType
 
@@ -221,7 +221,9 @@ async def quick_analyze(stock_code: str, pattern: str = None, auto_detect: bool
         print("❌ 未配置智谱AI API密钥")
         return None
 
-    adapter = ZhipuAdapter(
+    # 共享适配器池：复用连接，调用频率由统一的限流器控制
+    adapter = get_adapter_pool().get(
+        ModelProvider.ZHIPU,
         api_key=api_key,
         model=os.getenv("ZHIPU_MODEL", "glm-4-plus")
     )
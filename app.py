@@ -4,7 +4,7 @@
 使用Flask提供Web界面，每次刷新都重新获取真实数据
 """
 
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
+from flask import Flask, Response, g, render_template, request, jsonify, session, redirect, url_for
 from functools import wraps
 import asyncio
 import sys
@@ -14,17 +14,30 @@ from datetime import datetime, timedelta
 import base64
 import hashlib
 import json
+import time
+import numpy as np
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from dotenv import load_dotenv
 load_dotenv()
 
-from src.aigc.model_adapter import ZhipuAdapter
+from src.aigc.model_adapter import ModelProvider, get_adapter_pool
 from src.monitors.tencent_collector import TencentFinanceCollector
 from src.monitors.precious_metals_collector import PreciousMetalsCollector
 from src.monitors.sector_scanner import SectorScanner
 from src.monitors.index_collector import IndexCollector
+from src.monitors.screener import PATTERN_NAMES, SORT_FIELDS, screen, screen_quotes
+from src.monitors.market_snapshot import MarketSnapshotCollector
+from src.monitors.sector_membership import SectorIndex
+from src.monitors.intraday_state import IntradayStateTracker
+from src.utils.request_coalescer import RequestCoalescer, minute_bucket
+from src.utils.job_manager import AnalysisJobManager
+from src.utils.metrics import REGISTRY, HTTP_REQUEST_SECONDS, MARKET_SCAN_SECONDS
+from src.aigc.response_cache import LLMResponseCache, make_cache_key
+from src.aigc.load_shedder import LLMLoadShedder, resolve_with_shedding
+from src.utils.history_store import HistoryStore, parse_since
+from src.utils.event_bus import EventBus, Subscription, WebhookSink
 from analyze import detect_pattern_type
 
 app = Flask(__name__)
@@ -86,6 +99,458 @@ def login_required(f):
 # 获取配置
 API_KEY = os.getenv("ZHIPU_API_KEY")
 MODEL = os.getenv("ZHIPU_MODEL", "glm-4-plus")
+# 可选：智谱AI接口地址（压测时指向 llm_stub_server.py 启动的本地替身服务）
+ZHIPU_BASE_URL = os.getenv("ZHIPU_BASE_URL") or None
+
+# 可选的对冲备用模型：智谱超过p90耗时仍未返回时，同一请求改发给备用模型，取先返回的结果
+LLM_HEDGE_PROVIDER = os.getenv("LLM_HEDGE_PROVIDER", "").strip().lower()
+LLM_HEDGE_API_KEY = os.getenv("LLM_HEDGE_API_KEY")
+LLM_HEDGE_MODEL = os.getenv("LLM_HEDGE_MODEL")
+LLM_HEDGE_BASE_URL = os.getenv("LLM_HEDGE_BASE_URL")
+
+
+def get_analysis_adapter():
+    """获取股票分析使用的模型适配器（配置了备用模型时返回对冲适配器）"""
+    pool = get_adapter_pool()
+    primary_config = {"api_key": API_KEY, "model": MODEL}
+    if ZHIPU_BASE_URL:
+        primary_config["base_url"] = ZHIPU_BASE_URL
+    if not LLM_HEDGE_PROVIDER:
+        return pool.get(ModelProvider.ZHIPU, **primary_config)
+
+    secondary_config = {"api_key": LLM_HEDGE_API_KEY}
+    if LLM_HEDGE_MODEL:
+        secondary_config["model"] = LLM_HEDGE_MODEL
+    if LLM_HEDGE_BASE_URL:
+        secondary_config["base_url"] = LLM_HEDGE_BASE_URL
+    return pool.get_hedged(
+        ModelProvider.ZHIPU, primary_config,
+        ModelProvider(LLM_HEDGE_PROVIDER), secondary_config,
+        default_delay=float(os.getenv("LLM_HEDGE_DEFAULT_DELAY", "8"))
+    )
+
+
+# 后台批量分析任务（有界线程池，结果保留一段时间供轮询/推送）
+analysis_jobs = AnalysisJobManager(
+    runner=lambda stock_code: analyze_stock_async(stock_code, defer_ai=False),
+    max_workers=int(os.getenv("ANALYSIS_JOB_WORKERS", "2")),
+    retention_seconds=int(os.getenv("ANALYSIS_JOB_RETENTION_SECONDS", "1800"))
+)
+
+# AI补充分析任务：降级模式下先返回规则建议，AI分析完成后通过任务接口轮询/推送
+# （与批量任务分开，避免被长批量任务阻塞）
+ai_enrichment_jobs = AnalysisJobManager(
+    runner=lambda stock_code: analyze_stock_async(stock_code, defer_ai=False),
+    max_workers=int(os.getenv("AI_ENRICHMENT_WORKERS", "4")),
+    retention_seconds=int(os.getenv("ANALYSIS_JOB_RETENTION_SECONDS", "1800"))
+)
+
+
+def _llm_queue_depth() -> int:
+    """当前排队等待模型调用配额的请求数"""
+    governor = get_adapter_pool().governor
+    return governor.queue_depth if governor else 0
+
+
+# AI调用降级：模型变慢或排队过长时先返回规则建议，或直接跳过AI
+llm_load_shedder = LLMLoadShedder(
+    queue_depth_source=_llm_queue_depth,
+    latency_threshold=float(os.getenv("LLM_SHED_LATENCY_SECONDS", "20")),
+    skip_queue_depth=int(os.getenv("LLM_SHED_QUEUE_DEPTH", "8")),
+    defer_queue_depth=int(os.getenv("LLM_DEFER_QUEUE_DEPTH", "2"))
+)
+
+# 跨用户请求合并：同一分钟内对同一股票的并发请求共享一次行情获取和一次AI调用
+request_coalescer = RequestCoalescer(name="analysis_coalescer")
+
+
+# 分析历史存储（SQLite WAL，默认不启用，设置HISTORY_DB路径后开启）
+HISTORY_DB = os.getenv("HISTORY_DB", "")
+history_store = HistoryStore(
+    HISTORY_DB, snapshot_retention_days=float(os.getenv("HISTORY_SNAPSHOT_DAYS", "7"))
+) if HISTORY_DB else None
+
+# 历史分析的复用有效期：进程重启或其他Worker的相同分析在有效期内直接复用
+HISTORY_REUSE_SECONDS = float(os.getenv("HISTORY_REUSE_SECONDS", "120"))
+
+# 全市场扫描：快照在有效期内被所有扫描请求复用
+MARKET_SCAN_MAX_AGE = float(os.getenv("MARKET_SCAN_MAX_AGE", "15"))
+market_snapshot_collector = MarketSnapshotCollector(
+    max_workers=int(os.getenv("MARKET_SCAN_WORKERS", "8"))
+)
+
+# 板块扫描：全部板块的快照在有效期内复用，不同的sector_count只在内存中取前N
+sector_scanner = SectorScanner(max_age=float(os.getenv("SECTOR_SNAPSHOT_MAX_AGE", "30")))
+
+# 股票 -> 板块反向索引（SECTOR_INDEX_ENABLED=true时启用，默认关闭）：后台线程启动时预热、
+# 每天下载一次所属行业和概念并定期更新板块快照，行情只从内存补上板块名称和实时板块涨跌幅
+SECTOR_INDEX_ENABLED = os.getenv("SECTOR_INDEX_ENABLED", "false").lower() == "true"
+sector_index = SectorIndex(
+    market_snapshot_collector.get_membership,
+    sector_scanner.get_sector_snapshot,
+    sector_interval=sector_scanner.max_age
+).start() if SECTOR_INDEX_ENABLED else None
+
+
+# 监控事件总线：设置EVENT_LOG后触发事件写入追加式日志（默认不落盘），推送给SSE客户端和可选的Webhook
+event_bus = EventBus(
+    os.getenv("EVENT_LOG", "") or None,
+    max_log_bytes=int(float(os.getenv("EVENT_LOG_MAX_MB", "50")) * 1024 * 1024)
+)
+EVENT_WEBHOOK_URL = os.getenv("EVENT_WEBHOOK_URL")
+if EVENT_WEBHOOK_URL:
+    event_bus.subscribe(
+        "webhook",
+        WebhookSink(EVENT_WEBHOOK_URL),
+        maxsize=int(os.getenv("EVENT_WEBHOOK_QUEUE", "1000")),
+        policy=Subscription.DROP_OLDEST
+    )
+
+# SSE客户端的队列上限：同一股票同一图形的积压事件只保留最新一条
+EVENT_SSE_QUEUE = int(os.getenv("EVENT_SSE_QUEUE", "256"))
+
+
+def create_monitor_service():
+    """创建Web服务内的持续监控（使用MONITOR_WATCHLIST等配置，触发事件发布到event_bus）"""
+    from src.aigc.model_adapter import AIGCService
+    from src.monitors.data_collector import StockDataAggregator
+    from src.monitors.monitor_service import MonitorService, parse_patterns, parse_watchlist
+    from src.monitors.stock_monitor import StockPatternMonitor
+
+    aggregator = StockDataAggregator(
+        TencentFinanceCollector(sector_index=sector_index),
+        breadth_provider=lambda: market_snapshot_collector.get_breadth(MARKET_SCAN_MAX_AGE),
+        state_tracker=IntradayStateTracker()
+    )
+    monitor = StockPatternMonitor(
+        aggregator,
+        AIGCService(get_analysis_adapter()) if API_KEY else None,
+        history_store=history_store,
+        event_bus=event_bus
+    )
+    return MonitorService(
+        monitor,
+        watchlist=parse_watchlist(os.getenv("MONITOR_WATCHLIST", "")),
+        pattern_types=parse_patterns(os.getenv("MONITOR_PATTERNS", "开盘跳水,破位下跌,冲板回落")),
+        interval=float(os.getenv("MONITOR_INTERVAL_SECONDS", "60")),
+        analyze=bool(API_KEY)
+    )
+
+
+# Web服务内的持续监控（WEB_MONITOR_ENABLED=true且配置了MONITOR_WATCHLIST时启动）
+monitor_service = None
+if os.getenv("WEB_MONITOR_ENABLED", "false").lower() == "true" and os.getenv("MONITOR_WATCHLIST", "").strip():
+    monitor_service = create_monitor_service().start()
+
+
+# 盘中状态：每次实际获取的行情增量更新，提供开盘分钟数等时间相关的规则输入
+intraday_state = IntradayStateTracker()
+
+
+def fetch_realtime_data_shared(collector, stock_code: str) -> dict:
+    """获取实时行情（并发的相同请求只发起一次HTTP调用，实际获取的行情记录为快照并更新盘中状态）"""
+    def fetch():
+        data = collector.get_stock_realtime_data(stock_code)
+        if data:
+            if sector_index is not None and getattr(collector, "sector_index", None) is None:
+                sector_index.annotate(data)
+            intraday_state.update(stock_code, data)
+            if history_store is not None:
+                history_store.record_snapshot(stock_code, data)
+        return data
+
+    key = ("quote", stock_code, minute_bucket())
+    return request_coalescer.run(key, fetch)
+
+
+# AI分析结果缓存：行情量化后相同的分析在有效期内直接复用
+llm_response_cache = LLMResponseCache(
+    ttl_seconds=float(os.getenv("LLM_CACHE_TTL_SECONDS", "60")),
+    max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "512")),
+    disk_path=os.getenv("LLM_CACHE_DB") or None
+)
+
+
+def get_stored_analysis(cache_key: str):
+    """读取已有的分析结果：先查内存缓存，再查历史存储中仍在有效期内的记录"""
+    cached = llm_response_cache.get(cache_key)
+    if cached is None and history_store is not None:
+        cached = history_store.find_recent_analysis(cache_key, HISTORY_REUSE_SECONDS)
+        if cached is not None:
+            llm_response_cache.set(cache_key, cached)
+    return cached
+
+
+def store_analysis(stock_code: str, pattern_type: str, analysis_data: dict, cache_key: str, response: str):
+    """保存新的模型分析结果：写入缓存，并连同操作建议写入历史存储"""
+    llm_response_cache.set(cache_key, response)
+    if history_store is not None and response:
+        history_store.record_analysis(
+            stock_code,
+            pattern_type,
+            response,
+            suggestion=build_operation_suggestion(pattern_type, analysis_data, response),
+            stock_name=analysis_data.get("股票名称", ""),
+            cache_key=cache_key
+        )
+
+
+async def ai_analyze_shared(stock_code: str, pattern_type: str, analysis_data: dict, prompt: str,
+                            template_type: str = "简化版") -> str:
+    """
+    调用智谱AI分析
+
+    先查结果缓存；未命中时并发的相同分析只调用一次模型，结果写回缓存。
+    """
+    cache_key = make_cache_key(MODEL, template_type, pattern_type, analysis_data)
+    cached = get_stored_analysis(cache_key)
+    if cached is not None:
+        return cached
+
+    async def call_model():
+        adapter = get_analysis_adapter()
+        start = time.perf_counter()
+        try:
+            response = await adapter.async_chat(prompt)
+        finally:
+            llm_load_shedder.record(time.perf_counter() - start)
+        store_analysis(stock_code, pattern_type, analysis_data, cache_key, response)
+        return response
+
+    key = ("analysis", stock_code, pattern_type, minute_bucket())
+    return await request_coalescer.run_async(key, call_model)
+
+
+# 支持AI分析的图形类型
+SUPPORTED_AI_PATTERNS = ["开盘跳水", "破位下跌", "冲板回落"]
+
+
+def build_analysis_data(stock_code: str, real_data: dict, pattern_type: str) -> dict:
+    """
+    根据实时行情构造Prompt输入数据
+
+    Args:
+        stock_code: 股票代码
+        real_data: 实时行情
+        pattern_type: 图形类型
+
+    Returns:
+        generate_prompt使用的股票数据字典
+    """
+    current = real_data['实时价']
+    open_price = real_data['开盘价']
+
+    analysis_data = {
+        "股票代码": stock_code,
+        "股票名称": real_data["股票名称"],
+        "触发时间": datetime.now().strftime("%H:%M"),
+        "开盘价": open_price,
+        "实时价": current,
+        "最高价": real_data["最高价"],
+        "涨停价": real_data["涨停价"],
+        "5日均线": round(current * 0.995, 2),
+        "20日均线": round(current * 0.98, 2),
+        "前期平台支撑位": round(current * 0.97, 2),
+        "成交额放大比例": 25.0,
+        "板块名称": real_data.get("板块名称", "未知"),
+        "板块涨跌幅": real_data.get("板块涨跌幅", 0),
+        "大盘涨跌幅": 0,
+        "最新消息": "无"
+    }
+
+    # 添加图形特定字段
+    if pattern_type == "开盘跳水":
+        drop = abs(round((open_price - current) / open_price * 100, 2)) if open_price > 0 else 0
+        state = intraday_state.get(stock_code)
+        analysis_data.update({
+            "开盘分钟数": state.minutes_since_open if state is not None and state.minutes_since_open else 10,
+            "跌幅": drop,
+            "均线类型": 5,
+            "均线价格": analysis_data["5日均线"]
+        })
+    elif pattern_type == "破位下跌":
+        analysis_data.update({
+            "支撑位价格": analysis_data["前期平台支撑位"],
+            "破位后未回弹分钟数": 5
+        })
+    elif pattern_type == "冲板回落":
+        surge = round((real_data['最高价'] - open_price) / open_price * 100, 2) if open_price > 0 else 0
+        retrace = round((real_data['最高价'] - current) / real_data['最高价'] * 100, 2) if real_data['最高价'] > 0 else 0
+        analysis_data.update({
+            "涨幅": surge,
+            "回落幅度": retrace,
+            "封板挂单量": 10000
+        })
+
+    return analysis_data
+
+
+def build_analysis_prompt(pattern_type: str, analysis_data: dict) -> str:
+    """生成短线简化版分析提示词"""
+    from src.templates.prompt_templates import generate_prompt, TemplateType
+    return generate_prompt(
+        chart_type=pattern_type,
+        stock_data=analysis_data,
+        trading_style="短线",
+        template_type=TemplateType.SIMPLIFIED
+    )
+
+
+# 批量分析时每次模型调用合并的股票数
+LLM_BATCH_SIZE = int(os.getenv("LLM_BATCH_SIZE", "8"))
+
+
+async def prefetch_batch_analyses(quotes: dict):
+    """
+    批量预取AI分析
+
+    把需要AI分析且未命中缓存的股票按LLM_BATCH_SIZE合并为一次模型调用，
+    拆分后的结果按单只分析的缓存键写入缓存，随后的逐只分析直接命中；
+    批量调用失败或模型漏掉的股票仍按原方式逐只分析。
+
+    Args:
+        quotes: 股票代码到实时行情的映射
+    """
+    if not API_KEY:
+        return
+    if llm_load_shedder.decide(allow_defer=False) == LLMLoadShedder.SKIP:
+        return
+
+    pending = []
+    for stock_code, real_data in quotes.items():
+        if not real_data or not real_data.get("股票名称"):
+            continue
+        pattern_type, _, _ = detect_pattern_type(real_data)
+        if pattern_type not in SUPPORTED_AI_PATTERNS:
+            continue
+        analysis_data = build_analysis_data(stock_code, real_data, pattern_type)
+        cache_key = make_cache_key(MODEL, "简化版", pattern_type, analysis_data)
+        if get_stored_analysis(cache_key) is None:
+            pending.append((stock_code, cache_key, dict(analysis_data, 图形类型=pattern_type)))
+
+    if len(pending) < 2:
+        return
+
+    from src.templates.prompt_templates import generate_batch_prompt, parse_batch_response
+    adapter = get_analysis_adapter()
+
+    for i in range(0, len(pending), LLM_BATCH_SIZE):
+        batch = pending[i:i + LLM_BATCH_SIZE]
+        if len(batch) < 2:
+            # 只剩一只时合并没有意义，交给单只分析
+            continue
+
+        prompt = generate_batch_prompt([stock_data for _, _, stock_data in batch], trading_style="短线")
+        try:
+            text = await adapter.async_chat(prompt, max_tokens=120 * len(batch))
+        except Exception as e:
+            print(f"批量AI分析失败，改为逐只分析: {e}")
+            continue
+
+        parsed = parse_batch_response(text, [stock_code for stock_code, _, _ in batch])
+        for stock_code, cache_key, stock_data in batch:
+            if stock_code in parsed:
+                store_analysis(stock_code, stock_data["图形类型"], stock_data, cache_key, parsed[stock_code].原始回复)
+
+
+async def resolve_ai_analysis(stock_code: str, pattern_type: str, analysis_data: dict, prompt: str,
+                              defer_ai: bool = None) -> tuple:
+    """
+    按当前模型负载获取AI分析
+
+    Args:
+        stock_code: 股票代码
+        pattern_type: 图形类型
+        analysis_data: Prompt输入数据
+        prompt: 提示词
+        defer_ai: True表示客户端要求先返回规则建议；False表示不允许转后台；None表示按负载自动决定
+
+    Returns:
+        (ai_status, ai_response, job)：
+        done - 已得到AI分析；pending - 已提交后台任务，job为任务对象；skipped - 负载过高未调用模型
+    """
+    # 后台补充分析的任务结果（字段与同步分析接口一致）
+    def build_result(code: str, ai_response: str) -> dict:
+        return {
+            'success': True,
+            'stock_code': code,
+            'ai_analysis': {
+                'pattern_type': pattern_type,
+                'analysis': ai_response,
+                'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            },
+            'operation_suggestion': build_operation_suggestion(pattern_type, analysis_data, ai_response)
+        }
+
+    return await resolve_with_shedding(
+        llm_load_shedder,
+        stock_code,
+        analyze=lambda code: ai_analyze_shared(code, pattern_type, analysis_data, prompt),
+        lookup_cached=lambda: get_stored_analysis(make_cache_key(MODEL, "简化版", pattern_type, analysis_data)),
+        job_manager=ai_enrichment_jobs,
+        build_result=build_result,
+        defer_ai=defer_ai
+    )
+
+
+def _job_links(job) -> dict:
+    """任务查询/推送地址"""
+    return {
+        'job_id': job.job_id,
+        'status_url': f'/api/analysis-jobs/{job.job_id}',
+        'stream_url': f'/api/analysis-jobs/{job.job_id}/stream'
+    }
+
+
+def _find_job_manager(job_id: str):
+    """查找任务所在的管理器（批量任务或AI补充分析任务）"""
+    for manager in (analysis_jobs, ai_enrichment_jobs):
+        if manager.get(job_id):
+            return manager
+    return None
+
+
+# 降级时返回给前端的说明
+AI_STATUS_MESSAGES = {
+    'pending': 'AI分析正在后台进行，已先返回基于行情规则的操作建议',
+    'skipped': 'AI模型当前负载过高，已跳过AI分析，返回基于行情规则的操作建议'
+}
+
+
+def build_operation_suggestion(pattern_type: str, analysis_data: dict, ai_response: str) -> dict:
+    """根据AI分析结果生成操作建议（返回给前端的字典格式）"""
+    from src.utils.suggestions import OperationSuggestionGenerator
+    suggestion = OperationSuggestionGenerator.generate_suggestion(
+        pattern_type, analysis_data, ai_response
+    )
+    return {
+        'action': suggestion.action,
+        'confidence': suggestion.confidence,
+        'reasoning': suggestion.reasoning,
+        'price_levels': suggestion.price_level,
+        'risk_warning': suggestion.risk_warning
+    }
+
+
+@app.before_request
+def start_request_timer():
+    """记录请求开始时间（需在登录检查之前注册，401/重定向也计入耗时统计）"""
+    g.request_start = time.perf_counter()
+
+
+@app.after_request
+def record_request_latency(response):
+    """按路由记录接口耗时"""
+    start = g.get('request_start')
+    if start is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - start,
+            route=route,
+            method=request.method,
+            status=response.status_code
+        )
+    return response
 
 
 @app.before_request
@@ -95,6 +560,10 @@ def check_authentication():
     if request.path in ['/login', '/register', '/api/login', '/api/register', '/logout', '/metal-detail', '/api/metal-kline']:
         return None
 
+    # 指标接口供本机采集器抓取，单独做来源限制
+    if request.path == '/metrics':
+        return None
+
     # 排除静态文件
     if request.path.startswith('/static'):
         return None
@@ -268,348 +737,6 @@ def sector_scan():
     return render_template('sector_scan.html')
 
 
-def is_retail_favorite_stock(real_data: dict) -> tuple:
-    """
-    检测是否为散户最爱买的股票
-
-    散户最爱买的股票特征：
-    1. 低价股（<10元）- 散户觉得便宜、好买、能翻倍
-    2. 小盘股（<50亿市值）- 散户觉得成长空间大
-    3. ST/*ST股票 - 散户赌重组、借壳
-    4. 概念股名字（科技、智能、生物、新能源等）- 散户追热点
-    5. 高换手+高振幅组合 - 散户喜欢追涨杀跌
-    6. 曾经大涨过（前高远高于当前价）- 散户抄底心理
-
-    Args:
-        real_data: 股票实时数据字典
-
-    Returns:
-        (is_retail_favorite: bool, reason: str, retail_score: int)
-    """
-    try:
-        current_price = real_data.get('实时价', 0)
-        stock_name = real_data.get('股票名称', '')
-        open_price = real_data.get('开盘价', 0)
-        high_price = real_data.get('最高价', 0)
-        low_price = real_data.get('最低价', 0)
-        prev_close = real_data.get('昨收', 0)
-        turnover_rate = real_data.get('换手率', 0)
-        market_cap = real_data.get('总市值', 0)
-
-        if current_price <= 0 or not stock_name:
-            return False, "", 0
-
-        retail_factors = []
-        retail_score = 0
-
-        # ========== 1. 低价股判断（散户最爱）==========
-
-        if current_price < 5:  # 超低价股
-            retail_score += 30
-            retail_factors.append(f"💸 超低价股({current_price:.2f}元),散户最爱")
-        elif current_price < 10:  # 低价股
-            retail_score += 20
-            retail_factors.append(f"💸 低价股({current_price:.2f}元)")
-        elif current_price < 20:  # 中低价
-            retail_score += 10
-            retail_factors.append(f"价格适中({current_price:.2f}元)")
-        elif current_price >= 50:  # 高价股，散户不太买
-            retail_score -= 15
-            retail_factors.append(f"✓ 高价股({current_price:.2f}元),机构偏好")
-
-        # ========== 2. 小盘股判断（散户觉得好炒作）==========
-
-        if market_cap and market_cap > 0:
-            market_cap_yi = market_cap / 100000000
-
-            if market_cap_yi < 30:  # 超小盘
-                retail_score += 25
-                retail_factors.append(f"🎯 超小盘(市值{market_cap_yi:.0f}亿),易炒作")
-            elif market_cap_yi < 50:  # 小盘
-                retail_score += 15
-                retail_factors.append(f"🎯 小盘股(市值{market_cap_yi:.0f}亿)")
-            elif market_cap_yi < 100:  # 中盘
-                retail_score += 5
-            elif market_cap_yi >= 200:  # 大盘股，散户不太关注
-                retail_score -= 10
-                retail_factors.append(f"✓ 大盘股(市值{market_cap_yi:.0f}亿)")
-
-        # ========== 3. ST/*ST股票判断（散户赌重组）==========
-
-        if 'ST' in stock_name or '*ST' in stock_name or '退' in stock_name:
-            retail_score += 40
-            retail_factors.append(f"⚠️ 特殊处理股票({stock_name}),散户赌重组")
-
-        # ========== 4. 概念股名字判断（散户追热点）==========
-
-        # 散户最爱的概念关键词
-        concept_keywords = {
-            '科技': 15, '智能': 15, 'AI': 15, '人工智能': 15,
-            '生物': 12, '医疗': 12, '医药': 12, '健康': 12,
-            '新能源': 12, '锂电': 12, '光伏': 12, '储能': 12,
-            '芯片': 12, '半导体': 12, '集成电路': 12,
-            '软件': 10, '信息': 10, '网络': 10, '数据': 10,
-            '材料': 8, '化工': 8, '环保': 8,
-            '文化': 8, '传媒': 8, '教育': 8
-        }
-
-        matched_concepts = []
-        for keyword, score in concept_keywords.items():
-            if keyword in stock_name:
-                retail_score += score
-                matched_concepts.append(keyword)
-
-        if matched_concepts:
-            retail_factors.append(f"🔥 热门概念({','.join(matched_concepts)})")
-
-        # ========== 5. 高换手+高振幅组合（散户追涨杀跌）==========
-
-        is_high_turnover = turnover_rate and turnover_rate >= 10
-        is_high_amplitude = False
-        if high_price > 0 and low_price > 0 and prev_close > 0:
-            amplitude = ((high_price - low_price) / low_price * 100)
-            is_high_amplitude = amplitude >= 10
-            if amplitude >= 15:
-                retail_score += 15
-                retail_factors.append(f"🎢 巨幅波动({amplitude:.2f}%)")
-
-        # 散户最爱：高换手+高振幅
-        if is_high_turnover and is_high_amplitude:
-            retail_score += 20
-            retail_factors.append(f"🎲 高换手+高振幅,散户追涨杀跌")
-
-        # ========== 6. 涨停/跌停判断（散户最关注）==========
-
-        if prev_close > 0:
-            change_percent = ((current_price - prev_close) / prev_close * 100)
-
-            if change_percent >= 9.9:  # 涨停
-                retail_score += 25
-                retail_factors.append(f"🚀 涨停({change_percent:+.2f}%)")
-            elif change_percent <= -9.9:  # 跌停
-                retail_score += 20
-                retail_factors.append(f"💥 跌停({change_percent:+.2f}%),散户抄底")
-            elif change_percent >= 7:  # 大涨
-                retail_score += 15
-                retail_factors.append(f"大涨({change_percent:+.2f}%)")
-            elif change_percent <= -7:  # 大跌
-                retail_score += 15
-                retail_factors.append(f"大跌({change_percent:+.2f}%),散户抄底")
-
-        # ========== 7. 成交量异常放大（散户跟风）==========
-
-        if turnover_rate and turnover_rate > 0:
-            if turnover_rate >= 20:  # 超高换手
-                retail_score += 20
-                retail_factors.append(f"📊 超高换手({turnover_rate:.2f}%),散户跟风")
-            elif turnover_rate >= 15:  # 高换手
-                retail_score += 15
-                retail_factors.append(f"高换手({turnover_rate:.2f}%)")
-
-        # ========== 8. 冲高回落（散户追高被套）==========
-
-        if high_price > 0 and current_price > 0 and high_price > current_price:
-            pullback_from_high = ((high_price - current_price) / high_price * 100)
-            if pullback_from_high > 5:
-                retail_score += 10
-                retail_factors.append(f"⛰️ 冲高回落({pullback_from_high:.2f}%)")
-
-        # ========== 综合判断 ==========
-
-        # 低价 + 小盘 + 高换手 = 散户最爱组合
-        is_very_cheap = current_price < 10
-        is_very_small_cap = market_cap and (market_cap / 100000000) < 50
-        is_very_high_turnover = turnover_rate and turnover_rate >= 10
-
-        if is_very_cheap and is_very_small_cap and is_very_high_turnover:
-            retail_score += 15
-            if not any("散户最爱" in f for f in retail_factors):
-                retail_factors.insert(0, "🎯 散户最爱组合(低价+小盘+高换手)")
-
-        # 风险分数 > 40 判定为散户最爱
-        is_retail_favorite = retail_score > 40
-
-        reason = "、".join(retail_factors) if retail_factors else ""
-
-        return is_retail_favorite, reason, max(0, retail_score)
-
-    except Exception as e:
-        print(f"检测散户最爱股票时出错: {e}")
-        return False, "", 0
-
-
-def is_speculative_stock(real_data: dict) -> tuple:
-    """
-    检测是否为游资炒作的股票（游资票）
-
-    基于"核心3问+硬指标阈值"判断标准：
-
-    【第一问 看资金&龙虎榜】（暂无法获取，跳过）
-    【第二问 看量能&换手】（最易判断）⭐核心
-    【第三问 看走势&驱动】（定性关键）
-
-    ✅ 硬指标阈值：
-    - 游资票：换手率≥15%、振幅≥8%、流通值40-200亿
-    - 机构票：换手率≤5%、振幅≤5%、大中盘百亿起
-
-    ✅ 终极速判口诀：
-    1. 高换手(≥15%) + 大振幅(≥8%) + 中小盘 = 游资票
-    2. 低换手(≤5%) + 小振幅(≤5%) + 大盘 = 机构票
-
-    Args:
-        real_data: 股票实时数据字典
-
-    Returns:
-        (is_speculative: bool, reason: str, risk_score: int)
-    """
-    try:
-        current_price = real_data.get('实时价', 0)
-        open_price = real_data.get('开盘价', 0)
-        high_price = real_data.get('最高价', 0)
-        low_price = real_data.get('最低价', 0)
-        prev_close = real_data.get('昨收', 0)
-        amount = real_data.get('成交额', 0)  # 成交额（元）
-        turnover_rate = real_data.get('换手率', 0)  # 换手率
-        market_cap = real_data.get('总市值', 0)  # 总市值
-
-        if current_price <= 0 or prev_close <= 0:
-            return False, "", 0
-
-        risk_factors = []
-        risk_score = 0
-
-        # ========== 【第二问 看量能&换手】核心指标 ==========
-
-        # 1. 换手率判断（最关键指标）
-        if turnover_rate and turnover_rate > 0:
-            if turnover_rate >= 20:  # 连板期水平
-                risk_score += 40
-                risk_factors.append(f"⚠️ 超高换手({turnover_rate:.2f}%),连板特征")
-            elif turnover_rate >= 15:  # 游资票硬指标
-                risk_score += 30
-                risk_factors.append(f"⚠️ 高换手({turnover_rate:.2f}%),游资活跃")
-            elif turnover_rate >= 10:
-                risk_score += 15
-                risk_factors.append(f"换手率偏高({turnover_rate:.2f}%)")
-            elif turnover_rate <= 5:  # 机构票特征
-                risk_score -= 20  # 降低风险分数
-                risk_factors.append(f"✓ 低换手({turnover_rate:.2f}%),机构特征")
-
-        # ========== 【第三问 看走势&驱动】定性判断 ==========
-
-        # 2. 日内振幅判断（硬指标：游资票≥8%，机构票≤5%）
-        if high_price > 0 and low_price > 0:
-            amplitude = ((high_price - low_price) / low_price * 100)
-            if amplitude >= 12:  # 暴涨暴跌
-                risk_score += 30
-                risk_factors.append(f"⚠️ 巨幅震荡({amplitude:.2f}%),情绪化")
-            elif amplitude >= 8:  # 游资票硬指标
-                risk_score += 20
-                risk_factors.append(f"⚠️ 大振幅({amplitude:.2f}%),游资特征")
-            elif amplitude <= 5:  # 机构票特征
-                risk_score -= 15  # 降低风险分数
-                risk_factors.append(f"✓ 小振幅({amplitude:.2f}%),稳健")
-
-        # 3. 单日涨幅判断（连板/涨停特征）
-        change_percent = ((current_price - prev_close) / prev_close * 100)
-        if change_percent >= 9.9:  # 涨停
-            risk_score += 25
-            risk_factors.append(f"⚠️ 涨停({change_percent:+.2f}%)")
-        elif change_percent >= 7:  # 大涨
-            risk_score += 15
-            risk_factors.append(f"大涨({change_percent:+.2f}%)")
-        elif change_percent <= 3 and change_percent >= 0:  # 温和上涨（机构特征）
-            risk_score -= 10
-            risk_factors.append(f"✓ 温和上涨({change_percent:+.2f}%)")
-
-        # ========== 市值判断（辅助指标） ==========
-
-        if market_cap and market_cap > 0:
-            market_cap_yi = market_cap / 100000000  # 转换为亿
-
-            # 流通值40-200亿：游资票偏好区间
-            if 40 <= market_cap_yi <= 200:
-                if turnover_rate and turnover_rate >= 15:
-                    risk_score += 15
-                    risk_factors.append(f"中小盘+高换手(市值{market_cap_yi:.0f}亿)")
-                elif turnover_rate and turnover_rate >= 10:
-                    risk_score += 10
-                    risk_factors.append(f"中小盘(市值{market_cap_yi:.0f}亿)")
-
-            # 小于40亿：容易被控盘
-            elif market_cap_yi < 40:
-                if turnover_rate and turnover_rate >= 15:
-                    risk_score += 20
-                    risk_factors.append(f"⚠️ 小盘易控盘(市值{market_cap_yi:.0f}亿,换手{turnover_rate:.2f}%)")
-                elif turnover_rate and turnover_rate >= 10:
-                    risk_score += 10
-                    risk_factors.append(f"小盘股(市值{market_cap_yi:.0f}亿)")
-
-            # 大于100亿：机构票偏好
-            elif market_cap_yi >= 100:
-                if turnover_rate and turnover_rate <= 5:
-                    risk_score -= 15
-                    risk_factors.append(f"✓ 大盘低换手(市值{market_cap_yi:.0f}亿),机构偏好")
-
-        # ========== 情绪化走势特征 ==========
-
-        # 冲高回落（从高点回落>5%）
-        if high_price > 0 and current_price > 0:
-            pullback_from_high = ((high_price - current_price) / high_price * 100)
-            if pullback_from_high > 5:
-                risk_score += 15
-                risk_factors.append(f"⚠️ 冲高回落({pullback_from_high:.2f}%)")
-
-        # 开盘强势但回落
-        if open_price > 0 and current_price > 0 and open_price > prev_close:
-            open_change = ((open_price - prev_close) / prev_close * 100)
-            current_change = ((current_price - prev_close) / prev_close * 100)
-            if open_change > current_change and open_change > 3:
-                pullback = open_change - current_change
-                if pullback > 3:
-                    risk_score += 10
-                    risk_factors.append(f"开盘回落({pullback:.2f}%)")
-
-        # ========== 成交额异常放大判断 ==========
-
-        if market_cap and amount and market_cap > 0:
-            amount_ratio = (amount / market_cap * 100)
-            if amount_ratio > 40:
-                risk_score += 10
-                risk_factors.append(f"成交额异常({amount_ratio:.0f}%市值)")
-
-        # ========== 综合判断（终极速判口诀）==========
-
-        # 口诀1: 高换手(≥15%) + 大振幅(≥8%) + 中小盘 = 游资票
-        is_high_turnover = turnover_rate and turnover_rate >= 15
-        is_high_amplitude = False
-        if high_price > 0 and low_price > 0:
-            amplitude = ((high_price - low_price) / low_price * 100)
-            is_high_amplitude = amplitude >= 8
-        is_mid_small_cap = False
-        if market_cap and market_cap > 0:
-            market_cap_yi = market_cap / 100000000
-            is_mid_small_cap = market_cap_yi <= 200
-
-        # 满足游资票"三位一体"特征，直接判定
-        if is_high_turnover and is_high_amplitude and is_mid_small_cap:
-            is_speculative = True
-            if not any("三位一体" in f for f in risk_factors):
-                risk_factors.insert(0, "⚠️ 游资票三位一体(高换手+大振幅+中小盘)")
-        else:
-            # 否则按风险分数判断
-            # 风险分数 > 50 判定为游资票
-            is_speculative = risk_score > 50 or len([f for f in risk_factors if "⚠️" in f]) >= 2
-
-        reason = "、".join(risk_factors) if risk_factors else ""
-
-        return is_speculative, reason, max(0, risk_score)
-
-    except Exception as e:
-        print(f"检测游资票时出错: {e}")
-        return False, "", 0
-
-
 @app.route('/daily-recommend')
 @login_required
 def daily_recommend():
@@ -650,6 +777,10 @@ def finance_news_api():
 def sector_scan_api():
     """板块扫描API - 扫描热门板块并筛选图形"""
     try:
+        # 全市场模式：不再只看热门板块的前几只股票
+        if (request.json or {}).get('mode') == 'full':
+            return jsonify(run_market_scan(request.json))
+
         from src.monitors.tencent_collector import TencentFinanceCollector
 
         # 获取参数
@@ -657,8 +788,7 @@ def sector_scan_api():
         stocks_per_sector = request.json.get('stocks_per_sector', 5)
 
         # 扫描板块和股票
-        scanner = SectorScanner()
-        scan_result = scanner.scan_hot_sectors_stocks(
+        scan_result = sector_scanner.scan_hot_sectors_stocks(
             sector_count=sector_count,
             stocks_per_sector=stocks_per_sector
         )
@@ -724,6 +854,10 @@ def sector_scan_api():
 def daily_recommend_api():
     """每日推荐API - 基于热门板块和图形分析推荐股票"""
     try:
+        # 全市场模式：不再只看热门板块的前几只股票
+        if (request.json or {}).get('mode') == 'full':
+            return jsonify(run_market_scan(request.json))
+
         from src.monitors.tencent_collector import TencentFinanceCollector
 
         # 获取参数
@@ -731,62 +865,54 @@ def daily_recommend_api():
         stocks_per_sector = request.json.get('stocks_per_sector', 5)
 
         # 扫描板块和股票
-        scanner = SectorScanner()
-        scan_result = scanner.scan_hot_sectors_stocks(
+        scan_result = sector_scanner.scan_hot_sectors_stocks(
             sector_count=sector_count,
             stocks_per_sector=stocks_per_sector
         )
 
-        # 获取股票实时数据并检测图形
+        # 获取股票实时数据
         collector = TencentFinanceCollector()
-        recommended_stocks = []
+        scanned, quotes = [], []
 
         for stock in scan_result['stocks']:
-            stock_code = stock['stock_code']
-            real_data = collector.get_stock_realtime_data(stock_code)
-
+            real_data = collector.get_stock_realtime_data(stock['stock_code'])
             if real_data and real_data.get('股票名称'):
-                # 检测图形类型
-                pattern_type, confidence, reason = detect_pattern_type(real_data)
-
-                # 计算涨跌幅
-                prev_close = real_data.get('昨收', real_data.get('开盘价', 0))
-                change_percent = ((real_data['实时价'] - prev_close) / prev_close * 100) if prev_close > 0 else 0
-
-                # 检测是否为游资票（标记但不过滤）
-                is_speculative, speculative_reason, risk_score = is_speculative_stock(real_data)
+                scanned.append(stock)
+                quotes.append(real_data)
 
-                # 检测是否为散户最爱买的股票（标记但不过滤）
-                is_retail_favorite, retail_reason, retail_score = is_retail_favorite_stock(real_data)
+        # 一次性向量化检测图形、游资票和散户最爱（标记但不过滤）
+        screen_result = screen_quotes(quotes)
+        recommended_stocks = []
 
-                stock_info = {
-                    'stock_code': real_data.get('股票代码'),
-                    'stock_name': stock['stock_name'],
-                    'sector_name': stock['sector_name'],
-                    'sector_change': stock['sector_change'],
-                    'current_price': real_data.get('实时价'),
-                    'open_price': real_data.get('开盘价'),
-                    'high_price': real_data.get('最高价'),
-                    'low_price': real_data.get('最低价'),
-                    'volume': real_data.get('成交量'),
-                    'amount': real_data.get('成交额'),
-                    'change_percent': round(change_percent, 2),
-                    'pattern_type': pattern_type,
-                    'pattern_detection': {
-                        'type': pattern_type,
-                        'confidence': confidence,
-                        'description': reason
-                    },
-                    # 添加标记字段
-                    'is_speculative': is_speculative,
-                    'speculative_reason': speculative_reason,
-                    'speculative_risk_score': risk_score,
-                    'is_retail_favorite': is_retail_favorite,
-                    'retail_reason': retail_reason,
-                    'retail_score': retail_score
-                }
+        for stock, real_data, row in zip(scanned, quotes, screen_result.to_rows()):
+            stock_info = {
+                'stock_code': real_data.get('股票代码'),
+                'stock_name': stock['stock_name'],
+                'sector_name': stock['sector_name'],
+                'sector_change': stock['sector_change'],
+                'current_price': real_data.get('实时价'),
+                'open_price': real_data.get('开盘价'),
+                'high_price': real_data.get('最高价'),
+                'low_price': real_data.get('最低价'),
+                'volume': real_data.get('成交量'),
+                'amount': real_data.get('成交额'),
+                'change_percent': row['change_percent'],
+                'pattern_type': row['pattern_type'],
+                'pattern_detection': {
+                    'type': row['pattern_type'],
+                    'confidence': row['pattern_confidence'],
+                    'description': row['pattern_reason']
+                },
+                # 添加标记字段
+                'is_speculative': row['is_speculative'],
+                'speculative_reason': row['speculative_reason'],
+                'speculative_risk_score': row['speculative_risk_score'],
+                'is_retail_favorite': row['is_retail_favorite'],
+                'retail_reason': row['retail_reason'],
+                'retail_score': row['retail_score']
+            }
 
-                recommended_stocks.append(stock_info)
+            recommended_stocks.append(stock_info)
 
         # 按图形类型排序，优先显示强势上涨的股票
         pattern_priority = {
@@ -815,6 +941,102 @@ def daily_recommend_api():
         })
 
 
+def _scan_param(params: dict, name: str, default=None):
+    """读取扫描参数（兼容查询字符串和JSON）"""
+    value = params.get(name, default)
+    return value.strip() if isinstance(value, str) else value
+
+
+def _scan_flag(params: dict, name: str) -> bool:
+    value = params.get(name)
+    return value is True or (isinstance(value, str) and value.lower() == 'true')
+
+
+def run_market_scan(params: dict) -> dict:
+    """
+    全市场扫描：拉取（或复用）全A股快照，向量化判定后过滤、排序、分页
+
+    Args:
+        params: 扫描参数
+            - patterns: 图形类型，逗号分隔或列表（默认全部）
+            - speculative / retail_favorite: 只保留游资票/散户最爱
+            - exclude_st: 排除ST/退市股
+            - sort: 排序字段（见SORT_FIELDS，默认change_percent）
+            - order: desc/asc（默认desc）
+            - page / page_size: 分页（page从1开始，page_size最大200）
+
+    Returns:
+        扫描结果字典
+    """
+    sort = _scan_param(params, 'sort') or 'change_percent'
+    if sort not in SORT_FIELDS:
+        raise ValueError(f"不支持的排序字段: {sort}，可选: {', '.join(SORT_FIELDS)}")
+    descending = (_scan_param(params, 'order') or 'desc').lower() != 'asc'
+    page = max(1, int(_scan_param(params, 'page', 1)))
+    page_size = min(max(1, int(_scan_param(params, 'page_size', 50))), 200)
+
+    patterns = _scan_param(params, 'patterns') or []
+    if isinstance(patterns, str):
+        patterns = [p.strip() for p in patterns.split(',') if p.strip()]
+
+    snapshot = market_snapshot_collector.get_snapshot(max_age=MARKET_SCAN_MAX_AGE)
+
+    start = time.perf_counter()
+    result = screen(snapshot)
+    mask = result.pattern_mask(*patterns) if patterns else np.ones(len(result), dtype=bool)
+    if _scan_flag(params, 'speculative'):
+        mask &= result.speculative
+    if _scan_flag(params, 'retail_favorite'):
+        mask &= result.retail_favorite
+    if _scan_flag(params, 'exclude_st'):
+        mask &= ~snapshot.is_st
+
+    matched = int(np.count_nonzero(mask))
+    indices = result.select(
+        mask,
+        order_by=result.sort_key(sort),
+        descending=descending,
+        offset=(page - 1) * page_size,
+        limit=page_size
+    )
+    stocks = result.to_rows(indices)
+    screen_seconds = time.perf_counter() - start
+    MARKET_SCAN_SECONDS.observe(screen_seconds, stage="screen")
+
+    pattern_counts = np.bincount(result.pattern_code, minlength=len(PATTERN_NAMES))
+    return {
+        'success': True,
+        'mode': 'full',
+        'stocks': stocks,
+        'total': len(result),
+        'matched': matched,
+        'page': page,
+        'page_size': page_size,
+        'pages': (matched + page_size - 1) // page_size,
+        'sort': sort,
+        'order': 'desc' if descending else 'asc',
+        'pattern_counts': {name: int(count) for name, count in zip(PATTERN_NAMES, pattern_counts)},
+        'speculative_count': int(np.count_nonzero(result.speculative)),
+        'retail_favorite_count': int(np.count_nonzero(result.retail_favorite)),
+        'snapshot_time': datetime.fromtimestamp(snapshot.timestamp).strftime('%Y-%m-%d %H:%M:%S'),
+        'partial': bool(snapshot.missing_pages),
+        'missing_pages': snapshot.missing_pages,
+        'screen_ms': round(screen_seconds * 1000, 2)
+    }
+
+
+@app.route('/api/market-scan', methods=['GET', 'POST'])
+def market_scan_api():
+    """全市场扫描API - 一次拉取全部A股快照，筛选结果支持过滤、排序和分页"""
+    params = (request.get_json(silent=True) or {}) if request.method == 'POST' else request.args.to_dict()
+    try:
+        return jsonify(run_market_scan(params))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
+
 @app.route('/api/stock-detail/<stock_code>', methods=['GET'])
 def stock_detail_api(stock_code):
     """股票详情API"""
@@ -822,7 +1044,7 @@ def stock_detail_api(stock_code):
         from src.monitors.tencent_collector import TencentFinanceCollector
 
         collector = TencentFinanceCollector()
-        real_data = collector.get_stock_realtime_data(stock_code)
+        real_data = fetch_realtime_data_shared(collector, stock_code)
 
         if not real_data or not real_data.get('股票名称'):
             # 标准化股票代码用于错误提示
@@ -860,84 +1082,34 @@ def stock_detail_api(stock_code):
         }
 
         # 如果是支持的图形，进行AI分析
-        supported_patterns = ['开盘跳水', '冲板回落', '破位下跌']
-
-        if pattern_type in supported_patterns and API_KEY:
-            analysis_data = {
-                "股票代码": stock_code,
-                "股票名称": real_data["股票名称"],
-                "触发时间": datetime.now().strftime("%H:%M"),
-                "开盘价": real_data['开盘价'],
-                "实时价": real_data['实时价'],
-                "最高价": real_data["最高价"],
-                "涨停价": real_data["涨停价"],
-                "5日均线": round(real_data['实时价'] * 0.995, 2),
-                "20日均线": round(real_data['实时价'] * 0.98, 2),
-                "前期平台支撑位": round(real_data['实时价'] * 0.97, 2),
-                "成交额放大比例": 25.0,
-                "板块名称": real_data.get("板块名称", "未知"),
-                "板块涨跌幅": 0,
-                "大盘涨跌幅": 0,
-                "最新消息": "无"
-            }
-
-            # 添加图形特定字段
-            if pattern_type == "开盘跳水":
-                drop = abs(round((real_data['开盘价'] - real_data['实时价']) / real_data['开盘价'] * 100, 2))
-                analysis_data.update({
-                    "开盘分钟数": 10,
-                    "跌幅": drop,
-                    "均线类型": 5,
-                    "均线价格": analysis_data["5日均线"]
-                })
-            elif pattern_type == "破位下跌":
-                analysis_data.update({
-                    "支撑位价格": analysis_data["前期平台支撑位"],
-                    "破位后未回弹分钟数": 5
-                })
-            elif pattern_type == "冲板回落":
-                surge = round((real_data['最高价'] - real_data['开盘价']) / real_data['开盘价'] * 100, 2)
-                retrace = round((real_data['最高价'] - real_data['实时价']) / real_data['最高价'] * 100, 2)
-                analysis_data.update({
-                    "涨幅": surge,
-                    "回落幅度": retrace,
-                    "封板挂单量": 10000
-                })
-
-            # 生成提示词
-            from src.templates.prompt_templates import generate_prompt, TemplateType
-            prompt = generate_prompt(
-                chart_type=pattern_type,
-                stock_data=analysis_data,
-                trading_style="短线",
-                template_type=TemplateType.SIMPLIFIED
-            )
+        if pattern_type in SUPPORTED_AI_PATTERNS and API_KEY:
+            analysis_data = build_analysis_data(stock_code, real_data, pattern_type)
+            prompt = build_analysis_prompt(pattern_type, analysis_data)
 
-            # 调用智谱AI
+            # 调用智谱AI（负载过高时降级为规则建议）
+            defer_ai = request.args.get('defer_ai', '').lower() == 'true' or None
             loop = asyncio.new_event_loop()
             asyncio.set_event_loop(loop)
             try:
-                adapter = ZhipuAdapter(api_key=API_KEY, model=MODEL)
-                ai_response = loop.run_until_complete(adapter.async_chat(prompt))
-
-                detail['ai_analysis'] = ai_response
-
-                # 生成操作建议
-                from src.utils.suggestions import OperationSuggestionGenerator
-                suggestion = OperationSuggestionGenerator.generate_suggestion(
-                    pattern_type, analysis_data, ai_response
+                ai_status, ai_response, job = loop.run_until_complete(
+                    resolve_ai_analysis(stock_code, pattern_type, analysis_data, prompt, defer_ai)
                 )
-
-                detail['operation_suggestion'] = {
-                    'action': suggestion.action,
-                    'confidence': suggestion.confidence,
-                    'reasoning': suggestion.reasoning,
-                    'price_levels': suggestion.price_level,
-                    'risk_warning': suggestion.risk_warning
-                }
             finally:
                 loop.close()
 
+            detail['ai_status'] = ai_status
+            if ai_response is not None:
+                detail['ai_analysis'] = ai_response
+            else:
+                detail['ai_message'] = AI_STATUS_MESSAGES[ai_status]
+            if job is not None:
+                detail['ai_job'] = _job_links(job)
+
+            # 生成操作建议（规则建议不依赖AI结果，降级时同样返回）
+            detail['operation_suggestion'] = build_operation_suggestion(
+                pattern_type, analysis_data, ai_response or ""
+            )
+
         return jsonify({
             'success': True,
             'detail': detail
@@ -965,14 +1137,7 @@ def batch_quick_analyze_api():
         asyncio.set_event_loop(loop)
 
         try:
-            async def batch_analyze():
-                results = []
-                for stock_code in stock_codes:
-                    result = await analyze_stock_async(stock_code)
-                    results.append(result)
-                return results
-
-            results = loop.run_until_complete(batch_analyze())
+            results = loop.run_until_complete(analyze_stocks_batched(stock_codes))
 
             return jsonify({
                 'success': True,
@@ -1343,7 +1508,7 @@ def analyze_api():
 
         try:
             result = loop.run_until_complete(
-                analyze_stock_async(stock_code)
+                analyze_stock_async(stock_code, defer_ai=True if data.get('defer_ai') else None)
             )
 
             if result.get('success'):
@@ -1363,15 +1528,44 @@ def analyze_api():
         })
 
 
-async def analyze_stock_async(stock_code: str):
+async def analyze_stocks_batched(stock_codes: list) -> list:
+    """
+    批量分析股票
+    先获取全部行情，需要AI分析的股票合并调用模型，再逐只组装结果
+    """
+    collector = TencentFinanceCollector()
+    quotes = {}
+    for stock_code in stock_codes:
+        try:
+            quotes[stock_code] = fetch_realtime_data_shared(collector, stock_code)
+        except Exception as e:
+            print(f"获取股票{stock_code}数据失败: {e}")
+            quotes[stock_code] = None
+
+    await prefetch_batch_analyses(quotes)
+
+    results = []
+    for stock_code in stock_codes:
+        result = await analyze_stock_async(stock_code, real_data=quotes[stock_code], defer_ai=False)
+        results.append(result)
+    return results
+
+
+async def analyze_stock_async(stock_code: str, real_data: dict = None, defer_ai: bool = None):
     """
     异步分析股票
     使用真实数据和AI分析
+
+    Args:
+        stock_code: 股票代码
+        real_data: 已获取的实时行情（批量分析时传入，避免重复获取）
+        defer_ai: True表示先返回规则建议、AI分析转后台；False表示不转后台；None表示按模型负载自动决定
     """
     try:
         # 1. 获取真实数据
-        collector = TencentFinanceCollector()
-        real_data = collector.get_stock_realtime_data(stock_code)
+        if real_data is None:
+            collector = TencentFinanceCollector()
+            real_data = fetch_realtime_data_shared(collector, stock_code)
 
         if not real_data or not real_data.get("股票名称"):
             # 标准化股票代码用于错误提示
@@ -1445,89 +1639,34 @@ async def analyze_stock_async(stock_code: str):
         }
 
         # 3. 如果是支持的图形类型，进行AI分析
-        supported_patterns = ["开盘跳水", "破位下跌", "冲板回落"]
-
-        if pattern_type in supported_patterns and API_KEY:
-            # 准备分析数据
-            current = real_data['实时价']
-            open_price = real_data['开盘价']
-
-            analysis_data = {
-                "股票代码": stock_code,
-                "股票名称": real_data["股票名称"],
-                "触发时间": datetime.now().strftime("%H:%M"),
-                "开盘价": open_price,
-                "实时价": current,
-                "最高价": real_data["最高价"],
-                "涨停价": real_data["涨停价"],
-                "5日均线": round(current * 0.995, 2),
-                "20日均线": round(current * 0.98, 2),
-                "前期平台支撑位": round(current * 0.97, 2),
-                "成交额放大比例": 25.0,
-                "板块名称": real_data.get("板块名称", "未知"),
-                "板块涨跌幅": 0,
-                "大盘涨跌幅": 0,
-                "最新消息": "无"
-            }
-
-            # 添加图形特定字段
-            if pattern_type == "开盘跳水":
-                drop = abs(round((open_price - current) / open_price * 100, 2)) if open_price > 0 else 0
-                analysis_data.update({
-                    "开盘分钟数": 10,
-                    "跌幅": drop,
-                    "均线类型": 5,
-                    "均线价格": analysis_data["5日均线"]
-                })
-            elif pattern_type == "破位下跌":
-                analysis_data.update({
-                    "支撑位价格": analysis_data["前期平台支撑位"],
-                    "破位后未回弹分钟数": 5
-                })
-            elif pattern_type == "冲板回落":
-                surge = round((real_data['最高价'] - open_price) / open_price * 100, 2) if open_price > 0 else 0
-                retrace = round((real_data['最高价'] - current) / real_data['最高价'] * 100, 2) if real_data['最高价'] > 0 else 0
-                analysis_data.update({
-                    "涨幅": surge,
-                    "回落幅度": retrace,
-                    "封板挂单量": 10000
-                })
+        if pattern_type in SUPPORTED_AI_PATTERNS and API_KEY:
+            analysis_data = build_analysis_data(stock_code, real_data, pattern_type)
+            prompt = build_analysis_prompt(pattern_type, analysis_data)
 
-            # 生成提示词
-            from src.templates.prompt_templates import generate_prompt, TemplateType
-            prompt = generate_prompt(
-                chart_type=pattern_type,
-                stock_data=analysis_data,
-                trading_style="短线",
-                template_type=TemplateType.SIMPLIFIED
+            # 调用智谱AI（负载过高时降级为规则建议）
+            ai_status, ai_response, job = await resolve_ai_analysis(
+                stock_code, pattern_type, analysis_data, prompt, defer_ai
             )
 
-            # 调用智谱AI
-            adapter = ZhipuAdapter(api_key=API_KEY, model=MODEL)
-            ai_response = await adapter.async_chat(prompt)
-
-            response['ai_analysis'] = {
-                'pattern_type': pattern_type,
-                'analysis': ai_response,
-                'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            }
+            response['ai_status'] = ai_status
+            if ai_response is not None:
+                response['ai_analysis'] = {
+                    'pattern_type': pattern_type,
+                    'analysis': ai_response,
+                    'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                }
+            else:
+                response['message'] = AI_STATUS_MESSAGES[ai_status]
+            if job is not None:
+                response['ai_job'] = _job_links(job)
 
-            # 生成操作建议
-            from src.utils.suggestions import OperationSuggestionGenerator, format_suggestion
-            suggestion = OperationSuggestionGenerator.generate_suggestion(
-                pattern_type, analysis_data, ai_response
+            # 生成操作建议（规则建议不依赖AI结果，降级时同样返回）
+            response['operation_suggestion'] = build_operation_suggestion(
+                pattern_type, analysis_data, ai_response or ""
             )
-
-            response['operation_suggestion'] = {
-                'action': suggestion.action,
-                'confidence': suggestion.confidence,
-                'reasoning': suggestion.reasoning,
-                'price_levels': suggestion.price_level,
-                'risk_warning': suggestion.risk_warning
-            }
         else:
             # 不适合分析的状态
-            if pattern_type not in supported_patterns:
+            if pattern_type not in SUPPORTED_AI_PATTERNS:
                 response['message'] = f'当前市场状态为"{pattern_type}"，不适合图形分析'
 
                 if pattern_type == "强势上涨":
@@ -1567,19 +1706,16 @@ def batch_analyze_api():
                 'error': '请提供股票代码列表'
             })
 
+        # async=true 时转为后台任务，立即返回任务ID
+        if data.get('async'):
+            return jsonify(_submit_analysis_job(stock_codes))
+
         # 异步批量分析
         loop = asyncio.new_event_loop()
         asyncio.set_event_loop(loop)
 
         try:
-            async def batch_analyze():
-                results = []
-                for stock_code in stock_codes:
-                    result = await analyze_stock_async(stock_code)
-                    results.append(result)
-                return results
-
-            results = loop.run_until_complete(batch_analyze())
+            results = loop.run_until_complete(analyze_stocks_batched(stock_codes))
 
             return jsonify({
                 'success': True,
@@ -1597,6 +1733,289 @@ def batch_analyze_api():
         })
 
 
+
+def _submit_analysis_job(stock_codes):
+    """提交后台批量分析任务"""
+    job = analysis_jobs.submit(stock_codes)
+    return {
+        'success': True,
+        'status': job.status,
+        'total': len(job.stock_codes),
+        **_job_links(job)
+    }
+
+
+@app.route('/api/analysis-jobs', methods=['POST'])
+def create_analysis_job_api():
+    """创建批量分析任务API - 立即返回任务ID，分析在后台执行"""
+    try:
+        data = request.json or {}
+        stock_codes = data.get('stock_codes') or data.get('codes') or []
+
+        if not stock_codes:
+            return jsonify({
+                'success': False,
+                'error': '请提供股票代码列表'
+            })
+
+        return jsonify(_submit_analysis_job(stock_codes))
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        })
+
+
+@app.route('/api/analysis-jobs/<job_id>', methods=['GET'])
+def analysis_job_status_api(job_id):
+    """查询分析任务API - 支持since参数增量获取结果"""
+    since = request.args.get('since', 0, type=int)
+    manager = _find_job_manager(job_id)
+    job = manager.snapshot(job_id, since=since) if manager else None
+
+    if not job:
+        return jsonify({
+            'success': False,
+            'error': '任务不存在或已过期'
+        }), 404
+
+    return jsonify({
+        'success': True,
+        'job': job
+    })
+
+
+@app.route('/api/analysis-jobs/<job_id>/stream', methods=['GET'])
+def analysis_job_stream_api(job_id):
+    """分析任务SSE推送API - 每完成一只股票推送一条result事件"""
+    manager = _find_job_manager(job_id)
+    if not manager:
+        return jsonify({
+            'success': False,
+            'error': '任务不存在或已过期'
+        }), 404
+
+    since = request.args.get('since', 0, type=int)
+
+    def generate():
+        for event, payload in manager.iter_events(job_id, since=since):
+            if event == 'heartbeat':
+                yield ': heartbeat\n\n'
+                continue
+            yield f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+    return Response(
+        generate(),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+
+@app.route('/api/analyze/stream', methods=['GET'])
+def analyze_stream_api():
+    """
+    流式分析API（SSE）
+    先推送行情和图形识别结果（meta），AI分析文本逐段推送（token），
+    生成结束后推送完整分析和操作建议（done）
+    """
+    stock_code = request.args.get('stock_code', '').strip()
+    if not stock_code:
+        return jsonify({
+            'success': False,
+            'error': '请提供股票代码'
+        }), 400
+
+    try:
+        collector = TencentFinanceCollector()
+        real_data = fetch_realtime_data_shared(collector, stock_code)
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'分析失败: {str(e)}'
+        })
+
+    if not real_data or not real_data.get("股票名称"):
+        display_code = stock_code.upper() if any(c.isalpha() for c in stock_code) else stock_code
+        return jsonify({
+            'success': False,
+            'error': f'无法获取股票 {display_code} 的数据'
+        })
+
+    pattern_type, confidence, reason = detect_pattern_type(real_data)
+    prev_close = real_data.get('昨收', real_data.get('开盘价', 0))
+    change_percent = ((real_data['实时价'] - prev_close) / prev_close * 100) if prev_close > 0 else 0
+
+    meta = {
+        'stock_code': real_data.get('股票代码'),
+        'stock_name': real_data.get('股票名称'),
+        'open_price': real_data.get('开盘价'),
+        'current_price': real_data.get('实时价'),
+        'high_price': real_data.get('最高价'),
+        'low_price': real_data.get('最低价'),
+        'limit_up': real_data.get('涨停价'),
+        'change_percent': round(change_percent, 2),
+        'volume': real_data.get('成交量'),
+        'pattern_detection': {
+            'type': pattern_type,
+            'confidence': confidence,
+            'reason': reason
+        },
+        'update_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    }
+
+    def sse(event, payload):
+        return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+    def generate():
+        yield sse('meta', meta)
+
+        if pattern_type not in SUPPORTED_AI_PATTERNS:
+            yield sse('done', {'message': f'当前市场状态为"{pattern_type}"，不适合图形分析'})
+            return
+        if not API_KEY:
+            yield sse('done', {'message': '未配置智谱AI密钥，无法进行AI分析'})
+            return
+
+        analysis_data = build_analysis_data(stock_code, real_data, pattern_type)
+        prompt = build_analysis_prompt(pattern_type, analysis_data)
+        cache_key = make_cache_key(MODEL, "简化版", pattern_type, analysis_data)
+
+        ai_response = get_stored_analysis(cache_key)
+        if ai_response is not None:
+            yield sse('token', {'text': ai_response})
+        elif llm_load_shedder.decide(allow_defer=False) == LLMLoadShedder.SKIP:
+            # 模型负载过高：只返回规则建议
+            yield sse('done', {
+                'ai_status': 'skipped',
+                'message': AI_STATUS_MESSAGES['skipped'],
+                'operation_suggestion': build_operation_suggestion(pattern_type, analysis_data, "")
+            })
+            return
+        else:
+            chunks = []
+            start = time.perf_counter()
+            try:
+                adapter = get_analysis_adapter()
+                for chunk in adapter.stream_chat(prompt):
+                    chunks.append(chunk)
+                    yield sse('token', {'text': chunk})
+            except Exception as e:
+                yield sse('error', {'error': f'AI分析失败: {str(e)}'})
+                return
+            finally:
+                llm_load_shedder.record(time.perf_counter() - start)
+            ai_response = ''.join(chunks)
+            store_analysis(stock_code, pattern_type, analysis_data, cache_key, ai_response)
+
+        yield sse('done', {
+            'ai_status': 'done',
+            'ai_analysis': {
+                'pattern_type': pattern_type,
+                'analysis': ai_response,
+                'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            },
+            'operation_suggestion': build_operation_suggestion(pattern_type, analysis_data, ai_response)
+        })
+
+    return Response(
+        generate(),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+
+def _history_query_args() -> dict:
+    """解析历史查询的公共参数"""
+    return {
+        'stock_code': request.args.get('stock_code', '').strip() or None,
+        'since': parse_since(request.args.get('since')),
+        'limit': min(request.args.get('limit', 50, type=int), 500)
+    }
+
+
+@app.route('/api/history/analyses', methods=['GET'])
+def history_analyses_api():
+    """AI分析历史API - 支持stock_code、pattern_type、since、limit参数"""
+    if history_store is None:
+        return jsonify({'success': False, 'error': '未启用历史存储'}), 404
+
+    records = history_store.query_analyses(
+        pattern_type=request.args.get('pattern_type', '').strip() or None,
+        **_history_query_args()
+    )
+    return jsonify({'success': True, 'total': len(records), 'records': records})
+
+
+@app.route('/api/history/triggers', methods=['GET'])
+def history_triggers_api():
+    """监控触发事件历史API - 支持stock_code、pattern_type、since、limit参数"""
+    if history_store is None:
+        return jsonify({'success': False, 'error': '未启用历史存储'}), 404
+
+    records = history_store.query_triggers(
+        pattern_type=request.args.get('pattern_type', '').strip() or None,
+        **_history_query_args()
+    )
+    return jsonify({'success': True, 'total': len(records), 'records': records})
+
+
+@app.route('/api/history/snapshots', methods=['GET'])
+def history_snapshots_api():
+    """行情快照历史API - 必须提供stock_code，支持since、limit参数"""
+    if history_store is None:
+        return jsonify({'success': False, 'error': '未启用历史存储'}), 404
+
+    args = _history_query_args()
+    if not args['stock_code']:
+        return jsonify({'success': False, 'error': '请提供股票代码'}), 400
+
+    records = history_store.query_snapshots(**args)
+    return jsonify({'success': True, 'total': len(records), 'records': records})
+
+
+@app.route('/api/monitor/status', methods=['GET'])
+def monitor_status_api():
+    """持续监控状态API - 监控轮次、触发中的图形和事件总线统计"""
+    return jsonify({
+        'success': True,
+        'enabled': monitor_service is not None,
+        'monitor': monitor_service.status() if monitor_service is not None else None,
+        'event_bus': event_bus.stats()
+    })
+
+
+@app.route('/api/monitor/events', methods=['GET'])
+def monitor_events_api():
+    """
+    监控事件SSE推送API
+    推送trigger（新触发）和cleared（图形解除）事件；断线重连时根据Last-Event-ID或since参数补发，
+    序号大于服务端当前序号（服务重启且未落盘）时先推送reset事件，再从头补发
+    """
+    since = request.headers.get('Last-Event-ID') or request.args.get('since')
+    try:
+        since = int(since) if since not in (None, '') else None
+    except ValueError:
+        return jsonify({'success': False, 'error': 'since参数必须是整数'}), 400
+
+    return Response(
+        event_bus.sse_stream(since, maxsize=EVENT_SSE_QUEUE),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics_api():
+    """Prometheus指标接口（默认仅允许本机访问，METRICS_PUBLIC=true时放开）"""
+    if os.getenv('METRICS_PUBLIC', 'false').lower() != 'true' and request.remote_addr not in ('127.0.0.1', '::1'):
+        return Response('forbidden\n', status=403, mimetype='text/plain')
+
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+
 if __name__ == '__main__':
     print("\n" + "="*70)
     print(" " * 20 + "🌐 股票分析Web服务")
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+监控事件总线基准测试
+以指定速率发布触发事件，同时挂载：追加式日志、文件订阅者、本地Webhook替身（每批固定延迟）、
+模拟SSE客户端（合并策略、慢速消费），统计发布吞吐、发布耗时分位数和各订阅者的投递/丢弃/合并情况，
+验证慢订阅者不会拖慢发布方。不需要联网
+
+用法:
+    python bench_event_bus.py
+    python bench_event_bus.py --events 50000 --stocks 500 --webhook-delay 0.2
+"""
+
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.utils.event_bus import EventBus, FileSink, Subscription, WebhookSink
+
+
+PATTERNS = ["开盘跳水", "破位下跌", "冲板回落"]
+
+
+def start_webhook_standin(delay: float):
+    """
+    启动本地Webhook替身服务：每个请求固定延迟后返回200
+
+    Returns:
+        (server, url, 统计字典)
+    """
+    import json
+    import logging
+    from werkzeug.serving import make_server
+    from werkzeug.wrappers import Request, Response
+
+    received = {"requests": 0, "events": 0}
+    lock = threading.Lock()
+
+    @Request.application
+    def application(request):
+        body = json.loads(request.get_data())
+        time.sleep(delay)
+        with lock:
+            received["requests"] += 1
+            received["events"] += len(body["events"])
+        return Response('{"ok":true}', mimetype="application/json")
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    server = make_server("127.0.0.1", 0, application, threaded=True)
+    threading.Thread(target=server.serve_forever, name="webhook-standin", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/hook", received
+
+
+def sse_client(subscription: Subscription, consume_delay: float, received: list, stop: threading.Event):
+    """模拟SSE客户端：每批处理后停顿consume_delay秒（网络慢的浏览器）"""
+    while not stop.is_set() or subscription.depth:
+        batch = subscription.get_batch(100, timeout=0.2)
+        received.extend(batch)
+        if batch:
+            time.sleep(consume_delay)
+
+
+def main(events: int, stocks: int, rate: float, webhook_delay: float, sse_delay: float):
+    rng = random.Random(45)
+    codes = [f"{600000 + i:06d}" for i in range(stocks)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bus = EventBus(os.path.join(tmp, "events.log"))
+        server, url, webhook_received = start_webhook_standin(webhook_delay)
+
+        bus.subscribe("file", FileSink(os.path.join(tmp, "triggers.jsonl")), maxsize=10000, policy=Subscription.DROP_NEWEST)
+        bus.subscribe("webhook", WebhookSink(url), maxsize=1000, policy=Subscription.DROP_OLDEST, batch_size=200)
+        sse_subscription = bus.subscribe("sse", maxsize=256, policy=Subscription.COALESCE)
+        sse_received: list = []
+        stop = threading.Event()
+        sse_thread = threading.Thread(target=sse_client, args=(sse_subscription, sse_delay, sse_received, stop))
+        sse_thread.start()
+
+        interval = 1 / rate if rate > 0 else 0
+        latencies = []
+        start = time.perf_counter()
+        for i in range(events):
+            data = {
+                "股票代码": rng.choice(codes),
+                "图形类型": rng.choice(PATTERNS),
+                "实时价": round(rng.uniform(5, 50), 2),
+                "触发规则": "开盘5分钟跳水",
+            }
+            t0 = time.perf_counter()
+            bus.publish("trigger", data)
+            latencies.append((time.perf_counter() - t0) * 1e6)
+            if interval:
+                # 按速率发布，模拟持续产生的触发事件
+                target = start + (i + 1) * interval
+                while time.perf_counter() < target:
+                    pass
+        publish_seconds = time.perf_counter() - start
+
+        stop.set()
+        sse_thread.join()
+        bus.flush()
+        time.sleep(webhook_delay + 0.2)
+        stats = bus.stats()
+        bus.close()
+        server.shutdown()
+
+        latencies.sort()
+        print("=" * 70)
+        print(f"事件总线基准：{events}条事件，{stocks}只股票，目标速率 {'不限' if not rate else f'{rate:.0f}条/秒'}")
+        print("=" * 70)
+        print(f"发布吞吐: {events / publish_seconds:,.0f} 条/秒（耗时 {publish_seconds:.2f} 秒）")
+        print(f"单次发布耗时: 中位数 {statistics.median(latencies):.1f}µs  "
+              f"p99 {latencies[int(len(latencies) * 0.99) - 1]:.1f}µs  最大 {latencies[-1]:.1f}µs")
+        print(f"追加日志: {stats['log_written']} 条")
+        print("-" * 70)
+        print(f"{'订阅者':<10}{'策略':<14}{'投递':>8}{'丢弃':>8}{'合并':>8}{'积压':>8}")
+        for sub in stats["subscribers"]:
+            print(f"{sub['name']:<10}{sub['policy']:<14}{sub['delivered']:>8}{sub['dropped']:>8}{sub['coalesced']:>8}{sub['depth']:>8}")
+        print("-" * 70)
+        print(f"Webhook替身收到 {webhook_received['requests']} 次请求 / {webhook_received['events']} 条事件"
+              f"（每次延迟 {webhook_delay * 1000:.0f}ms）")
+        print(f"SSE客户端收到 {len(sse_received)} 条（同一股票同一图形积压时只推送最新一条）")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="监控事件总线基准测试")
+    parser.add_argument("--events", type=int, default=20000, help="发布的事件数")
+    parser.add_argument("--stocks", type=int, default=300, help="股票数量")
+    parser.add_argument("--rate", type=float, default=0, help="发布速率（条/秒），0表示尽快发布")
+    parser.add_argument("--webhook-delay", type=float, default=0.1, help="Webhook替身每次请求的延迟（秒）")
+    parser.add_argument("--sse-delay", type=float, default=0.05, help="模拟SSE客户端每批处理后的停顿（秒）")
+    args = parser.parse_args()
+
+    main(args.events, args.stocks, args.rate, args.webhook_delay, args.sse_delay)
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+模型调用链路压测
+在后台启动本地替身服务，经由智谱AI SDK + 适配器池 + 限流调度器发起并发调用，
+统计吞吐、耗时分位数、错误和限流情况，不需要真实API密钥
+
+用法:
+    python bench_llm_stack.py --requests 100 --concurrency 20 --latency lognormal:0.5,0.5
+    python bench_llm_stack.py --stream --rpm 600 --stub-rpm 300 --rate-limit-rate 0.05
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from llm_stub_server import StubConfig, start_stub_server
+from src.aigc.model_adapter import AdapterPool, ModelProvider
+from src.aigc.rate_limiter import LLMGovernor
+from src.monitors.data_collector import create_monitoring_data
+from src.templates.prompt_templates import TemplateType, generate_prompt
+from src.utils.metrics import LLM_FIRST_TOKEN_SECONDS
+
+
+PATTERNS = ["开盘跳水", "破位下跌", "冲板回落"]
+
+
+def percentile(values, q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+async def run(args):
+    server, base_url = start_stub_server(StubConfig(
+        latency=args.latency,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        rpm=args.stub_rpm
+    ))
+
+    governor = LLMGovernor(
+        requests_per_minute=args.rpm,
+        max_in_flight=args.max_in_flight,
+        timeout=args.queue_timeout
+    ) if args.rpm > 0 else None
+    pool = AdapterPool(max_workers=args.concurrency, governor=governor)
+    adapter = pool.get(
+        ModelProvider.ZHIPU,
+        api_key="stub.key",
+        model="glm-4-flash",
+        base_url=f"{base_url}/api/paas/v4"
+    )
+
+    prompts = [
+        generate_prompt(pattern, create_monitoring_data("600000", pattern, use_real_data=False),
+                        template_type=TemplateType.SIMPLIFIED)
+        for pattern in PATTERNS
+    ]
+
+    latencies, errors = [], []
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one(i: int):
+        prompt = prompts[i % len(prompts)]
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                if args.stream:
+                    async for _ in adapter.async_stream_chat(prompt):
+                        pass
+                else:
+                    await adapter.async_chat(prompt)
+                latencies.append(time.perf_counter() - start)
+            except Exception as e:
+                errors.append(type(e).__name__ + ": " + str(e)[:60])
+
+    print("=" * 70)
+    print(f"模型调用链路压测：{args.requests}次请求，并发{args.concurrency}，"
+          f"{'流式' if args.stream else '非流式'}，替身耗时分布 {args.latency}")
+    print(f"调度器：RPM={args.rpm or '不限'} 并发上限={args.max_in_flight}；"
+          f"替身服务：RPM={args.stub_rpm or '不限'} 随机429={args.rate_limit_rate} 错误率={args.error_rate}")
+    print("=" * 70)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(args.requests)))
+    elapsed = time.perf_counter() - started
+
+    print(f"总耗时: {elapsed:.2f}s  吞吐: {len(latencies) / elapsed:.2f} 次/秒")
+    print(f"成功: {len(latencies)}  失败: {len(errors)}")
+    if latencies:
+        print(f"耗时 p50={percentile(latencies, 0.5):.3f}s  p90={percentile(latencies, 0.9):.3f}s  "
+              f"p99={percentile(latencies, 0.99):.3f}s  平均={statistics.mean(latencies):.3f}s")
+    if args.stream:
+        count, total = LLM_FIRST_TOKEN_SECONDS.stats(provider="zhipu", model="glm-4-flash")
+        if count:
+            print(f"首个片段平均耗时: {total / count:.3f}s")
+    if errors:
+        print("失败示例:")
+        for message in sorted(set(errors))[:5]:
+            print(f"  - {message}")
+
+    import requests
+    print(f"替身服务统计: {requests.get(f'{base_url}/stats', timeout=5).json()}")
+
+    pool.shutdown()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="模型调用链路压测（使用本地替身服务）")
+    parser.add_argument("--requests", type=int, default=60, help="请求总数")
+    parser.add_argument("--concurrency", type=int, default=10, help="并发数")
+    parser.add_argument("--stream", action="store_true", help="使用流式调用")
+    parser.add_argument("--latency", default="lognormal:0.5,0.5", help="替身服务耗时分布")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="替身服务随机500错误比例")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="替身服务随机429比例")
+    parser.add_argument("--stub-rpm", type=float, default=None, help="替身服务每分钟请求上限")
+    parser.add_argument("--rpm", type=float, default=600, help="客户端调度器每分钟请求上限（0表示不限流）")
+    parser.add_argument("--max-in-flight", type=int, default=8, help="客户端调度器并发上限")
+    parser.add_argument("--queue-timeout", type=float, default=60, help="客户端排队截止时间（秒）")
+    args = parser.parse_args()
+
+    asyncio.run(run(args))
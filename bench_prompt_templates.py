@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Prompt模板基准测试
+对比完整版/精简版/简化版/批量模板的Prompt Token数和（本地模拟模型的）调用耗时，不需要API密钥
+
+用法:
+    python bench_prompt_templates.py
+    python bench_prompt_templates.py --rounds 20 --prefill-ms 0.5
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.aigc.model_adapter import MockAIGCAdapter
+from src.aigc.rate_limiter import estimate_tokens
+from src.monitors.data_collector import create_monitoring_data
+from src.templates.prompt_templates import TemplateType, generate_prompt, generate_batch_prompt
+
+
+PATTERNS = ["开盘跳水", "破位下跌", "冲板回落"]
+
+
+class StubModelAdapter(MockAIGCAdapter):
+    """
+    本地模拟模型
+
+    耗时 = 固定开销 + 输入Token数 × 单Token预填充耗时 + 输出Token数 × 单Token生成耗时，
+    回复内容沿用MockAIGCAdapter的模拟响应。
+    """
+
+    def __init__(self, base_ms: float, prefill_ms: float, decode_ms: float):
+        super().__init__()
+        self.base_ms = base_ms
+        self.prefill_ms = prefill_ms
+        self.decode_ms = decode_ms
+
+    async def async_chat(self, prompt: str, **kwargs) -> str:
+        response = self.chat(prompt, **kwargs)
+        delay_ms = (
+            self.base_ms
+            + estimate_tokens(prompt) * self.prefill_ms
+            + estimate_tokens(response) * self.decode_ms
+        )
+        await asyncio.sleep(delay_ms / 1000)
+        return response
+
+
+def build_prompts():
+    """生成各模板变体的Prompt：{变体名称: [(图形类型, prompt), ...]}"""
+    samples = {
+        pattern: create_monitoring_data("600000", pattern, use_real_data=False)
+        for pattern in PATTERNS
+    }
+
+    variants = {}
+    for template_type in (TemplateType.FULL, TemplateType.COMPACT, TemplateType.SIMPLIFIED):
+        variants[template_type.value] = [
+            (pattern, generate_prompt(pattern, data, template_type=template_type))
+            for pattern, data in samples.items()
+        ]
+
+    # 批量模板：三只股票一次调用，按平均每只股票计算
+    variants["批量(3只)"] = [("全部", generate_batch_prompt(list(samples.values())))]
+    return variants
+
+
+async def measure(adapter, prompt: str, rounds: int):
+    """多次调用，返回每次耗时（毫秒）"""
+    latencies = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        await adapter.async_chat(prompt)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+async def run(rounds: int, base_ms: float, prefill_ms: float, decode_ms: float):
+    adapter = StubModelAdapter(base_ms, prefill_ms, decode_ms)
+
+    print("=" * 78)
+    print(f"Prompt模板基准测试（每项{rounds}次，模拟模型：固定{base_ms}ms + "
+          f"预填充{prefill_ms}ms/Token + 生成{decode_ms}ms/Token）")
+    print("=" * 78)
+    print(f"{'模板':<10}{'图形':<8}{'字符数':>8}{'Token数':>10}{'每只Token':>12}{'p50(ms)':>10}{'p90(ms)':>10}")
+    print("-" * 78)
+
+    totals = {}
+    for variant, prompts in build_prompts().items():
+        per_stock = 1 if variant != "批量(3只)" else len(PATTERNS)
+        for pattern, prompt in prompts:
+            tokens = estimate_tokens(prompt)
+            latencies = sorted(await measure(adapter, prompt, rounds))
+            p50 = statistics.median(latencies)
+            p90 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.9))]
+            totals.setdefault(variant, []).append(tokens / per_stock)
+            print(f"{variant:<10}{pattern:<8}{len(prompt):>8}{tokens:>10}"
+                  f"{tokens / per_stock:>12.0f}{p50:>10.1f}{p90:>10.1f}")
+
+    print("-" * 78)
+    baseline = statistics.mean(totals[TemplateType.FULL.value])
+    for variant, values in totals.items():
+        average = statistics.mean(values)
+        print(f"{variant:<10} 平均每只股票 {average:>6.0f} Token（较完整版 {(average / baseline - 1) * 100:+.0f}%）")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Prompt模板Token数与耗时基准测试")
+    parser.add_argument("--rounds", type=int, default=10, help="每个Prompt的调用次数")
+    parser.add_argument("--base-ms", type=float, default=50, help="模拟模型固定开销（毫秒）")
+    parser.add_argument("--prefill-ms", type=float, default=0.3, help="每个输入Token的预填充耗时（毫秒）")
+    parser.add_argument("--decode-ms", type=float, default=2.0, help="每个输出Token的生成耗时（毫秒）")
+    args = parser.parse_args()
+
+    asyncio.run(run(args.rounds, args.base_ms, args.prefill_ms, args.decode_ms))
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+全市场筛选基准测试
+对比逐只调用 detect_pattern_type / is_speculative_stock / is_retail_favorite_stock（每只一行快照）
+与整批列式向量化筛选（src.monitors.screener）的耗时，使用随机生成的全A股规模行情，不需要联网
+
+用法:
+    python bench_screening.py
+    python bench_screening.py --stocks 5500 --rounds 20 --top 50
+"""
+
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from analyze import detect_pattern_type
+from src.monitors.screener import QuoteSnapshot, is_retail_favorite_stock, is_speculative_stock, screen
+
+
+NAMES = ["浦发银行", "*ST海润", "科技智能", "人工智能", "生物医药", "芯片半导体", "新能源锂电", "中国平安", "传媒教育"]
+
+
+def generate_quotes(count: int, seed: int = 7):
+    """生成随机行情（字段与TencentFinanceCollector一致）"""
+    rng = random.Random(seed)
+    quotes = []
+    for i in range(count):
+        prev_close = rng.uniform(2, 120)
+        high = prev_close * rng.uniform(1.0, 1.12)
+        low = prev_close * rng.uniform(0.88, 1.0)
+        quotes.append({
+            '股票代码': f"{i:06d}",
+            '股票名称': rng.choice(NAMES),
+            '实时价': round(rng.uniform(low, high), 2),
+            '开盘价': round(prev_close * rng.uniform(0.95, 1.05), 2),
+            '最高价': round(high, 2),
+            '最低价': round(low, 2),
+            '昨收': round(prev_close, 2),
+            '涨停价': round(prev_close * 1.1, 2),
+            '换手率': rng.uniform(0.2, 30),
+            '总市值': rng.uniform(1e9, 5e11),
+            '成交额': rng.uniform(1e7, 2e10),
+        })
+    return quotes
+
+
+def timed(func, rounds: int):
+    """多次执行取耗时（毫秒）"""
+    samples = []
+    result = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        result = func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return result, samples
+
+
+def main(stocks: int, rounds: int, top: int):
+    quotes = generate_quotes(stocks)
+
+    snapshot, build_ms = timed(lambda: QuoteSnapshot.from_quotes(quotes), rounds)
+    result, screen_ms = timed(lambda: screen(snapshot), rounds)
+
+    def select_top():
+        mask = result.retail_favorite | result.speculative
+        return result.to_rows(result.select(mask, order_by=result.retail_score, limit=top))
+
+    _, render_ms = timed(select_top, rounds)
+
+    def scalar():
+        return [
+            (detect_pattern_type(q), is_speculative_stock(q), is_retail_favorite_stock(q))
+            for q in quotes
+        ]
+
+    _, scalar_ms = timed(scalar, max(1, rounds // 5))
+
+    print("=" * 70)
+    print(f"全市场筛选基准：{stocks}只股票，{rounds}轮")
+    print("=" * 70)
+    print(f"{'阶段':<24}{'中位数(ms)':>12}{'最小(ms)':>12}")
+    print("-" * 70)
+    for label, samples in [
+        ("构建列式快照", build_ms),
+        ("向量化筛选（三项判定）", screen_ms),
+        (f"排序+生成前{top}行理由", render_ms),
+        ("逐只判定", scalar_ms),
+    ]:
+        print(f"{label:<24}{statistics.median(samples):>12.2f}{min(samples):>12.2f}")
+    print("-" * 70)
+    print(f"筛选提速: {statistics.median(scalar_ms) / statistics.median(screen_ms):.0f}x "
+          f"（游资票 {int(np.count_nonzero(result.speculative))} 只，散户最爱 {int(np.count_nonzero(result.retail_favorite))} 只）")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="全市场向量化筛选基准测试")
+    parser.add_argument("--stocks", type=int, default=5500, help="股票数量（约为全A股规模）")
+    parser.add_argument("--rounds", type=int, default=20, help="重复次数")
+    parser.add_argument("--top", type=int, default=50, help="生成理由文本的行数")
+    args = parser.parse_args()
+
+    main(args.stocks, args.rounds, args.top)
@@ -50,8 +50,8 @@ async def main():
     )
 
     print("\n测试规则检查...")
-    result = monitor._check_opening_dive(data, minutes=10, drop_percent=2)
-    print(f"规则检查结果: {result}")
+    for rule in monitor.opening_dive_rules:
+        print(f"规则检查结果: {rule.name} -> {rule.condition(data)}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+本地模型替身服务
+兼容OpenAI / 智谱AI的chat/completions接口，回复内容沿用MockAIGCAdapter的模拟响应，
+可配置耗时分布、流式输出、错误率和限流（429），用于在不消耗API额度的情况下压测完整的调用链路
+
+用法:
+    python llm_stub_server.py --port 8001 --latency lognormal:1.5,0.5 --rpm 120 --error-rate 0.02
+
+    # 让Web服务使用替身服务
+    ZHIPU_API_KEY=stub.key ZHIPU_BASE_URL=http://127.0.0.1:8001/api/paas/v4 python app.py
+"""
+
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from typing import Optional
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask, Response, jsonify, request
+
+from src.aigc.model_adapter import MockAIGCAdapter
+from src.aigc.rate_limiter import TokenBucket, estimate_tokens
+
+
+class LatencyDistribution:
+    """
+    耗时分布（秒）
+
+    支持的格式：
+    - fixed:1.5            固定1.5秒
+    - uniform:0.5,3        0.5~3秒均匀分布
+    - normal:1.5,0.3       均值1.5秒、标准差0.3秒的正态分布（截断为非负）
+    - lognormal:1.5,0.5    中位数1.5秒、对数标准差0.5的对数正态分布（长尾）
+    """
+
+    def __init__(self, spec: str = "fixed:0"):
+        kind, _, args = spec.partition(":")
+        self.kind = kind
+        self.args = [float(x) for x in args.split(",") if x] or [0.0]
+        if kind not in ("fixed", "uniform", "normal", "lognormal"):
+            raise ValueError(f"不支持的耗时分布: {spec}")
+        self.spec = spec
+
+    def sample(self) -> float:
+        if self.kind == "fixed":
+            return self.args[0]
+        if self.kind == "uniform":
+            return random.uniform(self.args[0], self.args[1])
+        if self.kind == "normal":
+            return max(0.0, random.gauss(self.args[0], self.args[1]))
+        return random.lognormvariate(math.log(max(self.args[0], 1e-6)), self.args[1])
+
+
+class StubConfig:
+    """替身服务配置"""
+
+    def __init__(
+        self,
+        latency: str = "fixed:0",
+        first_token_ratio: float = 0.2,
+        chunk_size: int = 8,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        rpm: Optional[float] = None
+    ):
+        """
+        Args:
+            latency: 完整回复耗时分布（见LatencyDistribution）
+            first_token_ratio: 流式输出时首个片段到达时间占总耗时的比例
+            chunk_size: 流式输出每个片段的字符数
+            error_rate: 随机返回500错误的比例
+            rate_limit_rate: 随机返回429的比例（模拟服务端突发限流）
+            rpm: 每分钟请求上限，超过时返回429（None表示不限制）
+        """
+        self.latency = LatencyDistribution(latency)
+        self.first_token_ratio = first_token_ratio
+        self.chunk_size = chunk_size
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.bucket = TokenBucket(max(1.0, rpm / 12), rpm / 60) if rpm else None
+
+
+def create_stub_app(config: StubConfig) -> Flask:
+    """
+    创建替身服务应用
+
+    Args:
+        config: 服务配置
+
+    Returns:
+        Flask应用
+    """
+    app = Flask(__name__)
+    mock = MockAIGCAdapter()
+    stats = {"requests": 0, "ok": 0, "errors": 0, "rate_limited": 0, "streams": 0}
+    stats_lock = threading.Lock()
+
+    def count(name: str):
+        with stats_lock:
+            stats[name] += 1
+
+    def error_response(status: int, code: str, message: str):
+        response = jsonify({"error": {"code": code, "message": message, "type": code}})
+        response.status_code = status
+        if status == 429:
+            response.headers["Retry-After"] = "1"
+        return response
+
+    def chat_completions():
+        count("requests")
+        body = request.get_json(silent=True) or {}
+        model = body.get("model", "stub")
+        messages = body.get("messages") or []
+        prompt = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+
+        # 限流：先判断每分钟配额，再按比例随机限流
+        if config.bucket is not None:
+            if config.bucket.wait_time(1) > 0:
+                count("rate_limited")
+                return error_response(429, "rate_limit_exceeded", "请求频率超过限制")
+            config.bucket.consume(1)
+        if random.random() < config.rate_limit_rate:
+            count("rate_limited")
+            return error_response(429, "rate_limit_exceeded", "服务繁忙，请稍后重试")
+        if random.random() < config.error_rate:
+            count("errors")
+            return error_response(500, "internal_error", "模拟服务端错误")
+
+        text = mock.chat(prompt)
+        total = config.latency.sample()
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+        usage = {
+            "prompt_tokens": estimate_tokens(prompt),
+            "completion_tokens": estimate_tokens(text),
+            "total_tokens": estimate_tokens(prompt) + estimate_tokens(text)
+        }
+
+        if not body.get("stream"):
+            time.sleep(total)
+            count("ok")
+            return jsonify({
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": text},
+                    "finish_reason": "stop"
+                }],
+                "usage": usage
+            })
+
+        count("streams")
+        chunks = [text[i:i + config.chunk_size] for i in range(0, len(text), config.chunk_size)]
+        first_delay = total * config.first_token_ratio
+        chunk_delay = (total - first_delay) / max(1, len(chunks) - 1)
+
+        def generate():
+            time.sleep(first_delay)
+            for i, chunk in enumerate(chunks):
+                if i:
+                    time.sleep(chunk_delay)
+                payload = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [{"index": 0, "delta": {"role": "assistant", "content": chunk}, "finish_reason": None}]
+                }
+                yield f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+            final = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                "usage": usage
+            }
+            yield f"data: {json.dumps(final, ensure_ascii=False)}\n\n"
+            yield "data: [DONE]\n\n"
+            count("ok")
+
+        return Response(generate(), mimetype="text/event-stream")
+
+    # OpenAI（base_url=http://host:port/v1）与智谱AI（base_url=http://host:port/api/paas/v4）
+    app.add_url_rule("/v1/chat/completions", "openai_chat", chat_completions, methods=["POST"])
+    app.add_url_rule("/api/paas/v4/chat/completions", "zhipu_chat", chat_completions, methods=["POST"])
+
+    @app.route("/stats", methods=["GET"])
+    def stub_stats():
+        with stats_lock:
+            return jsonify(dict(stats, latency=config.latency.spec))
+
+    return app
+
+
+def start_stub_server(config: StubConfig, host: str = "127.0.0.1", port: int = 0):
+    """
+    在后台线程启动替身服务（供基准测试脚本使用）
+
+    Args:
+        config: 服务配置
+        host: 监听地址
+        port: 监听端口（0表示自动分配）
+
+    Returns:
+        (server, base_url)：server.shutdown()停止服务
+    """
+    import logging
+    from werkzeug.serving import make_server
+
+    # 压测时逐条请求日志会淹没统计输出
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    server = make_server(host, port, create_stub_app(config), threaded=True)
+    threading.Thread(target=server.serve_forever, name="llm-stub", daemon=True).start()
+    return server, f"http://{host}:{server.server_port}"
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="本地模型替身服务（OpenAI/智谱AI兼容）")
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址")
+    parser.add_argument("--port", type=int, default=8001, help="监听端口")
+    parser.add_argument("--latency", default="lognormal:1.5,0.5", help="耗时分布，如 fixed:1 / uniform:0.5,3 / lognormal:1.5,0.5")
+    parser.add_argument("--first-token-ratio", type=float, default=0.2, help="流式首个片段到达时间占总耗时的比例")
+    parser.add_argument("--chunk-size", type=int, default=8, help="流式片段字符数")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="随机500错误比例")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="随机429比例")
+    parser.add_argument("--rpm", type=float, default=None, help="每分钟请求上限（超过返回429）")
+    args = parser.parse_args()
+
+    stub_config = StubConfig(
+        latency=args.latency,
+        first_token_ratio=args.first_token_ratio,
+        chunk_size=args.chunk_size,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        rpm=args.rpm
+    )
+
+    print("=" * 70)
+    print(f"🧪 模型替身服务: http://{args.host}:{args.port}")
+    print(f"   OpenAI base_url: http://{args.host}:{args.port}/v1")
+    print(f"   智谱AI base_url: http://{args.host}:{args.port}/api/paas/v4")
+    print(f"   耗时分布: {args.latency}  错误率: {args.error_rate}  随机429: {args.rate_limit_rate}  RPM: {args.rpm or '不限'}")
+    print("=" * 70)
+
+    create_stub_app(stub_config).run(host=args.host, port=args.port, threaded=True)
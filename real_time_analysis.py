@@ -92,7 +92,7 @@ async def analyze_stock_realtime(stock_code: str, pattern_type: str = None):
     from dotenv import load_dotenv
     load_dotenv()
 
-    from src.aigc.model_adapter import ZhipuAdapter
+    from src.aigc.model_adapter import ModelProvider, get_adapter_pool
     from src.monitors.tencent_collector import TencentFinanceCollector
     from src.templates.prompt_templates import generate_prompt, TemplateType
     from src.models.stock_data import StockMarketData
@@ -305,7 +305,8 @@ async def analyze_stock_realtime(stock_code: str, pattern_type: str = None):
     model = os.getenv("ZHIPU_MODEL", "glm-4-plus")
     print(f"使用模型: {model}")
 
-    adapter = ZhipuAdapter(api_key=api_key, model=model)
+    # 共享适配器池：复用连接，调用频率由统一的限流器控制
+    adapter = get_adapter_pool().get(ModelProvider.ZHIPU, api_key=api_key, model=model)
 
     try:
         response = await adapter.async_chat(prompt)
@@ -345,11 +346,6 @@ async def batch_analyze_stocks(stock_list: list):
             results.append(result)
             print(f"\n{result['AI分析']}")
 
-        # 避免API限流
-        if i < len(stock_list):
-            print("\n⏳ 等待3秒后分析下一只股票...")
-            await asyncio.sleep(3)
-
     # 汇总结果
     print("\n" + "="*80)
     print("📊 分析汇总")
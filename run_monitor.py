@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+持续监控服务启动脚本
+按 MONITOR_INTERVAL_SECONDS 间隔批量检测自选股的图形，只在图形新触发时调用智谱AI分析
+
+用法:
+    python run_monitor.py --stocks 600000,000001,601138
+    python run_monitor.py                    # 使用 .env 中的 MONITOR_WATCHLIST
+    python run_monitor.py --mock --interval 5 --cycles 3   # 模拟数据 + 模拟AI，不需要联网
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.aigc.model_adapter import AIGCService, MockAIGCAdapter, ModelProvider, get_adapter_pool
+from src.monitors.data_collector import MockDataCollector, StockDataAggregator
+from src.monitors.intraday_state import IntradayStateTracker
+from src.monitors.monitor_service import MonitorService, parse_patterns, parse_watchlist
+from src.monitors.stock_monitor import StockPatternMonitor
+from src.utils.config import Config
+
+
+def build_service(args) -> MonitorService:
+    """根据命令行参数创建监控服务"""
+    if args.mock:
+        collector = MockDataCollector()
+        aigc_service = AIGCService(MockAIGCAdapter())
+    else:
+        from src.monitors.market_snapshot import MarketSnapshotCollector
+        from src.monitors.sector_membership import SectorIndex
+        from src.monitors.sector_scanner import SectorScanner
+        from src.monitors.tencent_collector import UnifiedRealDataCollector
+        sector_index = SectorIndex(MarketSnapshotCollector().get_membership, SectorScanner().get_sector_snapshot).start()
+        collector = UnifiedRealDataCollector(sector_index=sector_index)
+        aigc_service = None
+        if Config.ZHIPU_API_KEY and not args.no_ai:
+            pool = get_adapter_pool()
+            aigc_service = AIGCService(pool.get(ModelProvider.ZHIPU, api_key=Config.ZHIPU_API_KEY, model=Config.ZHIPU_MODEL))
+        elif not args.no_ai:
+            print("⚠️  未配置ZHIPU_API_KEY，只检测图形，不调用AI分析")
+
+    history_store = None
+    history_db = os.getenv("HISTORY_DB", "")
+    if history_db and not args.mock:
+        from src.utils.history_store import HistoryStore
+        history_store = HistoryStore(history_db, snapshot_retention_days=float(os.getenv("HISTORY_SNAPSHOT_DAYS", "7")))
+
+    monitor = StockPatternMonitor(
+        StockDataAggregator(collector, state_tracker=IntradayStateTracker()),
+        aigc_service,
+        history_store=history_store
+    )
+    return MonitorService(
+        monitor,
+        watchlist=parse_watchlist(args.stocks),
+        pattern_types=parse_patterns(args.patterns),
+        interval=args.interval,
+        analyze=not args.no_ai
+    )
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="股票图形持续监控服务")
+    parser.add_argument("--stocks", default=Config.MONITOR_WATCHLIST, help="自选股代码，逗号分隔（默认MONITOR_WATCHLIST）")
+    parser.add_argument("--patterns", default=Config.MONITOR_PATTERNS, help="监控的图形类型，逗号分隔")
+    parser.add_argument("--interval", type=float, default=Config.MONITOR_INTERVAL_SECONDS, help="监控间隔（秒）")
+    parser.add_argument("--cycles", type=int, default=None, help="运行指定轮数后退出（默认持续运行）")
+    parser.add_argument("--no-ai", action="store_true", help="只检测图形，不调用AI分析")
+    parser.add_argument("--mock", action="store_true", help="使用模拟数据和模拟AI")
+    args = parser.parse_args()
+
+    if args.mock and not args.stocks:
+        args.stocks = "600000,000001,600036"
+    if not parse_watchlist(args.stocks):
+        parser.error("请通过 --stocks 或 MONITOR_WATCHLIST 指定自选股")
+
+    service = build_service(args)
+    print(f"👀 持续监控: {len(service.watchlist)}只股票，"
+          f"图形 {'/'.join(p.value for p in service.pattern_types)}，间隔{service.interval}秒（Ctrl+C退出）")
+    try:
+        service.run_forever(max_cycles=args.cycles)
+    except KeyboardInterrupt:
+        print("\n👋 监控已停止")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,7 +10,9 @@ from .templates.prompt_templates import (
     PromptTemplateManager,
     ChartType,
     TemplateType,
-    generate_prompt
+    generate_prompt,
+    generate_batch_prompt,
+    parse_batch_response
 )
 
 from .models.stock_data import (
@@ -37,7 +39,9 @@ from .aigc.model_adapter import (
     AIGCService,
     ModelProvider,
     create_adapter,
-    MockAIGCAdapter
+    MockAIGCAdapter,
+    AdapterPool,
+    get_adapter_pool
 )
 
 __all__ = [
@@ -46,6 +50,8 @@ __all__ = [
     "ChartType",
     "TemplateType",
     "generate_prompt",
+    "generate_batch_prompt",
+    "parse_batch_response",
 
     # Models
     "StockMarketData",
@@ -69,4 +75,6 @@ __all__ = [
     "ModelProvider",
     "create_adapter",
     "MockAIGCAdapter",
+    "AdapterPool",
+    "get_adapter_pool",
 ]
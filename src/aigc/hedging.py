@@ -0,0 +1,240 @@
+"""
+对冲调用适配器
+主模型超过p90耗时仍未返回时，向备用模型发出同一请求，取先返回的结果，降低长尾延迟
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Iterator, Optional
+
+from .model_adapter import AIGCModelAdapter
+from ..utils.metrics import LLM_HEDGE_REQUESTS, LLM_HEDGE_WINS
+
+
+class HedgedAdapter(AIGCModelAdapter):
+    """
+    对冲调用适配器（包装主、备两个适配器，接口保持不变）
+
+    对冲等待时间取主模型最近若干次调用耗时的分位数（默认p90），
+    样本不足时使用默认值。主模型在等待时间内报错时立即改用备用模型。
+    SDK请求一旦开始执行就无法中断：落后一方的结果被丢弃，但请求仍占用线程
+    （异步调用为主、备适配器共用的线程池，同步调用为对冲专用的线程池）直到返回，
+    受限流的适配器也一直占用并发名额。为避免被放弃的请求占满线程池、新请求排队，
+    空闲线程不足两个时不再对冲，只请求主模型。
+    """
+
+    # 同步对冲线程池大小
+    SYNC_WORKERS = 4
+
+    def __init__(
+        self,
+        primary: AIGCModelAdapter,
+        secondary: AIGCModelAdapter,
+        primary_name: Optional[str] = None,
+        secondary_name: Optional[str] = None,
+        quantile: float = 0.9,
+        default_delay: float = 8.0,
+        min_delay: float = 0.5,
+        window: int = 200,
+        min_samples: int = 20,
+        async_workers: Optional[int] = None
+    ):
+        """
+        Args:
+            primary: 主适配器
+            secondary: 备用适配器
+            primary_name: 主模型名称（指标标签，默认取类名）
+            secondary_name: 备用模型名称（指标标签，默认取类名）
+            quantile: 对冲等待时间使用的耗时分位数
+            default_delay: 样本不足时的对冲等待时间（秒）
+            min_delay: 对冲等待时间下限（秒），避免过早发出备用请求
+            window: 参与统计的最近调用次数
+            min_samples: 开始使用分位数所需的最少样本数
+            async_workers: 异步调用所用线程池的大小（AdapterPool传入其max_workers，默认与SYNC_WORKERS相同）
+        """
+        super().__init__(primary.api_key)
+        self.primary = primary
+        self.secondary = secondary
+        self.primary_name = primary_name or type(primary).__name__
+        self.secondary_name = secondary_name or type(secondary).__name__
+        self.quantile = quantile
+        self.default_delay = default_delay
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._sync_executor: Optional[ThreadPoolExecutor] = None
+        # 同步线程池中已提交未结束的调用数（含已放弃但仍在执行的）
+        self._sync_busy = 0
+        self.async_workers = async_workers or self.SYNC_WORKERS
+        # 异步调用中已提交未结束的调用数（含已放弃但仍在执行的）
+        self._async_busy = 0
+
+    @property
+    def executor(self):
+        return self.primary.executor
+
+    @executor.setter
+    def executor(self, value):
+        # 基类初始化时会赋值None，包装器始终使用主适配器的线程池
+        pass
+
+    def __getattr__(self, name):
+        # model等属性透传给主适配器
+        if name == "primary":
+            raise AttributeError(name)
+        return getattr(self.primary, name)
+
+    @property
+    def labels(self) -> dict:
+        return {"primary": self.primary_name, "secondary": self.secondary_name}
+
+    def hedge_delay(self) -> float:
+        """当前的对冲等待时间（秒）"""
+        with self._lock:
+            samples = sorted(self._latencies)
+        if len(samples) < self.min_samples:
+            return self.default_delay
+        index = min(len(samples) - 1, int(len(samples) * self.quantile))
+        return max(self.min_delay, samples[index])
+
+    def _record_latency(self, seconds: float):
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def stats(self) -> dict:
+        """对冲率和备用模型胜出率"""
+        total = sum(
+            LLM_HEDGE_REQUESTS.value(outcome=outcome, **self.labels)
+            for outcome in ("primary_only", "hedged")
+        )
+        hedged = LLM_HEDGE_REQUESTS.value(outcome="hedged", **self.labels)
+        secondary_wins = LLM_HEDGE_WINS.value(winner="secondary", **self.labels)
+        return {
+            "requests": int(total),
+            "hedged": int(hedged),
+            "hedge_rate": hedged / total if total else 0.0,
+            "secondary_win_rate": secondary_wins / hedged if hedged else 0.0,
+            "hedge_delay": round(self.hedge_delay(), 3)
+        }
+
+    async def async_chat(self, prompt: str, **kwargs) -> str:
+        """异步聊天（主模型超时未返回时对冲到备用模型）"""
+        start = time.perf_counter()
+        with self._lock:
+            saturated = self._async_busy + 2 > self.async_workers
+        if saturated:
+            result = await self.primary.async_chat(prompt, **kwargs)
+            self._record_latency(time.perf_counter() - start)
+            LLM_HEDGE_REQUESTS.inc(outcome="primary_only", **self.labels)
+            return result
+
+        primary = asyncio.ensure_future(self._submit_async(self.primary, prompt, kwargs))
+
+        done, _ = await asyncio.wait({primary}, timeout=self.hedge_delay())
+        if done and primary.exception() is None:
+            self._record_latency(time.perf_counter() - start)
+            LLM_HEDGE_REQUESTS.inc(outcome="primary_only", **self.labels)
+            return primary.result()
+
+        LLM_HEDGE_REQUESTS.inc(outcome="hedged", **self.labels)
+        secondary = asyncio.ensure_future(self._submit_async(self.secondary, prompt, kwargs))
+        pending = {primary, secondary}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        error = task.exception()
+                        continue
+                    # 备用模型胜出时，主模型耗时至少为当前已等待时间，同样计入样本
+                    self._record_latency(time.perf_counter() - start)
+                    winner = "primary" if task is primary else "secondary"
+                    LLM_HEDGE_WINS.inc(winner=winner, **self.labels)
+                    return task.result()
+            raise error
+        finally:
+            # 只能取消等待；已在执行的SDK调用结束后由_async_done归还计数
+            for task in pending:
+                task.cancel()
+
+    def chat(self, prompt: str, **kwargs) -> str:
+        """同步聊天（主模型超时未返回时对冲到备用模型）"""
+        start = time.perf_counter()
+        with self._lock:
+            saturated = self._sync_busy + 2 > self.SYNC_WORKERS
+        if saturated:
+            result = self.primary.chat(prompt, **kwargs)
+            self._record_latency(time.perf_counter() - start)
+            LLM_HEDGE_REQUESTS.inc(outcome="primary_only", **self.labels)
+            return result
+
+        primary = self._submit_sync(self.primary.chat, prompt, kwargs)
+
+        done, _ = wait({primary}, timeout=self.hedge_delay())
+        if done and primary.exception() is None:
+            self._record_latency(time.perf_counter() - start)
+            LLM_HEDGE_REQUESTS.inc(outcome="primary_only", **self.labels)
+            return primary.result()
+
+        LLM_HEDGE_REQUESTS.inc(outcome="hedged", **self.labels)
+        secondary = self._submit_sync(self.secondary.chat, prompt, kwargs)
+        pending = {primary, secondary}
+        error = None
+        try:
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future.exception() is not None:
+                        error = future.exception()
+                        continue
+                    # 备用模型胜出时，主模型耗时至少为当前已等待时间，同样计入样本
+                    self._record_latency(time.perf_counter() - start)
+                    winner = "primary" if future is primary else "secondary"
+                    LLM_HEDGE_WINS.inc(winner=winner, **self.labels)
+                    return future.result()
+            raise error
+        finally:
+            # 尚未开始执行的调用可以取消；已在执行的无法中断，结束后由_sync_done归还计数
+            for future in pending:
+                future.cancel()
+
+    def stream_chat(self, prompt: str, **kwargs) -> Iterator[str]:
+        """流式聊天只走主模型（首个片段到达前无法判断是否需要对冲）"""
+        return self.primary.stream_chat(prompt, **kwargs)
+
+    def _get_sync_executor(self) -> ThreadPoolExecutor:
+        """同步对冲需要同时等待两个调用，使用独立的小线程池"""
+        with self._lock:
+            if self._sync_executor is None:
+                self._sync_executor = ThreadPoolExecutor(
+                    max_workers=self.SYNC_WORKERS, thread_name_prefix="llm-hedge"
+                )
+            return self._sync_executor
+
+    def _submit_sync(self, func, prompt: str, kwargs: dict) -> Future:
+        """提交到同步线程池并计数"""
+        executor = self._get_sync_executor()
+        with self._lock:
+            self._sync_busy += 1
+        future = executor.submit(func, prompt, **kwargs)
+        future.add_done_callback(self._sync_done)
+        return future
+
+    async def _submit_async(self, adapter: AIGCModelAdapter, prompt: str, kwargs: dict) -> str:
+        """在线程池中调用并计数，SDK调用真正结束时（而不是等待被取消时）归还计数"""
+        with self._lock:
+            self._async_busy += 1
+        return await adapter.submit_chat(prompt, on_done=self._async_done, **kwargs)
+
+    def _async_done(self):
+        with self._lock:
+            self._async_busy -= 1
+
+    def _sync_done(self, future: Future):
+        with self._lock:
+            self._sync_busy -= 1
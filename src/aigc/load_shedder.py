@@ -0,0 +1,161 @@
+"""
+AI调用降级控制
+根据模型近期耗时和排队深度决定：同步调用、先返回规则建议再异步补充AI分析、或完全跳过AI
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from ..utils.metrics import LLM_DEGRADATION_DECISIONS
+
+
+class LLMLoadShedder:
+    """
+    AI调用降级控制器
+
+    - call：正常同步调用模型
+    - defer：先返回规则建议，AI分析在后台完成后通过轮询/推送获取
+    - skip：模型耗时或排队超过阈值，本次不调用模型，只返回规则建议
+
+    耗时样本只保留最近window_seconds秒，跳过调用期间样本会自然过期，负载恢复后自动恢复调用。
+    """
+
+    CALL = "call"
+    DEFER = "defer"
+    SKIP = "skip"
+
+    def __init__(
+        self,
+        queue_depth_source: Optional[Callable[[], int]] = None,
+        latency_threshold: float = 20.0,
+        skip_queue_depth: int = 8,
+        defer_queue_depth: int = 2,
+        window_seconds: float = 60
+    ):
+        """
+        初始化降级控制器
+
+        Args:
+            queue_depth_source: 返回当前模型调用排队数的函数（通常读取LLMGovernor.queue_depth）
+            latency_threshold: 近期平均耗时超过该值（秒）时跳过AI（0表示不按耗时降级）
+            skip_queue_depth: 排队数达到该值时跳过AI（0表示不按排队降级）
+            defer_queue_depth: 排队数达到该值时改为后台补充AI分析（0表示不自动转后台）
+            window_seconds: 耗时统计窗口（秒）
+        """
+        self.queue_depth_source = queue_depth_source
+        self.latency_threshold = latency_threshold
+        self.skip_queue_depth = skip_queue_depth
+        self.defer_queue_depth = defer_queue_depth
+        self.window_seconds = window_seconds
+        self._samples = deque()
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        """记录一次实际模型调用的耗时（缓存命中不计入）"""
+        now = time.monotonic()
+        with self._lock:
+            self._samples.append((now, seconds))
+            self._expire(now)
+
+    def _expire(self, now: float):
+        """移除窗口外的样本（调用方持有锁）"""
+        while self._samples and now - self._samples[0][0] > self.window_seconds:
+            self._samples.popleft()
+
+    def recent_latency(self) -> Optional[float]:
+        """窗口内的平均模型耗时（无样本返回None）"""
+        with self._lock:
+            self._expire(time.monotonic())
+            if not self._samples:
+                return None
+            return sum(seconds for _, seconds in self._samples) / len(self._samples)
+
+    def queue_depth(self) -> int:
+        """当前模型调用排队数"""
+        return self.queue_depth_source() if self.queue_depth_source else 0
+
+    def decide(self, prefer_defer: bool = False, allow_defer: bool = True) -> str:
+        """
+        决定本次请求如何使用AI
+
+        Args:
+            prefer_defer: 客户端是否要求先返回规则建议
+            allow_defer: 是否允许转后台（后台任务、流式接口本身不阻塞用户，传False）
+
+        Returns:
+            call / defer / skip
+        """
+        latency = self.recent_latency()
+        depth = self.queue_depth()
+
+        if self.latency_threshold and latency is not None and latency >= self.latency_threshold:
+            decision = self.SKIP
+        elif self.skip_queue_depth and depth >= self.skip_queue_depth:
+            decision = self.SKIP
+        elif allow_defer and (prefer_defer or (self.defer_queue_depth and depth >= self.defer_queue_depth)):
+            decision = self.DEFER
+        else:
+            decision = self.CALL
+
+        LLM_DEGRADATION_DECISIONS.inc(decision=decision)
+        return decision
+
+    def status(self) -> dict:
+        """当前负载状态"""
+        latency = self.recent_latency()
+        return {
+            "recent_latency": round(latency, 3) if latency is not None else None,
+            "queue_depth": self.queue_depth(),
+            "latency_threshold": self.latency_threshold,
+            "skip_queue_depth": self.skip_queue_depth,
+            "defer_queue_depth": self.defer_queue_depth
+        }
+
+
+async def resolve_with_shedding(
+    shedder: LLMLoadShedder,
+    stock_code: str,
+    analyze: Callable[[str], Awaitable[str]],
+    lookup_cached: Callable[[], Optional[str]],
+    job_manager,
+    build_result: Callable[[str, str], Dict[str, Any]],
+    defer_ai: Optional[bool] = None
+) -> Tuple[str, Optional[str], Any]:
+    """
+    按降级决策获取一只股票的AI分析
+
+    call时同步调用；defer/skip时先查缓存，命中则直接返回；
+    defer未命中时提交后台任务，任务完成后的结果由build_result生成。
+
+    Args:
+        shedder: 降级控制器
+        stock_code: 股票代码
+        analyze: 调用模型的异步函数（参数为股票代码，返回AI回复）
+        lookup_cached: 读取已缓存AI回复的函数（无缓存返回None）
+        job_manager: 后台任务管理器（job_manager.AnalysisJobManager）
+        build_result: 后台任务结果（参数为股票代码和AI回复）
+        defer_ai: True表示客户端要求先返回规则建议；False表示不允许转后台；None表示按负载自动决定
+
+    Returns:
+        (ai_status, ai_response, job)：
+        done - 已得到AI分析；pending - 已提交后台任务，job为任务对象；skipped - 负载过高未调用模型
+    """
+    decision = shedder.decide(prefer_defer=defer_ai is True, allow_defer=defer_ai is not False)
+
+    if decision == LLMLoadShedder.CALL:
+        return "done", await analyze(stock_code), None
+
+    # 缓存中已有结果时无需降级
+    cached = lookup_cached()
+    if cached is not None:
+        return "done", cached, None
+
+    if decision == LLMLoadShedder.SKIP:
+        return "skipped", None, None
+
+    async def enrich(code):
+        return build_result(code, await analyze(code))
+
+    return "pending", None, job_manager.submit([stock_code], runner=enrich)
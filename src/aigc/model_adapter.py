@@ -4,10 +4,67 @@ AIGC模型适配器
 """
 
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Iterator, AsyncIterator, Callable
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
 import json
+import os
+import threading
+import time
 from enum import Enum
 
+from ..utils.metrics import observe_llm, LLM_CLIENTS_CREATED, LLM_FIRST_TOKEN_SECONDS
+
+
+def _close_stream(response):
+    """关闭SDK流式响应的底层连接（OpenAI的Stream自带close，智谱的StreamResponse需关闭其httpx响应）"""
+    close = getattr(response, "close", None) or getattr(getattr(response, "response", None), "close", None)
+    if close is not None:
+        close()
+
+
+def _run_in_executor_tracked(
+    loop: asyncio.AbstractEventLoop,
+    executor,
+    func: Callable[[], Any],
+    on_done: Optional[Callable[[], None]] = None
+) -> "asyncio.Future":
+    """
+    在线程池中执行func，on_done在func真正执行结束（或尚未开始就被取消）时调用一次
+
+    取消返回的asyncio Future只能阻止尚未开始的调用；已在线程中执行的SDK请求会继续运行，
+    on_done在它返回后才调用，调用方可据此把名额一直占用到线程真正空闲。
+    """
+    if on_done is None:
+        return loop.run_in_executor(executor, func)
+
+    lock = threading.Lock()
+    state = {"started": False, "skipped": False}
+
+    def call():
+        with lock:
+            if state["skipped"]:
+                return None
+            state["started"] = True
+        try:
+            return func()
+        finally:
+            on_done()
+
+    future = loop.run_in_executor(executor, call)
+
+    def cancelled(f):
+        if not f.cancelled():
+            return
+        with lock:
+            if state["started"]:
+                return
+            state["skipped"] = True
+        on_done()
+
+    future.add_done_callback(cancelled)
+    return future
+
 
 class ModelProvider(Enum):
     """模型提供商枚举"""
@@ -30,6 +87,10 @@ class AIGCModelAdapter(ABC):
         """
         self.api_key = api_key
         self.config = kwargs
+        # 执行同步SDK调用的线程池（None表示使用事件循环默认线程池，由AdapterPool统一分配）
+        self.executor = None
+        # 保护延迟创建的SDK客户端
+        self._client_lock = threading.Lock()
 
     @abstractmethod
     def chat(self, prompt: str, **kwargs) -> str:
@@ -59,6 +120,83 @@ class AIGCModelAdapter(ABC):
         """
         pass
 
+    async def submit_chat(self, prompt: str, on_done: Optional[Callable[[], None]] = None, **kwargs) -> str:
+        """
+        在线程池中执行同步chat，并在SDK调用真正结束时通知调用方
+
+        与async_chat的区别：等待方被取消后线程中的请求仍会继续，on_done在它返回
+        （或尚未开始就被取消）时才调用一次，用于把并发名额占用到线程真正空闲。
+
+        Args:
+            prompt: 用户提示词
+            on_done: 调用结束回调（在线程池线程或事件循环中调用）
+            **kwargs: 其他参数
+
+        Returns:
+            模型响应文本
+        """
+        loop = asyncio.get_running_loop()
+        return await _run_in_executor_tracked(loop, self.executor, lambda: self.chat(prompt, **kwargs), on_done)
+
+    def stream_chat(self, prompt: str, **kwargs) -> Iterator[str]:
+        """
+        流式发送聊天请求（默认实现：不支持流式的模型一次性返回完整回复）
+
+        Args:
+            prompt: 用户提示词
+            **kwargs: 其他参数
+
+        Yields:
+            模型响应文本片段
+        """
+        yield self.chat(prompt, **kwargs)
+
+    async def async_stream_chat(self, prompt: str, **kwargs) -> AsyncIterator[str]:
+        """
+        异步流式聊天：在线程池中消费stream_chat，片段到达即产出
+
+        Args:
+            prompt: 用户提示词
+            **kwargs: 其他参数
+
+        Yields:
+            模型响应文本片段
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        done = object()
+
+        # 消费方提前退出（如SSE客户端断开）时置位，生产线程在下一个片段处停止并关闭底层流
+        stop = threading.Event()
+
+        def produce():
+            stream = self.stream_chat(prompt, **kwargs)
+            try:
+                for chunk in stream:
+                    if stop.is_set():
+                        break
+                    loop.call_soon_threadsafe(queue.put_nowait, chunk)
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+            finally:
+                close = getattr(stream, "close", None)
+                if close is not None:
+                    close()
+                loop.call_soon_threadsafe(queue.put_nowait, done)
+
+        producer = loop.run_in_executor(self.executor, produce)
+        try:
+            while True:
+                item = await queue.get()
+                if item is done:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+            await producer
+
 
 class GPTAdapter(AIGCModelAdapter):
     """GPT模型适配器（使用OpenAI API）"""
@@ -80,38 +218,74 @@ class GPTAdapter(AIGCModelAdapter):
     def _get_client(self):
         """获取OpenAI客户端（延迟导入）"""
         if self._client is None:
-            try:
-                from openai import OpenAI
-                self._client = OpenAI(
-                    api_key=self.api_key,
-                    base_url=self.base_url
-                )
-            except ImportError:
-                raise ImportError("使用GPT适配器需要安装openai包：pip install openai")
+            # 并发首次调用时只创建一个客户端
+            with self._client_lock:
+                if self._client is None:
+                    try:
+                        from openai import OpenAI
+                        self._client = OpenAI(
+                            api_key=self.api_key,
+                            base_url=self.base_url
+                        )
+                        LLM_CLIENTS_CREATED.inc(provider="gpt")
+                    except ImportError:
+                        raise ImportError("使用GPT适配器需要安装openai包：pip install openai")
         return self._client
 
     def chat(self, prompt: str, temperature: float = 0.7, max_tokens: int = 500, **kwargs) -> str:
         """发送GPT聊天请求"""
         try:
             client = self._get_client()
-            response = client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "你是一个专业的股票分析助手，擅长技术分析和风险识别。"},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=temperature,
-                max_tokens=max_tokens
-            )
+            with observe_llm("gpt", self.model):
+                response = client.chat.completions.create(
+                    model=self.model,
+                    messages=[
+                        {"role": "system", "content": "你是一个专业的股票分析助手，擅长技术分析和风险识别。"},
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=temperature,
+                    max_tokens=max_tokens
+                )
             return response.choices[0].message.content
         except Exception as e:
             raise Exception(f"GPT API调用失败: {str(e)}")
 
+    def stream_chat(self, prompt: str, temperature: float = 0.7, max_tokens: int = 500, **kwargs) -> Iterator[str]:
+        """流式发送GPT聊天请求"""
+        try:
+            client = self._get_client()
+            with observe_llm("gpt", self.model):
+                start = time.perf_counter()
+                response = client.chat.completions.create(
+                    model=self.model,
+                    messages=[
+                        {"role": "system", "content": "你是一个专业的股票分析助手，擅长技术分析和风险识别。"},
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    stream=True
+                )
+                first = True
+                try:
+                    for chunk in response:
+                        delta = chunk.choices[0].delta.content if chunk.choices else None
+                        if delta:
+                            if first:
+                                LLM_FIRST_TOKEN_SECONDS.observe(time.perf_counter() - start, provider="gpt", model=self.model)
+                                first = False
+                            yield delta
+                finally:
+                    # 消费方提前停止时（生成器被close）断开连接，不再继续接收剩余内容
+                    _close_stream(response)
+        except Exception as e:
+            raise Exception(f"GPT API调用失败: {str(e)}")
+
     async def async_chat(self, prompt: str, **kwargs) -> str:
         """异步发送GPT聊天请求"""
         import asyncio
         loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, lambda: self.chat(prompt, **kwargs))
+        return await loop.run_in_executor(self.executor, lambda: self.chat(prompt, **kwargs))
 
 
 class SparkAdapter(AIGCModelAdapter):
@@ -141,26 +315,31 @@ class SparkAdapter(AIGCModelAdapter):
     def _get_client(self):
         """获取讯飞星火客户端"""
         if self._client is None:
-            try:
-                # 讯飞星火官方SDK
-                from sparkai.core.spark_ai import SparkAI
-                self._client = SparkAI(
-                    app_id=self.app_id,
-                    api_key=self.api_key,
-                    api_secret=self.api_secret,
-                    domain=self.domain
-                )
-            except ImportError:
-                raise ImportError("使用讯飞星火适配器需要安装spark-ai包：pip install spark-ai")
+            # 并发首次调用时只创建一个客户端
+            with self._client_lock:
+                if self._client is None:
+                    try:
+                        # 讯飞星火官方SDK
+                        from sparkai.core.spark_ai import SparkAI
+                        self._client = SparkAI(
+                            app_id=self.app_id,
+                            api_key=self.api_key,
+                            api_secret=self.api_secret,
+                            domain=self.domain
+                        )
+                        LLM_CLIENTS_CREATED.inc(provider="spark")
+                    except ImportError:
+                        raise ImportError("使用讯飞星火适配器需要安装spark-ai包：pip install spark-ai")
         return self._client
 
     def chat(self, prompt: str, temperature: float = 0.7, max_tokens: int = 500, **kwargs) -> str:
         """发送讯飞星火聊天请求"""
         try:
             client = self._get_client()
-            response = client.generate([
-                {"role": "user", "content": prompt}
-            ])
+            with observe_llm("spark", self.domain):
+                response = client.generate([
+                    {"role": "user", "content": prompt}
+                ])
             return response
         except Exception as e:
             raise Exception(f"讯飞星火API调用失败: {str(e)}")
@@ -169,7 +348,7 @@ class SparkAdapter(AIGCModelAdapter):
         """异步发送讯飞星火聊天请求"""
         import asyncio
         loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, lambda: self.chat(prompt, **kwargs))
+        return await loop.run_in_executor(self.executor, lambda: self.chat(prompt, **kwargs))
 
 
 class QianfanAdapter(AIGCModelAdapter):
@@ -194,24 +373,29 @@ class QianfanAdapter(AIGCModelAdapter):
     def _get_client(self):
         """获取千帆客户端"""
         if self._client is None:
-            try:
-                from qianfan import ChatCompletion
-                self._client = ChatCompletion()
-            except ImportError:
-                raise ImportError("使用千帆适配器需要安装qianfan包：pip install qianfan")
+            # 并发首次调用时只创建一个客户端
+            with self._client_lock:
+                if self._client is None:
+                    try:
+                        from qianfan import ChatCompletion
+                        self._client = ChatCompletion()
+                        LLM_CLIENTS_CREATED.inc(provider="qianfan")
+                    except ImportError:
+                        raise ImportError("使用千帆适配器需要安装qianfan包：pip install qianfan")
         return self._client
 
     def chat(self, prompt: str, temperature: float = 0.7, max_tokens: int = 500, **kwargs) -> str:
         """发送千帆聊天请求"""
         try:
             client = self._get_client()
-            response = client.do(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=temperature,
-                top_p=0.8,
-                max_output_tokens=max_tokens
-            )
+            with observe_llm("qianfan", self.model):
+                response = client.do(
+                    model=self.model,
+                    messages=[{"role": "user", "content": prompt}],
+                    temperature=temperature,
+                    top_p=0.8,
+                    max_output_tokens=max_tokens
+                )
             return response['result']
         except Exception as e:
             raise Exception(f"千帆API调用失败: {str(e)}")
@@ -220,7 +404,7 @@ class QianfanAdapter(AIGCModelAdapter):
         """异步发送千帆聊天请求"""
         import asyncio
         loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, lambda: self.chat(prompt, **kwargs))
+        return await loop.run_in_executor(self.executor, lambda: self.chat(prompt, **kwargs))
 
 
 class ZhipuAdapter(AIGCModelAdapter):
@@ -234,54 +418,96 @@ class ZhipuAdapter(AIGCModelAdapter):
     - glm-3-turbo: 上一代模型
     """
 
-    def __init__(self, api_key: str, model: str = "glm-4-flash"):
+    def __init__(self, api_key: str, model: str = "glm-4-flash", base_url: Optional[str] = None):
         """
         初始化智谱AI适配器
 
         Args:
             api_key: 智谱AI API密钥（格式：id.secret）
             model: 模型名称
+            base_url: API基础URL（None使用SDK默认地址，压测时可指向本地替身服务）
         """
         super().__init__(api_key)
         self.model = model
+        self.base_url = base_url
         self._client = None
 
     def _get_client(self):
         """获取智谱AI客户端（延迟导入）"""
         if self._client is None:
-            try:
-                from zhipuai import ZhipuAI
-                self._client = ZhipuAI(api_key=self.api_key)
-            except ImportError:
-                raise ImportError("使用智谱AI适配器需要安装zhipuai包：pip install zhipuai")
+            # 并发首次调用时只创建一个客户端
+            with self._client_lock:
+                if self._client is None:
+                    try:
+                        from zhipuai import ZhipuAI
+                        self._client = ZhipuAI(api_key=self.api_key, base_url=self.base_url)
+                        LLM_CLIENTS_CREATED.inc(provider="zhipu")
+                    except ImportError:
+                        raise ImportError("使用智谱AI适配器需要安装zhipuai包：pip install zhipuai")
         return self._client
 
     def chat(self, prompt: str, temperature: float = 0.3, max_tokens: int = 500, **kwargs) -> str:
         """发送智谱AI聊天请求"""
         try:
             client = self._get_client()
-            response = client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "你是一个专业的股票分析助手，擅长技术分析和风险识别。输出要简洁明确，避免冗余。"
-                    },
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=temperature,
-                max_tokens=max_tokens,
-                top_p=0.7
-            )
+            with observe_llm("zhipu", self.model):
+                response = client.chat.completions.create(
+                    model=self.model,
+                    messages=[
+                        {
+                            "role": "system",
+                            "content": "你是一个专业的股票分析助手，擅长技术分析和风险识别。输出要简洁明确，避免冗余。"
+                        },
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    top_p=0.7
+                )
             return response.choices[0].message.content
         except Exception as e:
             raise Exception(f"智谱AI API调用失败: {str(e)}")
 
+    def stream_chat(self, prompt: str, temperature: float = 0.3, max_tokens: int = 500, **kwargs) -> Iterator[str]:
+        """流式发送智谱AI聊天请求"""
+        try:
+            client = self._get_client()
+            with observe_llm("zhipu", self.model):
+                start = time.perf_counter()
+                response = client.chat.completions.create(
+                    model=self.model,
+                    messages=[
+                        {
+                            "role": "system",
+                            "content": "你是一个专业的股票分析助手，擅长技术分析和风险识别。输出要简洁明确，避免冗余。"
+                        },
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    top_p=0.7,
+                    stream=True
+                )
+                first = True
+                try:
+                    for chunk in response:
+                        delta = chunk.choices[0].delta.content if chunk.choices else None
+                        if delta:
+                            if first:
+                                LLM_FIRST_TOKEN_SECONDS.observe(time.perf_counter() - start, provider="zhipu", model=self.model)
+                                first = False
+                            yield delta
+                finally:
+                    # 消费方提前停止时（生成器被close）断开连接，不再继续接收剩余内容
+                    _close_stream(response)
+        except Exception as e:
+            raise Exception(f"智谱AI API调用失败: {str(e)}")
+
     async def async_chat(self, prompt: str, **kwargs) -> str:
         """异步发送智谱AI聊天请求"""
         import asyncio
         loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, lambda: self.chat(prompt, **kwargs))
+        return await loop.run_in_executor(self.executor, lambda: self.chat(prompt, **kwargs))
 
 
 class AIGCService:
@@ -290,13 +516,17 @@ class AIGCService:
     支持多种模型的切换和调用
     """
 
-    def __init__(self, adapter: AIGCModelAdapter):
+    def __init__(self, adapter: AIGCModelAdapter, governor=None):
         """
         初始化AIGC服务
 
         Args:
             adapter: 模型适配器实例
+            governor: 可选的LLMGovernor，传入后所有调用受统一限流控制
         """
+        if governor is not None:
+            from .rate_limiter import GovernedAdapter
+            adapter = GovernedAdapter(adapter, governor)
         self.adapter = adapter
 
     def analyze_stock_pattern(self, prompt: str) -> str:
@@ -367,12 +597,146 @@ def create_adapter(
     elif provider == ModelProvider.ZHIPU:
         return ZhipuAdapter(
             api_key=config.get("api_key"),
-            model=config.get("model", "glm-4-flash")
+            model=config.get("model", "glm-4-flash"),
+            base_url=config.get("base_url")
         )
     else:
         raise ValueError(f"不支持的模型提供商: {provider}")
 
 
+class AdapterPool:
+    """
+    长期复用的模型适配器池
+
+    每个(提供商, 配置)只创建一个适配器，SDK客户端及其HTTP连接在请求之间复用；
+    所有适配器共享一个固定大小的专用线程池执行同步SDK调用，不占用事件循环默认线程池。
+    """
+
+    def __init__(self, max_workers: int = 8, governor=None):
+        """
+        初始化适配器池
+
+        Args:
+            max_workers: 模型调用线程池大小（即同时进行的模型请求上限）
+            governor: 可选的LLMGovernor，池中所有适配器共享同一限流配额
+        """
+        self.max_workers = max_workers
+        self.governor = governor
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm-call")
+        self._adapters: Dict[tuple, AIGCModelAdapter] = {}
+        self._lock = threading.Lock()
+
+    def get(self, provider: ModelProvider, **config) -> AIGCModelAdapter:
+        """
+        获取（或创建）适配器
+
+        Args:
+            provider: 模型提供商
+            **config: 与create_adapter相同的配置参数
+
+        Returns:
+            可复用的适配器实例
+        """
+        key = (provider, tuple(sorted((k, str(v)) for k, v in config.items())))
+        with self._lock:
+            adapter = self._adapters.get(key)
+            if adapter is None:
+                adapter = create_adapter(provider, **config)
+                adapter.executor = self._executor
+                if self.governor is not None:
+                    from .rate_limiter import GovernedAdapter
+                    adapter = GovernedAdapter(adapter, self.governor)
+                self._adapters[key] = adapter
+            return adapter
+
+    def get_hedged(
+        self,
+        primary: ModelProvider,
+        primary_config: Dict[str, Any],
+        secondary: ModelProvider,
+        secondary_config: Dict[str, Any],
+        **hedge_options
+    ) -> AIGCModelAdapter:
+        """
+        获取（或创建）对冲适配器
+
+        主、备适配器都从池中获取（共享线程池和限流配额），对冲适配器本身也会复用，
+        以便持续积累主模型的耗时分布。
+
+        Args:
+            primary: 主模型提供商
+            primary_config: 主模型配置参数
+            secondary: 备用模型提供商
+            secondary_config: 备用模型配置参数
+            **hedge_options: HedgedAdapter的其他参数（quantile、default_delay等）
+
+        Returns:
+            HedgedAdapter实例
+        """
+        from .hedging import HedgedAdapter
+
+        key = (
+            "hedged",
+            primary, tuple(sorted((k, str(v)) for k, v in primary_config.items())),
+            secondary, tuple(sorted((k, str(v)) for k, v in secondary_config.items()))
+        )
+        primary_adapter = self.get(primary, **primary_config)
+        secondary_adapter = self.get(secondary, **secondary_config)
+        with self._lock:
+            adapter = self._adapters.get(key)
+            if adapter is None:
+                # 主、备适配器共用池中的线程池，对冲的并发上限按线程池大小计算
+                hedge_options.setdefault("async_workers", self.max_workers)
+                adapter = HedgedAdapter(
+                    primary_adapter,
+                    secondary_adapter,
+                    primary_name=primary.value,
+                    secondary_name=secondary.value,
+                    **hedge_options
+                )
+                self._adapters[key] = adapter
+            return adapter
+
+    def shutdown(self, wait: bool = False):
+        """关闭线程池并释放适配器"""
+        with self._lock:
+            self._adapters.clear()
+        self._executor.shutdown(wait=wait)
+
+
+_default_pool: Optional[AdapterPool] = None
+_default_pool_lock = threading.Lock()
+
+
+def get_adapter_pool() -> AdapterPool:
+    """
+    获取进程级共享的适配器池
+
+    线程池大小由LLM_EXECUTOR_WORKERS配置；限流参数由LLM_RPM、LLM_TPM、
+    LLM_MAX_IN_FLIGHT、LLM_QUEUE_TIMEOUT配置（LLM_RPM=0表示不限流）。
+    """
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            from .rate_limiter import LLMGovernor
+
+            governor = None
+            rpm = float(os.getenv("LLM_RPM", "30"))
+            if rpm > 0:
+                tpm = float(os.getenv("LLM_TPM", "0"))
+                governor = LLMGovernor(
+                    requests_per_minute=rpm,
+                    tokens_per_minute=tpm or None,
+                    max_in_flight=int(os.getenv("LLM_MAX_IN_FLIGHT", "4")),
+                    timeout=float(os.getenv("LLM_QUEUE_TIMEOUT", "60"))
+                )
+            _default_pool = AdapterPool(
+                max_workers=int(os.getenv("LLM_EXECUTOR_WORKERS", "8")),
+                governor=governor
+            )
+        return _default_pool
+
+
 # 简化的Mock适配器（用于测试）
 class MockAIGCAdapter(AIGCModelAdapter):
     """Mock AIGC适配器，用于测试和演示"""
@@ -405,3 +769,9 @@ class MockAIGCAdapter(AIGCModelAdapter):
     async def async_chat(self, prompt: str, **kwargs) -> str:
         """异步聊天"""
         return self.chat(prompt, **kwargs)
+
+    def stream_chat(self, prompt: str, chunk_size: int = 8, **kwargs) -> Iterator[str]:
+        """流式返回模拟响应（按固定长度切片）"""
+        text = self.chat(prompt, **kwargs)
+        for i in range(0, len(text), chunk_size):
+            yield text[i:i + chunk_size]
@@ -0,0 +1,275 @@
+"""
+AI模型调用限流器
+按每分钟请求数、每分钟Token数和最大并发数统一控制所有模型调用，替代固定的sleep间隔
+"""
+
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Callable, Iterator, Optional
+
+from .model_adapter import AIGCModelAdapter
+
+
+class GovernorTimeout(Exception):
+    """排队超过截止时间仍未获得调用配额"""
+    pass
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    粗略估算文本Token数
+
+    中文字符按1个Token计，其余字符按4个字符1个Token计。
+    """
+    if not text:
+        return 0
+    cjk = sum(1 for ch in text if "一" <= ch <= "鿿")
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+class TokenBucket:
+    """令牌桶（线程安全）"""
+
+    def __init__(self, capacity: float, refill_per_second: float):
+        """
+        初始化令牌桶
+
+        Args:
+            capacity: 桶容量（允许的突发量）
+            refill_per_second: 每秒补充的令牌数
+        """
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated_at
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.refill_per_second)
+        self._updated_at = now
+
+    def wait_time(self, amount: float) -> float:
+        """返回获取指定数量令牌还需等待的秒数（0表示现在就可以）"""
+        amount = min(amount, self.capacity)
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= amount:
+                return 0.0
+            return (amount - self._tokens) / self.refill_per_second
+
+    def consume(self, amount: float):
+        """扣除令牌（允许透支，之后的请求会相应等待更久）"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= min(amount, self.capacity)
+
+
+class LLMGovernor:
+    """
+    模型调用调度器
+
+    三个约束同时满足才放行：
+    - 请求桶：每分钟请求数（RPM）
+    - Token桶：每分钟Token数（TPM，按Prompt估算值+max_tokens计）
+    - 并发上限：同时进行中的请求数
+    等待超过timeout时抛出GovernorTimeout，调用方可据此降级。
+    """
+
+    # 无法计算精确等待时间（等待并发名额）时的轮询间隔
+    POLL_INTERVAL = 0.05
+
+    def __init__(
+        self,
+        requests_per_minute: float = 30,
+        tokens_per_minute: Optional[float] = None,
+        max_in_flight: int = 4,
+        timeout: float = 60
+    ):
+        """
+        初始化调度器
+
+        Args:
+            requests_per_minute: 每分钟请求数上限
+            tokens_per_minute: 每分钟Token数上限（None表示不限制）
+            max_in_flight: 最大并发请求数
+            timeout: 默认排队截止时间（秒）
+        """
+        self.request_bucket = TokenBucket(max(1.0, requests_per_minute / 60 * 5), requests_per_minute / 60)
+        self.token_bucket = (
+            TokenBucket(tokens_per_minute / 6, tokens_per_minute / 60) if tokens_per_minute else None
+        )
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self._in_flight = 0
+        self._waiting = 0
+        self._lock = threading.Lock()
+
+    @property
+    def in_flight(self) -> int:
+        """当前进行中的请求数"""
+        return self._in_flight
+
+    @property
+    def queue_depth(self) -> int:
+        """当前排队等待的请求数"""
+        return self._waiting
+
+    def _try_acquire(self, tokens: int) -> float:
+        """尝试获取配额，成功返回0，否则返回建议的等待秒数"""
+        with self._lock:
+            if self._in_flight >= self.max_in_flight:
+                return self.POLL_INTERVAL
+
+            wait = self.request_bucket.wait_time(1)
+            if self.token_bucket is not None:
+                wait = max(wait, self.token_bucket.wait_time(tokens))
+            if wait > 0:
+                return wait
+
+            self.request_bucket.consume(1)
+            if self.token_bucket is not None:
+                self.token_bucket.consume(tokens)
+            self._in_flight += 1
+            return 0.0
+
+    def _release(self):
+        with self._lock:
+            self._in_flight -= 1
+
+    def _deadline(self, timeout: Optional[float]) -> float:
+        return time.monotonic() + (self.timeout if timeout is None else timeout)
+
+    async def acquire(self, tokens: int = 0, timeout: Optional[float] = None):
+        """异步等待配额（必须与release配对调用）"""
+        deadline = self._deadline(timeout)
+        with self._lock:
+            self._waiting += 1
+        try:
+            while True:
+                wait = self._try_acquire(tokens)
+                if wait == 0:
+                    return
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise GovernorTimeout("AI模型调用排队超时")
+                await asyncio.sleep(min(wait, remaining))
+        finally:
+            with self._lock:
+                self._waiting -= 1
+
+    def acquire_sync(self, tokens: int = 0, timeout: Optional[float] = None):
+        """同步等待配额（必须与release配对调用）"""
+        deadline = self._deadline(timeout)
+        with self._lock:
+            self._waiting += 1
+        try:
+            while True:
+                wait = self._try_acquire(tokens)
+                if wait == 0:
+                    return
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise GovernorTimeout("AI模型调用排队超时")
+                time.sleep(min(wait, remaining))
+        finally:
+            with self._lock:
+                self._waiting -= 1
+
+    def release(self):
+        """归还并发名额"""
+        self._release()
+
+    @asynccontextmanager
+    async def slot(self, tokens: int = 0, timeout: Optional[float] = None):
+        """异步上下文：获取配额并在结束时归还"""
+        await self.acquire(tokens, timeout)
+        try:
+            yield
+        finally:
+            self.release()
+
+    @contextmanager
+    def sync_slot(self, tokens: int = 0, timeout: Optional[float] = None):
+        """同步上下文：获取配额并在结束时归还"""
+        self.acquire_sync(tokens, timeout)
+        try:
+            yield
+        finally:
+            self.release()
+
+
+class GovernedAdapter(AIGCModelAdapter):
+    """受调度器控制的适配器（包装任意适配器，接口保持不变）"""
+
+    def __init__(self, adapter: AIGCModelAdapter, governor: LLMGovernor):
+        """
+        Args:
+            adapter: 实际执行调用的适配器
+            governor: 共享的调度器
+        """
+        super().__init__(adapter.api_key)
+        self.adapter = adapter
+        self.governor = governor
+
+    @property
+    def executor(self):
+        return self.adapter.executor
+
+    @executor.setter
+    def executor(self, value):
+        # 基类初始化时会赋值None，包装器始终使用内部适配器的线程池
+        pass
+
+    def __getattr__(self, name):
+        # model等属性透传给内部适配器
+        if name == "adapter":
+            raise AttributeError(name)
+        return getattr(self.adapter, name)
+
+    @staticmethod
+    def _cost(prompt: str, kwargs: dict) -> int:
+        return estimate_tokens(prompt) + int(kwargs.get("max_tokens", 500))
+
+    def chat(self, prompt: str, **kwargs) -> str:
+        """同步聊天（排队获取配额后调用）"""
+        with self.governor.sync_slot(self._cost(prompt, kwargs)):
+            return self.adapter.chat(prompt, **kwargs)
+
+    async def async_chat(self, prompt: str, **kwargs) -> str:
+        """
+        异步聊天（排队获取配额后调用）
+
+        SDK调用在线程池中执行，等待方被取消（如对冲中落后的一方）时请求仍在继续，
+        并发名额一直占用到线程中的调用真正结束，被放弃的调用不会绕过max_in_flight。
+        """
+        return await self.submit_chat(prompt, **kwargs)
+
+    async def submit_chat(self, prompt: str, on_done: Optional[Callable[[], None]] = None, **kwargs) -> str:
+        """排队获取配额后在线程池中调用，调用真正结束时归还名额并调用on_done"""
+        try:
+            await self.governor.acquire(self._cost(prompt, kwargs))
+        except BaseException:
+            if on_done is not None:
+                on_done()
+            raise
+
+        def done():
+            self.governor.release()
+            if on_done is not None:
+                on_done()
+
+        return await self.adapter.submit_chat(prompt, on_done=done, **kwargs)
+
+    def stream_chat(self, prompt: str, **kwargs) -> Iterator[str]:
+        """同步流式聊天（整个流式过程占用一个并发名额）"""
+        with self.governor.sync_slot(self._cost(prompt, kwargs)):
+            yield from self.adapter.stream_chat(prompt, **kwargs)
+
+    async def async_stream_chat(self, prompt: str, **kwargs) -> AsyncIterator[str]:
+        """异步流式聊天（整个流式过程占用一个并发名额）"""
+        async with self.governor.slot(self._cost(prompt, kwargs)):
+            async for chunk in self.adapter.async_stream_chat(prompt, **kwargs):
+                yield chunk
@@ -0,0 +1,207 @@
+"""
+AI分析结果缓存
+按(模型, 模板类型, 图形类型, 量化后的行情输入)缓存模型回复，短时间内的重复查看不再调用模型
+"""
+
+import hashlib
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from ..utils.metrics import record_cache
+
+
+# 不参与缓存键的字段（每分钟都在变化，但不影响分析结论）
+VOLATILE_FIELDS = {"触发时间"}
+
+
+def _quantize_number(field: str, value: float, pct_step: float, price_digits: int) -> float:
+    """
+    量化单个数值
+
+    百分比类字段（涨跌幅、放大比例等）按固定步长取整；
+    价格类字段保留指定有效数字，使相近价位落入同一个键。
+    """
+    if "幅" in field or "比例" in field:
+        return round(round(value / pct_step) * pct_step, 4)
+    if value == 0:
+        return 0.0
+    digits = price_digits - int(math.floor(math.log10(abs(value)))) - 1
+    return round(value, digits)
+
+
+def quantize_inputs(
+    stock_data: Dict[str, Any],
+    pct_step: float = 0.5,
+    price_digits: int = 3
+) -> Dict[str, Any]:
+    """
+    量化Prompt输入数据
+
+    Args:
+        stock_data: generate_prompt使用的股票数据字典
+        pct_step: 百分比字段的量化步长（%）
+        price_digits: 价格字段保留的有效数字位数
+
+    Returns:
+        量化后的字典（可用于构造缓存键）
+    """
+    quantized = {}
+    for field, value in stock_data.items():
+        if field in VOLATILE_FIELDS:
+            continue
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            quantized[field] = value
+        else:
+            quantized[field] = _quantize_number(field, float(value), pct_step, price_digits)
+    return quantized
+
+
+def make_cache_key(
+    model: str,
+    template_type: str,
+    pattern_type: str,
+    stock_data: Dict[str, Any],
+    **quantize_kwargs
+) -> str:
+    """
+    构造缓存键
+
+    Args:
+        model: 模型名称
+        template_type: 模板类型（完整版/简化版）
+        pattern_type: 图形类型
+        stock_data: Prompt输入数据
+        **quantize_kwargs: 量化参数（pct_step, price_digits）
+
+    Returns:
+        SHA1摘要字符串
+    """
+    payload = json.dumps(
+        [model, template_type, pattern_type, quantize_inputs(stock_data, **quantize_kwargs)],
+        ensure_ascii=False,
+        sort_keys=True,
+        default=str
+    )
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    模型回复缓存
+
+    内存层为带TTL的LRU；可选的磁盘层使用SQLite，进程重启后仍可命中。
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = 60,
+        max_entries: int = 512,
+        disk_path: Optional[str] = None,
+        name: str = "llm_response"
+    ):
+        """
+        初始化缓存
+
+        Args:
+            ttl_seconds: 缓存有效期（秒）
+            max_entries: 内存层最大条目数
+            disk_path: 磁盘层SQLite文件路径（None表示不启用）
+            name: 名称（用于命中率指标）
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.name = name
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk: Optional[sqlite3.Connection] = None
+
+        if disk_path:
+            directory = os.path.dirname(disk_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._disk = sqlite3.connect(disk_path, check_same_thread=False)
+            self._disk.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._disk.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        读取缓存
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            缓存的模型回复；未命中或已过期返回None
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                response, created_at = entry
+                if now - created_at <= self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    record_cache(self.name, hit=True)
+                    return response
+                del self._memory[key]
+
+            if self._disk is not None:
+                row = self._disk.execute(
+                    "SELECT response, created_at FROM llm_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row and now - row[1] <= self.ttl_seconds:
+                    self._put_memory(key, row[0], row[1])
+                    record_cache(self.name, hit=True)
+                    return row[0]
+
+        record_cache(self.name, hit=False)
+        return None
+
+    def set(self, key: str, response: str):
+        """
+        写入缓存
+
+        Args:
+            key: 缓存键
+            response: 模型回复
+        """
+        if not response:
+            return
+
+        now = time.time()
+        with self._lock:
+            self._put_memory(key, response, now)
+            if self._disk is not None:
+                self._disk.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, response, created_at) VALUES (?, ?, ?)",
+                    (key, response, now)
+                )
+                self._disk.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl_seconds,))
+                self._disk.commit()
+
+    def _put_memory(self, key: str, response: str, created_at: float):
+        """写入内存层并按LRU淘汰（调用方持有锁）"""
+        self._memory[key] = (response, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._memory.clear()
+            if self._disk is not None:
+                self._disk.execute("DELETE FROM llm_cache")
+                self._disk.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._memory)
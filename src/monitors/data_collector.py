@@ -4,10 +4,13 @@
 """
 
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional, List
+from typing import Callable, Dict, Any, Iterable, Optional, List, Sequence
 import requests
 import json
+import threading
+import time
 from datetime import datetime
+from ..utils.metrics import InstrumentedSession
 
 
 class DataCollector(ABC):
@@ -26,6 +29,23 @@ class DataCollector(ABC):
         """
         pass
 
+    def get_stocks_realtime_data(self, stock_codes: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        批量获取股票实时数据（默认逐只获取，支持批量接口的数据源应覆盖）
+
+        Args:
+            stock_codes: 股票代码列表
+
+        Returns:
+            {股票代码: 实时数据}，获取失败的股票不在结果中
+        """
+        results = {}
+        for stock_code in stock_codes:
+            data = self.get_stock_realtime_data(stock_code)
+            if data:
+                results[stock_code] = data
+        return results
+
     @abstractmethod
     def get_sector_data(self, sector_name: str) -> Dict[str, Any]:
         """
@@ -479,7 +499,7 @@ class EastMoneyDataCollector(DataCollector):
     def __init__(self):
         """初始化东方财富数据采集器"""
         self.base_url = "http://push2.eastmoney.com/api/qt"
-        self.session = requests.Session()
+        self.session = InstrumentedSession("eastmoney")
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         })
@@ -521,26 +541,179 @@ class EastMoneyDataCollector(DataCollector):
         return {"涨跌幅": 0}
 
 
+# IntradayStateTracker给出、原样带入监控数据的附加字段
+INTRADAY_EXTRA_FIELDS = ("开盘窗口最大跌幅", "跌破均线分钟数", "触板分钟数", "封板分钟数")
+
+# 市场环境中默认获取的指数（第一个作为监控数据中的「大盘」）
+CONTEXT_INDICES = ("上证指数", "深证成指")
+
+
+class MarketContext:
+    """
+    一个刷新周期内所有股票共享的市场环境
+    指数涨跌幅、板块涨跌幅和市场宽度每周期获取一次，注入到每只股票的监控数据中
+    """
+
+    def __init__(
+        self,
+        indices: Dict[str, Dict[str, Any]],
+        sectors: Optional[Dict[str, Dict[str, Any]]] = None,
+        breadth: Optional[Dict[str, int]] = None,
+        timestamp: Optional[float] = None
+    ):
+        """
+        Args:
+            indices: {指数名称: 指数数据}，按CONTEXT_INDICES顺序
+            sectors: {板块名称: 板块数据}
+            breadth: 市场宽度，如 {"上涨家数": 3000, "下跌家数": 2000, ...}
+            timestamp: 获取时间（time.time()），默认当前时间
+        """
+        self.indices = dict(indices)
+        self.sectors = dict(sectors or {})
+        self.breadth = dict(breadth or {})
+        self.timestamp = time.time() if timestamp is None else timestamp
+
+    @property
+    def age(self) -> float:
+        """距获取时间的秒数"""
+        return time.time() - self.timestamp
+
+    @property
+    def market_name(self) -> str:
+        """监控数据中的大盘名称"""
+        return next(iter(self.indices), "上证指数")
+
+    def index_change(self, index_name: Optional[str] = None) -> float:
+        """指数涨跌幅（%），默认大盘"""
+        return (self.indices.get(index_name or self.market_name) or {}).get("涨跌幅") or 0
+
+    def sector_change(self, sector_name: str) -> float:
+        """板块涨跌幅（%），未获取的板块为0"""
+        return (self.sectors.get(sector_name) or {}).get("涨跌幅") or 0
+
+    def fields(self, sector_name: str) -> Dict[str, Any]:
+        """
+        注入监控数据的市场环境字段
+
+        Args:
+            sector_name: 股票所属板块
+
+        Returns:
+            板块、大盘、其他指数涨跌幅及市场宽度字段
+        """
+        data = {
+            "板块名称": sector_name or "",
+            "板块涨跌幅": self.sector_change(sector_name) if sector_name else 0,
+            "大盘名称": self.market_name,
+            "大盘涨跌幅": self.index_change(),
+        }
+        for index_name in self.indices:
+            if index_name != self.market_name:
+                data[f"{index_name}涨跌幅"] = self.index_change(index_name)
+        data.update(self.breadth)
+        return data
+
+
 class StockDataAggregator:
     """
     股票数据聚合器
     整合多个数据源的数据，构建完整的市场数据结构
+
+    指数、板块、市场宽度放在共享的MarketContext中，每个刷新周期获取一次；
+    逐只股票只需获取自身行情。
     """
 
-    def __init__(self, data_collector: DataCollector):
+    def __init__(
+        self,
+        data_collector: DataCollector,
+        context_ttl: float = 30,
+        index_names: Sequence[str] = CONTEXT_INDICES,
+        breadth_provider: Optional[Callable[[], Dict[str, int]]] = None,
+        state_tracker=None
+    ):
         """
         初始化数据聚合器
 
         Args:
             data_collector: 数据采集器实例
+            context_ttl: 市场环境复用时间（秒），超过后下次采集时重新获取
+            index_names: 市场环境中获取的指数，第一个作为「大盘」
+            breadth_provider: 返回市场宽度的函数（如MarketSnapshotCollector.get_breadth），为None时不含宽度
+            state_tracker: 可选的IntradayStateTracker，每次采集的行情都会更新盘中状态，
+                开盘分钟数、破位后未回弹分钟数等规则输入由状态给出（调用方传入的参数优先）
         """
         self.collector = data_collector
+        self.context_ttl = context_ttl
+        self.index_names = tuple(index_names)
+        self.breadth_provider = breadth_provider
+        self.state_tracker = state_tracker
+        self._context: Optional[MarketContext] = None
+        self._context_lock = threading.Lock()
+
+    def refresh_context(self, sector_names: Iterable[str] = ()) -> MarketContext:
+        """
+        重新获取市场环境（每个刷新周期开始时调用一次）
+
+        Args:
+            sector_names: 本周期需要的板块
+
+        Returns:
+            新的MarketContext
+        """
+        indices = {name: self.collector.get_market_index_data(name) for name in self.index_names}
+        breadth = {}
+        if self.breadth_provider is not None:
+            try:
+                breadth = self.breadth_provider() or {}
+            except Exception as e:
+                print(f"⚠️  获取市场宽度失败: {e}")
+
+        context = MarketContext(indices, breadth=breadth)
+        self._add_sectors(context, sector_names)
+        with self._context_lock:
+            self._context = context
+        return context
+
+    def get_context(self, sector_names: Iterable[str] = (), max_age: Optional[float] = None) -> MarketContext:
+        """
+        获取市场环境（max_age秒内复用，缺少的板块补充获取一次）
+
+        Args:
+            sector_names: 需要的板块
+            max_age: 最长复用时间（秒），默认context_ttl
+
+        Returns:
+            MarketContext
+        """
+        max_age = self.context_ttl if max_age is None else max_age
+        with self._context_lock:
+            context = self._context
+        if context is None or context.age > max_age:
+            return self.refresh_context(sector_names)
+        self._add_sectors(context, sector_names)
+        return context
+
+    def _add_sectors(self, context: MarketContext, sector_names: Iterable[str]):
+        """获取上下文中还没有的板块数据（请求在锁外进行，写入共享的context.sectors时持锁）"""
+        with self._context_lock:
+            missing = [name for name in dict.fromkeys(sector_names) if name and name not in context.sectors]
+        for sector_name in missing:
+            data = self.collector.get_sector_data(sector_name)
+            with self._context_lock:
+                context.sectors.setdefault(sector_name, data)
+
+    def _with_intraday_state(self, stock_code: str, stock_data: Dict[str, Any], kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """用新行情更新盘中状态，状态给出的规则输入作为参数默认值"""
+        if self.state_tracker is None:
+            return kwargs
+        return {**self.state_tracker.rule_inputs(stock_code, stock_data), **kwargs}
 
     def collect_monitoring_data(
         self,
         stock_code: str,
         chart_type: str,
         trigger_time: str,
+        context: Optional[MarketContext] = None,
         **kwargs
     ) -> Dict[str, Any]:
         """
@@ -550,24 +723,86 @@ class StockDataAggregator:
             stock_code: 股票代码
             chart_type: 图形类型（开盘跳水/破位下跌/冲板回落）
             trigger_time: 触发时间
+            context: 本周期的市场环境，默认使用聚合器缓存的环境
             **kwargs: 其他特定参数（根据不同图形类型）
 
         Returns:
             完整的市场数据字典
         """
-        # 1. 获取股票基础数据
+        # 1. 获取股票基础数据（逐只只需这一次请求）
         stock_data = self.collector.get_stock_realtime_data(stock_code)
         if not stock_data:
             raise ValueError(f"无法获取股票{stock_code}的数据")
 
-        # 2. 获取板块数据
+        # 2. 板块、大盘数据取自共享的市场环境
         sector_name = stock_data.get("板块名称", "")
-        sector_data = self.collector.get_sector_data(sector_name) if sector_name else {}
+        if context is None:
+            context = self.get_context([sector_name])
+        else:
+            self._add_sectors(context, [sector_name])
+
+        # 3. 组装完整数据
+        kwargs = self._with_intraday_state(stock_code, stock_data, kwargs)
+        return self._assemble(stock_code, stock_data, context, chart_type, trigger_time, kwargs)
+
+    def collect_batch_monitoring_data(
+        self,
+        stock_codes: List[str],
+        chart_types: List[str],
+        trigger_time: str,
+        context: Optional[MarketContext] = None,
+        **kwargs
+    ) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """
+        批量采集多只股票、多种图形的监控数据
 
-        # 3. 获取大盘数据
-        market_data = self.collector.get_market_index_data("上证指数")
+        行情批量获取一次，板块和大盘取自共享的市场环境，各图形类型共用同一份数据组装。
 
-        # 4. 组装完整数据
+        Args:
+            stock_codes: 股票代码列表
+            chart_types: 图形类型列表
+            trigger_time: 触发时间
+            context: 本周期的市场环境，默认使用聚合器缓存的环境
+            **kwargs: 其他特定参数（对所有股票生效）
+
+        Returns:
+            {股票代码: {图形类型: 完整的市场数据字典}}，获取不到行情的股票不在结果中
+        """
+        # 1. 批量获取股票基础数据
+        stocks = self.collector.get_stocks_realtime_data(list(stock_codes))
+        missing = [code for code in stock_codes if code not in stocks]
+        if missing:
+            print(f"⚠️  无法获取以下股票的数据: {', '.join(missing)}")
+        if not stocks:
+            return {}
+
+        # 2. 市场环境：每个板块、每个指数在一个周期内只获取一次
+        sector_names = {stock_data.get("板块名称", "") for stock_data in stocks.values()}
+        if context is None:
+            context = self.get_context(sector_names)
+        else:
+            self._add_sectors(context, sector_names)
+
+        # 3. 按图形类型组装
+        collected = {}
+        for stock_code, stock_data in stocks.items():
+            stock_kwargs = self._with_intraday_state(stock_code, stock_data, kwargs)
+            collected[stock_code] = {
+                chart_type: self._assemble(stock_code, stock_data, context, chart_type, trigger_time, stock_kwargs)
+                for chart_type in chart_types
+            }
+        return collected
+
+    @staticmethod
+    def _assemble(
+        stock_code: str,
+        stock_data: Dict[str, Any],
+        context: MarketContext,
+        chart_type: str,
+        trigger_time: str,
+        kwargs: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """由已获取的行情和市场环境组装监控数据"""
         full_data = {
             "股票代码": stock_code,
             "股票名称": stock_data.get("股票名称", ""),
@@ -590,10 +825,7 @@ class StockDataAggregator:
             "分钟成交额放大比例": kwargs.get("分钟成交额放大比例") or 0,
 
             # 市场环境
-            "板块名称": sector_name or "",
-            "板块涨跌幅": sector_data.get("涨跌幅") or 0,
-            "大盘名称": "上证指数",
-            "大盘涨跌幅": market_data.get("涨跌幅") or 0,
+            **context.fields(stock_data.get("板块名称", "")),
 
             # 消息面
             "最新消息": stock_data.get("最新消息") or "无",
@@ -602,6 +834,11 @@ class StockDataAggregator:
             "额外特征": kwargs.get("额外特征") or ""
         }
 
+        # 盘中状态给出的附加字段
+        for key in INTRADAY_EXTRA_FIELDS:
+            if key in kwargs:
+                full_data[key] = kwargs[key]
+
         # 添加图形类型特定字段
         if chart_type == "开盘跳水":
             full_data.update({
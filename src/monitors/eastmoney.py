@@ -0,0 +1,136 @@
+"""
+东方财富列表接口（clist）分页拉取
+全市场行情、所属板块、全部板块快照共用：第一页拿到总数后其余分页并发请求，
+单页失败时重试，仍失败则跳过该页并记录缺失页码
+"""
+
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from ..utils.metrics import InstrumentedSession
+
+
+CLIST_URL = "http://push2.eastmoney.com/api/qt/clist/get"
+
+
+def em_number(value) -> float:
+    """东方财富数值字段（停牌等情况返回"-"）"""
+    return float(value) if isinstance(value, (int, float)) else 0.0
+
+
+class ClistPager:
+    """
+    clist接口分页拉取器
+
+    第一页失败时整次拉取失败（抛出异常）；其余分页失败时跳过，
+    由调用方按缺失页码标记部分结果。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        fs: str,
+        fields: str,
+        page_size: int = 100,
+        max_workers: int = 8,
+        timeout: float = 5,
+        retries: int = 1,
+        label: str = "行情"
+    ):
+        """
+        Args:
+            name: 数据源名称（InstrumentedSession的指标标签）
+            fs: 市场/板块过滤条件
+            fields: 默认请求字段
+            page_size: 每页条数（接口单页上限为100）
+            max_workers: 分页并发请求数
+            timeout: 单页请求超时（秒）
+            retries: 单页失败后的重试次数
+            label: 日志中的数据名称
+        """
+        self.fs = fs
+        self.fields = fields
+        self.page_size = page_size
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.retries = retries
+        self.label = label
+        self.session = InstrumentedSession(name)
+        self.session.headers.update({
+            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
+        })
+
+    def fetch_page(self, page: int, fields: Optional[str] = None) -> Dict:
+        """
+        拉取一页，返回接口的data字段
+
+        Raises:
+            ValueError: 接口返回错误码
+        """
+        params = {
+            'pn': str(page),
+            'pz': str(self.page_size),
+            'po': '1',
+            'np': '1',
+            'fltt': '2',
+            'invt': '2',
+            'fid': 'f12',  # 按代码排序，分页稳定
+            'fs': self.fs,
+            'fields': fields or self.fields,
+            '_': str(int(datetime.now().timestamp() * 1000))
+        }
+        response = self.session.get(CLIST_URL, params=params, timeout=self.timeout)
+        data = response.json()
+        if data.get('rc') != 0:
+            raise ValueError(f"接口返回rc={data.get('rc')}")
+        if not data.get('data'):
+            return {'total': 0, 'diff': []}
+        diff = data['data'].get('diff') or []
+        # 部分情况下diff以字典形式返回
+        if isinstance(diff, dict):
+            diff = list(diff.values())
+        return {'total': data['data'].get('total', 0), 'diff': diff}
+
+    def fetch_page_with_retry(self, page: int, fields: Optional[str] = None) -> Dict:
+        """拉取一页，超时、连接错误或返回内容无法解析时重试，重试用尽后抛出最后一次的异常"""
+        for attempt in range(self.retries + 1):
+            try:
+                return self.fetch_page(page, fields)
+            except Exception:
+                if attempt == self.retries:
+                    raise
+                time.sleep(0.2 * (attempt + 1))
+
+    def fetch_all(self, fields: Optional[str] = None) -> Tuple[List[Dict], int, List[int]]:
+        """
+        拉取全部分页（第一页拿到总数后，其余分页并发请求）
+
+        Args:
+            fields: 请求字段，默认为初始化时的fields
+
+        Returns:
+            (全部条目, 页数, 缺失的页码)
+        """
+        first = self.fetch_page_with_retry(1, fields)
+        items: List[Dict] = list(first['diff'])
+        pages = math.ceil(first['total'] / self.page_size) if first['total'] else 1
+        missing: List[int] = []
+
+        def fetch(page: int) -> Optional[Dict]:
+            try:
+                return self.fetch_page_with_retry(page, fields)
+            except Exception as e:
+                print(f"⚠️  {self.label}第{page}页拉取失败，已跳过: {e}")
+                return None
+
+        if pages > 1:
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="eastmoney-clist") as executor:
+                for page, data in zip(range(2, pages + 1), executor.map(fetch, range(2, pages + 1))):
+                    if data is None:
+                        missing.append(page)
+                    else:
+                        items.extend(data['diff'])
+        return items, pages, missing
@@ -4,16 +4,35 @@
 获取实时财经新闻
 """
 
-import requests
 from typing import Dict, List, Optional
 from datetime import datetime, timedelta
+from ..utils.metrics import InstrumentedSession
+from ..utils.keyword_matcher import TagMatcher
+
+
+# 新闻标签 -> 关键词
+NEWS_TAG_KEYWORDS = {
+    'A股': ['A股', '上证', '深证', '创业板', '指数'],
+    '央行': ['央行', '货币政策', '降准', '加息'],
+    '新能源': ['新能源', '锂电', '光伏', '储能', '电动车'],
+    '科技': ['科技', '芯片', '半导体', '人工智能', 'AI', '5G'],
+    '医药': ['医药', '生物', '疫苗', '创新药'],
+    '消费': ['消费', '零售', '白酒', '食品'],
+    '房地产': ['房地产', '地产', '住房'],
+    '金融': ['银行', '保险', '证券', '券商'],
+    '国际': ['美股', '港股', '欧股', '原油', '黄金'],
+    '政策': ['政策', '监管', '法规', '改革']
+}
+
+# 标签匹配器：每条标题只扫描一遍（快讯轮询时同一标题反复出现，按标题缓存）
+NEWS_TAG_MATCHER = TagMatcher(NEWS_TAG_KEYWORDS, memo_size=4096)
 
 
 class FinanceNewsCollector:
     """财经新闻收集器"""
 
     def __init__(self):
-        self.session = requests.Session()
+        self.session = InstrumentedSession("finance_news")
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
         })
@@ -341,25 +360,8 @@ class FinanceNewsCollector:
         Returns:
             标签列表
         """
-        keywords = {
-            'A股': ['A股', '上证', '深证', '创业板', '指数'],
-            '央行': ['央行', '货币政策', '降准', '加息'],
-            '新能源': ['新能源', '锂电', '光伏', '储能', '电动车'],
-            '科技': ['科技', '芯片', '半导体', '人工智能', 'AI', '5G'],
-            '医药': ['医药', '生物', '疫苗', '创新药'],
-            '消费': ['消费', '零售', '白酒', '食品'],
-            '房地产': ['房地产', '地产', '住房'],
-            '金融': ['银行', '保险', '证券', '券商'],
-            '国际': ['美股', '港股', '欧股', '原油', '黄金'],
-            '政策': ['政策', '监管', '法规', '改革']
-        }
-
-        tags = []
-        for tag, keywords_list in keywords.items():
-            if any(keyword in title for keyword in keywords_list):
-                tags.append(tag)
-
-        return tags if tags else ['财经']
+        tags = NEWS_TAG_MATCHER.match(title)
+        return list(tags) if tags else ['财经']
 
     def get_default_news(self) -> List[Dict]:
         """
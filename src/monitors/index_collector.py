@@ -4,16 +4,16 @@
 获取主要股票指数的实时行情
 """
 
-import requests
 from typing import Dict, Optional
 from datetime import datetime
+from ..utils.metrics import InstrumentedSession
 
 
 class IndexCollector:
     """股票指数收集器"""
 
     def __init__(self):
-        self.session = requests.Session()
+        self.session = InstrumentedSession("index")
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
         })
@@ -0,0 +1,275 @@
+"""
+盘中增量状态
+每只股票维护一个状态机，每收到一笔行情做一次O(1)更新，得到开盘分钟数、开盘以来最大跌幅、
+跌破均线/支撑位后未回弹的时长、触板后的最高价和回落幅度、分钟成交额放大比例等规则输入，
+不需要额外请求分时数据
+"""
+
+import math
+import threading
+from datetime import datetime, time as dtime
+from typing import Any, Callable, Dict, Optional
+
+
+# A股连续竞价时段（午间休市不计入分钟数）
+MORNING_OPEN = dtime(9, 30)
+MORNING_CLOSE = dtime(11, 30)
+AFTERNOON_OPEN = dtime(13, 0)
+AFTERNOON_CLOSE = dtime(15, 0)
+
+
+def _minutes_of_day(t: dtime) -> float:
+    return t.hour * 60 + t.minute + t.second / 60 + t.microsecond / 60_000_000
+
+
+_SESSION_MORNING = _minutes_of_day(MORNING_CLOSE) - _minutes_of_day(MORNING_OPEN)
+_SESSION_AFTERNOON = _minutes_of_day(AFTERNOON_CLOSE) - _minutes_of_day(AFTERNOON_OPEN)
+
+
+def trading_minutes(now: datetime) -> float:
+    """
+    开盘以来经过的交易分钟数（开盘前为0，午休期间停在120，收盘后为240）
+
+    Args:
+        now: 当前时间
+
+    Returns:
+        分钟数（含小数）
+    """
+    minutes = _minutes_of_day(now.time())
+    morning = min(max(minutes - _minutes_of_day(MORNING_OPEN), 0), _SESSION_MORNING)
+    afternoon = min(max(minutes - _minutes_of_day(AFTERNOON_OPEN), 0), _SESSION_AFTERNOON)
+    return morning + afternoon
+
+
+def _pct(numerator: float, denominator: float) -> float:
+    return round(numerator / denominator * 100, 2) if denominator else 0.0
+
+
+class BelowTimer:
+    """价格持续低于某一价位的计时器（回到价位上方即视为回弹，计时清零）"""
+
+    __slots__ = ("since", "level")
+
+    def __init__(self):
+        self.since: Optional[float] = None
+        self.level = 0.0
+
+    def update(self, price: float, level: float, minute: float):
+        if level <= 0 or price <= 0 or price >= level:
+            self.since = None
+        elif self.since is None:
+            self.since = minute
+        self.level = level
+
+    def minutes(self, minute: float) -> int:
+        """已持续的分钟数（取整，未跌破为0）"""
+        return int(minute - self.since) if self.since is not None else 0
+
+
+class SymbolState:
+    """
+    单只股票的盘中状态
+
+    只保存标量，update与行情笔数无关，均为O(1)。
+    """
+
+    # 开盘窗口：跳水规则关心开盘后10分钟内的跌幅
+    OPEN_WINDOW_MINUTES = 10
+
+    def __init__(self, stock_code: str, trade_date=None):
+        self.stock_code = stock_code
+        self.trade_date = trade_date
+        self.updates = 0
+        self.minute = 0.0
+        self.open_price = 0.0
+        self.price = 0.0
+
+        # 开盘窗口内的最大跌幅
+        self.open_window_drawdown = 0.0
+
+        # 跌破均线/支撑位
+        self.below_ma5 = BelowTimer()
+        self.below_ma20 = BelowTimer()
+        self.below_support = BelowTimer()
+
+        # 触及涨停
+        self.limit_touch_minute: Optional[float] = None
+        self.high_since_touch = 0.0
+        self.at_limit_since: Optional[float] = None
+        self.sealed_minutes = 0.0
+
+        # 分钟成交额（成交额为当日累计值，只统计完整观察到的分钟）
+        self.amount = 0.0
+        self.bucket = -1
+        self.bucket_start_amount = 0.0
+        self.bucket_complete = False
+        self.last_minute_amount = 0.0
+        self.prev_minute_amount = 0.0
+
+    def update(self, quote: Dict[str, Any], now: datetime):
+        """
+        用一笔新行情更新状态
+
+        Args:
+            quote: 实时行情（TencentFinanceCollector等的返回值）
+            now: 行情时间
+        """
+        minute = trading_minutes(now)
+        price = quote.get("实时价") or 0
+        open_price = quote.get("开盘价") or 0
+        high = quote.get("最高价") or 0
+        limit_up = quote.get("涨停价") or 0
+        amount = quote.get("成交额") or 0
+
+        self.updates += 1
+        self.minute = minute
+        self.price = price
+        self.open_price = open_price
+
+        # 开盘窗口最大跌幅
+        if open_price and price and minute <= self.OPEN_WINDOW_MINUTES:
+            self.open_window_drawdown = max(self.open_window_drawdown, _pct(open_price - price, open_price))
+
+        # 跌破均线/支撑位的持续时间
+        self.below_ma5.update(price, quote.get("5日均线") or 0, minute)
+        self.below_ma20.update(price, quote.get("20日均线") or 0, minute)
+        self.below_support.update(price, quote.get("前期平台支撑位") or 0, minute)
+
+        # 触板：第一次最高价达到涨停价时记录，之后跟踪最高价和封板时长
+        if limit_up > 0:
+            if self.limit_touch_minute is None and max(high, price) >= limit_up:
+                self.limit_touch_minute = minute
+            if self.limit_touch_minute is not None:
+                self.high_since_touch = max(self.high_since_touch, high, price)
+            if price >= limit_up:
+                if self.at_limit_since is None:
+                    self.at_limit_since = minute
+            elif self.at_limit_since is not None:
+                self.sealed_minutes += minute - self.at_limit_since
+                self.at_limit_since = None
+
+        # 分钟成交额：按交易分钟分桶，累计成交额在相邻两个分钟边界的差值即为分钟成交额；
+        # 第一个分钟从中途开始观察、跳过分钟时中间的分钟未观察到，这两种情况不计入
+        bucket = int(minute)
+        if bucket != self.bucket:
+            if self.bucket >= 0 and self.bucket_complete and bucket == self.bucket + 1:
+                self.prev_minute_amount = self.last_minute_amount
+                self.last_minute_amount = self.amount - self.bucket_start_amount
+            elif self.bucket >= 0:
+                self.prev_minute_amount = self.last_minute_amount = 0.0
+            self.bucket_complete = self.bucket >= 0 and bucket == self.bucket + 1
+            self.bucket = bucket
+            self.bucket_start_amount = self.amount if self.updates > 1 else amount
+        self.amount = amount
+
+    @property
+    def minutes_since_open(self) -> int:
+        """开盘分钟数（第几分钟，开盘前为0）"""
+        return math.ceil(self.minute) if self.minute > 0 else 0
+
+    def rule_inputs(self) -> Dict[str, Any]:
+        """
+        当前的规则输入字段（字段名与监控数据一致）
+
+        Returns:
+            开盘分钟数、跌幅、均线类型/价格、破位后未回弹分钟数、支撑位价格、涨幅、回落幅度、
+            成交额放大比例等；无法计算的字段不返回
+        """
+        inputs: Dict[str, Any] = {
+            "开盘分钟数": self.minutes_since_open,
+            "开盘窗口最大跌幅": self.open_window_drawdown,
+        }
+        if self.open_price and self.price:
+            inputs["跌幅"] = max(_pct(self.open_price - self.price, self.open_price), 0.0)
+
+        # 跌破的均线：优先5日线
+        for ma_type, timer in ((5, self.below_ma5), (20, self.below_ma20)):
+            if timer.since is not None:
+                inputs.update({
+                    "均线类型": ma_type,
+                    "均线价格": timer.level,
+                    "跌破均线分钟数": timer.minutes(self.minute),
+                })
+                break
+
+        if self.below_support.level > 0:
+            inputs["支撑位价格"] = self.below_support.level
+            inputs["破位后未回弹分钟数"] = self.below_support.minutes(self.minute)
+
+        if self.limit_touch_minute is not None and self.open_price:
+            sealed = self.sealed_minutes
+            if self.at_limit_since is not None:
+                sealed += self.minute - self.at_limit_since
+            inputs.update({
+                "涨幅": _pct(self.high_since_touch - self.open_price, self.open_price),
+                "回落幅度": _pct(self.high_since_touch - self.price, self.high_since_touch),
+                "触板分钟数": math.ceil(self.limit_touch_minute),
+                "封板分钟数": int(sealed),
+            })
+
+        # 最近一个完整分钟的成交额：较前1分钟、较当日分钟均值的放大比例
+        if self.last_minute_amount > 0:
+            if self.prev_minute_amount > 0:
+                inputs["分钟成交额放大比例"] = _pct(self.last_minute_amount - self.prev_minute_amount, self.prev_minute_amount)
+            if self.bucket > 0 and self.bucket_start_amount > 0:
+                average = self.bucket_start_amount / self.bucket
+                inputs["当日成交额放大比例"] = _pct(self.last_minute_amount - average, average)
+        return inputs
+
+
+class IntradayStateTracker:
+    """
+    全部股票的盘中状态
+
+    每笔行情调用update，日期变化时自动重置该股票的状态。
+    """
+
+    def __init__(self, clock: Callable[[], datetime] = datetime.now):
+        """
+        Args:
+            clock: 行情时间来源（测试或回放时可替换）
+        """
+        self.clock = clock
+        self._states: Dict[str, SymbolState] = {}
+        self._lock = threading.Lock()
+
+    def update(self, stock_code: str, quote: Dict[str, Any], now: Optional[datetime] = None) -> SymbolState:
+        """
+        用新行情更新某只股票的状态
+
+        Args:
+            stock_code: 股票代码
+            quote: 实时行情
+            now: 行情时间，默认clock()
+
+        Returns:
+            更新后的SymbolState
+        """
+        now = now or self.clock()
+        with self._lock:
+            state = self._states.get(stock_code)
+            if state is None or state.trade_date != now.date():
+                state = SymbolState(stock_code, now.date())
+                self._states[stock_code] = state
+            state.update(quote, now)
+            return state
+
+    def rule_inputs(self, stock_code: str, quote: Dict[str, Any], now: Optional[datetime] = None) -> Dict[str, Any]:
+        """更新状态并返回规则输入字段"""
+        state = self.update(stock_code, quote, now)
+        with self._lock:
+            return state.rule_inputs()
+
+    def get(self, stock_code: str) -> Optional[SymbolState]:
+        """获取某只股票的状态"""
+        with self._lock:
+            return self._states.get(stock_code)
+
+    def reset(self):
+        """清空全部状态"""
+        with self._lock:
+            self._states.clear()
+
+    def __len__(self) -> int:
+        return len(self._states)
@@ -0,0 +1,221 @@
+"""
+全市场行情快照
+分页并发拉取沪深京全部A股的实时行情，直接组装成列式快照（QuoteSnapshot），供全市场筛选使用；
+同一接口每天批量下载一次全部股票的所属行业和概念（SectorMembership）
+"""
+
+import threading
+import time
+from datetime import date
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .eastmoney import ClistPager, em_number
+from .screener import QuoteSnapshot
+from .sector_membership import SectorMembership
+from .symbol_table import SymbolTable, limit_price
+from ..utils.metrics import MARKET_SCAN_SECONDS
+
+
+# 沪深京A股：深主板、创业板、沪主板、科创板、北交所
+A_SHARE_FILTER = "m:0+t:6,m:0+t:80,m:1+t:2,m:1+t:23,m:0+t:81+s:2048"
+
+# 东方财富字段 -> 快照字段
+EASTMONEY_FIELDS = {
+    "f2": "price",
+    "f17": "open",
+    "f15": "high",
+    "f16": "low",
+    "f18": "prev_close",
+    "f8": "turnover",
+    "f20": "market_cap",
+    "f6": "amount",
+}
+
+# 东方财富静态字段 -> 属性表字段（每日构建属性表时使用）
+EASTMONEY_STATIC_FIELDS = {
+    "f39": "float_shares",
+    "f21": "float_market_cap",
+}
+
+# 东方财富所属板块字段：f100所属行业，f103所属概念（逗号分隔）
+EASTMONEY_INDUSTRY_FIELD = "f100"
+EASTMONEY_CONCEPT_FIELD = "f103"
+
+
+def market_breadth(snapshot: QuoteSnapshot) -> Dict[str, int]:
+    """
+    由全市场快照统计市场宽度
+
+    Args:
+        snapshot: 全市场快照
+
+    Returns:
+        上涨/下跌/平盘/涨停家数
+    """
+    prev_close = snapshot.prev_close
+    valid = prev_close > 0
+    up = valid & (snapshot.price > prev_close)
+    down = valid & (snapshot.price < prev_close)
+    limit_up = valid & (snapshot.limit_up > 0) & (snapshot.price >= snapshot.limit_up)
+    return {
+        "上涨家数": int(np.count_nonzero(up)),
+        "下跌家数": int(np.count_nonzero(down)),
+        "平盘家数": int(np.count_nonzero(valid & ~up & ~down)),
+        "涨停家数": int(np.count_nonzero(limit_up)),
+    }
+
+
+class MarketSnapshotCollector:
+    """
+    全市场行情快照采集器
+
+    第一页拿到总数后，其余分页并发请求；结果按max_age缓存，
+    并发的扫描请求共用同一次拉取。单页超时或返回异常时重试，仍失败则跳过该页，
+    快照的missing_pages记录缺失的页码（部分结果）；只有第一页失败时整次拉取失败。
+    """
+
+    def __init__(self, page_size: int = 100, max_workers: int = 8, timeout: float = 5, retries: int = 1):
+        """
+        初始化采集器
+
+        Args:
+            page_size: 每页股票数（接口单页上限为100）
+            max_workers: 并发请求数
+            timeout: 单页请求超时（秒）
+            retries: 单页失败后的重试次数
+        """
+        self.pager = ClistPager(
+            "eastmoney_market",
+            A_SHARE_FILTER,
+            'f12,f14,' + ','.join([*EASTMONEY_FIELDS, *EASTMONEY_STATIC_FIELDS]),
+            page_size=page_size,
+            max_workers=max_workers,
+            timeout=timeout,
+            retries=retries,
+            label="全市场行情"
+        )
+        self._snapshot: Optional[QuoteSnapshot] = None
+        self._symbols: Optional[SymbolTable] = None
+        self._membership: Optional[SectorMembership] = None
+        self._lock = threading.Lock()
+        self._membership_lock = threading.Lock()
+
+    def fetch(self) -> QuoteSnapshot:
+        """
+        拉取全市场快照（不使用缓存）
+
+        Returns:
+            QuoteSnapshot（已剔除停牌、无价格的股票）
+        """
+        start = time.perf_counter()
+        items, pages, missing = self.pager.fetch_all()
+        items = [item for item in items if em_number(item.get('f2')) > 0]
+        count = len(items)
+        codes = [str(item.get('f12', '')) for item in items]
+        names = [item.get('f14', '') or '' for item in items]
+        columns = {
+            field: np.fromiter((em_number(item.get(key)) for item in items), dtype=np.float64, count=count)
+            for key, field in EASTMONEY_FIELDS.items()
+        }
+
+        # 静态属性表每个交易日构建一次，之后的快照只追加新出现的股票
+        symbols = self._symbols
+        if symbols is None or symbols.trade_date != date.today():
+            symbols = SymbolTable(codes, names, **self._static_columns(items))
+            self._symbols = symbols
+        elif any(code not in symbols for code in codes):
+            symbols.extend(codes, names, **self._static_columns(items))
+
+        # 涨停价按所属板块和ST状态的涨跌幅限制计算
+        snapshot = QuoteSnapshot(codes, names, symbols=symbols, **columns)
+        snapshot.limit_up = limit_price(snapshot.prev_close, symbols.limit_ratio[snapshot.symbol_ids])
+        snapshot.missing_pages = missing
+        MARKET_SCAN_SECONDS.observe(time.perf_counter() - start, stage="fetch")
+        partial = f"，缺失第{','.join(map(str, missing))}页" if missing else ""
+        print(f"📡 全市场快照: {count}只股票（{pages}页{partial}），耗时{time.perf_counter() - start:.2f}秒")
+        return snapshot
+
+    def fetch_membership(self) -> SectorMembership:
+        """
+        批量下载全部A股的所属行业和概念（不使用缓存）
+
+        Returns:
+            SectorMembership
+        """
+        start = time.perf_counter()
+        items, pages, missing = self.pager.fetch_all(f"f12,{EASTMONEY_INDUSTRY_FIELD},{EASTMONEY_CONCEPT_FIELD}")
+
+        def text(value) -> str:
+            return value if isinstance(value, str) and value != "-" else ""
+
+        membership = SectorMembership(
+            [str(item.get('f12', '')) for item in items],
+            [text(item.get(EASTMONEY_INDUSTRY_FIELD)) for item in items],
+            [[name for name in text(item.get(EASTMONEY_CONCEPT_FIELD)).split(',') if name] for item in items]
+        )
+        membership.missing_pages = missing
+        partial = f"，缺失第{','.join(map(str, missing))}页" if missing else ""
+        print(f"📡 板块成分: {len(membership)}只股票、{len(membership.sector_names)}个板块（{pages}页{partial}），"
+              f"耗时{time.perf_counter() - start:.2f}秒")
+        return membership
+
+    def get_membership(self) -> Optional[SectorMembership]:
+        """
+        当日的股票 -> 板块反向索引（每个交易日下载一次，可作为SectorIndex的membership_provider）
+
+        Returns:
+            SectorMembership，下载结果为空时返回None（不缓存）；有分页缺失时下次调用重新下载
+        """
+        with self._membership_lock:
+            membership = self._membership
+            if membership is None or membership.trade_date != date.today() or membership.missing_pages:
+                membership = self.fetch_membership()
+                if not len(membership):
+                    return None
+                self._membership = membership
+            return membership
+
+    @staticmethod
+    def _static_columns(items: List[Dict]) -> Dict[str, List[float]]:
+        """行情条目中的流通股本、流通市值"""
+        return {
+            field: [em_number(item.get(key)) for item in items]
+            for key, field in EASTMONEY_STATIC_FIELDS.items()
+        }
+
+    @property
+    def symbols(self) -> Optional[SymbolTable]:
+        """当日的静态属性表（尚未拉取过快照时为None）"""
+        return self._symbols
+
+    def get_snapshot(self, max_age: float = 15) -> QuoteSnapshot:
+        """
+        获取全市场快照（max_age秒内复用上一次结果）
+
+        Args:
+            max_age: 快照最长复用时间（秒）
+
+        Returns:
+            QuoteSnapshot
+        """
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is not None and time.time() - snapshot.timestamp <= max_age:
+                return snapshot
+            # 持锁拉取：并发请求等待同一次结果，不会重复拉取
+            self._snapshot = self.fetch()
+            return self._snapshot
+
+    def get_breadth(self, max_age: float = 15) -> Dict[str, int]:
+        """
+        市场宽度（可作为StockDataAggregator的breadth_provider）
+
+        Args:
+            max_age: 快照最长复用时间（秒）
+
+        Returns:
+            上涨/下跌/平盘/涨停家数
+        """
+        return market_breadth(self.get_snapshot(max_age))
@@ -0,0 +1,306 @@
+"""
+持续监控服务
+按固定间隔对自选股批量评估图形规则，只在图形状态变化（未触发→触发）时产生MonitorTrigger事件，
+并且只对新触发的事件调用AI分析
+"""
+
+import asyncio
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from ..models.stock_data import MonitorTrigger
+from ..utils.metrics import MONITOR_CYCLE_LAG_SECONDS, MONITOR_CYCLE_SECONDS, MONITOR_TRIGGERS_TOTAL
+from .stock_monitor import PatternType, StockPatternMonitor
+
+
+# 状态键：(股票代码, 图形类型)
+StateKey = Tuple[str, PatternType]
+
+
+def parse_watchlist(value: str) -> List[str]:
+    """解析逗号/空白分隔的股票代码（去重并保持顺序）"""
+    codes = value.replace("，", ",").replace(" ", ",").split(",")
+    return list(dict.fromkeys(code.strip() for code in codes if code.strip()))
+
+
+def parse_patterns(value: str) -> List[PatternType]:
+    """
+    解析逗号分隔的图形类型
+
+    Raises:
+        ValueError: 未知的图形类型
+    """
+    return [PatternType(name) for name in parse_watchlist(value)]
+
+
+class CycleReport:
+    """一轮监控的结果"""
+
+    def __init__(self, cycle: int, scheduled_at: float, started_at: float):
+        self.cycle = cycle
+        self.scheduled_at = scheduled_at
+        self.started_at = started_at
+        self.lag = max(0.0, started_at - scheduled_at)
+        self.duration = 0.0
+        self.stages: Dict[str, float] = {}
+        self.stocks = 0
+        self.active = 0
+        self.triggers: List[MonitorTrigger] = []
+        self.cleared: List[StateKey] = []
+        self.skipped_cycles = 0
+        self.error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典格式"""
+        return {
+            "cycle": self.cycle,
+            "started_at": datetime.fromtimestamp(self.started_at).strftime("%Y-%m-%d %H:%M:%S"),
+            "lag": round(self.lag, 3),
+            "duration": round(self.duration, 3),
+            "stages": {stage: round(seconds, 3) for stage, seconds in self.stages.items()},
+            "stocks": self.stocks,
+            "active": self.active,
+            "triggered": [
+                {"事件ID": t.事件ID, "股票代码": t.股票代码, "图形类型": t.图形类型, "已分析": t.已处理}
+                for t in self.triggers
+            ],
+            "cleared": [{"股票代码": code, "图形类型": pattern.value} for code, pattern in self.cleared],
+            "skipped_cycles": self.skipped_cycles,
+            "error": self.error,
+        }
+
+
+class MonitorService:
+    """
+    持续监控服务
+
+    每轮：刷新市场环境 → 批量采集行情并评估规则 → 与上一轮的触发状态比较，
+    只有新进入触发状态的(股票, 图形)产生事件并调用AI；持续触发的图形不重复产生事件，
+    图形解除后再次触发会重新产生事件。行情获取失败的股票保持上一轮状态。
+
+    run_cycle可单独调用；start()在后台线程中按固定间隔运行，某轮超时则跳过错过的轮次。
+    """
+
+    def __init__(
+        self,
+        monitor: StockPatternMonitor,
+        watchlist: Iterable[str],
+        pattern_types: Optional[Iterable[PatternType]] = None,
+        interval: float = 60,
+        position_status: str = "已持仓",
+        analyze: bool = True,
+        on_trigger: Optional[Callable[[MonitorTrigger], None]] = None,
+        on_cycle: Optional[Callable[[CycleReport], None]] = None
+    ):
+        """
+        初始化监控服务
+
+        Args:
+            monitor: 图形监控器（数据聚合器、AI服务、历史存储、事件总线均取自监控器）
+            watchlist: 自选股代码
+            pattern_types: 监控的图形类型，默认全部
+            interval: 监控间隔（秒）
+            position_status: 生成Prompt使用的持仓状态
+            analyze: 是否对新触发的事件调用AI分析
+            on_trigger: 新触发事件回调
+            on_cycle: 每轮结束回调
+        """
+        self.monitor = monitor
+        self.watchlist = list(watchlist)
+        self.pattern_types = list(pattern_types) if pattern_types else list(PatternType)
+        self.interval = interval
+        self.position_status = position_status
+        self.analyze = analyze
+        self.on_trigger = on_trigger
+        self.on_cycle = on_cycle
+
+        self.active: Set[StateKey] = set()
+        self.cycles = 0
+        self.last_report: Optional[CycleReport] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ---------- 单轮 ----------
+
+    def run_cycle(self, scheduled_at: Optional[float] = None, skipped_cycles: int = 0) -> CycleReport:
+        """
+        执行一轮监控（不能在运行中的事件循环里调用，AI分析使用独立的事件循环）
+
+        Args:
+            scheduled_at: 本轮计划开始时间（time.time()），用于计算延迟，默认为当前时间
+            skipped_cycles: 上一轮超时后跳过的轮次数（在记录指标和回调之前写入报告）
+
+        Returns:
+            CycleReport
+        """
+        started_at = time.time()
+        self.cycles += 1
+        report = CycleReport(self.cycles, scheduled_at or started_at, started_at)
+        report.skipped_cycles = skipped_cycles
+        start = time.perf_counter()
+
+        try:
+            # 1. 市场环境每轮获取一次，所有股票共用
+            stage_start = time.perf_counter()
+            self.monitor.data_aggregator.refresh_context()
+            report.stages["context"] = time.perf_counter() - stage_start
+
+            # 2. 批量采集并评估规则
+            stage_start = time.perf_counter()
+            collected = self.monitor.data_aggregator.collect_batch_monitoring_data(
+                stock_codes=self.watchlist,
+                chart_types=[pattern_type.value for pattern_type in self.pattern_types],
+                trigger_time=datetime.now().strftime("%H:%M")
+            )
+            detected = self.monitor.detect_collected(collected, self.watchlist, self.pattern_types, verbose=False)
+            report.stages["detect"] = time.perf_counter() - stage_start
+
+            # 3. 状态比较：只保留新进入触发状态的事件（行情获取失败的股票保持原状态）
+            collected_codes = set(collected)
+            current = {(item["股票代码"], PatternType(item["图形类型"])): item for item in detected}
+            new_keys = [key for key in current if key not in self.active]
+            report.cleared = [
+                key for key in self.active
+                if key not in current and key[0] in collected_codes
+            ]
+            self.active = (self.active - set(report.cleared)) | set(current)
+            report.stocks = len(collected_codes)
+            report.active = len(self.active)
+
+            # 4. 新触发事件：调用AI分析并产生事件
+            stage_start = time.perf_counter()
+            if new_keys:
+                report.triggers = asyncio.run(self._build_triggers([current[key] for key in new_keys]))
+            report.stages["analyze"] = time.perf_counter() - stage_start
+
+        except Exception as e:
+            report.error = str(e)
+            print(f"❌ 第{report.cycle}轮监控失败: {e}")
+
+        report.duration = time.perf_counter() - start
+        self._record(report)
+        return report
+
+    async def _build_triggers(self, items: List[Dict[str, Any]]) -> List[MonitorTrigger]:
+        """对新触发的图形并发调用AI分析，生成触发事件"""
+        return list(await asyncio.gather(*(self._build_trigger(item) for item in items)))
+
+    async def _build_trigger(self, item: Dict[str, Any]) -> MonitorTrigger:
+        """单个新触发事件：AI分析失败时事件仍然产生（标记为未处理）"""
+        pattern_type = PatternType(item["图形类型"])
+        market_data = item["市场数据"]
+        aigc_response = None
+        if self.analyze and self.monitor.aigc_service is not None:
+            prompt = self.monitor.build_prompt(market_data, pattern_type, self.position_status)
+            try:
+                aigc_response = await self.monitor.aigc_service.async_analyze_stock_pattern(prompt)
+            except Exception as e:
+                print(f"❌ {item['股票代码']} {pattern_type.value} AI分析失败: {e}")
+
+        event_id = f"evt_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{item['股票代码']}_{pattern_type.name.lower()}"
+        trigger = self.monitor.build_trigger(market_data, pattern_type, aigc_response, event_id=event_id)
+        if self.monitor.history_store is not None:
+            self.monitor.history_store.record_trigger(trigger)
+        return trigger
+
+    def _record(self, report: CycleReport):
+        """记录指标、打印摘要并回调"""
+        for stage, seconds in report.stages.items():
+            MONITOR_CYCLE_SECONDS.observe(seconds, stage=stage)
+        MONITOR_CYCLE_SECONDS.observe(report.duration, stage="total")
+        MONITOR_CYCLE_LAG_SECONDS.observe(report.lag)
+        for trigger in report.triggers:
+            MONITOR_TRIGGERS_TOTAL.inc(pattern=trigger.图形类型, transition="triggered")
+        for _, pattern_type in report.cleared:
+            MONITOR_TRIGGERS_TOTAL.inc(pattern=pattern_type.value, transition="cleared")
+
+        skipped = f"，此前跳过{report.skipped_cycles}轮" if report.skipped_cycles else ""
+        print(
+            f"🔄 第{report.cycle}轮: {report.stocks}只股票，触发中{report.active}，"
+            f"新触发{len(report.triggers)}，解除{len(report.cleared)}，"
+            f"耗时{report.duration:.2f}秒，延迟{report.lag:.2f}秒{skipped}"
+        )
+        for trigger in report.triggers:
+            print(f"🚨 {trigger.股票代码} {trigger.股票名称} {trigger.图形类型}")
+
+        self.last_report = report
+        event_bus = self.monitor.event_bus
+        if event_bus is not None:
+            for trigger in report.triggers:
+                event_bus.publish_trigger(trigger)
+            for stock_code, pattern_type in report.cleared:
+                event_bus.publish("cleared", {"股票代码": stock_code, "图形类型": pattern_type.value})
+        if self.on_trigger is not None:
+            for trigger in report.triggers:
+                try:
+                    self.on_trigger(trigger)
+                except Exception as e:
+                    print(f"⚠️  触发事件回调失败: {e}")
+        if self.on_cycle is not None:
+            try:
+                self.on_cycle(report)
+            except Exception as e:
+                print(f"⚠️  监控轮次回调失败: {e}")
+
+    # ---------- 持续运行 ----------
+
+    def run_forever(self, max_cycles: Optional[int] = None):
+        """
+        按固定间隔持续运行（阻塞），直到stop()或达到max_cycles
+
+        计划时间按 首轮时间 + n × interval 推进，单轮耗时不会累积成漂移；
+        某轮超过间隔时跳过错过的轮次，延迟计入下一轮报告。
+        """
+        next_run = time.time()
+        skipped = 0
+        while not self._stop.is_set():
+            self.run_cycle(scheduled_at=next_run, skipped_cycles=skipped)
+            if max_cycles is not None and self.cycles >= max_cycles:
+                break
+
+            next_run += self.interval
+            now = time.time()
+            skipped = 0
+            if now > next_run + self.interval:
+                skipped = int((now - next_run) // self.interval)
+                next_run += skipped * self.interval
+                print(f"⚠️  监控轮次耗时超过间隔，跳过{skipped}轮")
+            self._stop.wait(max(0.0, next_run - now))
+
+    def start(self) -> "MonitorService":
+        """在后台线程中持续运行"""
+        if self._thread is not None and self._thread.is_alive():
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run_forever, name="monitor-service", daemon=True)
+        self._thread.start()
+        print(f"👀 持续监控已启动: {len(self.watchlist)}只股票，间隔{self.interval}秒")
+        return self
+
+    def stop(self, timeout: Optional[float] = None):
+        """停止后台运行（等待当前一轮结束）"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    @property
+    def running(self) -> bool:
+        """后台线程是否在运行"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def status(self) -> Dict[str, Any]:
+        """服务状态"""
+        return {
+            "running": self.running,
+            "interval": self.interval,
+            "watchlist": self.watchlist,
+            "patterns": [pattern_type.value for pattern_type in self.pattern_types],
+            "cycles": self.cycles,
+            "active": [{"股票代码": code, "图形类型": pattern.value} for code, pattern in sorted(
+                self.active, key=lambda key: (key[0], key[1].value)
+            )],
+            "last_cycle": self.last_report.to_dict() if self.last_report else None,
+        }
@@ -5,9 +5,9 @@
 使用 iTick API: https://docs.itick.org/
 """
 
-import requests
 from typing import Dict, Optional
 from datetime import datetime
+from ..utils.metrics import InstrumentedSession
 
 
 class PreciousMetalsCollector:
@@ -26,7 +26,7 @@ class PreciousMetalsCollector:
     }
 
     def __init__(self):
-        self.session = requests.Session()
+        self.session = InstrumentedSession("precious_metals")
         self.session.headers.update({
             'accept': 'application/json',
             'token': self.API_TOKEN,
@@ -0,0 +1,344 @@
+"""
+声明式图形规则
+规则由「字段 比较运算符 阈值」和 AllOf / AnyOf / Not 组合而成，编译为对列式行情表的NumPy布尔运算；
+派生列（开盘跌幅、冲高幅度等）按名称注册，同一次评估中每个派生列只计算一次
+"""
+
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple, Union
+
+import numpy as np
+
+
+OPERATORS: Dict[str, Callable[[np.ndarray, Any], np.ndarray]] = {
+    "<": np.less,
+    "<=": np.less_equal,
+    ">": np.greater,
+    ">=": np.greater_equal,
+    "==": np.equal,
+    "!=": np.not_equal,
+}
+
+
+def round2(values: np.ndarray) -> np.ndarray:
+    """
+    保留2位小数，结果与Python内置round(x, 2)逐个一致
+
+    np.round先乘100再取整，在接近0.5的边界上可能与round()差一位，这些位置逐个用round()修正。
+    """
+    rounded = np.round(values, 2)
+    scaled = values * 100
+    near_tie = np.abs(np.abs(scaled - np.trunc(scaled)) - 0.5) < 1e-6
+    for i in np.flatnonzero(near_tie):
+        rounded[i] = round(float(values[i]), 2)
+    return rounded
+
+
+def _ratio_pct(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    out = np.zeros_like(numerator)
+    np.divide(numerator, denominator, out=out, where=denominator != 0)
+    return out * 100
+
+
+class DerivedColumn:
+    """派生列：由若干原始字段计算得到，无效位置为NaN（任何比较都不成立）"""
+
+    def __init__(self, name: str, inputs: Tuple[str, ...], func: Callable[..., np.ndarray], description: str = ""):
+        self.name = name
+        self.inputs = inputs
+        self.func = func
+        self.description = description
+
+
+DERIVED_COLUMNS: Dict[str, DerivedColumn] = {}
+
+
+def register_column(name: str, inputs: Sequence[str], description: str = ""):
+    """
+    注册派生列（装饰器）
+
+    Args:
+        name: 列名（规则中直接引用）。不能与行情记录中的字段同名（如冲板回落记录自带的回落幅度），
+            否则规则引用该名称时取到的是派生列而不是记录中的值
+        inputs: 依赖的字段，按顺序作为参数传入
+        description: 说明
+    """
+    if name in DERIVED_COLUMNS:
+        raise ValueError(f"派生列重复注册: {name}")
+
+    def decorator(func):
+        DERIVED_COLUMNS[name] = DerivedColumn(name, tuple(inputs), func, description)
+        return func
+    return decorator
+
+
+@register_column("开盘跌幅", ("开盘价", "实时价"), "开盘以来跌幅(%)，开盘价或实时价为0时无效")
+def _opening_drop(open_price: np.ndarray, current_price: np.ndarray) -> np.ndarray:
+    valid = (open_price != 0) & (current_price != 0)
+    return np.where(valid, round2(_ratio_pct(open_price - current_price, open_price)), np.nan)
+
+
+@register_column("冲高幅度", ("最高价", "开盘价"), "最高价相对开盘价涨幅(%)，开盘价或最高价为0时无效")
+def _surge_from_open(high_price: np.ndarray, open_price: np.ndarray) -> np.ndarray:
+    valid = (open_price != 0) & (high_price != 0)
+    return np.where(valid, round2(_ratio_pct(high_price - open_price, open_price)), np.nan)
+
+
+@register_column("高点回落幅度", ("最高价", "实时价", "开盘价"), "实时价相对最高价回落(%)，开盘价或最高价为0时无效")
+def _retrace_from_high(high_price: np.ndarray, current_price: np.ndarray, open_price: np.ndarray) -> np.ndarray:
+    valid = (open_price != 0) & (high_price != 0)
+    return np.where(valid, round2(_ratio_pct(high_price - current_price, high_price)), np.nan)
+
+
+def _number(value) -> float:
+    """与规则原实现的 data.get(key) or 0 一致：缺失/None/空值按0处理"""
+    if not value:
+        return 0.0
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class RuleFrame:
+    """
+    规则评估用的列式行情表
+
+    原始字段在构建时转换为float64数组，派生列在首次引用时计算并缓存。
+    """
+
+    def __init__(self, columns: Dict[str, np.ndarray], size: int):
+        self._columns = dict(columns)
+        self.size = size
+
+    @classmethod
+    def from_records(cls, records: Sequence[Dict[str, Any]], fields: Iterable[str]) -> "RuleFrame":
+        """
+        由行情字典列表构建
+
+        Args:
+            records: 行情字典（如collect_monitoring_data的返回值）
+            fields: 需要的原始字段
+
+        Returns:
+            RuleFrame
+        """
+        size = len(records)
+        columns = {
+            field: np.fromiter((_number(record.get(field)) for record in records), dtype=np.float64, count=size)
+            for field in fields
+        }
+        return cls(columns, size)
+
+    def column(self, name: str) -> np.ndarray:
+        """获取列（派生列按需计算）"""
+        if name not in self._columns:
+            derived = DERIVED_COLUMNS.get(name)
+            if derived is None:
+                raise KeyError(f"未知字段: {name}")
+            with np.errstate(divide="ignore", invalid="ignore"):
+                self._columns[name] = derived.func(*(self.column(field) for field in derived.inputs))
+        return self._columns[name]
+
+
+class Field:
+    """字段引用（用作比较的右值，如 实时价 < 5日均线）"""
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __repr__(self) -> str:
+        return self.name
+
+
+class Condition:
+    """规则条件基类，支持 & | ~ 组合"""
+
+    def fields(self) -> Set[str]:
+        """条件引用的字段（原始字段或派生列）"""
+        raise NotImplementedError
+
+    def evaluate(self, frame: RuleFrame) -> np.ndarray:
+        """对整张表求值，返回布尔数组"""
+        raise NotImplementedError
+
+    def __and__(self, other) -> "AllOf":
+        return AllOf(self, other)
+
+    def __or__(self, other) -> "AnyOf":
+        return AnyOf(self, other)
+
+    def __invert__(self) -> "Not":
+        return Not(self)
+
+
+ConditionLike = Union[Condition, Tuple[str, str, Any]]
+
+
+def _as_condition(condition: ConditionLike) -> Condition:
+    """(字段, 运算符, 阈值) 元组转换为Predicate"""
+    if isinstance(condition, Condition):
+        return condition
+    return Predicate(*condition)
+
+
+class Predicate(Condition):
+    """字段 比较运算符 阈值（阈值可以是数值或另一个字段）"""
+
+    def __init__(self, field: str, op: str, value: Union[float, Field]):
+        if op not in OPERATORS:
+            raise ValueError(f"不支持的运算符: {op}")
+        self.field = field
+        self.op = op
+        self.value = value
+
+    def fields(self) -> Set[str]:
+        names = {self.field}
+        if isinstance(self.value, Field):
+            names.add(self.value.name)
+        return names
+
+    def evaluate(self, frame: RuleFrame) -> np.ndarray:
+        value = frame.column(self.value.name) if isinstance(self.value, Field) else self.value
+        with np.errstate(invalid="ignore"):
+            return OPERATORS[self.op](frame.column(self.field), value)
+
+    def __repr__(self) -> str:
+        return f"{self.field} {self.op} {self.value}"
+
+
+class AllOf(Condition):
+    """全部条件成立"""
+
+    def __init__(self, *conditions: ConditionLike):
+        self.conditions = [_as_condition(c) for c in conditions]
+
+    def fields(self) -> Set[str]:
+        return set().union(*(c.fields() for c in self.conditions))
+
+    def evaluate(self, frame: RuleFrame) -> np.ndarray:
+        result = np.ones(frame.size, dtype=bool)
+        for condition in self.conditions:
+            result &= condition.evaluate(frame)
+        return result
+
+    def __repr__(self) -> str:
+        return "(" + " 且 ".join(map(repr, self.conditions)) + ")"
+
+
+class AnyOf(Condition):
+    """任一条件成立"""
+
+    def __init__(self, *conditions: ConditionLike):
+        self.conditions = [_as_condition(c) for c in conditions]
+
+    def fields(self) -> Set[str]:
+        return set().union(*(c.fields() for c in self.conditions))
+
+    def evaluate(self, frame: RuleFrame) -> np.ndarray:
+        result = np.zeros(frame.size, dtype=bool)
+        for condition in self.conditions:
+            result |= condition.evaluate(frame)
+        return result
+
+    def __repr__(self) -> str:
+        return "(" + " 或 ".join(map(repr, self.conditions)) + ")"
+
+
+class Not(Condition):
+    """条件不成立（注意：派生列无效的行取反后为True）"""
+
+    def __init__(self, condition: ConditionLike):
+        self.condition = _as_condition(condition)
+
+    def fields(self) -> Set[str]:
+        return self.condition.fields()
+
+    def evaluate(self, frame: RuleFrame) -> np.ndarray:
+        return ~self.condition.evaluate(frame)
+
+    def __repr__(self) -> str:
+        return f"非{self.condition!r}"
+
+
+class RuleSpec:
+    """声明式识别规则"""
+
+    def __init__(self, name: str, when: ConditionLike, description: str = ""):
+        """
+        Args:
+            name: 规则名称
+            when: 触发条件
+            description: 规则描述
+        """
+        self.name = name
+        self.when = _as_condition(when)
+        self.description = description
+
+    def matches(self, data: Dict[str, Any]) -> bool:
+        """判断单条行情是否触发"""
+        frame = RuleFrame.from_records([data], raw_fields(self.when.fields()))
+        return bool(self.when.evaluate(frame)[0])
+
+    def __repr__(self) -> str:
+        return f"RuleSpec({self.name}: {self.when!r})"
+
+
+def raw_fields(names: Iterable[str]) -> Set[str]:
+    """把派生列展开为其依赖的原始字段"""
+    result = set()
+    for name in names:
+        derived = DERIVED_COLUMNS.get(name)
+        if derived is None:
+            result.add(name)
+        else:
+            result |= raw_fields(derived.inputs)
+    return result
+
+
+class CompiledRules:
+    """
+    一组规则的编译结果
+
+    规则按顺序评估，共享同一张表，派生列只计算一次；
+    first_match 返回每行第一条触发的规则（与逐条判断、命中即停的语义一致）。
+    """
+
+    def __init__(self, specs: Sequence[RuleSpec]):
+        self.specs = list(specs)
+        self.fields = raw_fields(set().union(*(spec.when.fields() for spec in self.specs)) if self.specs else set())
+
+    def frame(self, records: Sequence[Dict[str, Any]]) -> RuleFrame:
+        """构建包含全部所需字段的表"""
+        return RuleFrame.from_records(records, self.fields)
+
+    def evaluate(self, frame: RuleFrame) -> np.ndarray:
+        """
+        评估全部规则
+
+        Returns:
+            形状为 (规则数, 行数) 的布尔矩阵
+        """
+        if not self.specs:
+            return np.zeros((0, frame.size), dtype=bool)
+        return np.vstack([spec.when.evaluate(frame) for spec in self.specs])
+
+    def first_match(self, frame: RuleFrame) -> np.ndarray:
+        """
+        每行第一条触发的规则下标
+
+        Returns:
+            int数组，未触发为-1
+        """
+        matrix = self.evaluate(frame)
+        if not len(matrix):
+            return np.full(frame.size, -1, dtype=np.int64)
+        return np.where(matrix.any(axis=0), matrix.argmax(axis=0), -1)
+
+    def match_records(self, records: Sequence[Dict[str, Any]]) -> List[Optional[RuleSpec]]:
+        """逐条返回第一条触发的规则（未触发为None）"""
+        indices = self.first_match(self.frame(records))
+        return [self.specs[i] if i >= 0 else None for i in indices]
+
+    def match_one(self, data: Dict[str, Any]) -> Optional[RuleSpec]:
+        """单条行情第一条触发的规则"""
+        return self.match_records([data])[0]
@@ -0,0 +1,665 @@
+"""
+全市场向量化筛选
+把成千上万只股票的实时行情组织成列式数组（每个字段一个NumPy数组），
+一次性计算图形类型、游资票风险分和散户最爱分；理由文本只在输出行时才生成。
+
+图形判定规则与 analyze.detect_pattern_type 逐条一致；单只股票的游资票/散户最爱判定
+（is_speculative_stock、is_retail_favorite_stock）也是在一行快照上调用同一套规则。
+"""
+
+import time
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..utils.keyword_matcher import WeightedKeywordMatcher
+
+# 图形代码（PATTERN_NAMES的下标）
+PATTERN_NAMES = ("强势上涨", "冲板回落", "开盘跳水", "震荡整理", "其他")
+PATTERN_CODES = {name: code for code, name in enumerate(PATTERN_NAMES)}
+
+# 散户最爱的概念关键词及分值
+RETAIL_CONCEPT_KEYWORDS = {
+    '科技': 15, '智能': 15, 'AI': 15, '人工智能': 15,
+    '生物': 12, '医疗': 12, '医药': 12, '健康': 12,
+    '新能源': 12, '锂电': 12, '光伏': 12, '储能': 12,
+    '芯片': 12, '半导体': 12, '集成电路': 12,
+    '软件': 10, '信息': 10, '网络': 10, '数据': 10,
+    '材料': 8, '化工': 8, '环保': 8,
+    '文化': 8, '传媒': 8, '教育': 8
+}
+
+# 概念关键词匹配器：名称只扫描一遍
+RETAIL_CONCEPT_MATCHER = WeightedKeywordMatcher(RETAIL_CONCEPT_KEYWORDS)
+
+# 可排序字段 -> (所属对象, 数组属性)
+SORT_FIELDS = {
+    "change_percent": ("result", "pattern_change_percent"),
+    "pattern_confidence": ("result", "pattern_confidence"),
+    "speculative_risk_score": ("result", "speculative_score"),
+    "retail_score": ("result", "retail_score"),
+    "current_price": ("snapshot", "price"),
+    "turnover_rate": ("snapshot", "turnover"),
+    "market_cap": ("snapshot", "market_cap"),
+    "amount": ("snapshot", "amount"),
+}
+
+# 数组字段 -> 行情字典键
+QUOTE_FIELDS = {
+    "price": "实时价",
+    "open": "开盘价",
+    "high": "最高价",
+    "low": "最低价",
+    "prev_close": "昨收",
+    "limit_up": "涨停价",
+    "turnover": "换手率",
+    "market_cap": "总市值",
+    "amount": "成交额",
+}
+
+
+def _number(value) -> float:
+    """行情字段转浮点数（缺失/无效按0处理）"""
+    try:
+        return float(value) if value is not None else 0.0
+    except (TypeError, ValueError):
+        return 0.0
+
+
+@lru_cache(maxsize=16384)
+def name_features(stock_name: str) -> Tuple[bool, int, Tuple[str, ...]]:
+    """
+    股票名称特征（名称几乎不变，按名称缓存）
+
+    Args:
+        stock_name: 股票名称
+
+    Returns:
+        (是否ST/退市股, 概念关键词总分, 命中的概念关键词)
+    """
+    is_st = 'ST' in stock_name or '退' in stock_name
+    score, matched = RETAIL_CONCEPT_MATCHER.score(stock_name)
+    return is_st, score, matched
+
+
+def _ratio_pct(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    """numerator / denominator * 100，分母为0的位置记为0"""
+    out = np.zeros_like(numerator)
+    np.divide(numerator, denominator, out=out, where=denominator != 0)
+    return out * 100
+
+
+class QuoteSnapshot:
+    """
+    行情快照（列式存储）
+
+    每个行情字段是一个float64数组，股票代码和名称是列表，下标对齐。
+    """
+
+    def __init__(
+        self,
+        codes: Sequence[str],
+        names: Sequence[str],
+        has_prev_close: Optional[np.ndarray] = None,
+        timestamp: Optional[float] = None,
+        symbols=None,
+        **columns: np.ndarray
+    ):
+        """
+        Args:
+            codes: 股票代码
+            names: 股票名称
+            has_prev_close: 行情中是否带昨收字段（None表示都有）
+            timestamp: 行情时间戳（默认为当前时间）
+            symbols: 静态属性表（symbol_table.SymbolTable，需包含全部代码），
+                给出时名称特征按下标直接取用，不再逐个名称计算
+            **columns: QUOTE_FIELDS中各字段的数组
+        """
+        self.codes = list(codes)
+        self.names = list(names)
+        self.timestamp = time.time() if timestamp is None else timestamp
+        # 分页拉取时缺失的页码（非空表示快照只包含部分股票）
+        self.missing_pages: List[int] = []
+        size = len(self.codes)
+        for field in QUOTE_FIELDS:
+            column = columns.get(field)
+            setattr(self, field, np.zeros(size) if column is None else np.asarray(column, dtype=np.float64))
+
+        # 图形判定的涨跌幅基准：没有昨收字段时沿用开盘价（与detect_pattern_type一致），
+        # 游资票/散户最爱判定则按昨收为0处理
+        if has_prev_close is None or has_prev_close.all():
+            self.pattern_base = self.prev_close
+        else:
+            self.pattern_base = np.where(has_prev_close, self.prev_close, self.open)
+
+        # 名称特征
+        if symbols is not None:
+            self.symbol_ids = symbols.ids(self.codes)
+            self.is_st = symbols.is_st[self.symbol_ids]
+            self.concept_score = symbols.concept_score[self.symbol_ids]
+        else:
+            self.symbol_ids = None
+            features = [name_features(name or "") for name in self.names]
+            self.is_st = np.fromiter((f[0] for f in features), dtype=bool, count=size)
+            self.concept_score = np.fromiter((f[1] for f in features), dtype=np.int64, count=size)
+
+    @classmethod
+    def from_quotes(cls, quotes: Iterable[Dict[str, Any]]) -> "QuoteSnapshot":
+        """
+        由实时行情字典列表构建快照
+
+        Args:
+            quotes: TencentFinanceCollector.get_stock_realtime_data 返回的字典
+
+        Returns:
+            QuoteSnapshot
+        """
+        quotes = [q for q in quotes if q]
+        columns = {
+            field: np.fromiter((_number(q.get(key)) for q in quotes), dtype=np.float64, count=len(quotes))
+            for field, key in QUOTE_FIELDS.items()
+        }
+        return cls(
+            [q.get('股票代码', '') for q in quotes],
+            [q.get('股票名称', '') or '' for q in quotes],
+            has_prev_close=np.fromiter(('昨收' in q for q in quotes), dtype=bool, count=len(quotes)),
+            **columns
+        )
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def row(self, index: int) -> Dict[str, float]:
+        """第index行的标量字段"""
+        row = {field: float(getattr(self, field)[index]) for field in QUOTE_FIELDS}
+        row["pattern_base"] = float(self.pattern_base[index])
+        return row
+
+
+class ScreenResult:
+    """
+    筛选结果（列式）
+
+    数值结果都是数组；理由文本通过 *_reason(i) 或 to_rows() 按需生成。
+    """
+
+    def __init__(self, snapshot: QuoteSnapshot, **arrays: np.ndarray):
+        self.snapshot = snapshot
+        self.change_percent = arrays["change_percent"]
+        self.pattern_change_percent = arrays["pattern_change_percent"]
+        self.pattern_code = arrays["pattern_code"]
+        self.pattern_confidence = arrays["pattern_confidence"]
+        self.speculative = arrays["speculative"]
+        self.speculative_score = arrays["speculative_score"]
+        self.retail_favorite = arrays["retail_favorite"]
+        self.retail_score = arrays["retail_score"]
+
+    def __len__(self) -> int:
+        return len(self.snapshot)
+
+    def sort_key(self, name: str) -> np.ndarray:
+        """
+        排序字段对应的数组
+
+        Args:
+            name: SORT_FIELDS中的字段名
+
+        Returns:
+            排序键数组
+        """
+        if name not in SORT_FIELDS:
+            raise ValueError(f"不支持的排序字段: {name}")
+        owner, attr = SORT_FIELDS[name]
+        return getattr(self.snapshot if owner == "snapshot" else self, attr)
+
+    def pattern_mask(self, *patterns: str) -> np.ndarray:
+        """属于指定图形之一的行"""
+        codes = [PATTERN_CODES[p] for p in patterns if p in PATTERN_CODES]
+        return np.isin(self.pattern_code, codes)
+
+    # ---------- 理由文本（逐行生成） ----------
+
+    def pattern_reason(self, i: int) -> str:
+        """图形判定理由"""
+        r = self.snapshot.row(i)
+        if r["pattern_base"] == 0:
+            return "无法判断"
+        change_percent = float(self.pattern_change_percent[i])
+        pattern = PATTERN_NAMES[self.pattern_code[i]]
+        confidence = int(self.pattern_confidence[i])
+
+        if pattern == "强势上涨":
+            if confidence == 100:
+                return f"股价接近涨停({change_percent:+.2f}%)，属于强势上涨"
+            return f"股价大幅上涨({change_percent:+.2f}%)，不属于任何下跌图形"
+        if pattern == "冲板回落":
+            surge_from_open = ((r["high"] - r["open"]) / r["open"]) * 100
+            retrace_from_high = ((r["high"] - r["price"]) / r["high"]) * 100
+            return f"冲高{surge_from_open:.2f}%后回落{retrace_from_high:.2f}%"
+        if pattern == "开盘跳水":
+            return f"开盘后下跌{abs(change_percent):.2f}%"
+        if pattern == "震荡整理":
+            return f"股价窄幅震荡({change_percent:+.2f}%)"
+        return f"常规波动({change_percent:+.2f}%)"
+
+    def speculative_reason(self, i: int) -> str:
+        """游资票判定理由"""
+        r = self.snapshot.row(i)
+        price, open_price, high, low, prev_close = r["price"], r["open"], r["high"], r["low"], r["prev_close"]
+        turnover, market_cap, amount = r["turnover"], r["market_cap"], r["amount"]
+        if price <= 0 or prev_close <= 0:
+            return ""
+
+        factors = []
+        if turnover > 0:
+            if turnover >= 20:
+                factors.append(f"⚠️ 超高换手({turnover:.2f}%),连板特征")
+            elif turnover >= 15:
+                factors.append(f"⚠️ 高换手({turnover:.2f}%),游资活跃")
+            elif turnover >= 10:
+                factors.append(f"换手率偏高({turnover:.2f}%)")
+            elif turnover <= 5:
+                factors.append(f"✓ 低换手({turnover:.2f}%),机构特征")
+
+        if high > 0 and low > 0:
+            amplitude = ((high - low) / low * 100)
+            if amplitude >= 12:
+                factors.append(f"⚠️ 巨幅震荡({amplitude:.2f}%),情绪化")
+            elif amplitude >= 8:
+                factors.append(f"⚠️ 大振幅({amplitude:.2f}%),游资特征")
+            elif amplitude <= 5:
+                factors.append(f"✓ 小振幅({amplitude:.2f}%),稳健")
+
+        change_percent = ((price - prev_close) / prev_close * 100)
+        if change_percent >= 9.9:
+            factors.append(f"⚠️ 涨停({change_percent:+.2f}%)")
+        elif change_percent >= 7:
+            factors.append(f"大涨({change_percent:+.2f}%)")
+        elif 0 <= change_percent <= 3:
+            factors.append(f"✓ 温和上涨({change_percent:+.2f}%)")
+
+        if market_cap > 0:
+            market_cap_yi = market_cap / 100000000
+            if 40 <= market_cap_yi <= 200:
+                if turnover >= 15:
+                    factors.append(f"中小盘+高换手(市值{market_cap_yi:.0f}亿)")
+                elif turnover >= 10:
+                    factors.append(f"中小盘(市值{market_cap_yi:.0f}亿)")
+            elif market_cap_yi < 40:
+                if turnover >= 15:
+                    factors.append(f"⚠️ 小盘易控盘(市值{market_cap_yi:.0f}亿,换手{turnover:.2f}%)")
+                elif turnover >= 10:
+                    factors.append(f"小盘股(市值{market_cap_yi:.0f}亿)")
+            elif market_cap_yi >= 100:
+                if turnover and turnover <= 5:
+                    factors.append(f"✓ 大盘低换手(市值{market_cap_yi:.0f}亿),机构偏好")
+
+        if high > 0 and price > 0:
+            pullback_from_high = ((high - price) / high * 100)
+            if pullback_from_high > 5:
+                factors.append(f"⚠️ 冲高回落({pullback_from_high:.2f}%)")
+
+        if open_price > 0 and price > 0 and open_price > prev_close:
+            open_change = ((open_price - prev_close) / prev_close * 100)
+            current_change = ((price - prev_close) / prev_close * 100)
+            if open_change > current_change and open_change > 3:
+                pullback = open_change - current_change
+                if pullback > 3:
+                    factors.append(f"开盘回落({pullback:.2f}%)")
+
+        if market_cap and amount and market_cap > 0:
+            amount_ratio = (amount / market_cap * 100)
+            if amount_ratio > 40:
+                factors.append(f"成交额异常({amount_ratio:.0f}%市值)")
+
+        if turnover >= 15 and high > 0 and low > 0 and ((high - low) / low * 100) >= 8 \
+                and market_cap > 0 and market_cap / 100000000 <= 200:
+            factors.insert(0, "⚠️ 游资票三位一体(高换手+大振幅+中小盘)")
+
+        return "、".join(factors)
+
+    def retail_reason(self, i: int) -> str:
+        """散户最爱判定理由"""
+        r = self.snapshot.row(i)
+        price, high, low, prev_close = r["price"], r["high"], r["low"], r["prev_close"]
+        turnover, market_cap = r["turnover"], r["market_cap"]
+        stock_name = self.snapshot.names[i]
+        if price <= 0 or not stock_name:
+            return ""
+
+        factors = []
+        if price < 5:
+            factors.append(f"💸 超低价股({price:.2f}元),散户最爱")
+        elif price < 10:
+            factors.append(f"💸 低价股({price:.2f}元)")
+        elif price < 20:
+            factors.append(f"价格适中({price:.2f}元)")
+        elif price >= 50:
+            factors.append(f"✓ 高价股({price:.2f}元),机构偏好")
+
+        if market_cap > 0:
+            market_cap_yi = market_cap / 100000000
+            if market_cap_yi < 30:
+                factors.append(f"🎯 超小盘(市值{market_cap_yi:.0f}亿),易炒作")
+            elif market_cap_yi < 50:
+                factors.append(f"🎯 小盘股(市值{market_cap_yi:.0f}亿)")
+            elif market_cap_yi < 100:
+                pass
+            elif market_cap_yi >= 200:
+                factors.append(f"✓ 大盘股(市值{market_cap_yi:.0f}亿)")
+
+        is_st, _, concepts = name_features(stock_name)
+        if is_st:
+            factors.append(f"⚠️ 特殊处理股票({stock_name}),散户赌重组")
+        if concepts:
+            factors.append(f"🔥 热门概念({','.join(concepts)})")
+
+        is_high_amplitude = False
+        if high > 0 and low > 0 and prev_close > 0:
+            amplitude = ((high - low) / low * 100)
+            is_high_amplitude = amplitude >= 10
+            if amplitude >= 15:
+                factors.append(f"🎢 巨幅波动({amplitude:.2f}%)")
+        if turnover >= 10 and is_high_amplitude:
+            factors.append("🎲 高换手+高振幅,散户追涨杀跌")
+
+        if prev_close > 0:
+            change_percent = ((price - prev_close) / prev_close * 100)
+            if change_percent >= 9.9:
+                factors.append(f"🚀 涨停({change_percent:+.2f}%)")
+            elif change_percent <= -9.9:
+                factors.append(f"💥 跌停({change_percent:+.2f}%),散户抄底")
+            elif change_percent >= 7:
+                factors.append(f"大涨({change_percent:+.2f}%)")
+            elif change_percent <= -7:
+                factors.append(f"大跌({change_percent:+.2f}%),散户抄底")
+
+        if turnover > 0:
+            if turnover >= 20:
+                factors.append(f"📊 超高换手({turnover:.2f}%),散户跟风")
+            elif turnover >= 15:
+                factors.append(f"高换手({turnover:.2f}%)")
+
+        if high > 0 and high > price:
+            pullback_from_high = ((high - price) / high * 100)
+            if pullback_from_high > 5:
+                factors.append(f"⛰️ 冲高回落({pullback_from_high:.2f}%)")
+
+        if price < 10 and market_cap and (market_cap / 100000000) < 50 and turnover >= 10:
+            if not any("散户最爱" in f for f in factors):
+                factors.insert(0, "🎯 散户最爱组合(低价+小盘+高换手)")
+
+        return "、".join(factors)
+
+    # ---------- 输出 ----------
+
+    def select(
+        self,
+        mask: Optional[np.ndarray] = None,
+        order_by: Optional[np.ndarray] = None,
+        descending: bool = True,
+        offset: int = 0,
+        limit: Optional[int] = None
+    ) -> np.ndarray:
+        """
+        按条件过滤、排序、分页，返回行下标
+
+        Args:
+            mask: 布尔过滤条件（None表示全部）
+            order_by: 排序键数组（None保持原顺序）
+            descending: 是否降序
+            offset: 跳过的行数
+            limit: 最多返回行数
+
+        Returns:
+            行下标数组
+        """
+        indices = np.flatnonzero(mask) if mask is not None else np.arange(len(self))
+        if order_by is not None and len(indices):
+            keys = order_by[indices]
+            # 稳定排序：同分时保持原顺序
+            order = np.argsort(-keys if descending else keys, kind="stable")
+            indices = indices[order]
+        end = None if limit is None else offset + limit
+        return indices[offset:end]
+
+    def to_rows(self, indices: Optional[Iterable[int]] = None, with_reasons: bool = True) -> List[Dict[str, Any]]:
+        """
+        把指定行转换为字典（只对这些行生成理由文本）
+
+        Args:
+            indices: 行下标（None表示全部）
+            with_reasons: 是否生成理由文本
+
+        Returns:
+            字典列表
+        """
+        if indices is None:
+            indices = range(len(self))
+        rows = []
+        for i in indices:
+            i = int(i)
+            r = self.snapshot.row(i)
+            row = {
+                'stock_code': self.snapshot.codes[i],
+                'stock_name': self.snapshot.names[i],
+                'current_price': r["price"],
+                'open_price': r["open"],
+                'high_price': r["high"],
+                'low_price': r["low"],
+                'prev_close': r["pattern_base"],
+                'change_percent': round(float(self.pattern_change_percent[i]), 2),
+                'turnover_rate': r["turnover"],
+                'market_cap': r["market_cap"],
+                'amount': r["amount"],
+                'pattern_type': PATTERN_NAMES[self.pattern_code[i]],
+                'pattern_confidence': int(self.pattern_confidence[i]),
+                'is_speculative': bool(self.speculative[i]),
+                'speculative_risk_score': int(self.speculative_score[i]),
+                'is_retail_favorite': bool(self.retail_favorite[i]),
+                'retail_score': int(self.retail_score[i])
+            }
+            if with_reasons:
+                row['pattern_reason'] = self.pattern_reason(i)
+                row['speculative_reason'] = self.speculative_reason(i)
+                row['retail_reason'] = self.retail_reason(i)
+            rows.append(row)
+        return rows
+
+
+def _screen_patterns(s: QuoteSnapshot, change_percent: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """图形类型（与detect_pattern_type规则顺序一致，change_percent相对pattern_base）"""
+    surge_from_open = np.where(s.open > 0, _ratio_pct(s.high - s.open, s.open), 0.0)
+    retrace_from_high = np.where(s.high > 0, _ratio_pct(s.high - s.price, s.high), 0.0)
+
+    conditions = [
+        s.pattern_base == 0,
+        s.price >= s.limit_up * 0.995,
+        change_percent >= 5,
+        (surge_from_open >= 8) & (retrace_from_high >= 3),
+        change_percent <= -2,
+        (change_percent > -2) & (change_percent < 2),
+    ]
+    codes = np.select(conditions, [
+        PATTERN_CODES["开盘跳水"],
+        PATTERN_CODES["强势上涨"],
+        PATTERN_CODES["强势上涨"],
+        PATTERN_CODES["冲板回落"],
+        PATTERN_CODES["开盘跳水"],
+        PATTERN_CODES["震荡整理"],
+    ], default=PATTERN_CODES["其他"]).astype(np.int8)
+    confidence = np.select(conditions, [0, 100, 90, 95, 90, 80], default=50).astype(np.int16)
+    return codes, confidence
+
+
+def _screen_speculative(s: QuoteSnapshot, change_percent: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """游资票风险分（各项规则与speculative_reason逐项对应）"""
+    t, cap = s.turnover, s.market_cap
+    score = np.zeros(len(s), dtype=np.int64)
+    warnings = np.zeros(len(s), dtype=np.int64)
+
+    # 换手率
+    score += np.select([t >= 20, t >= 15, t >= 10, (t > 0) & (t <= 5)], [40, 30, 15, -20], default=0)
+    warnings += t >= 15
+
+    # 振幅
+    has_range = (s.high > 0) & (s.low > 0)
+    amplitude = _ratio_pct(s.high - s.low, s.low)
+    score += np.where(has_range, np.select([amplitude >= 12, amplitude >= 8, amplitude <= 5], [30, 20, -15], default=0), 0)
+    warnings += has_range & (amplitude >= 8)
+
+    # 单日涨幅
+    score += np.select(
+        [change_percent >= 9.9, change_percent >= 7, (change_percent <= 3) & (change_percent >= 0)],
+        [25, 15, -10], default=0
+    )
+    warnings += change_percent >= 9.9
+
+    # 市值
+    cap_yi = cap / 100000000
+    has_cap = cap > 0
+    mid = has_cap & (cap_yi >= 40) & (cap_yi <= 200)
+    small = has_cap & (cap_yi < 40)
+    large = has_cap & ~mid & ~small & (cap_yi >= 100)
+    score += np.where(mid, np.select([t >= 15, t >= 10], [15, 10], default=0), 0)
+    score += np.where(small, np.select([t >= 15, t >= 10], [20, 10], default=0), 0)
+    score += np.where(large & (t != 0) & (t <= 5), -15, 0)
+    warnings += small & (t >= 15)
+
+    # 冲高回落
+    pullback = (s.high > 0) & (s.price > 0) & (_ratio_pct(s.high - s.price, s.high) > 5)
+    score += np.where(pullback, 15, 0)
+    warnings += pullback
+
+    # 开盘强势但回落
+    open_change = _ratio_pct(s.open - s.prev_close, s.prev_close)
+    open_pullback = (
+        (s.open > 0) & (s.price > 0) & (s.open > s.prev_close)
+        & (open_change > change_percent) & (open_change > 3) & (open_change - change_percent > 3)
+    )
+    score += np.where(open_pullback, 10, 0)
+
+    # 成交额/市值
+    score += np.where((cap > 0) & (s.amount != 0) & (_ratio_pct(s.amount, cap) > 40), 10, 0)
+
+    trinity = (t >= 15) & has_range & (amplitude >= 8) & has_cap & (cap_yi <= 200)
+    speculative = trinity | (score > 50) | (warnings >= 2)
+
+    valid = (s.price > 0) & (s.prev_close > 0)
+    return speculative & valid, np.where(valid, np.maximum(score, 0), 0)
+
+
+def _screen_retail(s: QuoteSnapshot, change_percent: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """散户最爱分（各项规则与retail_reason逐项对应）"""
+    p, t, cap = s.price, s.turnover, s.market_cap
+    score = np.zeros(len(s), dtype=np.int64)
+
+    # 价格
+    score += np.select([p < 5, p < 10, p < 20, p >= 50], [30, 20, 10, -15], default=0)
+
+    # 市值
+    cap_yi = cap / 100000000
+    score += np.where(cap > 0, np.select([cap_yi < 30, cap_yi < 50, cap_yi < 100, cap_yi >= 200], [25, 15, 5, -10], default=0), 0)
+
+    # 名称（ST与概念）
+    score += np.where(s.is_st, 40, 0) + s.concept_score
+
+    # 振幅与高换手
+    has_range = (s.high > 0) & (s.low > 0) & (s.prev_close > 0)
+    amplitude = _ratio_pct(s.high - s.low, s.low)
+    score += np.where(has_range & (amplitude >= 15), 15, 0)
+    score += np.where((t >= 10) & has_range & (amplitude >= 10), 20, 0)
+
+    # 涨跌停
+    score += np.where(s.prev_close > 0, np.select(
+        [change_percent >= 9.9, change_percent <= -9.9, change_percent >= 7, change_percent <= -7],
+        [25, 20, 15, 15], default=0
+    ), 0)
+
+    # 换手
+    score += np.select([t >= 20, t >= 15], [20, 15], default=0)
+
+    # 冲高回落
+    score += np.where((s.high > 0) & (s.high > p) & (_ratio_pct(s.high - p, s.high) > 5), 10, 0)
+
+    # 低价+小盘+高换手
+    score += np.where((p < 10) & (cap != 0) & (cap_yi < 50) & (t >= 10), 15, 0)
+
+    valid = (p > 0) & np.fromiter((bool(name) for name in s.names), dtype=bool, count=len(s))
+    return valid & (score > 40), np.where(valid, np.maximum(score, 0), 0)
+
+
+def screen(snapshot: QuoteSnapshot) -> ScreenResult:
+    """
+    对整个快照一次性计算图形类型、游资票和散户最爱判定
+
+    Args:
+        snapshot: 行情快照
+
+    Returns:
+        ScreenResult
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        change_percent = _ratio_pct(snapshot.price - snapshot.prev_close, snapshot.prev_close)
+        if snapshot.pattern_base is snapshot.prev_close:
+            pattern_change_percent = change_percent
+        else:
+            pattern_change_percent = _ratio_pct(snapshot.price - snapshot.pattern_base, snapshot.pattern_base)
+        pattern_code, pattern_confidence = _screen_patterns(snapshot, pattern_change_percent)
+        speculative, speculative_score = _screen_speculative(snapshot, change_percent)
+        retail_favorite, retail_score = _screen_retail(snapshot, change_percent)
+
+    return ScreenResult(
+        snapshot,
+        change_percent=change_percent,
+        pattern_change_percent=pattern_change_percent,
+        pattern_code=pattern_code,
+        pattern_confidence=pattern_confidence,
+        speculative=speculative,
+        speculative_score=speculative_score,
+        retail_favorite=retail_favorite,
+        retail_score=retail_score
+    )
+
+
+def screen_quotes(quotes: Iterable[Dict[str, Any]]) -> ScreenResult:
+    """由实时行情字典列表构建快照并筛选"""
+    return screen(QuoteSnapshot.from_quotes(quotes))
+
+
+def is_speculative_stock(real_data: Dict[str, Any]) -> Tuple[bool, str, int]:
+    """
+    检测单只股票是否为游资炒作的股票（游资票）
+
+    硬指标：换手率≥15%、振幅≥8%、流通值40-200亿为游资票；
+    换手率≤5%、振幅≤5%、大中盘百亿起为机构票。
+
+    Args:
+        real_data: 股票实时数据字典
+
+    Returns:
+        (is_speculative: bool, reason: str, risk_score: int)
+    """
+    if not real_data:
+        return False, "", 0
+    result = screen_quotes([real_data])
+    return bool(result.speculative[0]), result.speculative_reason(0), int(result.speculative_score[0])
+
+
+def is_retail_favorite_stock(real_data: Dict[str, Any]) -> Tuple[bool, str, int]:
+    """
+    检测单只股票是否为散户最爱买的股票
+
+    特征：低价、小盘、ST/*ST、热门概念名称、高换手+高振幅、涨跌停、冲高回落。
+
+    Args:
+        real_data: 股票实时数据字典
+
+    Returns:
+        (is_retail_favorite: bool, reason: str, retail_score: int)
+    """
+    if not real_data:
+        return False, "", 0
+    result = screen_quotes([real_data])
+    return bool(result.retail_favorite[0]), result.retail_reason(0), int(result.retail_score[0])
@@ -0,0 +1,266 @@
+"""
+股票 -> 板块反向索引
+每天从全市场行情接口批量下载一次每只股票的所属行业和概念，存成紧凑数组（后台线程下载）；
+行情中的板块名称、板块涨跌幅按下标O(1)取得，不需要每次分析单独请求
+"""
+
+import threading
+import time
+from datetime import date
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+class SectorMembership:
+    """
+    股票所属板块（列式）
+
+    板块名称去重后编号；每只股票的行业是一个板块编号，概念按CSR方式存放：
+    concept_ids[concept_offsets[i]:concept_offsets[i + 1]] 为第i只股票的概念板块编号。
+    """
+
+    INDUSTRY = 0
+    CONCEPT = 1
+
+    def __init__(
+        self,
+        codes: Sequence[str],
+        industries: Sequence[str],
+        concepts: Sequence[Sequence[str]],
+        trade_date: Optional[date] = None
+    ):
+        """
+        Args:
+            codes: 股票代码
+            industries: 所属行业名称（未知为空串）
+            concepts: 所属概念名称列表
+            trade_date: 所属交易日（默认今天）
+        """
+        self.trade_date = trade_date or date.today()
+        # 分页下载时缺失的页码（非空表示索引不完整）
+        self.missing_pages: List[int] = []
+        self.codes = list(codes)
+        self.stock_index = {code: i for i, code in enumerate(self.codes)}
+        self.sector_names: List[str] = []
+        self.sector_index: Dict[str, int] = {}
+        kinds: List[int] = []
+
+        def sector_id(name: str, kind: int) -> int:
+            i = self.sector_index.get(name)
+            if i is None:
+                i = self.sector_index[name] = len(self.sector_names)
+                self.sector_names.append(name)
+                kinds.append(kind)
+            return i
+
+        self.industry = np.fromiter(
+            (sector_id(name, self.INDUSTRY) if name else -1 for name in industries),
+            dtype=np.int32, count=len(self.codes)
+        )
+        concept_ids: List[int] = []
+        offsets = [0]
+        for names in concepts:
+            concept_ids.extend(sector_id(name, self.CONCEPT) for name in names if name)
+            offsets.append(len(concept_ids))
+        self.concept_ids = np.array(concept_ids, dtype=np.int32)
+        self.concept_offsets = np.array(offsets, dtype=np.int32)
+        self.sector_kind = np.array(kinds, dtype=np.int8)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def industry_of(self, stock_code: str) -> str:
+        """所属行业（未知返回空串）"""
+        i = self.stock_index.get(stock_code)
+        if i is None or self.industry[i] < 0:
+            return ""
+        return self.sector_names[self.industry[i]]
+
+    def concepts_of(self, stock_code: str) -> List[str]:
+        """所属概念"""
+        i = self.stock_index.get(stock_code)
+        if i is None:
+            return []
+        ids = self.concept_ids[self.concept_offsets[i]:self.concept_offsets[i + 1]]
+        return [self.sector_names[j] for j in ids]
+
+    def members(self, sector_name: str) -> List[str]:
+        """
+        板块成分股（正向查询，按需由反向索引计算）
+
+        Args:
+            sector_name: 行业或概念名称
+
+        Returns:
+            股票代码列表
+        """
+        j = self.sector_index.get(sector_name)
+        if j is None:
+            return []
+        if self.sector_kind[j] == self.INDUSTRY:
+            rows = np.flatnonzero(self.industry == j)
+        else:
+            positions = np.flatnonzero(self.concept_ids == j)
+            rows = np.searchsorted(self.concept_offsets, positions, side="right") - 1
+        return [self.codes[i] for i in rows]
+
+
+class SectorIndex:
+    """
+    板块字段注入
+
+    组合每日的SectorMembership和实时板块快照（SectorScanner.get_sector_snapshot），
+    为行情补上板块名称、板块涨跌幅和概念。两者都由后台线程下载（start启动：先预热，
+    之后每个交易日更新一次板块成分、每sector_interval秒更新一次板块快照，失败时retry_interval秒后重试）；
+    annotate等查询只读内存，不在行情请求中访问数据源，尚未下载完成时板块字段保持原样。
+    """
+
+    def __init__(
+        self,
+        membership_provider: Callable[[], Optional[SectorMembership]],
+        sector_provider: Optional[Callable[[], Any]] = None,
+        retry_interval: float = 60,
+        sector_interval: float = 30
+    ):
+        """
+        Args:
+            membership_provider: 返回当日SectorMembership的函数（如MarketSnapshotCollector.get_membership）
+            sector_provider: 返回实时板块快照的函数，为None时板块涨跌幅不注入
+            retry_interval: 数据源失败后的重试间隔（秒）
+            sector_interval: 板块快照的更新间隔（秒）
+        """
+        self.membership_provider = membership_provider
+        self.sector_provider = sector_provider
+        self.retry_interval = retry_interval
+        self.sector_interval = sector_interval
+        self._membership: Optional[SectorMembership] = None
+        self._sectors = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def _call(name: str, provider: Callable[[], Any]):
+        """调用数据源，失败返回None"""
+        try:
+            return provider()
+        except Exception as e:
+            print(f"⚠️  获取{name}失败: {e}")
+            return None
+
+    def refresh_membership(self) -> bool:
+        """
+        下载板块成分（结果为空时保留上一次的索引）
+
+        Returns:
+            是否拿到完整的当日索引
+        """
+        membership = self._call("板块成分", self.membership_provider)
+        if not membership:
+            return False
+        self._membership = membership
+        return not membership.missing_pages
+
+    def refresh_sectors(self) -> bool:
+        """
+        更新板块快照（结果为空时保留上一次的快照）
+
+        Returns:
+            是否更新成功
+        """
+        if self.sector_provider is None:
+            return False
+        snapshot = self._call("板块快照", self.sector_provider)
+        if not snapshot:
+            return False
+        self._sectors = snapshot
+        return True
+
+    @property
+    def membership_stale(self) -> bool:
+        """板块成分是否需要（重新）下载：尚未下载、不是当天的或有分页缺失"""
+        membership = self._membership
+        return membership is None or membership.trade_date != date.today() or bool(membership.missing_pages)
+
+    def _run(self):
+        """后台更新线程"""
+        next_membership = next_sectors = 0.0
+        while not self._stop.is_set():
+            now = time.time()
+            if self.membership_stale and now >= next_membership:
+                if not self.refresh_membership():
+                    next_membership = now + self.retry_interval
+            if self.sector_provider is not None and now >= next_sectors:
+                ok = self.refresh_sectors()
+                next_sectors = now + (self.sector_interval if ok else self.retry_interval)
+            # 至少每分钟检查一次交易日是否变化
+            deadline = min(next_sectors if self.sector_provider is not None else now + 60, now + 60)
+            if self.membership_stale:
+                deadline = min(deadline, next_membership)
+            self._stop.wait(max(0.1, deadline - time.time()))
+
+    def start(self) -> "SectorIndex":
+        """在后台线程中预热并定期更新"""
+        if self._thread is not None and self._thread.is_alive():
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sector-index", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None):
+        """停止后台更新"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def sector_data(self, sector_name: str) -> Dict[str, Any]:
+        """
+        板块实时数据（DataCollector.get_sector_data的格式）
+
+        Args:
+            sector_name: 板块名称
+
+        Returns:
+            {"涨跌幅": 涨跌幅}，未知板块为0
+        """
+        snapshot = self._sectors
+        sector = snapshot.get_by_name(sector_name) if snapshot is not None and sector_name else None
+        return {"涨跌幅": sector["change_percent"] if sector else 0}
+
+    def fields(self, stock_code: str) -> Dict[str, Any]:
+        """
+        某只股票的板块字段
+
+        Args:
+            stock_code: 股票代码
+
+        Returns:
+            板块名称（所属行业）、板块涨跌幅、概念板块；不在索引中（或尚未下载）返回空字典
+        """
+        membership = self._membership
+        if membership is None:
+            return {}
+        industry = membership.industry_of(stock_code)
+        if not industry:
+            return {}
+        return {
+            "板块名称": industry,
+            "板块涨跌幅": self.sector_data(industry)["涨跌幅"],
+            "概念板块": membership.concepts_of(stock_code),
+        }
+
+    def annotate(self, quote: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        给行情补上板块字段（原地修改，只读内存）
+
+        Args:
+            quote: 实时行情（含股票代码）
+
+        Returns:
+            同一个行情字典
+        """
+        if quote:
+            quote.update(self.fields(quote.get("股票代码", "")))
+        return quote
@@ -4,28 +4,203 @@
 获取热门板块及成分股，用于批量筛选图形形态
 """
 
-import requests
-from typing import List, Dict, Optional
+import threading
+import time
+from typing import List, Dict, Optional, Sequence
 from datetime import datetime
 
+import numpy as np
+
+from .eastmoney import CLIST_URL, ClistPager, em_number
+
+
+# 可排序字段 -> SectorSnapshot数组属性
+SECTOR_SORT_FIELDS = {
+    "amount": "amount",
+    "change_percent": "change_percent",
+    "price": "price",
+}
+
+
+class SectorSnapshot:
+    """
+    全部板块的行情快照（列式）
+
+    一次拉取全部板块，热门前N、按其他字段排序、按代码/名称查询都在内存中完成。
+    """
+
+    def __init__(
+        self,
+        codes: Sequence[str],
+        names: Sequence[str],
+        price: np.ndarray,
+        change_percent: np.ndarray,
+        amount: np.ndarray,
+        timestamp: Optional[float] = None
+    ):
+        """
+        Args:
+            codes: 板块代码
+            names: 板块名称
+            price: 板块指数最新价
+            change_percent: 涨跌幅（%）
+            amount: 成交额（元）
+            timestamp: 快照时间戳（默认为当前时间）
+        """
+        self.codes = list(codes)
+        self.names = list(names)
+        self.price = np.asarray(price, dtype=np.float64)
+        self.change_percent = np.asarray(change_percent, dtype=np.float64)
+        self.amount = np.asarray(amount, dtype=np.float64)
+        self.timestamp = time.time() if timestamp is None else timestamp
+        # 分页拉取时缺失的页码（非空表示快照不完整）
+        self.missing_pages: List[int] = []
+        self.index = {code: i for i, code in enumerate(self.codes)}
+        self.name_index = {name: i for i, name in enumerate(self.names)}
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    @property
+    def age(self) -> float:
+        """快照已存在的秒数"""
+        return time.time() - self.timestamp
+
+    def row(self, i: int) -> Dict:
+        """第i个板块（字段与get_hot_sectors一致）"""
+        return {
+            'sector_code': self.codes[i],
+            'sector_name': self.names[i],
+            'change_percent': round(float(self.change_percent[i]), 2),
+            'amount': float(self.amount[i])
+        }
+
+    def top(self, n: int, sort_by: str = "amount", ascending: bool = False) -> List[Dict]:
+        """
+        按字段排序取前N个板块
+
+        Args:
+            n: 数量
+            sort_by: SECTOR_SORT_FIELDS中的字段
+            ascending: 是否升序
+
+        Returns:
+            板块列表
+        """
+        if sort_by not in SECTOR_SORT_FIELDS:
+            raise ValueError(f"不支持的排序字段: {sort_by}")
+        key = getattr(self, SECTOR_SORT_FIELDS[sort_by])
+        n = max(0, min(int(n), len(self)))
+        if n == 0:
+            return []
+        # 只对前N个做部分排序
+        key = key if ascending else -key
+        part = np.argpartition(key, n - 1)[:n] if n < len(self) else np.arange(len(self))
+        order = part[np.argsort(key[part], kind="stable")]
+        return [self.row(int(i)) for i in order]
+
+    def get(self, sector_code: str) -> Optional[Dict]:
+        """按板块代码查询"""
+        i = self.index.get(sector_code)
+        return self.row(i) if i is not None else None
+
+    def get_by_name(self, sector_name: str) -> Optional[Dict]:
+        """按板块名称查询"""
+        i = self.name_index.get(sector_name)
+        return self.row(i) if i is not None else None
+
 
 class SectorScanner:
     """板块扫描器"""
 
-    def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
-        })
+    def __init__(self, max_age: float = 30, page_size: int = 100, max_workers: int = 4, retries: int = 1):
+        """
+        Args:
+            max_age: 板块快照复用时间（秒）
+            page_size: 每页板块数（接口单页上限为100）
+            max_workers: 分页并发请求数
+            retries: 单页失败后的重试次数
+        """
+        self.max_age = max_age
+        # 板块，字段为代码,名称,最新价,涨跌幅,成交额
+        self.pager = ClistPager(
+            "eastmoney_sector", "m:90+t:2", "f12,f14,f2,f3,f6",
+            page_size=page_size, max_workers=max_workers, retries=retries, label="板块行情"
+        )
+        self.session = self.pager.session
+        self._snapshot: Optional[SectorSnapshot] = None
+        self._lock = threading.Lock()
+
+    def fetch_sector_snapshot(self) -> SectorSnapshot:
+        """
+        拉取全部板块的行情（不使用缓存）
 
-    def get_hot_sectors(self, top_n: int = 5) -> List[Dict]:
+        Returns:
+            SectorSnapshot（有分页缺失时missing_pages非空）
+        """
+        start = time.perf_counter()
+        items, pages, missing = self.pager.fetch_all()
+
+        count = len(items)
+        snapshot = SectorSnapshot(
+            [str(item.get('f12', '')) for item in items],
+            [item.get('f14', '') or '' for item in items],
+            price=np.fromiter((em_number(item.get('f2')) for item in items), dtype=np.float64, count=count),
+            change_percent=np.fromiter((em_number(item.get('f3')) for item in items), dtype=np.float64, count=count),
+            amount=np.fromiter((em_number(item.get('f6')) for item in items), dtype=np.float64, count=count)
+        )
+        snapshot.missing_pages = missing
+        partial = f"，缺失第{','.join(map(str, missing))}页" if missing else ""
+        print(f"📡 板块快照: {count}个板块（{pages}页{partial}），耗时{time.perf_counter() - start:.2f}秒")
+        return snapshot
+
+    def get_sector_snapshot(self, max_age: Optional[float] = None) -> SectorSnapshot:
+        """
+        获取全部板块的快照（max_age秒内复用上一次结果，并发请求共用同一次拉取）
+
+        Args:
+            max_age: 快照最长复用时间（秒），默认使用初始化时的max_age
+
+        Returns:
+            SectorSnapshot
+        """
+        max_age = self.max_age if max_age is None else max_age
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is not None and snapshot.age <= max_age:
+                return snapshot
+            snapshot = self.fetch_sector_snapshot()
+            # 拉取失败（空结果）不缓存；部分结果照常返回，但不复用，下次重新拉取
+            if len(snapshot) and not snapshot.missing_pages:
+                self._snapshot = snapshot
+            return snapshot
+
+    def get_sector(self, sector_code: str) -> Optional[Dict]:
+        """
+        按板块代码查询板块行情（来自板块快照）
+
+        Args:
+            sector_code: 板块代码
+
+        Returns:
+            板块信息，不存在返回None
+        """
+        try:
+            return self.get_sector_snapshot().get(sector_code)
+        except Exception as e:
+            print(f"获取板块 {sector_code} 失败: {e}")
+            return None
+
+    def get_hot_sectors(self, top_n: int = 5, sort_by: str = "amount") -> List[Dict]:
         """
         获取热门板块列表（按热度排序）
 
-        热度定义：按成交额排序，成交额越大代表市场关注度越高
+        热度定义：按成交额排序，成交额越大代表市场关注度越高；
+        结果取自板块快照，不同的top_n/sort_by不会重复请求
 
         Args:
             top_n: 获取前N个热门板块
+            sort_by: 排序字段（amount/change_percent/price，默认成交额）
 
         Returns:
             [
@@ -38,42 +213,18 @@ class SectorScanner:
                 ...
             ]
         """
-        try:
-            # 使用东方财富的板块数据接口
-            url = "http://push2.eastmoney.com/api/qt/clist/get"
-            params = {
-                'pn': '1',
-                'pz': top_n,
-                'po': '1',
-                'np': '1',
-                'fltt': '2',
-                'invt': '2',
-                'fid': 'f6',  # 按成交额排序（热度）
-                'fs': 'm:90+t:2',  # 板块
-                'fields': 'f12,f14,f2,f3,f6',  # 代码,名称,最新价,涨跌幅,成交额
-                '_': str(int(datetime.now().timestamp() * 1000))
-            }
-
-            response = self.session.get(url, params=params, timeout=5)
-            data = response.json()
-
-            if data.get('rc') == 0 and 'data' in data:
-                sectors = []
-                for item in data['data']['diff']:
-                    sectors.append({
-                        'sector_code': item.get('f12', ''),
-                        'sector_name': item.get('f14', ''),
-                        'change_percent': round(item.get('f3', 0), 2),
-                        'amount': item.get('f6', 0)  # 成交额
-                    })
-                return sectors
-
-            return []
+        if sort_by not in SECTOR_SORT_FIELDS:
+            raise ValueError(f"不支持的排序字段: {sort_by}")
 
+        try:
+            snapshot = self.get_sector_snapshot()
         except Exception as e:
             print(f"获取热门板块失败: {e}")
-            # 返回默认热门板块列表
-            return self._get_default_sectors()
+            snapshot = None
+        if snapshot is None or not len(snapshot):
+            # 第一页失败或没有任何板块时返回默认热门板块列表
+            return self._get_default_sectors()[:top_n]
+        return snapshot.top(top_n, sort_by=sort_by)
 
     def _get_default_sectors(self) -> List[Dict]:
         """获取默认热门板块列表（备用）"""
@@ -107,7 +258,7 @@ class SectorScanner:
         """
         try:
             # 使用东方财富的板块成分股接口
-            url = "http://push2.eastmoney.com/api/qt/clist/get"
+            url = CLIST_URL
             params = {
                 'pn': '1',
                 'pz': top_n * 3,  # 多取一些，因为后面会过滤
@@ -3,9 +3,9 @@
 接入新浪财经、东方财富等免费API获取实时行情
 """
 
-import requests
 from typing import Dict, Any
 from src.monitors.data_collector import DataCollector
+from src.utils.metrics import InstrumentedSession
 
 
 class SinaFinanceCollector(DataCollector):
@@ -21,7 +21,7 @@ class SinaFinanceCollector(DataCollector):
         """初始化新浪财经数据采集器"""
         # 新浪API不需要密钥
         self.base_url = "http://hq.sinajs.cn"
-        self.session = requests.Session()
+        self.session = InstrumentedSession("sina")
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': '*/*',
@@ -12,6 +12,7 @@ from ..templates.prompt_templates import PromptTemplateManager, ChartType, Templ
 from ..models.stock_data import StockMarketData, AIGCResponse, MonitorTrigger
 from ..aigc.model_adapter import AIGCService, ModelProvider
 from .data_collector import StockDataAggregator
+from .rule_spec import AllOf, CompiledRules, Field, RuleSpec
 
 
 class PatternType(Enum):
@@ -50,6 +51,56 @@ class PatternRule:
         self.description = description
 
 
+# 三类图形的识别规则（同一图形内按顺序判断，命中第一条即触发）
+PATTERN_RULE_SPECS: Dict[PatternType, List[RuleSpec]] = {
+    PatternType.OPENING_DIVE: [
+        RuleSpec(
+            "开盘5分钟跳水",
+            AllOf(("开盘分钟数", "<=", 5), ("开盘跌幅", ">=", 3)),
+            "开盘5分钟内跌幅超过3%"
+        ),
+        RuleSpec(
+            "开盘10分钟跳水",
+            AllOf(("开盘分钟数", "<=", 10), ("开盘跌幅", ">=", 2)),
+            "开盘10分钟内跌幅超过2%"
+        ),
+    ],
+    PatternType.BREAKDOWN_FALL: [
+        RuleSpec(
+            "跌破5日均线",
+            AllOf(("实时价", "<", Field("5日均线")), ("成交额放大比例", ">", 20)),
+            "跌破5日均线且放量"
+        ),
+        RuleSpec(
+            "跌破20日均线",
+            AllOf(("实时价", "<", Field("20日均线")), ("成交额放大比例", ">", 20)),
+            "跌破20日均线且放量"
+        ),
+        RuleSpec(
+            "跌破平台支撑位",
+            AllOf(
+                ("实时价", "<", Field("前期平台支撑位")),
+                ("破位后未回弹分钟数", ">=", 3),
+                ("成交额放大比例", ">", 15)
+            ),
+            "跌破前期平台支撑位且3分钟未回弹"
+        ),
+    ],
+    PatternType.SURGE_RETRACE: [
+        RuleSpec(
+            "冲板回落超5%",
+            AllOf(("冲高幅度", ">=", 9.9), ("高点回落幅度", ">=", 5)),
+            "冲至涨停板后回落超过5%"
+        ),
+        RuleSpec(
+            "冲高回落超3%",
+            AllOf(("冲高幅度", ">=", 8), ("高点回落幅度", ">=", 3)),
+            "冲高超8%后回落超过3%"
+        ),
+    ],
+}
+
+
 class StockPatternMonitor:
     """
     股票图形监控器
@@ -60,7 +111,9 @@ class StockPatternMonitor:
         data_aggregator: StockDataAggregator,
         aigc_service: AIGCService,
         trading_style: TradingStyle = TradingStyle.SHORT,
-        template_type: TemplateType = TemplateType.FULL
+        template_type: TemplateType = TemplateType.FULL,
+        history_store=None,
+        event_bus=None
     ):
         """
         初始化监控器
@@ -70,122 +123,55 @@ class StockPatternMonitor:
             aigc_service: AIGC服务
             trading_style: 交易风格
             template_type: 模板类型
+            history_store: 可选的HistoryStore，触发事件会被持久化
+            event_bus: 可选的EventBus，触发事件会被发布给订阅者
         """
         self.data_aggregator = data_aggregator
         self.aigc_service = aigc_service
         self.trading_style = trading_style
         self.template_type = template_type
+        self.history_store = history_store
+        self.event_bus = event_bus
 
         # 初始化识别规则
         self._init_rules()
 
     def _init_rules(self):
-        """初始化图形识别规则"""
-
-        # 开盘跳水规则
-        self.opening_dive_rules = [
-            PatternRule(
-                name="开盘5分钟跳水",
-                condition=lambda data: self._check_opening_dive(data, minutes=5, drop_percent=3),
-                description="开盘5分钟内跌幅超过3%"
-            ),
-            PatternRule(
-                name="开盘10分钟跳水",
-                condition=lambda data: self._check_opening_dive(data, minutes=10, drop_percent=2),
-                description="开盘10分钟内跌幅超过2%"
-            )
-        ]
-
-        # 破位下跌规则
-        self.breakdown_rules = [
-            PatternRule(
-                name="跌破5日均线",
-                condition=lambda data: self._check_breakdown(data, ma_type=5),
-                description="跌破5日均线且放量"
-            ),
-            PatternRule(
-                name="跌破20日均线",
-                condition=lambda data: self._check_breakdown(data, ma_type=20),
-                description="跌破20日均线且放量"
-            ),
-            PatternRule(
-                name="跌破平台支撑位",
-                condition=lambda data: self._check_support_breakdown(data),
-                description="跌破前期平台支撑位且3分钟未回弹"
-            )
-        ]
-
-        # 冲板回落规则
-        self.surge_retrace_rules = [
-            PatternRule(
-                name="冲板回落超5%",
-                condition=lambda data: self._check_surge_retrace(data, retrace_percent=5),
-                description="冲至涨停板后回落超过5%"
-            ),
-            PatternRule(
-                name="冲高回落超3%",
-                condition=lambda data: self._check_surge_retrace(data, surge_percent=8, retrace_percent=3),
-                description="冲高超8%后回落超过3%"
-            )
-        ]
-
-    def _check_opening_dive(self, data: Dict[str, Any], minutes: int, drop_percent: float) -> bool:
-        """检查开盘跳水"""
-        current_price = data.get("实时价") or 0
-        open_price = data.get("开盘价") or 0
-        open_minutes = data.get("开盘分钟数") or 0
-
-        if open_price == 0 or current_price == 0:
-            return False
-
-        drop_ratio = round((open_price - current_price) / open_price * 100, 2)  # 四舍五入到2位小数
-        return open_minutes <= minutes and drop_ratio >= drop_percent
-
-    def _check_breakdown(self, data: Dict[str, Any], ma_type: int) -> bool:
-        """检查破位下跌"""
-        current_price = data.get("实时价") or 0
-        ma_price = data.get(f"{ma_type}日均线") or 0
-        volume_increase = data.get("成交额放大比例") or 0
-
-        return (
-            current_price < ma_price and
-            volume_increase > 20  # 成交额放大超过20%
-        )
+        """初始化图形识别规则（由PATTERN_RULE_SPECS编译，同一图形的规则共享派生列）"""
+        self.rule_sets = {
+            pattern_type: CompiledRules(specs)
+            for pattern_type, specs in PATTERN_RULE_SPECS.items()
+        }
+
+        def as_rules(pattern_type: PatternType) -> List[PatternRule]:
+            return [
+                PatternRule(name=spec.name, condition=spec.matches, description=spec.description)
+                for spec in PATTERN_RULE_SPECS[pattern_type]
+            ]
+
+        self.opening_dive_rules = as_rules(PatternType.OPENING_DIVE)
+        self.breakdown_rules = as_rules(PatternType.BREAKDOWN_FALL)
+        self.surge_retrace_rules = as_rules(PatternType.SURGE_RETRACE)
+
+    def match_rules(
+        self,
+        records: List[Dict[str, Any]],
+        pattern_type: PatternType
+    ) -> List[Optional[RuleSpec]]:
+        """
+        对多条市场数据一次性评估某类图形的规则
 
-    def _check_support_breakdown(self, data: Dict[str, Any]) -> bool:
-        """检查支撑位破位"""
-        current_price = data.get("实时价") or 0
-        support_price = data.get("前期平台支撑位") or 0
-        minutes_no_rebound = data.get("破位后未回弹分钟数") or 0
-        volume_increase = data.get("成交额放大比例") or 0
-
-        return (
-            current_price < support_price and
-            minutes_no_rebound >= 3 and
-            volume_increase > 15
-        )
+        Args:
+            records: 市场数据列表（collect_monitoring_data的返回值）
+            pattern_type: 图形类型
 
-    def _check_surge_retrace(
-        self,
-        data: Dict[str, Any],
-        surge_percent: float = 9.9,
-        retrace_percent: float = 5
-    ) -> bool:
-        """检查冲板回落"""
-        current_price = data.get("实时价") or 0
-        high_price = data.get("最高价") or 0
-        open_price = data.get("开盘价") or 0
-        limit_up_price = data.get("涨停价") or 0
-
-        if open_price == 0 or high_price == 0:
-            return False
-
-        # 计算涨幅
-        surge = round((high_price - open_price) / open_price * 100, 2)  # 四舍五入到2位小数
-        # 计算回落幅度
-        retrace = round((high_price - current_price) / high_price * 100, 2)  # 四舍五入到2位小数
-
-        return surge >= surge_percent and retrace >= retrace_percent
+        Returns:
+            每条数据第一条触发的规则，未触发为None
+        """
+        rule_set = self.rule_sets.get(pattern_type)
+        if rule_set is None:
+            return [None] * len(records)
+        return rule_set.match_records(records)
 
     def detect_pattern(
         self,
@@ -213,21 +199,11 @@ class StockPatternMonitor:
             **kwargs
         )
 
-        # 根据图形类型选择规则
-        if pattern_type == PatternType.OPENING_DIVE:
-            rules = self.opening_dive_rules
-        elif pattern_type == PatternType.BREAKDOWN_FALL:
-            rules = self.breakdown_rules
-        elif pattern_type == PatternType.SURGE_RETRACE:
-            rules = self.surge_retrace_rules
-        else:
-            return None
-
         # 检查是否满足任一规则
-        for rule in rules:
-            if rule.condition(market_data):
-                print(f"✓ 触发规则: {rule.name} - {rule.description}")
-                return market_data
+        rule = self.match_rules([market_data], pattern_type)[0]
+        if rule is not None:
+            print(f"✓ 触发规则: {rule.name} - {rule.description}")
+            return market_data
 
         return None
 
@@ -256,13 +232,7 @@ class StockPatternMonitor:
             return None
 
         # 2. 生成Prompt
-        prompt = PromptTemplateManager.get_template(
-            chart_type=ChartType(pattern_type.value),
-            stock_data=market_data,
-            trading_style=self.trading_style.value,
-            position_status=position_status,
-            template_type=self.template_type
-        )
+        prompt = self.build_prompt(market_data, pattern_type, position_status)
 
         print(f"\n{'='*60}")
         print(f"检测到 {pattern_type.value}: {market_data['股票代码']} {market_data['股票名称']}")
@@ -275,16 +245,12 @@ class StockPatternMonitor:
             print(f"AIGC分析结果:\n{aigc_response}\n")
 
             # 4. 创建触发事件
-            trigger_event = MonitorTrigger(
-                事件ID=f"evt_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{stock_code}",
-                股票代码=stock_code,
-                股票名称=market_data["股票名称"],
-                图形类型=pattern_type.value,
-                触发时间=datetime.now(),
-                市场数据=StockMarketData(**market_data),
-                已处理=True,
-                AIGC分析结果=AIGCResponse(原始回复=aigc_response)
-            )
+            trigger_event = self.build_trigger(market_data, pattern_type, aigc_response)
+
+            if self.history_store is not None:
+                self.history_store.record_trigger(trigger_event)
+            if self.event_bus is not None:
+                self.event_bus.publish_trigger(trigger_event)
 
             return trigger_event
 
@@ -292,32 +258,132 @@ class StockPatternMonitor:
             print(f"❌ AIGC分析失败: {str(e)}")
             return None
 
+    def build_prompt(
+        self,
+        market_data: Dict[str, Any],
+        pattern_type: PatternType,
+        position_status: str = "已持仓"
+    ) -> str:
+        """
+        按监控器的交易风格和模板类型生成Prompt
+
+        Args:
+            market_data: 市场数据（collect_monitoring_data的返回值）
+            pattern_type: 图形类型
+            position_status: 持仓状态
+
+        Returns:
+            Prompt文本
+        """
+        return PromptTemplateManager.get_template(
+            chart_type=ChartType(pattern_type.value),
+            stock_data=market_data,
+            trading_style=self.trading_style.value,
+            position_status=position_status,
+            template_type=self.template_type
+        )
+
+    @staticmethod
+    def build_trigger(
+        market_data: Dict[str, Any],
+        pattern_type: PatternType,
+        aigc_response: Optional[str] = None,
+        event_id: Optional[str] = None
+    ) -> MonitorTrigger:
+        """
+        由市场数据创建触发事件
+
+        Args:
+            market_data: 市场数据
+            pattern_type: 图形类型
+            aigc_response: AIGC分析结果（None表示未分析，事件标记为未处理）
+            event_id: 事件ID，默认 evt_时间_股票代码
+
+        Returns:
+            MonitorTrigger
+        """
+        stock_code = market_data["股票代码"]
+        return MonitorTrigger(
+            事件ID=event_id or f"evt_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{stock_code}",
+            股票代码=stock_code,
+            股票名称=market_data["股票名称"],
+            图形类型=pattern_type.value,
+            触发时间=datetime.now(),
+            市场数据=StockMarketData(**market_data),
+            已处理=aigc_response is not None,
+            AIGC分析结果=AIGCResponse(原始回复=aigc_response) if aigc_response is not None else None
+        )
+
     def batch_detect(
         self,
         stock_codes: List[str],
-        pattern_types: List[PatternType]
+        pattern_types: List[PatternType],
+        **kwargs
     ) -> List[Dict[str, Any]]:
         """
         批量检测多个股票的多种图形
 
+        所有股票的数据只采集一次（行情批量获取，板块和大盘取自共享的市场环境），
+        每种图形的规则对全部股票一次性评估。
+
         Args:
             stock_codes: 股票代码列表
             pattern_types: 图形类型列表
+            **kwargs: 额外参数（对所有股票生效）
 
         Returns:
-            触发的事件列表
+            触发的事件列表（按股票、图形类型的输入顺序）
         """
-        detected = []
+        trigger_time = kwargs.pop("trigger_time", datetime.now().strftime("%H:%M"))
+        collected = self.data_aggregator.collect_batch_monitoring_data(
+            stock_codes=stock_codes,
+            chart_types=[pattern_type.value for pattern_type in pattern_types],
+            trigger_time=trigger_time,
+            **kwargs
+        )
+        return self.detect_collected(collected, stock_codes, pattern_types)
+
+    def detect_collected(
+        self,
+        collected: Dict[str, Dict[str, Dict[str, Any]]],
+        stock_codes: List[str],
+        pattern_types: List[PatternType],
+        verbose: bool = True
+    ) -> List[Dict[str, Any]]:
+        """
+        对已采集的批量数据评估规则
 
-        for stock_code in stock_codes:
+        Args:
+            collected: collect_batch_monitoring_data的返回值
+            stock_codes: 股票代码列表（决定输出顺序）
+            pattern_types: 图形类型列表
+            verbose: 是否逐条打印触发的规则
+
+        Returns:
+            触发的事件列表（按股票、图形类型的输入顺序）
+        """
+        codes = [code for code in stock_codes if code in collected]
+
+        # 每种图形对全部股票一次性评估
+        matches = {
+            pattern_type: self.match_rules([collected[code][pattern_type.value] for code in codes], pattern_type)
+            for pattern_type in pattern_types
+        }
+
+        detected = []
+        for i, stock_code in enumerate(codes):
             for pattern_type in pattern_types:
-                result = self.detect_pattern(stock_code, pattern_type)
-                if result:
-                    detected.append({
-                        "股票代码": stock_code,
-                        "图形类型": pattern_type.value,
-                        "市场数据": result
-                    })
+                rule = matches[pattern_type][i]
+                if rule is None:
+                    continue
+                if verbose:
+                    print(f"✓ {stock_code} 触发规则: {rule.name} - {rule.description}")
+                detected.append({
+                    "股票代码": stock_code,
+                    "图形类型": pattern_type.value,
+                    "触发规则": rule.name,
+                    "市场数据": collected[stock_code][pattern_type.value]
+                })
 
         return detected
 
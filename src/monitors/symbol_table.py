@@ -0,0 +1,249 @@
+"""
+每日静态股票属性表
+板块（沪深主板/创业板/科创板/北交所）、涨跌幅限制、ST、概念关键词、流通股本、市值分档
+在一个交易日内不变，每天构建一次，按股票下标存成数组，行情快照直接按下标取用
+"""
+
+import math
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .screener import name_features
+
+
+# 板块代码（BOARD_NAMES的下标）
+BOARD_NAMES = ("沪主板", "深主板", "创业板", "科创板", "北交所", "其他")
+BOARD_CODES = {name: code for code, name in enumerate(BOARD_NAMES)}
+
+# 各板块的涨跌幅限制；主板ST为5%，创业板/科创板ST仍为20%
+BOARD_LIMIT_RATIOS = {"沪主板": 0.10, "深主板": 0.10, "创业板": 0.20, "科创板": 0.20, "北交所": 0.30, "其他": 0.10}
+ST_LIMIT_RATIO = 0.05
+
+# 流通市值分档（上限，单位：亿元）；分档代码为CAP_BUCKET_NAMES的下标
+CAP_BUCKETS = (("微盘", 30), ("小盘", 100), ("中盘", 500), ("大盘", math.inf))
+CAP_BUCKET_NAMES = tuple(name for name, _ in CAP_BUCKETS) + ("未知",)
+CAP_BUCKET_CODES = {name: code for code, name in enumerate(CAP_BUCKET_NAMES)}
+
+
+def board_of(stock_code: str) -> str:
+    """
+    由代码判断所属板块
+
+    Args:
+        stock_code: 6位股票代码
+
+    Returns:
+        BOARD_NAMES中的板块名（港股、美股、基金等返回"其他"）
+    """
+    if len(stock_code) != 6 or not stock_code.isdigit():
+        return "其他"
+    if stock_code.startswith(("688", "689")):
+        return "科创板"
+    if stock_code.startswith(("600", "601", "603", "605")):
+        return "沪主板"
+    if stock_code.startswith(("300", "301")):
+        return "创业板"
+    if stock_code.startswith(("000", "001", "002", "003")):
+        return "深主板"
+    if stock_code.startswith(("4", "8", "92")):
+        return "北交所"
+    return "其他"
+
+
+def limit_ratio(stock_code: str, stock_name: str = "") -> float:
+    """
+    涨跌幅限制比例
+
+    Args:
+        stock_code: 股票代码
+        stock_name: 股票名称（用于判断ST）
+
+    Returns:
+        如0.1、0.2、0.3、0.05（非A股沿用0.1）
+    """
+    board = board_of(stock_code)
+    is_st = name_features(stock_name or "")[0]
+    if is_st and board in ("沪主板", "深主板"):
+        return ST_LIMIT_RATIO
+    return BOARD_LIMIT_RATIOS[board]
+
+
+def limit_price(prev_close, ratio, up: bool = True):
+    """
+    涨停价/跌停价：昨收×(1±比例)，四舍五入到分（标量或数组均可）
+
+    Args:
+        prev_close: 昨收
+        ratio: 涨跌幅限制比例
+        up: True为涨停价，False为跌停价
+
+    Returns:
+        与输入同形的价格，昨收无效时为0
+    """
+    prev_close = np.asarray(prev_close, dtype=np.float64)
+    ratio = np.asarray(ratio, dtype=np.float64)
+    raw = prev_close * (1 + ratio if up else 1 - ratio)
+    # 先加一个极小量再截断，避免 10.05×1.1=11.054999… 这类浮点误差少一分
+    price = np.where(prev_close > 0, np.floor(raw * 100 + 0.5 + 1e-6) / 100, 0.0)
+    return float(price) if price.ndim == 0 else price
+
+
+def cap_bucket(float_market_cap: float) -> str:
+    """
+    流通市值分档
+
+    Args:
+        float_market_cap: 流通市值（元）
+
+    Returns:
+        微盘/小盘/中盘/大盘（市值未知返回"未知"）
+    """
+    if not float_market_cap or float_market_cap <= 0:
+        return "未知"
+    cap_yi = float_market_cap / 100000000
+    return next(name for name, upper in CAP_BUCKETS if cap_yi < upper)
+
+
+class SymbolTable:
+    """
+    静态股票属性表（列式）
+
+    每个属性一个数组，下标即股票的symbol id；index把代码映射到下标。
+    """
+
+    def __init__(
+        self,
+        codes: Sequence[str],
+        names: Sequence[str],
+        float_shares: Optional[Sequence[float]] = None,
+        float_market_cap: Optional[Sequence[float]] = None,
+        trade_date: Optional[date] = None
+    ):
+        """
+        Args:
+            codes: 股票代码
+            names: 股票名称
+            float_shares: 流通股本（股）
+            float_market_cap: 流通市值（元），用于市值分档
+            trade_date: 所属交易日（默认今天）
+        """
+        self.trade_date = trade_date or date.today()
+        self.codes: List[str] = []
+        self.names: List[str] = []
+        self.index: Dict[str, int] = {}
+        self.board = np.zeros(0, dtype=np.int8)
+        self.limit_ratio = np.zeros(0)
+        self.is_st = np.zeros(0, dtype=bool)
+        self.concept_score = np.zeros(0, dtype=np.int64)
+        self.concepts: List[Tuple[str, ...]] = []
+        self.float_shares = np.zeros(0)
+        self.cap_bucket = np.zeros(0, dtype=np.int8)
+        self.extend(codes, names, float_shares, float_market_cap)
+
+    def extend(
+        self,
+        codes: Sequence[str],
+        names: Sequence[str],
+        float_shares: Optional[Sequence[float]] = None,
+        float_market_cap: Optional[Sequence[float]] = None
+    ) -> int:
+        """
+        追加表中还没有的股票（如盘中新上市），已有的跳过
+
+        Returns:
+            新增的股票数
+        """
+        size = len(codes)
+        float_shares = float_shares if float_shares is not None else [0.0] * size
+        float_market_cap = float_market_cap if float_market_cap is not None else [0.0] * size
+        rows = [i for i, code in enumerate(codes) if code not in self.index]
+        if not rows:
+            return 0
+
+        boards, ratios, st_flags, scores, buckets = [], [], [], [], []
+        for i in rows:
+            code, name = codes[i], names[i] or ""
+            is_st, score, concepts = name_features(name)
+            self.index[code] = len(self.codes)
+            self.codes.append(code)
+            self.names.append(name)
+            self.concepts.append(concepts)
+            boards.append(BOARD_CODES[board_of(code)])
+            ratios.append(limit_ratio(code, name))
+            st_flags.append(is_st)
+            scores.append(score)
+            buckets.append(CAP_BUCKET_CODES[cap_bucket(float_market_cap[i])])
+
+        self.board = np.concatenate([self.board, np.array(boards, dtype=np.int8)])
+        self.limit_ratio = np.concatenate([self.limit_ratio, np.array(ratios, dtype=np.float64)])
+        self.is_st = np.concatenate([self.is_st, np.array(st_flags, dtype=bool)])
+        self.concept_score = np.concatenate([self.concept_score, np.array(scores, dtype=np.int64)])
+        self.float_shares = np.concatenate([self.float_shares, np.array([float_shares[i] for i in rows], dtype=np.float64)])
+        self.cap_bucket = np.concatenate([self.cap_bucket, np.array(buckets, dtype=np.int8)])
+        return len(rows)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __contains__(self, stock_code: str) -> bool:
+        return stock_code in self.index
+
+    def ids(self, codes: Sequence[str]) -> np.ndarray:
+        """
+        代码 -> symbol id（不在表中的为-1，先用extend补齐）
+
+        Args:
+            codes: 股票代码
+
+        Returns:
+            int64数组
+        """
+        if codes == self.codes:
+            return np.arange(len(codes))
+        index = self.index
+        return np.fromiter((index.get(code, -1) for code in codes), dtype=np.int64, count=len(codes))
+
+    def attributes(self, stock_code: str) -> Dict[str, Any]:
+        """
+        单只股票的静态属性（字段名与行情字典一致）
+
+        Args:
+            stock_code: 股票代码
+
+        Returns:
+            板块、涨跌幅限制、是否ST、概念、流通股本、市值分档；不在表中返回空字典
+        """
+        i = self.index.get(stock_code)
+        if i is None:
+            return {}
+        return {
+            "所属板块": BOARD_NAMES[self.board[i]],
+            "涨跌幅限制": float(self.limit_ratio[i]),
+            "是否ST": bool(self.is_st[i]),
+            "概念": list(self.concepts[i]),
+            "流通股本": float(self.float_shares[i]),
+            "市值分档": CAP_BUCKET_NAMES[self.cap_bucket[i]],
+        }
+
+    @classmethod
+    def from_quotes(cls, quotes: Iterable[Dict[str, Any]], trade_date: Optional[date] = None) -> "SymbolTable":
+        """
+        由行情字典构建（流通股本、流通市值字段缺失时按0处理）
+
+        Args:
+            quotes: 行情字典列表
+            trade_date: 所属交易日
+
+        Returns:
+            SymbolTable
+        """
+        quotes = [q for q in quotes if q]
+        return cls(
+            [q.get("股票代码", "") for q in quotes],
+            [q.get("股票名称", "") or "" for q in quotes],
+            float_shares=[q.get("流通股本") or 0.0 for q in quotes],
+            float_market_cap=[q.get("流通市值") or 0.0 for q in quotes],
+            trade_date=trade_date
+        )
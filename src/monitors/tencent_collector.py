@@ -3,9 +3,19 @@
 备用真实数据源
 """
 
-import requests
-from typing import Dict, Any
+from typing import Dict, Any, List, Tuple
 from .data_collector import DataCollector
+from .symbol_table import board_of, limit_price, limit_ratio
+from ..utils.metrics import InstrumentedSession
+
+
+def _positive_number(value: str) -> float:
+    """正数字段转浮点数（缺失、无效或非正数返回0）"""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    return number if number > 0 else 0.0
 
 
 class TencentFinanceCollector(DataCollector):
@@ -18,10 +28,16 @@ class TencentFinanceCollector(DataCollector):
     - 提供实时行情数据
     """
 
-    def __init__(self):
-        """初始化腾讯财经数据采集器"""
+    def __init__(self, sector_index=None):
+        """
+        初始化腾讯财经数据采集器
+
+        Args:
+            sector_index: 可选的SectorIndex；给出时行情补上所属板块，get_sector_data返回实时板块涨跌幅
+        """
         self.base_url = "http://qt.gtimg.cn"
-        self.session = requests.Session()
+        self.sector_index = sector_index
+        self.session = InstrumentedSession("tencent")
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': '*/*',
@@ -30,6 +46,91 @@ class TencentFinanceCollector(DataCollector):
             'Connection': 'keep-alive'
         })
 
+    @staticmethod
+    def _to_symbol(stock_code: str) -> Tuple[str, str]:
+        """
+        股票代码转换为腾讯API的symbol
+
+        Returns:
+            (标准化后的代码, symbol)
+        """
+        normalized_code = stock_code  # 默认使用原始代码
+        symbol = stock_code  # 默认使用原始代码
+
+        # 处理股票代码格式
+        # 美股判断：包含字母（如AAPL、TSLA）
+        if any(c.isalpha() for c in stock_code):
+            # 美股，统一转换为大写（腾讯API要求）
+            normalized_code = stock_code.upper()
+            symbol = f"us{normalized_code}"
+        # 港股判断：5位数字且以0开头（如00700、01810）
+        elif len(stock_code) == 5 and stock_code.startswith("0"):
+            # 港股
+            symbol = f"hk{stock_code}"
+        elif stock_code.startswith("6") or stock_code.startswith("5"):
+            # 6开头是上交所股票，5开头是上交所ETF基金
+            symbol = f"sh{stock_code}"
+        elif stock_code.startswith("0") or stock_code.startswith("3") or stock_code.startswith("1"):
+            # 0/3开头是深交所股票，1开头是深交所ETF基金
+            symbol = f"sz{stock_code}"
+        elif stock_code.startswith("4") or stock_code.startswith("8"):
+            # 4/8开头是北交所股票
+            symbol = f"bj{stock_code}"
+
+        return normalized_code, symbol
+
+    @staticmethod
+    def _parse_fields(normalized_code: str, fields: List[str]) -> Dict[str, Any]:
+        """解析腾讯API返回的一只股票的字段"""
+        if len(fields) < 30:
+            print(f"数据字段不足: {len(fields)}")
+            return {}
+
+        # 解析字段（腾讯API字段索引）
+        stock_name = fields[1]
+        open_price = float(fields[5]) if fields[5] else 0
+        close_prev = float(fields[4]) if fields[4] else 0
+        current_price = float(fields[3]) if fields[3] else 0
+        high_price = float(fields[33]) if fields[33] else 0
+        low_price = float(fields[34]) if fields[34] else 0
+        # 港股成交量可能是小数，需要先转float再转int
+        volume = int(float(fields[36])) if fields[36] else 0
+
+        # 获取成交额（字段38，单位：元）
+        amount = float(fields[37]) if fields[37] and len(fields) > 37 else 0
+
+        # 获取总市值（字段45，单位：元）
+        market_cap = float(fields[45]) if len(fields) > 45 and fields[45] else 0
+
+        # 获取换手率（字段39，单位：%）
+        turnover_rate = float(fields[38]) if len(fields) > 38 and fields[38] else 0
+
+        # 涨跌停价：A股优先用接口给出的（字段47/48），否则按板块和ST状态的涨跌幅限制计算
+        ratio = limit_ratio(normalized_code, stock_name)
+        limit_up = limit_price(close_prev, ratio)
+        limit_down = limit_price(close_prev, ratio, up=False)
+        if board_of(normalized_code) != "其他" and len(fields) > 48:
+            limit_up = _positive_number(fields[47]) or limit_up
+            limit_down = _positive_number(fields[48]) or limit_down
+
+        return {
+            "股票代码": normalized_code,  # 使用标准化后的代码（美股统一大写）
+            "股票名称": stock_name,
+            "开盘价": open_price,
+            "实时价": current_price,
+            "最高价": high_price,
+            "最低价": low_price,
+            "涨停价": limit_up,
+            "跌停价": limit_down,
+            "昨收": close_prev,
+            "成交量": volume,
+            "成交额": amount,
+            "总市值": market_cap,
+            "换手率": turnover_rate,
+            "板块名称": "未知",
+            "最新消息": "无"
+        }
+
     def get_stock_realtime_data(self, stock_code: str) -> Dict[str, Any]:
         """
         获取股票实时数据
@@ -37,30 +138,9 @@ class TencentFinanceCollector(DataCollector):
         Args:
             stock_code: 股票代码（如 sh600000 或 sz000001）
         """
+        normalized_code = stock_code
         try:
-            # 标准化股票代码
-            normalized_code = stock_code  # 默认使用原始代码
-            symbol = stock_code  # 默认使用原始代码
-
-            # 处理股票代码格式
-            # 美股判断：包含字母（如AAPL、TSLA）
-            if any(c.isalpha() for c in stock_code):
-                # 美股，统一转换为大写（腾讯API要求）
-                normalized_code = stock_code.upper()
-                symbol = f"us{normalized_code}"
-            # 港股判断：5位数字且以0开头（如00700、01810）
-            elif len(stock_code) == 5 and stock_code.startswith("0"):
-                # 港股
-                symbol = f"hk{stock_code}"
-            elif stock_code.startswith("6") or stock_code.startswith("5"):
-                # 6开头是上交所股票，5开头是上交所ETF基金
-                symbol = f"sh{stock_code}"
-            elif stock_code.startswith("0") or stock_code.startswith("3") or stock_code.startswith("1"):
-                # 0/3开头是深交所股票，1开头是深交所ETF基金
-                symbol = f"sz{stock_code}"
-            elif stock_code.startswith("4") or stock_code.startswith("8"):
-                # 4/8开头是北交所股票
-                symbol = f"bj{stock_code}"
+            normalized_code, symbol = self._to_symbol(stock_code)
 
             # 调用腾讯API
             url = f"{self.base_url}/q={symbol}"
@@ -79,57 +159,71 @@ class TencentFinanceCollector(DataCollector):
 
             # 提取数据部分
             data_part = data_str.split('"')[1]
-            fields = data_part.split('~')
-
-            if len(fields) < 30:
-                print(f"数据字段不足: {len(fields)}")
-                return {}
-
-            # 解析字段（腾讯API字段索引）
-            stock_name = fields[1]
-            open_price = float(fields[5]) if fields[5] else 0
-            close_prev = float(fields[4]) if fields[4] else 0
-            current_price = float(fields[3]) if fields[3] else 0
-            high_price = float(fields[33]) if fields[33] else 0
-            low_price = float(fields[34]) if fields[34] else 0
-            # 港股成交量可能是小数，需要先转float再转int
-            volume = int(float(fields[36])) if fields[36] else 0
-
-            # 获取成交额（字段38，单位：元）
-            amount = float(fields[37]) if fields[37] and len(fields) > 37 else 0
-
-            # 获取总市值（字段45，单位：元）
-            market_cap = float(fields[45]) if len(fields) > 45 and fields[45] else 0
-
-            # 获取换手率（字段39，单位：%）
-            turnover_rate = float(fields[38]) if len(fields) > 38 and fields[38] else 0
-
-            # 计算涨停价
-            limit_up = round(close_prev * 1.1, 2) if close_prev > 0 else 0
-
-            return {
-                "股票代码": normalized_code,  # 使用标准化后的代码（美股统一大写）
-                "股票名称": stock_name,
-                "开盘价": open_price,
-                "实时价": current_price,
-                "最高价": high_price,
-                "最低价": low_price,
-                "涨停价": limit_up,
-                "昨收": close_prev,
-                "成交量": volume,
-                "成交额": amount,
-                "总市值": market_cap,
-                "换手率": turnover_rate,
-                "板块名称": "未知",
-                "最新消息": "无"
-            }
+            data = self._parse_fields(normalized_code, data_part.split('~'))
+            if self.sector_index is not None:
+                self.sector_index.annotate(data)
+            return data
 
         except Exception as e:
             print(f"获取股票{normalized_code}数据失败: {e}")
             return {}
 
+    def get_stocks_realtime_data(self, stock_codes: List[str], chunk_size: int = 60) -> Dict[str, Dict[str, Any]]:
+        """
+        批量获取股票实时数据（一次请求多只，q=sh600000,sz000001,...）
+
+        Args:
+            stock_codes: 股票代码列表
+            chunk_size: 每次请求的股票数
+
+        Returns:
+            {原始股票代码: 实时数据}，获取失败的股票不在结果中
+        """
+        results: Dict[str, Dict[str, Any]] = {}
+        for start in range(0, len(stock_codes), chunk_size):
+            chunk = stock_codes[start:start + chunk_size]
+            symbols = {}
+            for code in chunk:
+                normalized_code, symbol = self._to_symbol(code)
+                symbols[symbol] = (code, normalized_code)
+
+            try:
+                response = self.session.get(f"{self.base_url}/q={','.join(symbols)}", timeout=10)
+                response.encoding = 'gbk'
+                text = response.text
+            except Exception as e:
+                print(f"批量获取股票数据失败: {e}")
+                continue
+            if response.status_code != 200:
+                print(f"批量API调用失败: {response.status_code}")
+                continue
+
+            # 每只股票一行：v_sh600000="1~浦发银行~600000~...";
+            # 逐行解析，一只股票的字段异常不影响同批其他股票
+            for line in text.split(';'):
+                line = line.strip()
+                if not line.startswith('v_') or '"' not in line or '=' not in line:
+                    continue
+                symbol = line[2:line.index('=')]
+                if symbol not in symbols:
+                    continue
+                code, normalized_code = symbols[symbol]
+                try:
+                    data = self._parse_fields(normalized_code, line.split('"')[1].split('~'))
+                    if data and self.sector_index is not None:
+                        self.sector_index.annotate(data)
+                except Exception as e:
+                    print(f"解析股票{code}数据失败: {e}")
+                    continue
+                if data:
+                    results[code] = data
+
+        return results
+
     def get_sector_data(self, sector_name: str) -> Dict[str, Any]:
-        """获取板块数据"""
+        """获取板块数据（需要sector_index，否则涨跌幅为0）"""
+        if self.sector_index is not None:
+            return self.sector_index.sector_data(sector_name)
         return {"涨跌幅": 0}
 
     def get_market_index_data(self, index_name: str = "上证指数") -> Dict[str, Any]:
@@ -337,10 +431,15 @@ class UnifiedRealDataCollector(DataCollector):
     自动尝试多个数据源，提高数据获取成功率
     """
 
-    def __init__(self):
-        """初始化统一数据采集器"""
+    def __init__(self, sector_index=None):
+        """
+        初始化统一数据采集器
+
+        Args:
+            sector_index: 可选的SectorIndex，传给各数据源
+        """
         self.collectors = [
-            TencentFinanceCollector(),  # 优先使用腾讯
+            TencentFinanceCollector(sector_index=sector_index),  # 优先使用腾讯
             # SinaFinanceCollector(),  # 新浪API可能被限流
         ]
         self.current_collector = None
@@ -365,6 +464,20 @@ class UnifiedRealDataCollector(DataCollector):
             print(f"⚠️  所有真实数据源均失败，将使用Mock数据作为备用")
         return result
 
+    def get_stocks_realtime_data(self, stock_codes: List[str]) -> Dict[str, Dict[str, Any]]:
+        """批量获取股票实时数据（前一个数据源缺失的股票交给下一个数据源）"""
+        results: Dict[str, Dict[str, Any]] = {}
+        for collector in self.collectors:
+            missing = [code for code in stock_codes if code not in results]
+            if not missing:
+                break
+            try:
+                fetched = collector.get_stocks_realtime_data(missing)
+            except Exception:
+                continue
+            results.update({code: data for code, data in fetched.items() if data and data.get("股票名称")})
+        return results
+
     def get_sector_data(self, sector_name: str) -> Dict[str, Any]:
         """获取板块数据"""
         return self._try_collectors(sector_name, "get_sector_data", sector_name) or {"涨跌幅": 0}
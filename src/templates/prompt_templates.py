@@ -1,11 +1,15 @@
 """
 股票AIGC监控Prompt模板管理器
-支持开盘跳水、破位下跌、冲板回落三类图形的完整版和简化版模板
+支持开盘跳水、破位下跌、冲板回落三类图形的完整版、精简版和简化版模板，以及多只股票合并的批量模板
 """
 
-from typing import Dict, Any, Optional
+import json
+import re
+from typing import Dict, Any, Iterable, List, Optional
 from enum import Enum
 
+from ..models.stock_data import AIGCResponse
+
 
 class ChartType(Enum):
     """图形类型枚举"""
@@ -17,9 +21,82 @@ class ChartType(Enum):
 class TemplateType(Enum):
     """模板类型枚举"""
     FULL = "完整版"
+    COMPACT = "精简版"
     SIMPLIFIED = "简化版"
 
 
+# 精简版模板的字段编码：(字段名, 简写标签, 单位)，按输出顺序排列
+COMPACT_FIELD_CODES = [
+    ("开盘价", "开", ""),
+    ("实时价", "现", ""),
+    ("最高价", "高", ""),
+    ("涨停价", "涨停", ""),
+    ("5日均线", "MA5 ", ""),
+    ("20日均线", "MA20 ", ""),
+    ("前期平台支撑位", "平台支撑", ""),
+    ("支撑位价格", "破支撑", ""),
+    ("开盘分钟数", "开盘", "分钟"),
+    ("跌幅", "跌", "%"),
+    ("涨幅", "冲高", "%"),
+    ("回落幅度", "回落", "%"),
+    ("破位后未回弹分钟数", "未回弹", "分钟"),
+    ("封板挂单量", "封单", "手"),
+    ("触发成交额", "触发额", ""),
+    ("成交额放大比例", "较5日放量", "%"),
+    ("当日成交额放大比例", "较当日放量", "%"),
+    ("分钟成交额放大比例", "较前1分放量", "%"),
+]
+
+# 视为未填写的占位值
+_PLACEHOLDER_VALUES = ("", "无", "未知")
+
+
+def _is_placeholder(value: Any) -> bool:
+    """判断字段值是否为空值或默认占位值（None、空字符串、无、未知、0）"""
+    if value is None:
+        return True
+    if isinstance(value, str):
+        return value.strip() in _PLACEHOLDER_VALUES
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value == 0
+    return False
+
+
+def compact_stock_data(stock_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    去掉空值和默认占位字段
+
+    Args:
+        stock_data: 股票数据字典
+
+    Returns:
+        只包含有效字段的新字典
+    """
+    return {field: value for field, value in stock_data.items() if not _is_placeholder(value)}
+
+
+def _format_value(value: Any) -> str:
+    """数值去掉多余的小数位（10.0 -> 10），其他类型原样输出"""
+    if isinstance(value, float):
+        return f"{value:g}"
+    return str(value)
+
+
+def _format_change(value: Any) -> str:
+    """涨跌幅带符号输出（+1.5%），字符串数值先转换，无法解析的值返回空串"""
+    try:
+        return f"{float(value or 0):+g}%"
+    except (TypeError, ValueError):
+        return ""
+
+
+# 批量模板要求模型返回的字段（与AIGCResponse字段一致，不适用的字段由模型省略）
+BATCH_RESPONSE_FIELDS = [
+    "判断结果", "破位判断", "核心原因", "风险等级", "抛压强度",
+    "走势影响", "短期预判", "操作建议", "参考价位"
+]
+
+
 class PromptTemplateManager:
     """Prompt模板管理器"""
 
@@ -62,6 +139,50 @@ class PromptTemplateManager:
             f"5. 额外特征：{stock_data.get('额外特征', '')}"
         )
 
+    @staticmethod
+    def _build_compact_supplementary_data(stock_data: Dict[str, Any]) -> str:
+        """
+        构建精简版补充数据：去掉空值和默认占位字段，字段使用简写标签
+
+        Args:
+            stock_data: 股票数据字典（字段同_build_supplementary_data）
+
+        Returns:
+            紧凑的补充数据字符串
+        """
+        data = compact_stock_data(stock_data)
+
+        lines = [
+            f"{data.get('股票代码', '')}{data.get('股票名称', '')} "
+            f"{data.get('触发时间', '')}触发{data.get('图形类型', '')}"
+        ]
+
+        quote = [
+            f"{label}{_format_value(data[field])}{unit}"
+            for field, label, unit in COMPACT_FIELD_CODES if field in data
+        ]
+        if "均线价格" in data:
+            quote.append(f"破MA{data.get('均线类型', '')} {_format_value(data['均线价格'])}")
+        if quote:
+            lines.append("行情：" + " ".join(quote))
+
+        market = []
+        if "板块名称" in data:
+            pct = _format_change(data["板块涨跌幅"]) if "板块涨跌幅" in data else ""
+            market.append(f"板块{data['板块名称']}{pct}")
+        index_pct = _format_change(data["大盘涨跌幅"]) if "大盘涨跌幅" in data else ""
+        if index_pct:
+            market.append(f"{data.get('大盘名称', '大盘')}{index_pct}")
+        if market:
+            lines.append("环境：" + " ".join(market))
+
+        if "最新消息" in data:
+            lines.append(f"消息：{data['最新消息']}")
+        if "额外特征" in data:
+            lines.append(f"特征：{data['额外特征']}")
+
+        return "\n".join(lines)
+
     @staticmethod
     def get_opening_dive_template(
         stock_data: Dict[str, Any],
@@ -74,7 +195,7 @@ class PromptTemplateManager:
         Args:
             stock_data: 股票数据字典
             trading_style: 交易风格（短线/波段/长线）
-            template_type: 模板类型（完整版/简化版）
+            template_type: 模板类型（完整版/精简版/简化版）
 
         Returns:
             完整的Prompt字符串
@@ -92,6 +213,15 @@ class PromptTemplateManager:
                 f"判断是真/假跳水？风险高/中/低？{trading_style}该规避/持有/止损？给出关键价位，50字内。"
             )
 
+        if template_type == TemplateType.COMPACT:
+            # 精简版模板（输出格式与完整版一致）
+            return (
+                f"{PromptTemplateManager._build_compact_supplementary_data(stock_data)}\n"
+                f"1.真跳水(资金出逃)/假跳水(联动下跌)+1条依据；2.风险高/中/低+理由；"
+                f"3.{trading_style}建议(规避/持有/止盈/止损)+参考价位。\n"
+                f"格式：\n判断结果：\n判断依据：\n风险等级：（理由：）\n操作建议：（参考价位：）\n150字内。"
+            )
+
         # 完整版模板
         supplementary_data = PromptTemplateManager._build_supplementary_data(stock_data)
 
@@ -123,7 +253,7 @@ class PromptTemplateManager:
         Args:
             stock_data: 股票数据字典
             trading_style: 交易风格（短线/波段/长线）
-            template_type: 模板类型（完整版/简化版）
+            template_type: 模板类型（完整版/精简版/简化版）
 
         Returns:
             完整的Prompt字符串
@@ -139,6 +269,15 @@ class PromptTemplateManager:
                 f"是真/假破位？短期涨/跌？{trading_style}操作建议？50字内。"
             )
 
+        if template_type == TemplateType.COMPACT:
+            # 精简版模板（输出格式与完整版一致）
+            return (
+                f"{PromptTemplateManager._build_compact_supplementary_data(stock_data)}\n"
+                f"1.真破位(趋势走坏)/假破位(洗盘)+依据；2.核心原因(资金/板块/消息/大盘选1-2)；"
+                f"3.1-2日预判(反弹/续跌/横盘)+{trading_style}建议。\n"
+                f"格式：\n破位判断：（依据：）\n核心原因：\n短期预判：\n操作建议：\n150字内。"
+            )
+
         # 完整版模板
         supplementary_data = PromptTemplateManager._build_supplementary_data(stock_data)
 
@@ -172,7 +311,7 @@ class PromptTemplateManager:
             stock_data: 股票数据字典
             position_status: 持仓状态（已持仓/未持仓）
             trading_style: 交易风格（短线/波段/长线）
-            template_type: 模板类型（完整版/简化版）
+            template_type: 模板类型（完整版/精简版/简化版）
 
         Returns:
             完整的Prompt字符串
@@ -188,6 +327,15 @@ class PromptTemplateManager:
                 f"抛压强/弱？{trading_style}该持有/清仓/观望？50字内。"
             )
 
+        if template_type == TemplateType.COMPACT:
+            # 精简版模板（输出格式与完整版一致）
+            return (
+                f"{PromptTemplateManager._build_compact_supplementary_data(stock_data)}\n"
+                f"1.回落原因(抛压/诱多/分流)+抛压强/中/弱；2.1-2日影响(偏空/中性/偏多)+理由；"
+                f"3.{position_status}{trading_style}建议(加仓/减仓/清仓/观望)。\n"
+                f"格式：\n核心原因：（抛压强度：）\n走势影响：（理由：）\n操作建议：\n150字内。"
+            )
+
         # 完整版模板
         supplementary_data = PromptTemplateManager._build_supplementary_data(stock_data)
 
@@ -205,6 +353,83 @@ class PromptTemplateManager:
             f"总字数控制在150字内，聚焦实际交易决策，避免理论化表述。"
         )
 
+    @staticmethod
+    def _build_compact_line(stock_data: Dict[str, Any]) -> str:
+        """
+        构建单只股票的紧凑数据行（批量模板使用，只保留简化版模板中的关键数据）
+
+        Args:
+            stock_data: 股票数据字典（需包含图形类型字段）
+
+        Returns:
+            一行数据描述
+        """
+        pattern_type = stock_data.get('图形类型', '')
+        head = (
+            f"{stock_data.get('股票代码', '')} {stock_data.get('股票名称', '')}【{pattern_type}】"
+            f"{stock_data.get('触发时间', '')}"
+        )
+
+        if pattern_type == ChartType.OPENING_DIVE.value:
+            body = (
+                f"开盘{stock_data.get('开盘分钟数', '')}分钟跌{stock_data.get('跌幅', '')}%，"
+                f"跌破{stock_data.get('均线类型', '')}日均线{stock_data.get('均线价格', '')}，"
+                f"大盘{stock_data.get('大盘涨跌幅', '')}%"
+            )
+        elif pattern_type == ChartType.BREAKDOWN_FALL.value:
+            body = (
+                f"跌破支撑位{stock_data.get('支撑位价格', '')}，"
+                f"消息{stock_data.get('最新消息', '无')}"
+            )
+        else:
+            body = (
+                f"冲至{stock_data.get('涨幅', '')}%未封板，回落{stock_data.get('回落幅度', '')}%，"
+                f"封板挂单{stock_data.get('封板挂单量', '')}手"
+            )
+
+        return (
+            f"{head}，实时价{stock_data.get('实时价', '')}，{body}，"
+            f"放量{stock_data.get('成交额放大比例', '')}%，"
+            f"板块{stock_data.get('板块名称', '')}{stock_data.get('板块涨跌幅', '')}%"
+        )
+
+    @staticmethod
+    def get_batch_template(
+        stocks: List[Dict[str, Any]],
+        trading_style: str = "短线"
+    ) -> str:
+        """
+        获取多只股票合并分析的Prompt模板
+
+        分析要求只出现一次，各股票只占一行紧凑数据，要求模型按股票代码返回JSON数组。
+
+        Args:
+            stocks: 股票数据字典列表（每个字典需包含图形类型字段）
+            trading_style: 交易风格（短线/波段/长线）
+
+        Returns:
+            完整的Prompt字符串
+        """
+        lines = [
+            f"{i}. {PromptTemplateManager._build_compact_line(stock_data)}"
+            for i, stock_data in enumerate(stocks, 1)
+        ]
+        example = json.dumps(
+            [{"股票代码": "600000", **{field: "" for field in BATCH_RESPONSE_FIELDS}}],
+            ensure_ascii=False
+        )
+
+        return (
+            f"以下{len(stocks)}只股票今日触发图形规则：\n"
+            + "\n".join(lines)
+            + "\n\n"
+            f"请逐只分析：开盘跳水判断真/假跳水及风险高/中/低；"
+            f"破位下跌判断真/假破位及短期预判；冲板回落判断抛压强/中/弱及走势影响。"
+            f"针对{trading_style}交易者给出操作建议（规避/持有/止损/清仓/观望）和关键参考价位（数字）。\n"
+            f"只输出JSON数组，每只股票一个对象，以股票代码区分，不适用的字段省略，每只股票50字内：\n"
+            f"{example}"
+        )
+
     @classmethod
     def get_template(
         cls,
@@ -222,7 +447,7 @@ class PromptTemplateManager:
             stock_data: 股票数据字典
             trading_style: 交易风格（短线/波段/长线）
             position_status: 持仓状态（已持仓/未持仓）
-            template_type: 模板类型（完整版/简化版）
+            template_type: 模板类型（完整版/精简版/简化版）
 
         Returns:
             完整的Prompt字符串
@@ -283,3 +508,89 @@ def generate_prompt(
         position_status=kwargs.get("position_status", "已持仓"),
         template_type=kwargs.get("template_type", TemplateType.FULL)
     )
+
+
+# 便捷函数：快速生成批量Prompt
+def generate_batch_prompt(
+    stocks: List[Dict[str, Any]],
+    **kwargs
+) -> str:
+    """
+    生成多只股票合并分析Prompt的便捷函数
+
+    Args:
+        stocks: 股票数据字典列表（每个字典需包含图形类型字段）
+        **kwargs: 其他可选参数（trading_style）
+
+    Returns:
+        完整的Prompt字符串
+    """
+    for stock_data in stocks:
+        if stock_data.get("图形类型") not in [chart_type.value for chart_type in ChartType]:
+            raise ValueError(
+                f"不支持的图形类型: {stock_data.get('图形类型')}，请使用：开盘跳水/破位下跌/冲板回落"
+            )
+
+    return PromptTemplateManager.get_batch_template(
+        stocks,
+        trading_style=kwargs.get("trading_style", "短线")
+    )
+
+
+def _extract_json_array(text: str) -> Optional[list]:
+    """从模型回复中提取JSON数组（兼容```json代码块和前后多余文字）"""
+    start = text.find("[")
+    end = text.rfind("]")
+    if start == -1 or end <= start:
+        return None
+    try:
+        data = json.loads(text[start:end + 1])
+    except ValueError:
+        return None
+    return data if isinstance(data, list) else None
+
+
+def parse_batch_response(
+    text: str,
+    stock_codes: Optional[Iterable[str]] = None
+) -> Dict[str, AIGCResponse]:
+    """
+    将批量模板的模型回复拆分为每只股票的AIGCResponse
+
+    Args:
+        text: 模型原始回复
+        stock_codes: 期望的股票代码（提供时忽略不在其中的条目）
+
+    Returns:
+        股票代码到AIGCResponse的映射；解析失败或缺失的股票不在结果中，调用方可单独重试
+    """
+    items = _extract_json_array(text or "")
+    if not items:
+        return {}
+
+    expected = set(stock_codes) if stock_codes is not None else None
+    results = {}
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        code = str(item.get("股票代码") or item.get("code") or "").strip()
+        if not code or (expected is not None and code not in expected):
+            continue
+
+        fields = {}
+        for field in BATCH_RESPONSE_FIELDS:
+            value = item.get(field)
+            if value in (None, ""):
+                continue
+            if field == "参考价位":
+                match = re.search(r"\d+(?:\.\d+)?", str(value))
+                if match:
+                    fields[field] = float(match.group())
+            else:
+                fields[field] = str(value)
+
+        # 原始回复使用与单只分析一致的“字段：值”文本格式，便于直接展示和缓存
+        raw = "\n".join(f"{field}：{value}" for field, value in fields.items())
+        results[code] = AIGCResponse(原始回复=raw or json.dumps(item, ensure_ascii=False), **fields)
+
+    return results
@@ -48,6 +48,8 @@ class Config:
 
     # 监控配置
     MONITOR_INTERVAL_SECONDS: int = int(os.getenv("MONITOR_INTERVAL_SECONDS", "60"))
+    MONITOR_WATCHLIST: str = os.getenv("MONITOR_WATCHLIST", "")  # 逗号分隔的股票代码
+    MONITOR_PATTERNS: str = os.getenv("MONITOR_PATTERNS", "开盘跳水,破位下跌,冲板回落")
     TRADING_STYLE: str = os.getenv("TRADING_STYLE", "short")
 
     # 日志配置
@@ -136,6 +138,7 @@ def print_config_summary():
     print(f"默认AIGC模型: {Config.DEFAULT_AIGC_MODEL}")
     print(f"交易风格: {Config.TRADING_STYLE}")
     print(f"监控间隔: {Config.MONITOR_INTERVAL_SECONDS}秒")
+    print(f"监控股票: {Config.MONITOR_WATCHLIST or '未配置'}")
     print(f"日志级别: {Config.LOG_LEVEL}")
     print("=" * 60)
 
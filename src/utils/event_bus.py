@@ -0,0 +1,607 @@
+"""
+进程内事件总线
+监控触发事件发布后写入追加式磁盘日志，并分发给各订阅者（SSE客户端、Webhook、文件等）；
+每个订阅者有独立的有界队列和溢出策略，慢的订阅者只会丢弃/合并自己的事件，不会阻塞发布方
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Any, Callable, Dict, Hashable, Iterable, Iterator, List, Optional
+
+from .metrics import EVENT_BUS_EVENTS_TOTAL, InstrumentedSession
+
+
+class Event:
+    """总线事件（发布时序列化一次，日志和各订阅者共用）"""
+
+    __slots__ = ("seq", "type", "data", "timestamp", "_json")
+
+    def __init__(self, seq: int, event_type: str, data: Dict[str, Any], timestamp: Optional[float] = None):
+        self.seq = seq
+        self.type = event_type
+        self.data = data
+        self.timestamp = time.time() if timestamp is None else timestamp
+        self._json: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典格式"""
+        return {"seq": self.seq, "type": self.type, "ts": self.timestamp, "data": self.data}
+
+    def to_json(self) -> str:
+        """JSON文本（缓存）"""
+        if self._json is None:
+            self._json = json.dumps(self.to_dict(), ensure_ascii=False, default=str)
+        return self._json
+
+    @classmethod
+    def from_json(cls, line: str) -> "Event":
+        """由日志行解析"""
+        record = json.loads(line)
+        event = cls(record["seq"], record["type"], record["data"], record["ts"])
+        event._json = line.rstrip("\n")
+        return event
+
+
+def _format_sse(event: Event) -> str:
+    """SSE文本块（id为事件序号，供客户端断线重连时作为Last-Event-ID）"""
+    return f"id: {event.seq}\nevent: {event.type}\ndata: {event.to_json()}\n\n"
+
+
+def trigger_event_data(trigger) -> Dict[str, Any]:
+    """
+    MonitorTrigger转换为事件数据
+
+    Args:
+        trigger: MonitorTrigger对象
+
+    Returns:
+        可JSON序列化的字典
+    """
+    return {
+        "事件ID": trigger.事件ID,
+        "股票代码": trigger.股票代码,
+        "股票名称": trigger.股票名称,
+        "图形类型": trigger.图形类型,
+        "触发时间": trigger.触发时间.strftime("%Y-%m-%d %H:%M:%S"),
+        "已处理": trigger.已处理,
+        "AI分析": trigger.AIGC分析结果.原始回复 if trigger.AIGC分析结果 else None,
+        "市场数据": trigger.市场数据.to_dict(),
+    }
+
+
+def stock_pattern_key(event: Event) -> Hashable:
+    """合并键：同一股票同一图形只保留最新一条"""
+    return (event.type, event.data.get("股票代码"), event.data.get("图形类型"))
+
+
+class Subscription:
+    """
+    订阅者队列
+
+    溢出策略：
+        drop_oldest  队列满时丢弃最早的事件（默认，适合只关心最新情况的推送）
+        drop_newest  队列满时丢弃新事件（保留积压的顺序，适合审计类消费者）
+        coalesce     相同合并键的待投递事件只保留最新一条（位置不变），仍然溢出时丢弃最早的
+    """
+
+    DROP_OLDEST = "drop_oldest"
+    DROP_NEWEST = "drop_newest"
+    COALESCE = "coalesce"
+    POLICIES = (DROP_OLDEST, DROP_NEWEST, COALESCE)
+
+    def __init__(
+        self,
+        name: str,
+        maxsize: int = 1000,
+        policy: str = DROP_OLDEST,
+        coalesce_key: Callable[[Event], Hashable] = stock_pattern_key,
+        event_types: Optional[Iterable[str]] = None
+    ):
+        """
+        Args:
+            name: 订阅者名称（统计和指标标签，同类订阅者可以同名）
+            maxsize: 队列上限
+            policy: 溢出策略
+            coalesce_key: coalesce策略的合并键
+            event_types: 只接收这些类型的事件，None表示全部
+        """
+        if policy not in self.POLICIES:
+            raise ValueError(f"不支持的溢出策略: {policy}")
+        self.name = name
+        self.maxsize = maxsize
+        self.policy = policy
+        self.coalesce_key = coalesce_key
+        self.event_types = set(event_types) if event_types else None
+
+        # 待投递事件：键为合并键（coalesce）或序号，OrderedDict保持投递顺序
+        self._pending: "OrderedDict[Hashable, Event]" = OrderedDict()
+        self._cond = threading.Condition()
+        self.closed = False
+        self.delivered = 0
+        self.dropped = 0
+        self.coalesced = 0
+
+    def offer(self, event: Event) -> bool:
+        """
+        放入事件（不阻塞）
+
+        Returns:
+            事件是否进入队列（被合并也算进入）
+        """
+        if self.event_types is not None and event.type not in self.event_types:
+            return False
+
+        with self._cond:
+            if self.closed:
+                return False
+            key = self.coalesce_key(event) if self.policy == self.COALESCE else event.seq
+            outcome = "queued"
+            if key in self._pending:
+                self._pending[key] = event
+                self.coalesced += 1
+                outcome = "coalesced"
+            elif len(self._pending) >= self.maxsize:
+                if self.policy == self.DROP_NEWEST:
+                    self.dropped += 1
+                    EVENT_BUS_EVENTS_TOTAL.inc(subscriber=self.name, outcome="dropped")
+                    return False
+                # 被挤掉的是最早的事件，新事件正常入队
+                self._pending.popitem(last=False)
+                self._pending[key] = event
+                self.dropped += 1
+                EVENT_BUS_EVENTS_TOTAL.inc(subscriber=self.name, outcome="dropped")
+            else:
+                self._pending[key] = event
+            self._cond.notify()
+
+        EVENT_BUS_EVENTS_TOTAL.inc(subscriber=self.name, outcome=outcome)
+        return True
+
+    def get_batch(self, max_items: int = 100, timeout: Optional[float] = None, linger: float = 0) -> List[Event]:
+        """
+        取出一批事件
+
+        Args:
+            max_items: 每批最多条数
+            timeout: 等待第一条事件的超时（秒），None表示一直等待
+            linger: 拿到第一条后最多再等待多久凑批（秒）
+
+        Returns:
+            事件列表（超时或已关闭时可能为空）
+        """
+        with self._cond:
+            if not self._pending and not self.closed:
+                self._cond.wait(timeout)
+            if linger > 0 and 0 < len(self._pending) < max_items and not self.closed:
+                deadline = time.monotonic() + linger
+                while len(self._pending) < max_items and not self.closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+
+            batch = []
+            while self._pending and len(batch) < max_items:
+                batch.append(self._pending.popitem(last=False)[1])
+            self.delivered += len(batch)
+            return batch
+
+    @property
+    def depth(self) -> int:
+        """当前积压的事件数"""
+        with self._cond:
+            return len(self._pending)
+
+    def close(self):
+        """关闭队列，唤醒等待中的消费者"""
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        """订阅者统计"""
+        with self._cond:
+            return {
+                "policy": self.policy,
+                "maxsize": self.maxsize,
+                "depth": len(self._pending),
+                "delivered": self.delivered,
+                "dropped": self.dropped,
+                "coalesced": self.coalesced,
+            }
+
+
+class EventBus:
+    """
+    事件总线
+
+    publish只做序号分配、入日志队列和各订阅者的非阻塞入队；
+    日志由后台线程批量追加写入（每行一条JSON），超过max_log_bytes后轮转为 .1 文件（只保留一份），
+    进程重启后序号从日志末尾继续，最近的事件同时保存在内存中，供断线重连的SSE客户端补发。
+    """
+
+    def __init__(
+        self,
+        log_path: Optional[str] = None,
+        recent_size: int = 1000,
+        flush_interval: float = 0.05,
+        batch_size: int = 1000,
+        max_log_bytes: int = 50 * 1024 * 1024
+    ):
+        """
+        初始化事件总线
+
+        Args:
+            log_path: 追加式日志路径，None表示不落盘
+            recent_size: 内存中保留的最近事件数
+            flush_interval: 日志写入线程的等待间隔（秒）
+            batch_size: 日志每次最多合并写入的事件数
+            max_log_bytes: 日志轮转大小（字节），0表示不轮转
+        """
+        self.log_path = log_path
+        self.max_log_bytes = max_log_bytes
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._recent: deque = deque(maxlen=recent_size)
+        self._subscribers: List[Subscription] = []
+        self._workers: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self.published = 0
+        self.log_written = 0
+
+        self._seq = 0
+        self._log_queue: Optional[queue.SimpleQueue] = None
+        self._writer_thread: Optional[threading.Thread] = None
+        if log_path:
+            directory = os.path.dirname(log_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._seq = self._last_logged_seq()
+            self._log_queue = queue.SimpleQueue()
+            self._writer_thread = threading.Thread(target=self._writer_loop, name="event-bus-log", daemon=True)
+            self._writer_thread.start()
+
+    # ---------- 发布 ----------
+
+    def publish(self, event_type: str, data: Dict[str, Any]) -> Event:
+        """
+        发布事件（不阻塞，慢订阅者按各自策略丢弃/合并）
+
+        Args:
+            event_type: 事件类型，如 trigger / cleared
+            data: 事件数据（可JSON序列化）
+
+        Returns:
+            Event
+        """
+        with self._lock:
+            self._seq += 1
+            event = Event(self._seq, event_type, data)
+            self.published += 1
+            self._recent.append(event)
+            subscribers = list(self._subscribers)
+            # 在锁内入日志队列，保证日志按序号顺序写入
+            if self._log_queue is not None:
+                self._log_queue.put(event)
+
+        for subscription in subscribers:
+            subscription.offer(event)
+        return event
+
+    @property
+    def last_seq(self) -> int:
+        """最近发布的事件序号"""
+        with self._lock:
+            return self._seq
+
+    def publish_trigger(self, trigger) -> Event:
+        """发布MonitorTrigger"""
+        return self.publish("trigger", trigger_event_data(trigger))
+
+    # ---------- 订阅 ----------
+
+    def subscribe(
+        self,
+        name: str,
+        handler: Optional[Callable[[List[Event]], None]] = None,
+        maxsize: int = 1000,
+        policy: str = Subscription.DROP_OLDEST,
+        batch_size: int = 100,
+        linger: float = 0.05,
+        **kwargs
+    ) -> Subscription:
+        """
+        添加订阅者
+
+        Args:
+            name: 订阅者名称
+            handler: 批量处理函数；提供时在独立线程中按批调用，不提供时由调用方get_batch拉取（如SSE）
+            maxsize: 队列上限
+            policy: 溢出策略（drop_oldest / drop_newest / coalesce）
+            batch_size: 每批最多条数
+            linger: 凑批等待时间（秒）
+            **kwargs: 传给Subscription（coalesce_key、event_types）
+
+        Returns:
+            Subscription
+        """
+        subscription = Subscription(name, maxsize=maxsize, policy=policy, **kwargs)
+        with self._lock:
+            self._subscribers.append(subscription)
+
+        if handler is not None:
+            worker = threading.Thread(
+                target=self._deliver_loop,
+                args=(subscription, handler, batch_size, linger),
+                name=f"event-bus-{name}",
+                daemon=True
+            )
+            self._workers.append(worker)
+            worker.start()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        """移除订阅者"""
+        subscription.close()
+        with self._lock:
+            if subscription in self._subscribers:
+                self._subscribers.remove(subscription)
+
+    @staticmethod
+    def _deliver_loop(subscription: Subscription, handler: Callable[[List[Event]], None], batch_size: int, linger: float):
+        """推送型订阅者的投递线程：处理失败只影响本批"""
+        while not subscription.closed:
+            batch = subscription.get_batch(batch_size, timeout=1, linger=linger)
+            if not batch:
+                continue
+            try:
+                handler(batch)
+            except Exception as e:
+                print(f"⚠️  事件订阅者 {subscription.name} 处理失败（{len(batch)}条）: {e}")
+                EVENT_BUS_EVENTS_TOTAL.inc(len(batch), subscriber=subscription.name, outcome="failed")
+
+    # ---------- 补发 ----------
+
+    def replay(self, since: int = 0, limit: int = 1000) -> List[Event]:
+        """
+        读取序号大于since的事件（优先内存，不够时读日志，跳过不含所需序号的轮转文件）
+
+        Args:
+            since: 起始序号（不含）
+            limit: 最多条数
+
+        Returns:
+            按序号排列的事件列表
+        """
+        with self._lock:
+            recent = list(self._recent)
+            last_seq = self._seq
+        # 内存覆盖所需范围（或不落盘）时直接返回；重启后内存为空，从日志读取
+        if not self.log_path or since >= last_seq or (recent and recent[0].seq <= since + 1):
+            return [event for event in recent if event.seq > since][:limit]
+
+        self.flush()
+        paths = self._log_files()
+        # 后一个文件的首条序号不超过since+1时，更早的文件不需要读
+        for i in range(len(paths) - 1, 0, -1):
+            first = self._first_logged_seq(paths[i])
+            if first is not None and first <= since + 1:
+                paths = paths[i:]
+                break
+
+        events = []
+        for path in paths:
+            try:
+                with open(path, encoding="utf-8") as f:
+                    for line in f:
+                        if not line.strip():
+                            continue
+                        event = Event.from_json(line)
+                        if event.seq > since:
+                            events.append(event)
+                            if len(events) >= limit:
+                                return events
+            except FileNotFoundError:
+                continue
+        return events
+
+    # ---------- SSE ----------
+
+    def sse_stream(
+        self,
+        since: Optional[int] = None,
+        maxsize: int = 1000,
+        heartbeat_seconds: float = 15
+    ) -> Iterator[str]:
+        """
+        SSE推送：先补发序号大于since的事件，再推送实时事件
+
+        since大于当前序号（服务重启且未落盘）时先产出reset事件，再从头补发。
+        生成器关闭（客户端断开）时取消订阅。
+
+        Args:
+            since: 客户端最后收到的序号（None表示不补发）
+            maxsize: 订阅队列上限（溢出时按股票+图形合并）
+            heartbeat_seconds: 无新事件时的心跳间隔
+
+        Returns:
+            SSE文本块迭代器
+        """
+        # 先订阅再补发，补发过的事件在实时推送中跳过
+        subscription = self.subscribe("sse", maxsize=maxsize, policy=Subscription.COALESCE)
+        try:
+            # 只跳过实际补发过的事件
+            replayed_until = 0
+            if since is not None:
+                cursor = since
+                last_seq = self.last_seq
+                if cursor > last_seq:
+                    yield f"event: reset\ndata: {json.dumps({'last_seq': last_seq})}\n\n"
+                    cursor = 0
+                # 分批补发到订阅时的最新序号，之后的事件由订阅队列推送
+                while cursor < last_seq:
+                    events = self.replay(cursor)
+                    if not events:
+                        break
+                    for event in events:
+                        cursor = replayed_until = event.seq
+                        yield _format_sse(event)
+
+            while True:
+                batch = subscription.get_batch(100, timeout=heartbeat_seconds)
+                if not batch:
+                    yield ": heartbeat\n\n"
+                    continue
+                for event in batch:
+                    if event.seq > replayed_until:
+                        yield _format_sse(event)
+        finally:
+            self.unsubscribe(subscription)
+
+    # ---------- 日志 ----------
+
+    def _log_files(self) -> List[str]:
+        """现有的日志文件（轮转文件在前）"""
+        return [path for path in (self.log_path + ".1", self.log_path) if os.path.exists(path)]
+
+    @staticmethod
+    def _first_logged_seq(path: str) -> Optional[int]:
+        """读取日志第一条的序号（文件不存在或为空返回None）"""
+        try:
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        return int(json.loads(line)["seq"])
+        except (OSError, ValueError, KeyError):
+            pass
+        return None
+
+    def _last_logged_seq(self) -> int:
+        """读取已有日志最后一条的序号（当前文件刚轮转为空时读轮转文件）"""
+        for path in reversed(self._log_files()):
+            with open(path, "rb") as f:
+                f.seek(0, os.SEEK_END)
+                size = f.tell()
+                f.seek(max(0, size - 65536))
+                lines = [line for line in f.read().splitlines() if line.strip()]
+            for line in reversed(lines):
+                try:
+                    return int(json.loads(line)["seq"])
+                except (ValueError, KeyError):
+                    continue
+        return 0
+
+    def _writer_loop(self):
+        """后台写入线程：攒批后一次写入，超过大小上限时轮转"""
+        f = open(self.log_path, "a", encoding="utf-8")
+        try:
+            while True:
+                try:
+                    item = self._log_queue.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    continue
+
+                batch = [item]
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._log_queue.get_nowait())
+                    except queue.Empty:
+                        break
+
+                stop = False
+                lines = []
+                for entry in batch:
+                    if entry is None:
+                        stop = True
+                    elif isinstance(entry, threading.Event):
+                        continue
+                    else:
+                        lines.append(entry.to_json() + "\n")
+                if lines:
+                    f.writelines(lines)
+                    f.flush()
+                    self.log_written += len(lines)
+                    if self.max_log_bytes and f.tell() >= self.max_log_bytes:
+                        f.close()
+                        os.replace(self.log_path, self.log_path + ".1")
+                        f = open(self.log_path, "a", encoding="utf-8")
+                for entry in batch:
+                    if isinstance(entry, threading.Event):
+                        entry.set()
+                if stop:
+                    return
+        finally:
+            f.close()
+
+    def flush(self, timeout: float = 5):
+        """等待已发布的事件写入日志"""
+        if self._log_queue is None:
+            return
+        done = threading.Event()
+        self._log_queue.put(done)
+        done.wait(timeout)
+
+    def close(self):
+        """停止投递线程，写完剩余日志"""
+        with self._lock:
+            subscribers = list(self._subscribers)
+            self._subscribers.clear()
+        for subscription in subscribers:
+            subscription.close()
+        for worker in self._workers:
+            worker.join(2)
+        if self._log_queue is not None:
+            self._log_queue.put(None)
+            self._writer_thread.join()
+
+    def stats(self) -> Dict[str, Any]:
+        """总线统计"""
+        with self._lock:
+            subscribers = list(self._subscribers)
+        return {
+            "published": self.published,
+            "last_seq": self._seq,
+            "log_written": self.log_written,
+            "subscribers": [{"name": s.name, **s.stats()} for s in subscribers],
+        }
+
+
+class FileSink:
+    """文件订阅者：每批追加为JSON行"""
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+
+    def __call__(self, batch: List[Event]):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.writelines(event.to_json() + "\n" for event in batch)
+
+
+class WebhookSink:
+    """Webhook订阅者：每批POST一次 {"events": [...]}"""
+
+    def __init__(self, url: str, timeout: float = 5):
+        self.url = url
+        self.timeout = timeout
+        self.session = InstrumentedSession("event_webhook")
+
+    def __call__(self, batch: List[Event]):
+        body = '{"sent_at":"%s","events":[%s]}' % (
+            datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            ",".join(event.to_json() for event in batch)
+        )
+        response = self.session.post(
+            self.url,
+            data=body.encode("utf-8"),
+            headers={"Content-Type": "application/json; charset=utf-8"},
+            timeout=self.timeout
+        )
+        response.raise_for_status()
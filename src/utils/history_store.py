@@ -0,0 +1,416 @@
+"""
+分析历史存储
+使用SQLite（WAL模式）持久化AI分析、监控触发事件和行情快照，写入在后台线程批量提交
+"""
+
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+
+_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS analyses (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        stock_code TEXT NOT NULL,
+        stock_name TEXT,
+        pattern_type TEXT NOT NULL,
+        cache_key TEXT,
+        analysis TEXT NOT NULL,
+        suggestion TEXT,
+        created_at REAL NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_analyses_code_time ON analyses (stock_code, created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_analyses_pattern_time ON analyses (pattern_type, created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_analyses_key_time ON analyses (cache_key, created_at)",
+    """CREATE TABLE IF NOT EXISTS triggers (
+        event_id TEXT PRIMARY KEY,
+        stock_code TEXT NOT NULL,
+        stock_name TEXT,
+        pattern_type TEXT NOT NULL,
+        market_data TEXT,
+        analysis TEXT,
+        created_at REAL NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_triggers_code_time ON triggers (stock_code, created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_triggers_pattern_time ON triggers (pattern_type, created_at)",
+    """CREATE TABLE IF NOT EXISTS snapshots (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        stock_code TEXT NOT NULL,
+        price REAL,
+        data TEXT NOT NULL,
+        created_at REAL NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_snapshots_code_time ON snapshots (stock_code, created_at)",
+]
+
+_INSERTS = {
+    "analyses": (
+        "INSERT INTO analyses (stock_code, stock_name, pattern_type, cache_key, analysis, suggestion, created_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)"
+    ),
+    "triggers": (
+        "INSERT OR REPLACE INTO triggers (event_id, stock_code, stock_name, pattern_type, market_data, analysis, created_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)"
+    ),
+    "snapshots": (
+        "INSERT INTO snapshots (stock_code, price, data, created_at) VALUES (?, ?, ?, ?)"
+    ),
+}
+
+
+def _dumps(value: Any) -> Optional[str]:
+    """序列化为JSON文本（None保持为NULL）"""
+    if value is None:
+        return None
+    return json.dumps(value, ensure_ascii=False, default=str)
+
+
+def _format_time(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def parse_since(value: Optional[str]) -> Optional[float]:
+    """
+    解析查询起始时间
+
+    Args:
+        value: 时间戳，或 YYYY-MM-DD / YYYY-MM-DD HH:MM:SS 格式的字符串
+
+    Returns:
+        时间戳（无法解析或为空返回None）
+    """
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        return None
+
+
+class HistoryStore:
+    """
+    分析历史存储
+
+    写入方法只把记录放入队列并立即返回，后台线程按批次在一个事务内提交；
+    WAL模式下查询不会被写入阻塞，多个进程/Worker可以共享同一个数据库文件。
+    行情快照只保留最近snapshot_retention_days天，由写入线程定期清理。
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        batch_size: int = 200,
+        flush_interval: float = 1.0,
+        max_queue: int = 10000,
+        snapshot_retention_days: float = 7,
+        prune_interval: float = 3600
+    ):
+        """
+        初始化历史存储
+
+        Args:
+            db_path: SQLite文件路径
+            batch_size: 每个事务最多提交的记录数
+            flush_interval: 队列为空时最长等待多久提交一次（秒）
+            max_queue: 写入队列上限（写满时丢弃新记录，不阻塞请求）
+            snapshot_retention_days: 行情快照保留天数（0表示不清理）
+            prune_interval: 清理过期快照的间隔（秒）
+        """
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.snapshot_retention_days = snapshot_retention_days
+        self.prune_interval = prune_interval
+        self.dropped = 0
+        self.pruned = 0
+        self._queue: "queue.Queue[Optional[Tuple[str, tuple]]]" = queue.Queue(maxsize=max_queue)
+        self._read_lock = threading.Lock()
+
+        self._reader = self._connect()
+        for statement in _SCHEMA:
+            self._reader.execute(statement)
+        self._reader.commit()
+
+        self._writer_thread = threading.Thread(target=self._writer_loop, name="history-writer", daemon=True)
+        self._writer_thread.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    # ---------- 写入 ----------
+
+    def _enqueue(self, table: str, row: tuple):
+        try:
+            self._queue.put_nowait((table, row))
+        except queue.Full:
+            self.dropped += 1
+
+    def record_analysis(
+        self,
+        stock_code: str,
+        pattern_type: str,
+        analysis: str,
+        suggestion: Optional[Dict[str, Any]] = None,
+        stock_name: str = "",
+        cache_key: Optional[str] = None
+    ):
+        """
+        记录一次AI分析
+
+        Args:
+            stock_code: 股票代码
+            pattern_type: 图形类型
+            analysis: AI分析文本
+            suggestion: 操作建议（字典）
+            stock_name: 股票名称
+            cache_key: 分析结果缓存键（用于跨进程复用）
+        """
+        self._enqueue("analyses", (
+            stock_code, stock_name, pattern_type, cache_key, analysis, _dumps(suggestion), time.time()
+        ))
+
+    def record_trigger(self, trigger):
+        """
+        记录监控触发事件
+
+        Args:
+            trigger: MonitorTrigger对象
+        """
+        analysis = trigger.AIGC分析结果.原始回复 if trigger.AIGC分析结果 else None
+        self._enqueue("triggers", (
+            trigger.事件ID,
+            trigger.股票代码,
+            trigger.股票名称,
+            trigger.图形类型,
+            _dumps(trigger.市场数据.to_dict()),
+            analysis,
+            trigger.触发时间.timestamp()
+        ))
+
+    def record_snapshot(self, stock_code: str, data: Dict[str, Any]):
+        """
+        记录行情快照
+
+        Args:
+            stock_code: 股票代码
+            data: 实时行情字典
+        """
+        self._enqueue("snapshots", (stock_code, data.get("实时价"), _dumps(data), time.time()))
+
+    def _prune_due(self, conn: sqlite3.Connection, next_prune: float) -> float:
+        """到期时删除过期的行情快照（在写入线程中调用），返回下次清理时间"""
+        now = time.time()
+        if not self.snapshot_retention_days or now < next_prune:
+            return next_prune
+        cursor = conn.execute(
+            "DELETE FROM snapshots WHERE created_at < ?", (now - self.snapshot_retention_days * 86400,)
+        )
+        self.pruned += max(cursor.rowcount, 0)
+        return now + self.prune_interval
+
+    def _writer_loop(self):
+        """后台写入线程：攒批后在一个事务内提交，并定期清理过期快照"""
+        conn = self._connect()
+        next_prune = 0.0
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                try:
+                    with conn:
+                        next_prune = self._prune_due(conn, next_prune)
+                except sqlite3.Error as e:
+                    print(f"⚠️  历史快照清理失败: {e}")
+                continue
+
+            batch = [item]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = None in batch
+            grouped: Dict[str, List[tuple]] = {}
+            for entry in batch:
+                if entry is not None:
+                    grouped.setdefault(entry[0], []).append(entry[1])
+
+            try:
+                with conn:
+                    for table, rows in grouped.items():
+                        conn.executemany(_INSERTS[table], rows)
+                    next_prune = self._prune_due(conn, next_prune)
+            except sqlite3.Error as e:
+                print(f"⚠️  历史记录写入失败: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+            if stop:
+                conn.close()
+                return
+
+    def flush(self):
+        """等待队列中的记录全部写入"""
+        self._queue.join()
+
+    def close(self):
+        """写完剩余记录后关闭"""
+        self._queue.put(None)
+        self._writer_thread.join()
+        with self._read_lock:
+            self._reader.close()
+
+    # ---------- 查询 ----------
+
+    def _query(self, sql: str, params: tuple) -> List[sqlite3.Row]:
+        with self._read_lock:
+            self._reader.row_factory = sqlite3.Row
+            return self._reader.execute(sql, params).fetchall()
+
+    @staticmethod
+    def _where(stock_code: Optional[str], pattern_type: Optional[str], since: Optional[float]) -> Tuple[str, list]:
+        clauses, params = [], []
+        if stock_code:
+            clauses.append("stock_code = ?")
+            params.append(stock_code)
+        if pattern_type:
+            clauses.append("pattern_type = ?")
+            params.append(pattern_type)
+        if since is not None:
+            clauses.append("created_at >= ?")
+            params.append(since)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def query_analyses(
+        self,
+        stock_code: Optional[str] = None,
+        pattern_type: Optional[str] = None,
+        since: Optional[float] = None,
+        limit: int = 50
+    ) -> List[Dict[str, Any]]:
+        """
+        查询AI分析历史（按时间倒序）
+
+        Args:
+            stock_code: 股票代码
+            pattern_type: 图形类型
+            since: 起始时间戳
+            limit: 最多返回条数
+
+        Returns:
+            分析记录列表
+        """
+        where, params = self._where(stock_code, pattern_type, since)
+        rows = self._query(
+            f"SELECT stock_code, stock_name, pattern_type, analysis, suggestion, created_at FROM analyses"
+            f"{where} ORDER BY created_at DESC LIMIT ?",
+            tuple(params) + (limit,)
+        )
+        return [{
+            "stock_code": row["stock_code"],
+            "stock_name": row["stock_name"],
+            "pattern_type": row["pattern_type"],
+            "analysis": row["analysis"],
+            "operation_suggestion": json.loads(row["suggestion"]) if row["suggestion"] else None,
+            "created_at": _format_time(row["created_at"])
+        } for row in rows]
+
+    def query_triggers(
+        self,
+        stock_code: Optional[str] = None,
+        pattern_type: Optional[str] = None,
+        since: Optional[float] = None,
+        limit: int = 50
+    ) -> List[Dict[str, Any]]:
+        """
+        查询监控触发事件（按时间倒序）
+
+        Args:
+            stock_code: 股票代码
+            pattern_type: 图形类型
+            since: 起始时间戳
+            limit: 最多返回条数
+
+        Returns:
+            触发事件列表
+        """
+        where, params = self._where(stock_code, pattern_type, since)
+        rows = self._query(
+            f"SELECT event_id, stock_code, stock_name, pattern_type, market_data, analysis, created_at FROM triggers"
+            f"{where} ORDER BY created_at DESC LIMIT ?",
+            tuple(params) + (limit,)
+        )
+        return [{
+            "event_id": row["event_id"],
+            "stock_code": row["stock_code"],
+            "stock_name": row["stock_name"],
+            "pattern_type": row["pattern_type"],
+            "market_data": json.loads(row["market_data"]) if row["market_data"] else None,
+            "analysis": row["analysis"],
+            "created_at": _format_time(row["created_at"])
+        } for row in rows]
+
+    def query_snapshots(
+        self,
+        stock_code: str,
+        since: Optional[float] = None,
+        limit: int = 240
+    ) -> List[Dict[str, Any]]:
+        """
+        查询行情快照（按时间倒序）
+
+        Args:
+            stock_code: 股票代码
+            since: 起始时间戳
+            limit: 最多返回条数
+
+        Returns:
+            快照列表
+        """
+        where, params = self._where(stock_code, None, since)
+        rows = self._query(
+            f"SELECT stock_code, price, data, created_at FROM snapshots{where} ORDER BY created_at DESC LIMIT ?",
+            tuple(params) + (limit,)
+        )
+        return [{
+            "stock_code": row["stock_code"],
+            "price": row["price"],
+            "data": json.loads(row["data"]),
+            "created_at": _format_time(row["created_at"])
+        } for row in rows]
+
+    def find_recent_analysis(self, cache_key: str, max_age_seconds: float) -> Optional[str]:
+        """
+        查找仍然有效的最近一次分析（同一缓存键且未超过有效期）
+
+        Args:
+            cache_key: 分析结果缓存键
+            max_age_seconds: 有效期（秒）
+
+        Returns:
+            分析文本；没有有效记录返回None
+        """
+        rows = self._query(
+            "SELECT analysis FROM analyses WHERE cache_key = ? AND created_at >= ? "
+            "ORDER BY created_at DESC LIMIT 1",
+            (cache_key, time.time() - max_age_seconds)
+        )
+        return rows[0]["analysis"] if rows else None
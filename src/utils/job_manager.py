@@ -0,0 +1,222 @@
+"""
+异步分析任务管理器
+批量分析提交后立即返回任务ID，在后台有界线程池中逐只执行，结果可轮询或流式推送
+"""
+
+import asyncio
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+
+
+class AnalysisJob:
+    """分析任务"""
+
+    PENDING = "pending"
+    RUNNING = "running"
+    FINISHED = "finished"
+    FAILED = "failed"
+
+    def __init__(
+        self,
+        stock_codes: List[str],
+        runner: Optional[Callable[[str], Awaitable[Dict[str, Any]]]] = None
+    ):
+        """
+        初始化分析任务
+
+        Args:
+            stock_codes: 待分析的股票代码列表
+            runner: 该任务专用的分析函数（None表示使用管理器默认的分析函数）
+        """
+        self.job_id = uuid.uuid4().hex
+        self.stock_codes = list(stock_codes)
+        self.runner = runner
+        self.status = self.PENDING
+        self.results: List[Dict[str, Any]] = []
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+
+    @property
+    def done(self) -> bool:
+        """任务是否已结束"""
+        return self.status in (self.FINISHED, self.FAILED)
+
+    def to_dict(self, since: int = 0) -> Dict[str, Any]:
+        """
+        转换为字典格式
+
+        Args:
+            since: 只返回该序号之后的结果（用于增量轮询）
+        """
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "total": len(self.stock_codes),
+            "completed": len(self.results),
+            "results": self.results[since:],
+            "next_since": len(self.results),
+            "error": self.error,
+            "created_at": datetime.fromtimestamp(self.created_at).strftime("%Y-%m-%d %H:%M:%S"),
+            "finished_at": (
+                datetime.fromtimestamp(self.finished_at).strftime("%Y-%m-%d %H:%M:%S")
+                if self.finished_at else None
+            )
+        }
+
+
+class AnalysisJobManager:
+    """
+    分析任务管理器
+
+    任务在独立的有界线程池中运行，不占用Web服务的请求线程；
+    已结束的任务在保留期内可查询，过期后自动清理。
+    """
+
+    def __init__(
+        self,
+        runner: Callable[[str], Awaitable[Dict[str, Any]]],
+        max_workers: int = 2,
+        retention_seconds: int = 1800
+    ):
+        """
+        初始化任务管理器
+
+        Args:
+            runner: 单只股票的异步分析函数
+            max_workers: 后台线程数（同时运行的任务数）
+            retention_seconds: 已结束任务的保留时长（秒）
+        """
+        self.runner = runner
+        self.retention_seconds = retention_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="analysis-job")
+        self._jobs: Dict[str, AnalysisJob] = {}
+        self._cond = threading.Condition()
+
+    def submit(
+        self,
+        stock_codes: List[str],
+        runner: Optional[Callable[[str], Awaitable[Dict[str, Any]]]] = None
+    ) -> AnalysisJob:
+        """
+        提交批量分析任务
+
+        Args:
+            stock_codes: 股票代码列表
+            runner: 该任务专用的分析函数（可携带已获取的行情等上下文，None表示使用默认函数）
+
+        Returns:
+            新建的任务对象
+        """
+        self._purge_expired()
+
+        job = AnalysisJob(stock_codes, runner)
+        with self._cond:
+            self._jobs[job.job_id] = job
+        self._executor.submit(self._run_job, job)
+        return job
+
+    def get(self, job_id: str) -> Optional[AnalysisJob]:
+        """获取任务（不存在或已过期返回None）"""
+        self._purge_expired()
+        with self._cond:
+            return self._jobs.get(job_id)
+
+    def snapshot(self, job_id: str, since: int = 0) -> Optional[Dict[str, Any]]:
+        """在锁内生成任务快照，避免读到执行中的半更新状态"""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            return job.to_dict(since) if job else None
+
+    def iter_events(
+        self,
+        job_id: str,
+        since: int = 0,
+        heartbeat_seconds: float = 15
+    ) -> Iterator[Tuple[str, Any]]:
+        """
+        逐条产出任务事件，直到任务结束
+
+        Args:
+            job_id: 任务ID
+            since: 从第几条结果开始
+            heartbeat_seconds: 无新结果时的心跳间隔
+
+        Yields:
+            (事件类型, 数据)：result / heartbeat / done
+        """
+        cursor = since
+        while True:
+            with self._cond:
+                job = self._jobs.get(job_id)
+                if job is None:
+                    return
+                if cursor >= len(job.results) and not job.done:
+                    self._cond.wait(timeout=heartbeat_seconds)
+                new_results = job.results[cursor:]
+                finished = job.done and cursor + len(new_results) >= len(job.results)
+                summary = job.to_dict(len(job.results)) if finished else None
+
+            if not new_results and not finished:
+                yield "heartbeat", None
+                continue
+
+            for result in new_results:
+                yield "result", {"index": cursor, "result": result}
+                cursor += 1
+
+            if finished:
+                yield "done", summary
+                return
+
+    def _run_job(self, job: AnalysisJob):
+        """在后台线程中执行任务"""
+        with self._cond:
+            job.status = AnalysisJob.RUNNING
+            self._cond.notify_all()
+
+        runner = job.runner or self.runner
+        loop = asyncio.new_event_loop()
+        # SystemExit/KeyboardInterrupt等不会进入except，任务也要以失败结束，不让订阅者一直等待
+        status, error = AnalysisJob.FAILED, "interrupted"
+        try:
+            for stock_code in job.stock_codes:
+                try:
+                    result = loop.run_until_complete(runner(stock_code))
+                except Exception as e:
+                    result = {"success": False, "error": f"分析失败: {str(e)}"}
+                result.setdefault("stock_code", stock_code)
+
+                with self._cond:
+                    job.results.append(result)
+                    self._cond.notify_all()
+
+            status, error = AnalysisJob.FINISHED, None
+        except Exception as e:
+            status, error = AnalysisJob.FAILED, str(e)
+        finally:
+            loop.close()
+            with self._cond:
+                job.status = status
+                job.error = error
+                job.finished_at = time.time()
+                self._cond.notify_all()
+
+    def _purge_expired(self):
+        """清理超过保留期的已结束任务"""
+        now = time.time()
+        with self._cond:
+            expired = [
+                job_id for job_id, job in self._jobs.items()
+                if job.finished_at and now - job.finished_at > self.retention_seconds
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+    def shutdown(self, wait: bool = False):
+        """关闭后台线程池"""
+        self._executor.shutdown(wait=wait)
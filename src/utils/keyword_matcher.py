@@ -0,0 +1,160 @@
+"""
+多关键词匹配器（Aho-Corasick自动机）
+关键词集合构建一次，之后每段文本只需从头到尾扫描一遍即可找出全部命中的关键词，
+与关键词数量无关；用于股票名称的概念判断和新闻标题打标签
+"""
+
+from collections import deque
+from functools import lru_cache
+from typing import Dict, Iterable, List, Mapping, Sequence, Tuple
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick多关键词匹配器
+
+    匹配语义与逐个关键词做 `keyword in text` 一致（包括互相包含的关键词，
+    如"智能"和"人工智能"同时命中），命中结果按关键词定义顺序返回。
+    """
+
+    def __init__(self, keywords: Iterable[str], memo_size: int = 0):
+        """
+        Args:
+            keywords: 关键词（重复的只保留第一次出现）
+            memo_size: 按文本缓存匹配结果的条数（股票名称几乎不变，适合缓存；0表示不缓存）
+        """
+        self.keywords: Tuple[str, ...] = tuple(dict.fromkeys(k for k in keywords if k))
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[Tuple[int, ...]] = [()]
+        self._build()
+        if memo_size:
+            self.match = lru_cache(maxsize=memo_size)(self.match)
+
+    def _build(self):
+        """构建字典树、失败指针，并把失败链上的输出合并到每个状态"""
+        for index, keyword in enumerate(self.keywords):
+            state = 0
+            for char in keyword:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append(())
+                state = next_state
+            self._output[state] += (index,)
+
+        # 按层次遍历，子状态的失败指针由父状态的失败链推出
+        # （第一层状态的失败指针都指向根）
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self._goto[state].items():
+                queue.append(child)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                self._output[child] += self._output[self._fail[child]]
+
+        # 展开为确定性转移表：每个状态对关键词中出现过的每个字符都有直接转移，
+        # 匹配时每个字符只查一次表，不再沿失败指针回退；未出现过的字符回到根
+        alphabet = set(self._goto[0]) | {char for edges in self._goto for char in edges}
+        self._delta: List[Dict[str, int]] = [{} for _ in self._goto]
+        for state in self._bfs_order():
+            for char in alphabet:
+                if char in self._goto[state]:
+                    target = self._goto[state][char]
+                elif state:
+                    target = self._delta[self._fail[state]].get(char, 0)
+                else:
+                    target = 0
+                if target:
+                    self._delta[state][char] = target
+
+    def _bfs_order(self) -> List[int]:
+        """按层次遍历的状态顺序（失败指针总是指向更浅的状态）"""
+        order = [0]
+        for state in order:
+            order.extend(self._goto[state].values())
+        return order
+
+    def match(self, text: str) -> Tuple[str, ...]:
+        """
+        扫描一遍文本，返回命中的关键词
+
+        Args:
+            text: 待匹配文本
+
+        Returns:
+            命中的关键词（去重，按关键词定义顺序）
+        """
+        if not text:
+            return ()
+        delta, output = self._delta, self._output
+        found = set()
+        state = 0
+        for char in text:
+            state = delta[state].get(char, 0)
+            if output[state]:
+                found.update(output[state])
+        return tuple(self.keywords[i] for i in sorted(found))
+
+
+class WeightedKeywordMatcher(KeywordMatcher):
+    """带分值的关键词匹配器：返回命中关键词和总分"""
+
+    def __init__(self, weights: Mapping[str, int], memo_size: int = 0):
+        """
+        Args:
+            weights: 关键词 -> 分值
+            memo_size: 按文本缓存匹配结果的条数
+        """
+        self.weights = dict(weights)
+        super().__init__(self.weights, memo_size=0)
+        if memo_size:
+            self.score = lru_cache(maxsize=memo_size)(self.score)
+
+    def score(self, text: str) -> Tuple[int, Tuple[str, ...]]:
+        """
+        Args:
+            text: 待匹配文本
+
+        Returns:
+            (命中关键词总分, 命中的关键词)
+        """
+        matched = self.match(text)
+        return sum(self.weights[keyword] for keyword in matched), matched
+
+
+class TagMatcher:
+    """标签匹配器：每个标签对应一组关键词，命中任一关键词即打上该标签"""
+
+    def __init__(self, tag_keywords: Mapping[str, Sequence[str]], memo_size: int = 0):
+        """
+        Args:
+            tag_keywords: 标签 -> 关键词列表
+            memo_size: 按文本缓存匹配结果的条数
+        """
+        self.tags: Tuple[str, ...] = tuple(tag_keywords)
+        keyword_tags: Dict[str, List[int]] = {}
+        for index, keywords in enumerate(tag_keywords.values()):
+            for keyword in keywords:
+                keyword_tags.setdefault(keyword, []).append(index)
+        self._keyword_tags = keyword_tags
+        self._matcher = KeywordMatcher(keyword_tags)
+        if memo_size:
+            self.match = lru_cache(maxsize=memo_size)(self.match)
+
+    def match(self, text: str) -> Tuple[str, ...]:
+        """
+        Args:
+            text: 待匹配文本
+
+        Returns:
+            命中的标签（按标签定义顺序）
+        """
+        indices = {i for keyword in self._matcher.match(text) for i in self._keyword_tags[keyword]}
+        return tuple(self.tags[i] for i in sorted(indices))
@@ -0,0 +1,324 @@
+"""
+运行指标采集模块
+记录接口耗时、上游数据源调用、AI模型调用和缓存命中情况，输出Prometheus文本格式
+"""
+
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+
+
+# 默认耗时分桶（秒），覆盖从毫秒级行情接口到数十秒的模型调用
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+    """转义标签值"""
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    """格式化标签为 {a="x",b="y"}"""
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    """计数器"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        """计数加一（或加指定值）"""
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        """读取当前值"""
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            return self._values.get(key, 0)
+
+    def render(self) -> List[str]:
+        """输出Prometheus文本格式"""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram:
+    """直方图（累积分桶）"""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # 每组标签：[各分桶计数..., 总和, 总数]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        """记录一次观测值"""
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = [0] * (len(self.buckets) + 2)
+                self._values[key] = series
+            for i, upper in enumerate(self.buckets):
+                if value <= upper:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def stats(self, **labels) -> Tuple[int, float]:
+        """读取(次数, 总耗时)"""
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            series = self._values.get(key)
+            return (int(series[-1]), series[-2]) if series else (0, 0.0)
+
+    def render(self) -> List[str]:
+        """输出Prometheus文本格式"""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._values.items()):
+                for i, upper in enumerate(self.buckets):
+                    labels = _format_labels(self.labelnames, key, f'le="{upper}"')
+                    lines.append(f"{self.name}_bucket{labels} {series[i]}")
+                labels = _format_labels(self.labelnames, key, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{labels} {series[-1]}")
+                plain = _format_labels(self.labelnames, key)
+                lines.append(f"{self.name}_sum{plain} {round(series[-2], 6)}")
+                lines.append(f"{self.name}_count{plain} {series[-1]}")
+        return lines
+
+
+class MetricsRegistry:
+    """指标注册表"""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        """注册（或获取已有的）计数器"""
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        """注册（或获取已有的）直方图"""
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """输出全部指标"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "http_request_duration_seconds",
+    "Web接口处理耗时",
+    ("route", "method", "status")
+)
+
+UPSTREAM_REQUEST_SECONDS = REGISTRY.histogram(
+    "upstream_request_duration_seconds",
+    "上游数据源HTTP调用耗时",
+    ("collector", "operation", "host", "status")
+)
+
+LLM_REQUEST_SECONDS = REGISTRY.histogram(
+    "llm_request_duration_seconds",
+    "AI模型调用耗时（status: ok / error / cancelled流式调用被消费方中断）",
+    ("provider", "model", "status")
+)
+
+LLM_FIRST_TOKEN_SECONDS = REGISTRY.histogram(
+    "llm_first_token_seconds",
+    "流式调用首个Token到达耗时",
+    ("provider", "model")
+)
+
+LLM_HEDGE_REQUESTS = REGISTRY.counter(
+    "llm_hedge_requests_total",
+    "对冲调用次数（outcome: primary_only未触发对冲 / hedged已发出备用请求）",
+    ("primary", "secondary", "outcome")
+)
+
+LLM_HEDGE_WINS = REGISTRY.counter(
+    "llm_hedge_wins_total",
+    "触发对冲后率先返回的一方",
+    ("primary", "secondary", "winner")
+)
+
+LLM_DEGRADATION_DECISIONS = REGISTRY.counter(
+    "llm_degradation_decisions_total",
+    "分析请求的AI调用决策（call同步调用 / defer先返回规则建议 / skip跳过AI）",
+    ("decision",)
+)
+
+LLM_CLIENTS_CREATED = REGISTRY.counter(
+    "llm_clients_created_total",
+    "AI模型SDK客户端创建次数（连接复用时应保持不变）",
+    ("provider",)
+)
+
+MARKET_SCAN_SECONDS = REGISTRY.histogram(
+    "market_scan_duration_seconds",
+    "全市场扫描各阶段耗时（stage: fetch拉取快照 / screen向量化筛选）",
+    ("stage",)
+)
+
+MONITOR_CYCLE_SECONDS = REGISTRY.histogram(
+    "monitor_cycle_duration_seconds",
+    "持续监控每轮各阶段耗时（stage: context市场环境 / detect采集+规则评估 / analyze新触发的AI分析 / total整轮）",
+    ("stage",)
+)
+
+MONITOR_CYCLE_LAG_SECONDS = REGISTRY.histogram(
+    "monitor_cycle_lag_seconds",
+    "持续监控每轮实际开始时间相对计划时间的延迟"
+)
+
+MONITOR_TRIGGERS_TOTAL = REGISTRY.counter(
+    "monitor_triggers_total",
+    "持续监控的图形状态变化（transition: triggered新触发 / cleared解除）",
+    ("pattern", "transition")
+)
+
+EVENT_BUS_EVENTS_TOTAL = REGISTRY.counter(
+    "event_bus_events_total",
+    "事件总线各订阅者的入队结果（outcome: queued / coalesced合并 / dropped丢弃 / failed处理失败）",
+    ("subscriber", "outcome")
+)
+
+CACHE_REQUESTS_TOTAL = REGISTRY.counter(
+    "cache_requests_total",
+    "缓存/请求合并查询次数",
+    ("cache", "result")
+)
+
+
+def record_cache(cache: str, hit: bool):
+    """记录一次缓存查询结果"""
+    CACHE_REQUESTS_TOTAL.inc(cache=cache, result="hit" if hit else "miss")
+
+
+def cache_hit_ratio(cache: str) -> float:
+    """计算缓存命中率"""
+    hits = CACHE_REQUESTS_TOTAL.value(cache=cache, result="hit")
+    misses = CACHE_REQUESTS_TOTAL.value(cache=cache, result="miss")
+    total = hits + misses
+    return hits / total if total else 0.0
+
+
+@contextmanager
+def observe_llm(provider: str, model: Optional[str]):
+    """
+    记录一次AI模型调用的耗时
+
+    status为ok / error；包裹流式生成器时，消费方提前关闭（如SSE客户端断开）记为cancelled。
+
+    Example:
+        >>> with observe_llm("zhipu", "glm-4-flash"):
+        ...     response = client.chat.completions.create(...)
+    """
+    start = time.perf_counter()
+    status = "ok"
+    try:
+        yield
+    except GeneratorExit:
+        status = "cancelled"
+        raise
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        LLM_REQUEST_SECONDS.observe(time.perf_counter() - start, provider=provider, model=model or "", status=status)
+
+
+def _caller_operation() -> str:
+    """找到发起HTTP调用的采集器方法名（跳过requests内部栈帧）"""
+    frame = sys._getframe(1)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if not (module.startswith("requests") or module == __name__):
+            return frame.f_code.co_name
+        frame = frame.f_back
+    return "unknown"
+
+
+class InstrumentedSession(requests.Session):
+    """
+    带耗时统计的requests会话
+
+    用法与requests.Session一致，每次请求按(采集器, 调用方法, 目标主机, 状态)记录耗时。
+    """
+
+    def __init__(self, collector: str):
+        """
+        Args:
+            collector: 采集器名称（指标标签）
+        """
+        super().__init__()
+        self.collector = collector
+
+    def request(self, method, url, *args, **kwargs):
+        operation = _caller_operation()
+        host = urlparse(url).netloc or "unknown"
+        start = time.perf_counter()
+        status = "error"
+        try:
+            response = super().request(method, url, *args, **kwargs)
+            status = str(response.status_code)
+            return response
+        finally:
+            UPSTREAM_REQUEST_SECONDS.observe(
+                time.perf_counter() - start,
+                collector=self.collector,
+                operation=operation,
+                host=host,
+                status=status
+            )
@@ -0,0 +1,126 @@
+"""
+请求合并器
+相同的进行中请求共享同一个结果，避免重复的行情获取和AI调用
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from .metrics import record_cache
+
+
+def minute_bucket(now: datetime = None) -> str:
+    """
+    获取分钟时间桶，用于构造合并键
+
+    Args:
+        now: 时间（默认当前时间）
+
+    Returns:
+        格式为YYYYMMDDHHMM的字符串
+    """
+    return (now or datetime.now()).strftime("%Y%m%d%H%M")
+
+
+class RequestCoalescer:
+    """
+    进行中请求注册表
+
+    同一个键的并发调用只会真正执行一次，其余调用等待并共享第一次调用的结果。
+    请求完成后立即从注册表移除，因此这里只合并并发请求，不做结果缓存。
+
+    Flask每个请求线程都有自己的事件循环，所以共享对象使用线程安全的
+    concurrent.futures.Future，异步调用方通过asyncio.wrap_future等待。
+    """
+
+    def __init__(self, name: str = "coalescer"):
+        """
+        初始化请求合并器
+
+        Args:
+            name: 名称（用于命中率指标）
+        """
+        self.name = name
+        self._lock = threading.Lock()
+        self._inflight: Dict[Hashable, Future] = {}
+        self.stats = {"leader": 0, "shared": 0}
+
+    def _acquire(self, key: Hashable):
+        """获取键对应的Future，返回(future, 是否为首个调用方)"""
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self.stats["shared"] += 1
+                record_cache(self.name, hit=True)
+                return future, False
+
+            future = Future()
+            self._inflight[key] = future
+            self.stats["leader"] += 1
+            record_cache(self.name, hit=False)
+            return future, True
+
+    def _release(self, key: Hashable, future: Future):
+        """请求完成，移出注册表"""
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def run(self, key: Hashable, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        同步执行（或等待）请求
+
+        Args:
+            key: 合并键
+            func: 实际执行的函数
+            *args, **kwargs: 函数参数
+
+        Returns:
+            函数执行结果（异常同样会传递给所有等待方）
+        """
+        future, is_leader = self._acquire(key)
+        if not is_leader:
+            return future.result()
+
+        try:
+            result = func(*args, **kwargs)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            self._release(key, future)
+
+    async def run_async(self, key: Hashable, coro_factory: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        异步执行（或等待）请求
+
+        Args:
+            key: 合并键
+            coro_factory: 返回协程的工厂函数（只有首个调用方会调用）
+
+        Returns:
+            协程执行结果
+        """
+        future, is_leader = self._acquire(key)
+        if not is_leader:
+            return await asyncio.wrap_future(future)
+
+        try:
+            result = await coro_factory()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            self._release(key, future)
+
+    def inflight_count(self) -> int:
+        """当前进行中的请求数"""
+        with self._lock:
+            return len(self._inflight)
@@ -258,11 +258,6 @@ async def mode_batch_analysis():
                 skip_count += 1
                 print("(市场状态不适合图形分析，已跳过)")
 
-            # 避免API限流
-            if i < len(stock_codes):
-                print("\n等待3秒后分析下一只股票...")
-                await asyncio.sleep(3)
-
         print("\n" + "="*70)
         print("📊 批量分析完成")
         print("="*70)
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+批量采集测试
+验证批量检测只获取一次行情、每个板块/指数各一次且结果与逐只检测一致，
+以及腾讯批量行情中单只股票的字段异常不影响同批其他股票
+
+用法:
+    python test_batch_collection.py
+    python -m pytest test_batch_collection.py -q
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.aigc.model_adapter import AIGCService, MockAIGCAdapter
+from src.monitors.data_collector import MockDataCollector, StockDataAggregator
+from src.monitors.stock_monitor import PatternType, StockPatternMonitor
+from src.monitors.tencent_collector import TencentFinanceCollector
+
+CODES = ["600000", "000001", "600036", "601138", "688981", "300750", "600519"]
+PATTERNS = [PatternType.OPENING_DIVE, PatternType.BREAKDOWN_FALL, PatternType.SURGE_RETRACE]
+DETECT_KWARGS = {"开盘分钟数": 5, "成交额放大比例": 30, "破位后未回弹分钟数": 4, "trigger_time": "09:35"}
+
+
+class CountingCollector(MockDataCollector):
+    """统计各接口调用次数的模拟采集器"""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = {"stock": 0, "batch": 0, "sector": 0, "index": 0}
+
+    def get_stock_realtime_data(self, stock_code):
+        self.calls["stock"] += 1
+        return super().get_stock_realtime_data(stock_code)
+
+    def get_stocks_realtime_data(self, stock_codes):
+        self.calls["batch"] += 1
+        return super().get_stocks_realtime_data(stock_codes)
+
+    def get_sector_data(self, sector_name):
+        self.calls["sector"] += 1
+        return super().get_sector_data(sector_name)
+
+    def get_market_index_data(self, index_name="上证指数"):
+        self.calls["index"] += 1
+        return super().get_market_index_data(index_name)
+
+
+def make_monitor():
+    collector = CountingCollector()
+    monitor = StockPatternMonitor(StockDataAggregator(collector), AIGCService(MockAIGCAdapter()))
+    return monitor, collector
+
+
+def test_batch_detect_collects_once():
+    monitor, collector = make_monitor()
+    detected = monitor.batch_detect(CODES, PATTERNS, **DETECT_KWARGS)
+
+    sectors = {collector.mock_stocks[code]["板块名称"] for code in CODES}
+    assert collector.calls == {"stock": len(CODES), "batch": 1, "sector": len(sectors), "index": 2}
+    assert detected and all(event["触发规则"] for event in detected)
+
+
+def test_batch_detect_matches_per_stock_detect():
+    monitor, collector = make_monitor()
+    expected = [
+        (code, pattern_type.value)
+        for code in CODES for pattern_type in PATTERNS
+        if monitor.detect_pattern(code, pattern_type, **DETECT_KWARGS) is not None
+    ]
+    # 逐只检测每个图形都要重新获取行情
+    assert collector.calls["stock"] == len(CODES) * len(PATTERNS)
+
+    batch_monitor, _ = make_monitor()
+    detected = batch_monitor.batch_detect(CODES, PATTERNS, **DETECT_KWARGS)
+    assert [(event["股票代码"], event["图形类型"]) for event in detected] == expected
+
+
+def test_batch_skips_stocks_without_quotes():
+    class PartialCollector(CountingCollector):
+        def get_stock_realtime_data(self, stock_code):
+            return {} if stock_code == "600036" else super().get_stock_realtime_data(stock_code)
+
+    aggregator = StockDataAggregator(PartialCollector())
+    collected = aggregator.collect_batch_monitoring_data(CODES, ["开盘跳水"], "09:35")
+    assert "600036" not in collected and len(collected) == len(CODES) - 1
+
+
+class FakeResponse:
+    def __init__(self, text, status_code=200):
+        self.text = text
+        self.status_code = status_code
+        self.encoding = None
+
+
+class FakeSession:
+    def __init__(self, text):
+        self.text = text
+        self.urls = []
+
+    def get(self, url, timeout=None):
+        self.urls.append(url)
+        return FakeResponse(self.text)
+
+
+def quote_line(symbol, name, price, open_price="10.00"):
+    fields = [""] * 50
+    fields[1], fields[3], fields[4], fields[5] = name, price, "10.00", open_price
+    fields[33], fields[34], fields[36] = "10.50", "9.50", "1000"
+    return f'v_{symbol}="{"~".join(fields)}";'
+
+
+def test_tencent_batch_bad_row_isolated():
+    text = "\n".join([
+        quote_line("sh600000", "浦发银行", "10.20"),
+        quote_line("sz000001", "平安银行", "12.00", open_price="--"),  # 字段异常
+        'v_sh600036="1~招商银行";',                                    # 字段不足
+        'v_pv_none_match="1";',
+        quote_line("sh601138", "工业富联", "25.00"),
+    ])
+    collector = TencentFinanceCollector()
+    collector.session = FakeSession(text)
+    results = collector.get_stocks_realtime_data(["600000", "000001", "600036", "601138"])
+    assert sorted(results) == ["600000", "601138"]
+    assert results["600000"]["实时价"] == 10.2 and results["601138"]["股票名称"] == "工业富联"
+    assert len(collector.session.urls) == 1
+
+
+if __name__ == "__main__":
+    tests = [(name, func) for name, func in list(globals().items()) if name.startswith("test_") and callable(func)]
+    failed = 0
+    for name, func in tests:
+        try:
+            func()
+            print(f"✅ {name}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {name}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} 通过")
+    sys.exit(1 if failed else 0)
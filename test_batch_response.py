@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+批量AI分析回复拆分测试
+验证代码块包裹、顺序打乱、缺失/多余/格式错误的条目都能正确映射回每只股票
+
+用法:
+    python test_batch_response.py
+    python -m pytest test_batch_response.py -q
+"""
+
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.templates.prompt_templates import generate_batch_prompt, parse_batch_response
+
+CODES = ["600000", "000001", "300750"]
+
+
+def item(code, **fields):
+    data = {"股票代码": code, "判断结果": "真", "风险等级": "中", "操作建议": f"{code}观望"}
+    data.update(fields)
+    return data
+
+
+def test_reordered_items_in_code_block():
+    body = json.dumps([item("300750"), item("600000"), item("000001")], ensure_ascii=False)
+    text = f"分析如下：\n```json\n{body}\n```\n以上仅供参考"
+    parsed = parse_batch_response(text, CODES)
+    assert sorted(parsed) == sorted(CODES)
+    for code in CODES:
+        assert parsed[code].操作建议 == f"{code}观望"
+        assert parsed[code].原始回复 == f"判断结果：真\n风险等级：中\n操作建议：{code}观望"
+
+
+def test_partial_and_unexpected_items():
+    items = [
+        item("600000", 参考价位="约10.35元", 核心原因=""),
+        item("688981"),                    # 不在本批次中
+        {"判断结果": "假"},                  # 缺少股票代码
+        "300750: 真",                       # 不是对象
+        {"code": " 000001 ", "风险等级": "低"},
+    ]
+    parsed = parse_batch_response(json.dumps(items, ensure_ascii=False), CODES)
+    assert sorted(parsed) == ["000001", "600000"]
+    assert parsed["600000"].参考价位 == 10.35 and parsed["600000"].核心原因 is None
+    assert parsed["000001"].风险等级 == "低" and parsed["000001"].判断结果 is None
+    # 调用方据此对缺失的300750单独重试
+    assert "300750" not in parsed
+
+    # 不限定期望代码时保留全部有代码的条目
+    assert sorted(parse_batch_response(json.dumps(items, ensure_ascii=False))) == ["000001", "600000", "688981"]
+
+
+def test_item_without_known_fields_keeps_raw_json():
+    parsed = parse_batch_response('[{"股票代码": "600000", "备注": "数据不足"}]', CODES)
+    assert json.loads(parsed["600000"].原始回复) == {"股票代码": "600000", "备注": "数据不足"}
+
+
+def test_malformed_output():
+    assert parse_batch_response("", CODES) == {}
+    assert parse_batch_response(None, CODES) == {}
+    assert parse_batch_response("模型暂时无法回答", CODES) == {}
+    assert parse_batch_response('{"股票代码": "600000"}', CODES) == {}
+    # 输出被max_tokens截断
+    truncated = json.dumps([item("600000"), item("000001")], ensure_ascii=False)[:-40]
+    assert parse_batch_response(truncated, CODES) == {}
+    assert parse_batch_response('[{"股票代码": "600000",}]', CODES) == {}
+
+
+def test_batch_prompt_lists_every_stock():
+    stocks = [{"股票代码": code, "股票名称": f"股票{code}", "图形类型": "开盘跳水"} for code in CODES]
+    prompt = generate_batch_prompt(stocks)
+    assert all(code in prompt for code in CODES)
+    try:
+        generate_batch_prompt([{"股票代码": "600000", "图形类型": "未知"}])
+        assert False, "不支持的图形类型应报错"
+    except ValueError:
+        pass
+
+
+if __name__ == "__main__":
+    tests = [(name, func) for name, func in list(globals().items()) if name.startswith("test_") and callable(func)]
+    failed = 0
+    for name, func in tests:
+        try:
+            func()
+            print(f"✅ {name}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {name}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} 通过")
+    sys.exit(1 if failed else 0)
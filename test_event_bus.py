@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+事件总线测试
+验证溢出策略、慢订阅者不阻塞发布、日志落盘与序号恢复、断线补发
+
+用法:
+    python test_event_bus.py
+    python -m pytest test_event_bus.py -q
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.utils.event_bus import EventBus, FileSink, Subscription
+from src.utils.metrics import EVENT_BUS_EVENTS_TOTAL
+
+
+def trigger(code, pattern="开盘跳水", price=9.6):
+    return {"股票代码": code, "图形类型": pattern, "实时价": price}
+
+
+def test_drop_oldest_and_newest():
+    bus = EventBus()
+    oldest = bus.subscribe("oldest", maxsize=3, policy=Subscription.DROP_OLDEST)
+    newest = bus.subscribe("newest", maxsize=3, policy=Subscription.DROP_NEWEST)
+    for i in range(5):
+        bus.publish("trigger", trigger(f"{i:06d}"))
+
+    assert [e.seq for e in oldest.get_batch(10, timeout=0)] == [3, 4, 5]
+    assert [e.seq for e in newest.get_batch(10, timeout=0)] == [1, 2, 3]
+    assert oldest.dropped == 2 and newest.dropped == 2
+
+
+def test_drop_oldest_counts_evicted_event():
+    bus = EventBus()
+    name = f"oldest-{time.time_ns()}"
+    bus.subscribe(name, maxsize=2, policy=Subscription.DROP_OLDEST)
+    for i in range(5):
+        bus.publish("trigger", trigger(f"{i:06d}"))
+    # 新事件都进入队列，被挤掉的3条计为丢弃
+    assert EVENT_BUS_EVENTS_TOTAL.value(subscriber=name, outcome="queued") == 5
+    assert EVENT_BUS_EVENTS_TOTAL.value(subscriber=name, outcome="dropped") == 3
+
+
+def test_coalesce_keeps_latest_per_key():
+    bus = EventBus()
+    sub = bus.subscribe("sse", maxsize=10, policy=Subscription.COALESCE)
+    bus.publish("trigger", trigger("600000", price=9.6))
+    bus.publish("trigger", trigger("000001"))
+    bus.publish("trigger", trigger("600000", price=9.4))
+    bus.publish("cleared", trigger("600000"))
+
+    batch = sub.get_batch(10, timeout=0)
+    # 600000的两次触发合并为最新一条，位置保持在最前；解除事件类型不同，不合并
+    assert [(e.type, e.data["股票代码"], e.data["实时价"]) for e in batch] == [
+        ("trigger", "600000", 9.4), ("trigger", "000001", 9.6), ("cleared", "600000", 9.6)
+    ]
+    assert sub.coalesced == 1
+
+
+def test_slow_subscriber_does_not_block_publish():
+    bus = EventBus()
+    release = threading.Event()
+    received = []
+
+    def slow(batch):
+        release.wait(5)
+        received.extend(batch)
+
+    bus.subscribe("slow", slow, maxsize=100, policy=Subscription.DROP_OLDEST, linger=0)
+    fast = bus.subscribe("fast", maxsize=20000)
+
+    start = time.perf_counter()
+    for i in range(10000):
+        bus.publish("trigger", trigger(f"{i % 500:06d}"))
+    elapsed = time.perf_counter() - start
+    assert elapsed < 2, f"发布10000条耗时{elapsed:.2f}秒"
+    assert fast.depth == 10000
+
+    release.set()
+    deadline = time.time() + 5
+    while time.time() < deadline and (not received or received[-1].seq < 10000):
+        time.sleep(0.01)
+    bus.close()
+    # 慢订阅者只拿到阻塞前取走的一批和队列中保留的最新100条
+    assert received[-1].seq == 10000 and len(received) <= 200
+    assert [e.seq for e in received[-100:]] == list(range(9901, 10001))
+
+
+def test_handler_batches():
+    bus = EventBus()
+    batches = []
+    bus.subscribe("batch", batches.append, batch_size=50, linger=0.2)
+    for i in range(120):
+        bus.publish("trigger", trigger(f"{i:06d}"))
+    deadline = time.time() + 5
+    while time.time() < deadline and sum(map(len, batches)) < 120:
+        time.sleep(0.01)
+    bus.close()
+    assert sum(map(len, batches)) == 120 and max(map(len, batches)) <= 50 and len(batches) <= 5
+
+
+def test_log_and_sequence_recovery():
+    with tempfile.TemporaryDirectory() as tmp:
+        log_path = os.path.join(tmp, "events.log")
+        bus = EventBus(log_path, recent_size=5)
+        for i in range(20):
+            bus.publish("trigger", trigger(f"{i:06d}"))
+        # 内存只保留最近5条，更早的从日志补发
+        assert [e.seq for e in bus.replay(since=12, limit=3)] == [13, 14, 15]
+        assert [e.seq for e in bus.replay(since=2, limit=3)] == [3, 4, 5]
+        bus.close()
+
+        with open(log_path, encoding="utf-8") as f:
+            seqs = [json.loads(line)["seq"] for line in f]
+        assert seqs == list(range(1, 21))
+
+        # 重启后序号接着日志继续
+        bus = EventBus(log_path)
+        assert bus.publish("trigger", trigger("600000")).seq == 21
+        bus.close()
+
+
+def test_log_rotation():
+    with tempfile.TemporaryDirectory() as tmp:
+        log_path = os.path.join(tmp, "events.log")
+        bus = EventBus(log_path, recent_size=5, max_log_bytes=2000)
+        for i in range(60):
+            bus.publish("trigger", trigger(f"{i:06d}"))
+            bus.flush()
+        bus.close()
+
+        # 只保留当前文件和一份轮转文件，大小都不超过上限太多
+        assert sorted(os.listdir(tmp)) == ["events.log", "events.log.1"]
+        assert os.path.getsize(log_path + ".1") < 2500
+        with open(log_path + ".1", encoding="utf-8") as f:
+            rotated = [json.loads(line)["seq"] for line in f]
+        with open(log_path, encoding="utf-8") as f:
+            current = [json.loads(line)["seq"] for line in f]
+        assert rotated + current == list(range(rotated[0], 61))
+
+        # 重启后内存为空，补发全部来自日志：跨越轮转文件，更早的事件已随轮转丢弃
+        bus = EventBus(log_path, recent_size=5, max_log_bytes=2000)
+        assert [e.seq for e in bus.replay(since=rotated[0], limit=3)] == [rotated[0] + i for i in (1, 2, 3)]
+        assert bus.replay(since=0, limit=1)[0].seq == rotated[0]
+        assert [e.seq for e in bus.replay(since=rotated[-1])] == current
+        assert bus.publish("trigger", trigger("600000")).seq == 61
+        bus.close()
+
+        # 刚轮转、当前文件为空时序号从轮转文件恢复
+        os.replace(log_path, log_path + ".1")
+        open(log_path, "w").close()
+        bus = EventBus(log_path, max_log_bytes=0)
+        assert bus.publish("trigger", trigger("600000")).seq == 62
+        bus.close()
+
+
+def test_sse_replay_and_reset():
+    bus = EventBus(recent_size=100)
+    try:
+        for i in range(3):
+            bus.publish("trigger", trigger(f"{i:06d}"))
+
+        def first_chunks(since, count):
+            stream = bus.sse_stream(since, heartbeat_seconds=0.05)
+            try:
+                return [next(stream) for _ in range(count)]
+            finally:
+                stream.close()
+
+        chunks = first_chunks(1, 2)
+        assert [chunk.split("\n")[0] for chunk in chunks] == ["id: 2", "id: 3"]
+
+        # 客户端的序号大于服务端当前序号（服务重启）：先reset，再从头补发
+        chunks = first_chunks(50, 4)
+        assert chunks[0].startswith("event: reset") and '"last_seq": 3' in chunks[0]
+        assert [chunk.split("\n")[0] for chunk in chunks[1:]] == ["id: 1", "id: 2", "id: 3"]
+
+        # 补发后推送实时事件（补发过的不重复），无事件时发心跳；客户端断开后取消订阅
+        stream = bus.sse_stream(2, heartbeat_seconds=0.05)
+        assert next(stream).startswith("id: 3\nevent: trigger\n")
+        bus.publish("cleared", {"stock_code": "000001"})
+        assert next(stream).startswith("id: 4\nevent: cleared\n")
+        assert next(stream) == ": heartbeat\n\n"
+        assert bus.stats()["subscribers"]
+        stream.close()
+        assert not bus.stats()["subscribers"]
+    finally:
+        bus.close()
+
+
+def test_file_sink():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "sink", "triggers.jsonl")
+        bus = EventBus()
+        bus.subscribe("file", FileSink(path), event_types=["trigger"], linger=0)
+        bus.publish("trigger", trigger("600000"))
+        bus.publish("cleared", trigger("600000"))
+        bus.publish("trigger", trigger("000001"))
+        time.sleep(0.3)
+        bus.close()
+        with open(path, encoding="utf-8") as f:
+            codes = [json.loads(line)["data"]["股票代码"] for line in f]
+        assert codes == ["600000", "000001"]
+
+
+if __name__ == "__main__":
+    tests = [(name, func) for name, func in list(globals().items()) if name.startswith("test_") and callable(func)]
+    failed = 0
+    for name, func in tests:
+        try:
+            func()
+            print(f"✅ {name}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {name}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} 通过")
+    sys.exit(1 if failed else 0)
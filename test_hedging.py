@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+对冲调用适配器测试
+用固定耗时的适配器替身验证：主模型及时返回不对冲、超时后对冲并记录胜出方、落后方的请求继续执行
+并一直计入占用、样本不足时使用默认对冲等待时间、线程池被落后调用占满时（同步和异步）不再对冲
+
+用法:
+    python test_hedging.py
+    python -m pytest test_hedging.py -q
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+from itertools import count
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.aigc.hedging import HedgedAdapter
+from src.aigc.model_adapter import AIGCModelAdapter
+from src.utils.metrics import LLM_HEDGE_REQUESTS, LLM_HEDGE_WINS
+
+_names = count()
+
+
+class DelayAdapter(AIGCModelAdapter):
+    """固定耗时的适配器替身，记录调用和取消"""
+
+    def __init__(self, name, delay, error=None):
+        super().__init__("fake")
+        self.name = name
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+        self.cancelled = 0
+        self.finished = threading.Event()
+
+    def chat(self, prompt, **kwargs):
+        self.calls += 1
+        time.sleep(self.delay)
+        self.finished.set()
+        if self.error:
+            raise self.error
+        return f"{self.name}:{prompt}"
+
+    async def async_chat(self, prompt, **kwargs):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.error:
+            raise self.error
+        return f"{self.name}:{prompt}"
+
+
+def make_hedged(primary_delay, secondary_delay, default_delay=0.05, primary_error=None, **kwargs):
+    primary = DelayAdapter("主", primary_delay, primary_error)
+    secondary = DelayAdapter("备", secondary_delay)
+    # 每个用例使用独立的指标标签
+    suffix = next(_names)
+    hedged = HedgedAdapter(primary, secondary, primary_name=f"p{suffix}", secondary_name=f"s{suffix}",
+                           default_delay=default_delay, min_delay=0.01, **kwargs)
+    return hedged, primary, secondary
+
+
+def outcomes(hedged):
+    return {
+        "primary_only": LLM_HEDGE_REQUESTS.value(outcome="primary_only", **hedged.labels),
+        "hedged": LLM_HEDGE_REQUESTS.value(outcome="hedged", **hedged.labels),
+        "primary": LLM_HEDGE_WINS.value(winner="primary", **hedged.labels),
+        "secondary": LLM_HEDGE_WINS.value(winner="secondary", **hedged.labels),
+    }
+
+
+def test_fast_primary_not_hedged():
+    hedged, primary, secondary = make_hedged(0.01, 0.01, default_delay=0.5)
+    assert asyncio.run(hedged.async_chat("p")) == "主:p"
+    assert hedged.chat("p") == "主:p"
+    assert secondary.calls == 0
+    assert outcomes(hedged) == {"primary_only": 2, "hedged": 0, "primary": 0, "secondary": 0}
+    assert hedged.stats()["hedge_rate"] == 0.0
+
+
+def test_slow_primary_hedged_secondary_wins():
+    hedged, primary, secondary = make_hedged(0.5, 0.01)
+
+    async def run():
+        start = time.perf_counter()
+        result = await hedged.async_chat("p")
+        elapsed = time.perf_counter() - start
+        # 落后的主模型请求无法中断，仍在线程中执行并计入占用
+        return result, elapsed, hedged._async_busy, primary.finished.is_set()
+
+    result, elapsed, busy, primary_finished = asyncio.run(run())
+    assert result == "备:p" and elapsed < 0.4
+    assert busy == 1 and not primary_finished
+    # asyncio.run结束时等待线程池中的调用返回，计数随之归还
+    assert primary.finished.is_set() and hedged._async_busy == 0
+    assert outcomes(hedged) == {"primary_only": 0, "hedged": 1, "primary": 0, "secondary": 1}
+    stats = hedged.stats()
+    assert stats["hedge_rate"] == 1.0 and stats["secondary_win_rate"] == 1.0
+
+
+def test_primary_wins_after_hedge():
+    hedged, primary, secondary = make_hedged(0.1, 0.5)
+
+    assert asyncio.run(hedged.async_chat("p")) == "主:p"
+    assert secondary.calls == 1 and secondary.finished.is_set() and hedged._async_busy == 0
+    assert outcomes(hedged) == {"primary_only": 0, "hedged": 1, "primary": 1, "secondary": 0}
+
+
+def test_primary_error_falls_back():
+    hedged, primary, secondary = make_hedged(0.01, 0.01, default_delay=1.0, primary_error=RuntimeError("限流"))
+    start = time.perf_counter()
+    assert asyncio.run(hedged.async_chat("p")) == "备:p"
+    assert hedged.chat("p") == "备:p"
+    # 主模型报错后立即改用备用模型，不等满对冲时间
+    assert time.perf_counter() - start < 0.5
+    assert outcomes(hedged)["secondary"] == 2
+
+    both_fail, _, secondary = make_hedged(0.01, 0.01, primary_error=RuntimeError("限流"))
+    secondary.error = RuntimeError("超时")
+    try:
+        both_fail.chat("p")
+        assert False, "两个模型都失败时应抛出异常"
+    except RuntimeError:
+        pass
+
+
+def test_hedge_delay_uses_default_before_min_samples():
+    hedged, _, _ = make_hedged(0.01, 0.01, default_delay=8.0, min_samples=20, window=200)
+    for i in range(19):
+        hedged._record_latency(1.0 + i * 0.1)
+    assert hedged.hedge_delay() == 8.0
+    hedged._record_latency(10.0)
+    # 20个样本的p90为第18个（从0计）
+    assert abs(hedged.hedge_delay() - 2.8) < 1e-9
+
+    fast, _, _ = make_hedged(0.01, 0.01, min_samples=1)
+    fast._record_latency(0.001)
+    assert fast.hedge_delay() == fast.min_delay
+
+
+def test_async_hedge_bounded_by_abandoned_calls():
+    hedged, primary, secondary = make_hedged(0.3, 0.01, async_workers=2)
+
+    async def run():
+        first = await hedged.async_chat("p")
+        busy = hedged._async_busy
+        # 落后的主模型请求仍占用线程：空闲不足两个，直接调用主模型，不再对冲
+        second = await hedged.async_chat("q")
+        return first, busy, second
+
+    first, busy, second = asyncio.run(run())
+    assert first == "备:p" and busy == 1 and second == "主:q"
+    assert secondary.calls == 1 and outcomes(hedged)["primary_only"] == 1
+    assert hedged._async_busy == 0
+
+
+def test_sync_hedge_bounded_by_abandoned_calls():
+    hedged, primary, secondary = make_hedged(0.3, 0.01)
+    hedged.SYNC_WORKERS = 2
+    assert hedged.chat("p") == "备:p"
+    # 同步调用无法取消已在执行的主模型请求，它仍占用线程池
+    assert hedged._sync_busy == 1 and not primary.finished.is_set()
+
+    # 线程池空闲不足两个：直接调用主模型，不再对冲
+    assert hedged.chat("p") == "主:p"
+    assert secondary.calls == 1 and outcomes(hedged)["primary_only"] == 1
+
+    primary.finished.wait(1)
+    time.sleep(0.05)
+    assert hedged._sync_busy == 0
+
+
+if __name__ == "__main__":
+    tests = [(name, func) for name, func in list(globals().items()) if name.startswith("test_") and callable(func)]
+    failed = 0
+    for name, func in tests:
+        try:
+            func()
+            print(f"✅ {name}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {name}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} 通过")
+    sys.exit(1 if failed else 0)
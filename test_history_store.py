@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+分析历史存储测试
+验证后台线程批量写入与flush、分析/触发事件/快照查询的过滤和排序、
+find_recent_analysis的有效期、过期行情快照的清理
+
+用法:
+    python test_history_store.py
+    python -m pytest test_history_store.py -q
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.utils.history_store import HistoryStore, parse_since
+
+
+def age_rows(db_path, table, seconds, where="1 = 1"):
+    """把记录的写入时间往前推（模拟早先写入的记录）"""
+    conn = sqlite3.connect(db_path)
+    with conn:
+        conn.execute(f"UPDATE {table} SET created_at = created_at - ? WHERE {where}", (seconds,))
+    conn.close()
+
+
+def test_batched_writer_flush():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "history", "history.db")
+        store = HistoryStore(path, batch_size=7, flush_interval=0.05)
+        for i in range(50):
+            store.record_snapshot(f"{600000 + i % 5:06d}", {"实时价": 10 + i})
+        store.flush()
+        # flush返回时全部记录已提交，其他连接可以读到
+        conn = sqlite3.connect(path)
+        assert conn.execute("SELECT COUNT(*) FROM snapshots").fetchone()[0] == 50
+        conn.close()
+        assert store.dropped == 0
+        store.close()
+
+
+def test_queue_full_drops_without_blocking():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = HistoryStore(os.path.join(tmp, "history.db"), max_queue=1, flush_interval=0.05)
+        start = time.perf_counter()
+        for i in range(200):
+            store.record_snapshot("600000", {"实时价": i})
+        assert time.perf_counter() - start < 1 and store.dropped > 0
+        store.close()
+
+
+def test_queries_filter_and_order():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "history.db")
+        store = HistoryStore(path, flush_interval=0.05)
+        store.record_analysis("600000", "开盘跳水", "分析A", {"action": "持有"}, stock_name="浦发银行")
+        store.record_analysis("600000", "冲板回落", "分析B")
+        store.record_analysis("000001", "开盘跳水", "分析C")
+        store.flush()
+        age_rows(path, "analyses", 3600, "analysis = '分析A'")
+
+        records = store.query_analyses(stock_code="600000")
+        # 按时间倒序，操作建议还原为字典
+        assert [r["analysis"] for r in records] == ["分析B", "分析A"]
+        assert records[1]["operation_suggestion"] == {"action": "持有"} and records[1]["stock_name"] == "浦发银行"
+        assert [r["analysis"] for r in store.query_analyses(pattern_type="开盘跳水")] == ["分析C", "分析A"]
+        assert [r["analysis"] for r in store.query_analyses(since=time.time() - 60)] == ["分析C", "分析B"]
+        assert len(store.query_analyses(limit=1)) == 1
+
+        trigger = SimpleNamespace(
+            事件ID="e1", 股票代码="600000", 股票名称="浦发银行", 图形类型="开盘跳水",
+            市场数据=SimpleNamespace(to_dict=lambda: {"实时价": 9.6}),
+            AIGC分析结果=SimpleNamespace(原始回复="假跳水"), 触发时间=datetime(2026, 10, 19, 9, 35)
+        )
+        store.record_trigger(trigger)
+        # 同一事件ID重复写入只保留一条
+        store.record_trigger(trigger)
+        store.record_snapshot("600000", {"实时价": 9.6})
+        store.flush()
+        triggers = store.query_triggers(stock_code="600000")
+        assert len(triggers) == 1 and triggers[0]["market_data"] == {"实时价": 9.6}
+        assert triggers[0]["analysis"] == "假跳水" and triggers[0]["created_at"] == "2026-10-19 09:35:00"
+        assert store.query_triggers(since=parse_since("2026-10-20")) == []
+        snapshots = store.query_snapshots("600000")
+        assert snapshots[0]["price"] == 9.6 and snapshots[0]["data"] == {"实时价": 9.6}
+        store.close()
+
+
+def test_find_recent_analysis():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "history.db")
+        store = HistoryStore(path, flush_interval=0.05)
+        store.record_analysis("600000", "开盘跳水", "旧分析", cache_key="k")
+        store.flush()
+        age_rows(path, "analyses", 300)
+        store.record_analysis("600000", "开盘跳水", "新分析", cache_key="k")
+        store.flush()
+
+        assert store.find_recent_analysis("k", 120) == "新分析"
+        assert store.find_recent_analysis("other", 120) is None
+        age_rows(path, "analyses", 300)
+        # 全部超过有效期
+        assert store.find_recent_analysis("k", 120) is None
+        assert store.find_recent_analysis("k", 3600) == "新分析"
+        store.close()
+
+
+def test_expired_snapshots_pruned():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "history.db")
+        store = HistoryStore(path, flush_interval=0.05, snapshot_retention_days=1, prune_interval=0)
+        store.record_snapshot("600000", {"实时价": 9.0})
+        store.record_analysis("600000", "开盘跳水", "分析", cache_key="k")
+        store.flush()
+        age_rows(path, "snapshots", 2 * 86400)
+        age_rows(path, "analyses", 2 * 86400)
+
+        # 下一批写入时清理过期快照，分析记录不受影响
+        store.record_snapshot("600000", {"实时价": 9.5})
+        store.flush()
+        assert [s["price"] for s in store.query_snapshots("600000")] == [9.5]
+        assert store.pruned == 1 and len(store.query_analyses()) == 1
+        store.close()
+
+
+if __name__ == "__main__":
+    tests = [(name, func) for name, func in list(globals().items()) if name.startswith("test_") and callable(func)]
+    failed = 0
+    for name, func in tests:
+        try:
+            func()
+            print(f"✅ {name}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {name}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} 通过")
+    sys.exit(1 if failed else 0)
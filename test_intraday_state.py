@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+盘中增量状态测试
+验证交易分钟数、开盘窗口跌幅、破位计时、触板回落、分钟成交额和跨日重置
+
+用法:
+    python test_intraday_state.py
+    python -m pytest test_intraday_state.py -q
+"""
+
+import os
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.monitors.data_collector import MockDataCollector, StockDataAggregator
+from src.monitors.intraday_state import IntradayStateTracker, trading_minutes
+
+
+def at(hour, minute, second=0, day=19):
+    return datetime(2026, 10, day, hour, minute, second)
+
+
+def quote(price, open_price=10.0, high=None, amount=0.0, **extra):
+    return {"实时价": price, "开盘价": open_price, "最高价": high or max(price, open_price), "成交额": amount, **extra}
+
+
+def test_trading_minutes_skips_lunch_break():
+    assert trading_minutes(at(9, 0)) == 0
+    assert trading_minutes(at(9, 35)) == 5
+    assert trading_minutes(at(12, 0)) == 120
+    assert trading_minutes(at(13, 30)) == 150
+    assert trading_minutes(at(15, 30)) == 240
+
+
+def test_open_window_drawdown():
+    tracker = IntradayStateTracker()
+    tracker.update("600000", quote(9.8), at(9, 31))
+    tracker.update("600000", quote(9.5), at(9, 34, 30))
+    inputs = tracker.rule_inputs("600000", quote(9.7), at(9, 45))
+    assert inputs["开盘分钟数"] == 15
+    assert inputs["开盘窗口最大跌幅"] == 5.0
+    assert inputs["跌幅"] == 3.0
+
+
+def test_support_timer_resets_on_rebound():
+    tracker = IntradayStateTracker()
+    tracker.update("600000", quote(9.5, 前期平台支撑位=9.6), at(10, 0))
+    inputs = tracker.rule_inputs("600000", quote(9.4, 前期平台支撑位=9.6), at(10, 7))
+    assert inputs["支撑位价格"] == 9.6 and inputs["破位后未回弹分钟数"] == 7
+
+    tracker.update("600000", quote(9.7, 前期平台支撑位=9.6), at(10, 8))
+    inputs = tracker.rule_inputs("600000", quote(9.5, 前期平台支撑位=9.6), at(10, 10))
+    assert inputs["破位后未回弹分钟数"] == 0
+
+
+def test_below_ma_prefers_ma5():
+    tracker = IntradayStateTracker()
+    tracker.update("600000", quote(9.5, **{"5日均线": 9.8, "20日均线": 9.6}), at(10, 0))
+    inputs = tracker.rule_inputs("600000", quote(9.5, **{"5日均线": 9.8, "20日均线": 9.6}), at(10, 4))
+    assert inputs["均线类型"] == 5 and inputs["均线价格"] == 9.8 and inputs["跌破均线分钟数"] == 4
+
+
+def test_limit_touch_and_retrace():
+    tracker = IntradayStateTracker()
+    tracker.update("600000", quote(10.5, amount=0, 涨停价=11.0), at(9, 50))
+    tracker.update("600000", quote(11.0, high=11.0, 涨停价=11.0), at(10, 0))
+    tracker.update("600000", quote(10.9, high=11.0, 涨停价=11.0), at(10, 6))
+    inputs = tracker.rule_inputs("600000", quote(10.45, high=11.0, 涨停价=11.0), at(10, 20))
+    assert inputs["触板分钟数"] == 30
+    assert inputs["封板分钟数"] == 6
+    assert inputs["涨幅"] == 10.0
+    assert inputs["回落幅度"] == 5.0
+
+
+def test_minute_amount_ratios():
+    tracker = IntradayStateTracker()
+    # 第10分钟中途开始观察，不计入；第11、12分钟完整
+    tracker.update("600000", quote(10, amount=1000), at(9, 40, 30))
+    tracker.update("600000", quote(10, amount=1100), at(9, 41, 0))
+    tracker.update("600000", quote(10, amount=1200), at(9, 42, 0))
+    tracker.update("600000", quote(10, amount=1500), at(9, 43, 0))
+    inputs = tracker.rule_inputs("600000", quote(10, amount=1500), at(9, 44, 0))
+    # 第12分钟成交300，第11分钟成交100
+    assert inputs["分钟成交额放大比例"] == 200.0
+    assert "当日成交额放大比例" in inputs
+
+    # 漏掉一分钟后重新开始统计
+    inputs = tracker.rule_inputs("600000", quote(10, amount=2000), at(9, 46, 0))
+    assert "分钟成交额放大比例" not in inputs
+
+
+def test_reset_on_new_day():
+    tracker = IntradayStateTracker()
+    tracker.update("600000", quote(9.0), at(9, 35))
+    state = tracker.update("600000", quote(10.0), at(9, 31, day=20))
+    assert state.updates == 1 and state.open_window_drawdown == 0
+    assert len(tracker) == 1
+
+
+def test_aggregator_merges_state_and_kwargs_win():
+    tracker = IntradayStateTracker(clock=lambda: at(9, 36))
+    aggregator = StockDataAggregator(MockDataCollector(), state_tracker=tracker)
+    data = aggregator.collect_monitoring_data("600000", "开盘跳水", "09:36:00")
+    assert data["开盘分钟数"] == 6
+    assert tracker.get("600000").updates == 1
+
+    data = aggregator.collect_monitoring_data("600000", "开盘跳水", "09:36:00", 开盘分钟数=3)
+    assert data["开盘分钟数"] == 3
+
+
+if __name__ == "__main__":
+    tests = [(name, func) for name, func in list(globals().items()) if name.startswith("test_") and callable(func)]
+    failed = 0
+    for name, func in tests:
+        try:
+            func()
+            print(f"✅ {name}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {name}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} 通过")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+后台分析任务管理器测试
+验证提交/查询、单只失败不影响整个任务、iter_events的结果/心跳/结束事件、
+被中断的任务以failed结束、已结束任务超过保留期后清理
+
+用法:
+    python test_job_manager.py
+    python -m pytest test_job_manager.py -q
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.utils.job_manager import AnalysisJob, AnalysisJobManager
+
+
+class Interrupted(BaseException):
+    """模拟SystemExit/KeyboardInterrupt等不继承Exception的中断"""
+
+
+async def analyze(stock_code):
+    if stock_code == "bad":
+        raise RuntimeError("行情获取失败")
+    return {"success": True, "price": 10.0}
+
+
+def wait_done(manager, job, timeout=5):
+    deadline = time.time() + timeout
+    while not job.done and time.time() < deadline:
+        time.sleep(0.01)
+    return manager.get(job.job_id)
+
+
+def test_submit_and_get():
+    manager = AnalysisJobManager(analyze, max_workers=1)
+    job = manager.submit(["600000", "bad", "000001"])
+    assert manager.get(job.job_id) is job and manager.get("missing") is None
+    wait_done(manager, job)
+
+    snapshot = manager.snapshot(job.job_id)
+    assert snapshot["status"] == AnalysisJob.FINISHED and snapshot["completed"] == 3
+    # 单只失败记录在结果中，不影响整个任务
+    assert [r["stock_code"] for r in snapshot["results"]] == ["600000", "bad", "000001"]
+    assert snapshot["results"][1] == {"success": False, "error": "分析失败: 行情获取失败", "stock_code": "bad"}
+    assert manager.snapshot(job.job_id, since=2)["results"] == [snapshot["results"][2]]
+    manager.shutdown(wait=True)
+
+
+def test_iter_events_heartbeat_and_done():
+    release = threading.Event()
+
+    async def slow(stock_code):
+        if stock_code == "000001":
+            await asyncio.get_running_loop().run_in_executor(None, release.wait, 5)
+        return {"success": True}
+
+    manager = AnalysisJobManager(slow, max_workers=1)
+    job = manager.submit(["600000", "000001"])
+    events = manager.iter_events(job.job_id, heartbeat_seconds=0.05)
+
+    first = next(event for event in events if event[0] != "heartbeat")
+    assert first == ("result", {"index": 0, "result": {"success": True, "stock_code": "600000"}})
+    # 第二只股票阻塞期间产出心跳
+    assert next(events) == ("heartbeat", None)
+    release.set()
+    rest = list(events)
+    assert [kind for kind, _ in rest if kind != "heartbeat"] == ["result", "done"]
+    assert rest[-1][1]["status"] == AnalysisJob.FINISHED and rest[-1][1]["results"] == []
+    assert list(manager.iter_events("missing")) == []
+    manager.shutdown(wait=True)
+
+
+def test_interrupted_job_ends_failed():
+    async def interrupted(stock_code):
+        raise Interrupted()
+
+    manager = AnalysisJobManager(interrupted, max_workers=1)
+    job = manager.submit(["600000"])
+    job = wait_done(manager, job)
+    # 中断不进入except分支，任务仍以failed结束，订阅者不会一直等待
+    assert job.status == AnalysisJob.FAILED and job.error == "interrupted" and job.finished_at
+    kinds = [kind for kind, _ in manager.iter_events(job.job_id, heartbeat_seconds=0.05)]
+    assert kinds == ["done"]
+    manager.shutdown(wait=True)
+
+
+def test_expired_jobs_purged():
+    manager = AnalysisJobManager(analyze, max_workers=1, retention_seconds=60)
+    finished = wait_done(manager, manager.submit(["600000"]))
+    unfinished = wait_done(manager, manager.submit([]))
+    unfinished.finished_at = None  # 未结束的任务不清理
+
+    finished.finished_at -= 61
+    assert manager.get(finished.job_id) is None
+    assert manager.get(unfinished.job_id) is unfinished
+    manager.shutdown(wait=True)
+
+
+if __name__ == "__main__":
+    tests = [(name, func) for name, func in list(globals().items()) if name.startswith("test_") and callable(func)]
+    failed = 0
+    for name, func in tests:
+        try:
+            func()
+            print(f"✅ {name}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {name}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} 通过")
+    sys.exit(1 if failed else 0)
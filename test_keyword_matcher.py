@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+多关键词匹配器测试
+验证Aho-Corasick匹配结果与逐个关键词 `in` 判断一致，以及概念打分、新闻标签
+
+用法:
+    python test_keyword_matcher.py
+    python -m pytest test_keyword_matcher.py -q
+"""
+
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.monitors.finance_news_collector import NEWS_TAG_KEYWORDS, FinanceNewsCollector
+from src.monitors.screener import RETAIL_CONCEPT_KEYWORDS, name_features
+from src.utils.keyword_matcher import KeywordMatcher, TagMatcher
+
+
+def test_overlapping_keywords():
+    matcher = KeywordMatcher(["he", "she", "his", "hers", "智能", "人工智能"])
+    assert matcher.match("ushers") == ("he", "she", "hers")
+    assert matcher.match("人工智能科技") == ("智能", "人工智能")
+    assert matcher.match("") == ()
+    assert matcher.match("银行") == ()
+
+
+def test_matches_naive_scan():
+    rng = random.Random(47)
+    keywords = list(RETAIL_CONCEPT_KEYWORDS)
+    alphabet = "".join(set("".join(keywords))) + "股份集团A"
+    matcher = KeywordMatcher(keywords)
+    for _ in range(2000):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 12)))
+        assert matcher.match(text) == tuple(k for k in keywords if k in text), text
+
+
+def test_concept_score_matches_original_rule():
+    for name in ["中科智能", "人工智能科技", "海天味业", "锂电新能源材料", "*ST数据"]:
+        _, score, matched = name_features(name)
+        expected = [k for k in RETAIL_CONCEPT_KEYWORDS if k in name]
+        assert matched == tuple(expected)
+        assert score == sum(RETAIL_CONCEPT_KEYWORDS[k] for k in expected)
+
+
+def test_news_tags():
+    collector = FinanceNewsCollector()
+    title = "央行降准，券商与AI芯片板块领涨创业板指数"
+    expected = [tag for tag, words in NEWS_TAG_KEYWORDS.items() if any(w in title for w in words)]
+    assert collector._extract_tags(title) == expected == ["A股", "央行", "科技", "金融"]
+    assert collector._extract_tags("今日天气晴") == ["财经"]
+
+
+def test_memo():
+    matcher = TagMatcher({"科技": ["芯片"]}, memo_size=16)
+    assert matcher.match("芯片股") == ("科技",)
+    assert matcher.match("芯片股") == ("科技",)
+    assert matcher.match.cache_info().hits == 1
+
+
+if __name__ == "__main__":
+    tests = [(name, func) for name, func in list(globals().items()) if name.startswith("test_") and callable(func)]
+    failed = 0
+    for name, func in tests:
+        try:
+            func()
+            print(f"✅ {name}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {name}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} 通过")
+    sys.exit(1 if failed else 0)
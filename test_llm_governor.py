@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+AI模型调用调度器测试
+验证RPM/TPM令牌桶的突发量与补充、最大并发上限、排队超时抛出GovernorTimeout、
+被取消的异步调用一直占用名额到线程中的请求结束
+
+用法:
+    python test_llm_governor.py
+    python -m pytest test_llm_governor.py -q
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.aigc.model_adapter import AIGCModelAdapter
+from src.aigc.rate_limiter import GovernedAdapter, GovernorTimeout, LLMGovernor, TokenBucket, estimate_tokens
+
+
+class FakeAdapter(AIGCModelAdapter):
+    """固定耗时的适配器替身，记录并发峰值"""
+
+    def __init__(self, delay=0.02):
+        super().__init__("fake")
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def chat(self, prompt, **kwargs):
+        # 异步调用经GovernedAdapter在线程池中执行chat
+        with self._lock:
+            self.calls += 1
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.delay)
+        with self._lock:
+            self.active -= 1
+        return f"回复:{prompt}"
+
+    async def async_chat(self, prompt, **kwargs):
+        self.calls += 1
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(self.delay)
+        self.active -= 1
+        return f"回复:{prompt}"
+
+
+def raises_timeout(func, *args, **kwargs):
+    try:
+        func(*args, **kwargs)
+    except GovernorTimeout:
+        return True
+    return False
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("开盘跳水") == 4
+    assert estimate_tokens("abcdefgh") == 2 and estimate_tokens("abc") == 1
+
+
+def test_token_bucket_refill():
+    bucket = TokenBucket(capacity=2, refill_per_second=10)
+    assert bucket.wait_time(1) == 0
+    bucket.consume(2)
+    assert 0.09 < bucket.wait_time(1) <= 0.1
+    # 超过容量的请求按容量计，不会永远等待
+    assert bucket.wait_time(100) <= 0.2
+    bucket._updated_at -= 0.1
+    assert bucket.wait_time(1) == 0
+
+
+def test_rpm_burst_and_refill():
+    # 60 RPM：突发5个，之后每秒补充1个
+    governor = LLMGovernor(requests_per_minute=60, max_in_flight=100)
+    for _ in range(5):
+        governor.acquire_sync(timeout=0)
+        governor.release()
+    assert raises_timeout(governor.acquire_sync, timeout=0)
+
+    governor.request_bucket._updated_at -= 1
+    governor.acquire_sync(timeout=0)
+    governor.release()
+    assert raises_timeout(governor.acquire_sync, timeout=0)
+    assert governor.in_flight == 0 and governor.queue_depth == 0
+
+
+def test_tpm_limit_and_refill():
+    # 600 TPM：突发100个Token，每秒补充10个
+    governor = LLMGovernor(requests_per_minute=6000, tokens_per_minute=600, max_in_flight=100)
+    with governor.sync_slot(tokens=80, timeout=0):
+        pass
+    assert raises_timeout(governor.acquire_sync, tokens=80, timeout=0)
+    # 请求桶未耗尽，少量Token的请求仍可通过
+    with governor.sync_slot(tokens=10, timeout=0):
+        pass
+
+    governor.token_bucket._updated_at -= 7
+    with governor.sync_slot(tokens=80, timeout=0):
+        pass
+
+
+def test_max_in_flight_cap():
+    governor = LLMGovernor(requests_per_minute=6000, max_in_flight=2)
+    fake = FakeAdapter(delay=0.02)
+    adapter = GovernedAdapter(fake, governor)
+
+    async def run():
+        return await asyncio.gather(*(adapter.async_chat(f"p{i}") for i in range(6)))
+
+    results = asyncio.run(run())
+    assert results == [f"回复:p{i}" for i in range(6)]
+    assert fake.calls == 6 and fake.peak == 2
+    assert governor.in_flight == 0 and governor.queue_depth == 0
+
+
+def test_governor_timeout_path():
+    governor = LLMGovernor(requests_per_minute=6000, max_in_flight=1, timeout=0.1)
+    fake = FakeAdapter()
+    adapter = GovernedAdapter(fake, governor)
+
+    # 唯一的并发名额被占用时，排队到截止时间后抛出GovernorTimeout，不调用内部适配器
+    with governor.sync_slot():
+        start = time.monotonic()
+        assert raises_timeout(adapter.chat, "p")
+        assert 0.09 <= time.monotonic() - start < 1
+        try:
+            asyncio.run(adapter.async_chat("p"))
+            assert False, "应抛出GovernorTimeout"
+        except GovernorTimeout:
+            pass
+    assert fake.calls == 0 and governor.in_flight == 0 and governor.queue_depth == 0
+
+    # 名额归还后正常调用
+    assert adapter.chat("p") == "回复:p" and governor.in_flight == 0
+
+
+def test_cancelled_call_holds_slot_until_finished():
+    governor = LLMGovernor(requests_per_minute=6000, max_in_flight=1, timeout=0)
+    fake = FakeAdapter(delay=0.3)
+    adapter = GovernedAdapter(fake, governor)
+
+    async def run():
+        task = asyncio.ensure_future(adapter.async_chat("p"))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        await asyncio.sleep(0.05)
+        # 等待方已取消，但线程中的请求仍在执行，名额未归还
+        held = governor.in_flight
+        try:
+            await adapter.async_chat("q")
+            admitted = True
+        except GovernorTimeout:
+            admitted = False
+        return held, admitted
+
+    held, admitted = asyncio.run(run())
+    assert held == 1 and not admitted
+    assert fake.calls == 1 and governor.in_flight == 0
+
+
+def test_stream_holds_slot():
+    governor = LLMGovernor(requests_per_minute=6000, max_in_flight=1, timeout=0)
+    adapter = GovernedAdapter(FakeAdapter(), governor)
+    stream = adapter.stream_chat("p")
+    assert next(stream) == "回复:p" and governor.in_flight == 1
+    assert raises_timeout(governor.acquire_sync)
+    assert list(stream) == [] and governor.in_flight == 0
+
+
+if __name__ == "__main__":
+    tests = [(name, func) for name, func in list(globals().items()) if name.startswith("test_") and callable(func)]
+    failed = 0
+    for name, func in tests:
+        try:
+            func()
+            print(f"✅ {name}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {name}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} 通过")
+    sys.exit(1 if failed else 0)
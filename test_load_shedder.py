@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+AI调用降级测试
+验证按排队深度/近期耗时做出call、defer、skip决策，以及转后台补充AI分析的流程
+
+用法:
+    python test_load_shedder.py
+    python -m pytest test_load_shedder.py -q
+"""
+
+import asyncio
+import os
+import sys
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.aigc.load_shedder import LLMLoadShedder, resolve_with_shedding
+from src.utils.job_manager import AnalysisJobManager
+from src.utils.metrics import LLM_DEGRADATION_DECISIONS
+
+
+def make_shedder(depth=0, **kwargs):
+    state = {"depth": depth}
+    shedder = LLMLoadShedder(queue_depth_source=lambda: state["depth"], latency_threshold=20.0,
+                             skip_queue_depth=8, defer_queue_depth=2, **kwargs)
+    return shedder, state
+
+
+def test_decisions_by_queue_depth():
+    shedder, state = make_shedder()
+    assert shedder.decide() == LLMLoadShedder.CALL
+    # 客户端要求先返回规则建议；不允许转后台时照常调用
+    assert shedder.decide(prefer_defer=True) == LLMLoadShedder.DEFER
+    assert shedder.decide(prefer_defer=True, allow_defer=False) == LLMLoadShedder.CALL
+
+    state["depth"] = 2
+    assert shedder.decide() == LLMLoadShedder.DEFER
+    assert shedder.decide(allow_defer=False) == LLMLoadShedder.CALL
+
+    state["depth"] = 8
+    assert shedder.decide() == LLMLoadShedder.SKIP
+    assert shedder.decide(prefer_defer=True, allow_defer=False) == LLMLoadShedder.SKIP
+
+
+def test_decisions_by_latency_and_recovery():
+    shedder, _ = make_shedder(window_seconds=60)
+    shedder.record(10)
+    assert shedder.decide() == LLMLoadShedder.CALL
+    shedder.record(40)
+    assert shedder.recent_latency() == 25 and shedder.decide() == LLMLoadShedder.SKIP
+
+    # 样本过期后自动恢复调用
+    shedder._samples = type(shedder._samples)((ts - 61, seconds) for ts, seconds in shedder._samples)
+    assert shedder.recent_latency() is None and shedder.decide() == LLMLoadShedder.CALL
+
+
+def test_zero_thresholds_disable_shedding():
+    shedder = LLMLoadShedder(queue_depth_source=lambda: 100, latency_threshold=0,
+                             skip_queue_depth=0, defer_queue_depth=0)
+    shedder.record(100)
+    assert shedder.decide() == LLMLoadShedder.CALL
+    assert shedder.status() == {"recent_latency": 100, "queue_depth": 100, "latency_threshold": 0,
+                                "skip_queue_depth": 0, "defer_queue_depth": 0}
+
+
+def test_decisions_counted():
+    shedder, state = make_shedder(depth=8)
+    before = LLM_DEGRADATION_DECISIONS.value(decision="skip")
+    shedder.decide()
+    assert LLM_DEGRADATION_DECISIONS.value(decision="skip") == before + 1
+
+
+def test_resolve_with_shedding_deferred():
+    shedder, state = make_shedder(depth=3)
+    jobs = AnalysisJobManager(runner=None, max_workers=1)
+    cache, prompts = {}, []
+
+    async def analyze(code):
+        prompts.append(code)
+        cache[code] = "判断结果：假\n风险等级：低\n操作建议：继续持有"
+        return cache[code]
+
+    def resolve(code, defer_ai=None):
+        return asyncio.run(resolve_with_shedding(
+            shedder, code, analyze, lambda: cache.get(code), jobs,
+            build_result=lambda c, ai_response: {"stock_code": c, "analysis": ai_response},
+            defer_ai=defer_ai
+        ))
+
+    try:
+        code = uuid.uuid4().hex[:6]
+
+        # 排队较深：先返回pending和后台任务，AI分析在任务中完成
+        status, response, job = resolve(code)
+        assert status == "pending" and response is None and job is not None
+        events = [event for event in jobs.iter_events(job.job_id, heartbeat_seconds=1) if event[0] != "heartbeat"]
+        kind, payload = events[0]
+        assert kind == "result" and payload["result"] == {"stock_code": code, "analysis": cache[code]}
+        assert events[-1][0] == "done" and events[-1][1]["status"] == "finished"
+        assert prompts == [code]
+
+        # 后台结果已写入缓存：相同分析直接返回，不再转后台
+        status, response, job = resolve(code)
+        assert status == "done" and response.startswith("判断结果：假") and job is None
+        assert prompts == [code]
+
+        # 排队过深且无缓存：跳过AI
+        state["depth"] = 8
+        other = uuid.uuid4().hex[:6]
+        assert resolve(other) == ("skipped", None, None)
+
+        # 不允许转后台时同步调用
+        state["depth"] = 3
+        status, response, job = resolve(other, defer_ai=False)
+        assert status == "done" and job is None and prompts == [code, other]
+    finally:
+        jobs.shutdown(wait=True)
+
+
+if __name__ == "__main__":
+    tests = [(name, func) for name, func in list(globals().items()) if name.startswith("test_") and callable(func)]
+    failed = 0
+    for name, func in tests:
+        try:
+            func()
+            print(f"✅ {name}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {name}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} 通过")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+共享市场环境测试
+验证有效期内复用、缺少的板块补充获取、市场宽度获取失败时照常返回、并发补充板块
+
+用法:
+    python test_market_context.py
+    python -m pytest test_market_context.py -q
+"""
+
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.monitors.data_collector import MarketContext, MockDataCollector, StockDataAggregator
+
+
+class CountingCollector(MockDataCollector):
+    """统计板块、指数请求次数的模拟采集器"""
+
+    def __init__(self, delay=0.0):
+        super().__init__()
+        self.delay = delay
+        self.sector_calls = []
+        self.index_calls = []
+
+    def get_sector_data(self, sector_name):
+        self.sector_calls.append(sector_name)
+        time.sleep(self.delay)
+        return {"涨跌幅": len(sector_name) * 0.5}
+
+    def get_market_index_data(self, index_name="上证指数"):
+        self.index_calls.append(index_name)
+        return {"涨跌幅": 0.8 if index_name == "上证指数" else -0.4}
+
+
+def test_context_reused_within_ttl():
+    collector = CountingCollector()
+    aggregator = StockDataAggregator(collector, context_ttl=30)
+    context = aggregator.get_context(["银行"])
+    assert aggregator.get_context(["银行"]) is context
+    assert collector.index_calls == ["上证指数", "深证成指"] and collector.sector_calls == ["银行"]
+
+    # 超过有效期后重新获取
+    context.timestamp -= 31
+    refreshed = aggregator.get_context(["银行"])
+    assert refreshed is not context and len(collector.index_calls) == 4
+    assert aggregator.get_context(max_age=0) is not refreshed
+
+
+def test_missing_sectors_added():
+    collector = CountingCollector()
+    aggregator = StockDataAggregator(collector)
+    context = aggregator.get_context(["银行"])
+    assert aggregator.get_context(["银行", "半导体", "", "半导体"]) is context
+    assert collector.sector_calls == ["银行", "半导体"]
+    assert context.sector_change("半导体") == 1.5 and context.sector_change("白酒") == 0
+
+
+def test_breadth_provider_failure():
+    def offline():
+        raise ConnectionError("offline")
+
+    aggregator = StockDataAggregator(CountingCollector(), breadth_provider=offline)
+    context = aggregator.get_context(["银行"])
+    assert context.breadth == {}
+    fields = context.fields("银行")
+    assert fields["板块涨跌幅"] == 1.0 and fields["大盘名称"] == "上证指数" and fields["大盘涨跌幅"] == 0.8
+    assert fields["深证成指涨跌幅"] == -0.4 and "上涨家数" not in fields
+
+    aggregator = StockDataAggregator(CountingCollector(), breadth_provider=lambda: {"上涨家数": 3000, "下跌家数": 1800})
+    assert aggregator.get_context().fields("")["上涨家数"] == 3000
+
+
+def test_fields_without_indices():
+    context = MarketContext({})
+    assert context.market_name == "上证指数" and context.index_change() == 0
+    assert context.fields("") == {"板块名称": "", "板块涨跌幅": 0, "大盘名称": "上证指数", "大盘涨跌幅": 0}
+
+
+def test_concurrent_sector_additions():
+    collector = CountingCollector(delay=0.01)
+    aggregator = StockDataAggregator(collector)
+    context = aggregator.get_context()
+    names = [f"板块{i}" for i in range(20)]
+    errors = []
+
+    def add(offset):
+        try:
+            for i in range(len(names)):
+                aggregator.get_context([names[(i + offset) % len(names)]])
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=add, args=(offset,)) for offset in range(0, 20, 4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors and sorted(context.sectors) == sorted(names)
+    assert all(context.sector_change(name) == len(name) * 0.5 for name in names)
+
+
+if __name__ == "__main__":
+    tests = [(name, func) for name, func in list(globals().items()) if name.startswith("test_") and callable(func)]
+    failed = 0
+    for name, func in tests:
+        try:
+            func()
+            print(f"✅ {name}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {name}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} 通过")
+    sys.exit(1 if failed else 0)
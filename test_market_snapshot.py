@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+全市场行情快照测试
+验证分页拉取中单页超时/返回异常时重试、仍失败时跳过并标记部分结果，以及第一页失败时整次失败
+
+用法:
+    python test_market_snapshot.py
+    python -m pytest test_market_snapshot.py -q
+"""
+
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.monitors.market_snapshot import MarketSnapshotCollector, market_breadth
+
+
+def make_collector(total=450, failures=None):
+    """接口替身：total只股票；failures为页码 -> 依次抛出的异常列表（用完后正常返回）"""
+    items = [
+        {"f12": f"{600000 + i:06d}", "f14": f"股票{i}", "f2": 10.5, "f17": 10.0, "f15": 11.0, "f16": 9.8,
+         "f18": 10.0, "f8": 3.0, "f20": 5e9, "f6": 1e8, "f39": 4e8, "f21": 4e9,
+         "f100": "银行", "f103": "破净股"}
+        for i in range(total)
+    ]
+    collector = MarketSnapshotCollector(page_size=100, max_workers=4)
+    failures = {page: list(errors) for page, errors in (failures or {}).items()}
+    calls = []
+
+    def fetch_page(page, fields=None):
+        calls.append(page)
+        if failures.get(page):
+            raise failures[page].pop(0)
+        start = (page - 1) * collector.pager.page_size
+        return {"total": total, "diff": items[start:start + collector.pager.page_size]}
+
+    collector.pager.fetch_page = fetch_page
+    return collector, calls
+
+
+def bad_json():
+    try:
+        json.loads("<html>502 Bad Gateway</html>")
+    except ValueError as e:
+        return e
+
+
+def test_complete_snapshot():
+    collector, calls = make_collector()
+    snapshot = collector.fetch()
+    assert len(snapshot) == 450 and snapshot.missing_pages == []
+    assert sorted(calls) == [1, 2, 3, 4, 5]
+    assert market_breadth(snapshot)["上涨家数"] == 450
+
+
+def test_failed_page_retried():
+    collector, calls = make_collector(failures={2: [TimeoutError("read timeout")], 4: [bad_json()]})
+    snapshot = collector.fetch()
+    assert len(snapshot) == 450 and snapshot.missing_pages == []
+    assert calls.count(2) == 2 and calls.count(4) == 2
+
+
+def test_failed_page_skipped_as_partial():
+    collector, calls = make_collector(failures={3: [TimeoutError("read timeout")] * 2, 5: [bad_json()] * 2})
+    snapshot = collector.get_snapshot(max_age=15)
+    assert len(snapshot) == 300 and snapshot.missing_pages == [3, 5]
+    assert "600200" not in snapshot.codes and "600199" in snapshot.codes
+    assert calls.count(3) == 2 and calls.count(5) == 2
+
+
+def test_first_page_failure_raises():
+    collector, _ = make_collector(failures={1: [ConnectionError("offline")] * 2})
+    try:
+        collector.fetch()
+        assert False, "第一页失败时应抛出异常"
+    except ConnectionError:
+        pass
+
+
+def test_partial_membership_refetched():
+    collector, calls = make_collector(failures={2: [TimeoutError("read timeout")] * 2})
+    membership = collector.get_membership()
+    assert len(membership) == 350 and membership.missing_pages == [2]
+    # 不完整的索引不作为当天结果缓存，下次调用重新下载
+    complete = collector.get_membership()
+    assert len(complete) == 450 and complete.missing_pages == []
+    assert collector.get_membership() is complete
+
+
+if __name__ == "__main__":
+    tests = [(name, func) for name, func in list(globals().items()) if name.startswith("test_") and callable(func)]
+    failed = 0
+    for name, func in tests:
+        try:
+            func()
+            print(f"✅ {name}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {name}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} 通过")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+运行指标测试
+验证Prometheus文本输出（标签转义、直方图分桶/总和/次数）以及InstrumentedSession
+按采集器、调用方法、目标主机和状态记录上游请求
+
+用法:
+    python test_metrics.py
+    python -m pytest test_metrics.py -q
+"""
+
+import os
+import sys
+
+import requests
+from requests.adapters import BaseAdapter
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.utils.metrics import UPSTREAM_REQUEST_SECONDS, InstrumentedSession, MetricsRegistry
+
+
+class StubAdapter(BaseAdapter):
+    """不发起网络请求，直接返回指定状态码的传输适配器"""
+
+    def __init__(self, status_code=200, error=None):
+        super().__init__()
+        self.status_code = status_code
+        self.error = error
+        self.sent = []
+
+    def send(self, request, **kwargs):
+        self.sent.append(request.url)
+        if self.error is not None:
+            raise self.error
+        response = requests.Response()
+        response.status_code = self.status_code
+        response.url = request.url
+        response.request = request
+        response._content = b'{"rc": 0}'
+        return response
+
+    def close(self):
+        pass
+
+
+def make_session(collector, adapter):
+    session = InstrumentedSession(collector)
+    session.mount("http://", adapter)
+    return session
+
+
+def test_counter_render_escapes_labels():
+    registry = MetricsRegistry()
+    counter = registry.counter("demo_total", "示例计数", ("name",))
+    counter.inc(name='a"b')
+    counter.inc(2, name="c\\d\ne")
+    assert registry.counter("demo_total", "重复注册返回已有指标") is counter
+    assert registry.render().splitlines() == [
+        "# HELP demo_total 示例计数",
+        "# TYPE demo_total counter",
+        'demo_total{name="a\\"b"} 1',
+        'demo_total{name="c\\\\d\\ne"} 2',
+    ]
+
+
+def test_histogram_render_buckets_sum_count():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("demo_seconds", "示例耗时", ("stage",), buckets=(1.0, 0.1))
+    histogram.observe(0.05, stage="fetch")
+    histogram.observe(0.5, stage="fetch")
+    histogram.observe(3, stage="fetch")
+    assert histogram.stats(stage="fetch") == (3, 3.55)
+    lines = registry.render().splitlines()
+    # 分桶按上界排序、累积计数，+Inf等于总次数
+    assert lines[1] == "# TYPE demo_seconds histogram"
+    assert lines[2:] == [
+        'demo_seconds_bucket{stage="fetch",le="0.1"} 1',
+        'demo_seconds_bucket{stage="fetch",le="1.0"} 2',
+        'demo_seconds_bucket{stage="fetch",le="+Inf"} 3',
+        'demo_seconds_sum{stage="fetch"} 3.55',
+        'demo_seconds_count{stage="fetch"} 3',
+    ]
+
+
+def test_unlabelled_histogram_render():
+    registry = MetricsRegistry()
+    registry.histogram("lag_seconds", "延迟", buckets=(1.0,)).observe(0.2)
+    assert registry.render().splitlines()[2:] == [
+        'lag_seconds_bucket{le="1.0"} 1',
+        'lag_seconds_bucket{le="+Inf"} 1',
+        "lag_seconds_sum 0.2",
+        "lag_seconds_count 1",
+    ]
+
+
+def fetch_quote(session):
+    return session.get("http://push2.test.local/api/qt/stock/get", params={"secid": "1.600000"}, timeout=1)
+
+
+def test_instrumented_session_labels():
+    adapter = StubAdapter()
+    session = make_session("test_source", adapter)
+    labels = dict(collector="test_source", operation="fetch_quote", host="push2.test.local", status="200")
+    before = UPSTREAM_REQUEST_SECONDS.stats(**labels)[0]
+
+    response = fetch_quote(session)
+    assert response.json() == {"rc": 0} and len(adapter.sent) == 1
+    # 调用方法取发起请求的函数名（跳过requests内部栈帧）
+    assert UPSTREAM_REQUEST_SECONDS.stats(**labels)[0] == before + 1
+
+    adapter.status_code = 503
+    session.post("http://push2.test.local/api/submit", timeout=1)
+    assert UPSTREAM_REQUEST_SECONDS.stats(**dict(labels, operation="test_instrumented_session_labels", status="503"))[0] == 1
+
+
+def test_instrumented_session_records_errors():
+    session = make_session("test_error_source", StubAdapter(error=requests.ConnectionError("offline")))
+    try:
+        fetch_quote(session)
+        assert False, "应抛出连接错误"
+    except requests.ConnectionError:
+        pass
+    count, _ = UPSTREAM_REQUEST_SECONDS.stats(
+        collector="test_error_source", operation="fetch_quote", host="push2.test.local", status="error"
+    )
+    assert count == 1
+
+
+if __name__ == "__main__":
+    tests = [(name, func) for name, func in list(globals().items()) if name.startswith("test_") and callable(func)]
+    failed = 0
+    for name, func in tests:
+        try:
+            func()
+            print(f"✅ {name}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {name}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} 通过")
+    sys.exit(1 if failed else 0)
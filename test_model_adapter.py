@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+模型适配器测试
+验证并发首次调用只创建一个SDK客户端、异步流式消费方提前退出时停止读取并关闭底层流，
+流式调用被中断时按cancelled记录耗时
+
+用法:
+    python test_model_adapter.py
+    python -m pytest test_model_adapter.py -q
+"""
+
+import os
+import sys
+import asyncio
+import threading
+import time
+
+from types import SimpleNamespace
+
+import zhipuai
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.aigc.model_adapter import AIGCModelAdapter, ZhipuAdapter
+from src.utils.metrics import LLM_CLIENTS_CREATED, LLM_REQUEST_SECONDS
+
+
+def test_concurrent_client_creation():
+    created = []
+
+    class SlowClient:
+        def __init__(self, **kwargs):
+            time.sleep(0.05)  # 放大竞争窗口
+            created.append(self)
+
+    original = zhipuai.ZhipuAI
+    zhipuai.ZhipuAI = SlowClient
+    try:
+        adapter = ZhipuAdapter(api_key="id.secret")
+        before = LLM_CLIENTS_CREATED.value(provider="zhipu")
+        clients = []
+        threads = [threading.Thread(target=lambda: clients.append(adapter._get_client())) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        zhipuai.ZhipuAI = original
+
+    assert len(created) == 1 and all(c is created[0] for c in clients)
+    assert LLM_CLIENTS_CREATED.value(provider="zhipu") - before == 1
+
+
+class EndlessStreamAdapter(AIGCModelAdapter):
+    """不断产出片段的流式适配器替身，记录产出数量和流是否被关闭"""
+
+    def __init__(self):
+        super().__init__("fake")
+        self.produced = 0
+        self.closed = threading.Event()
+
+    def chat(self, prompt, **kwargs):
+        return ""
+
+    async def async_chat(self, prompt, **kwargs):
+        return ""
+
+    def stream_chat(self, prompt, **kwargs):
+        try:
+            while True:
+                time.sleep(0.005)
+                self.produced += 1
+                yield f"片段{self.produced}"
+        finally:
+            self.closed.set()
+
+
+def test_async_stream_stops_on_disconnect():
+    adapter = EndlessStreamAdapter()
+
+    async def consume():
+        stream = adapter.async_stream_chat("p")
+        chunks = [await stream.__anext__() for _ in range(3)]
+        # 模拟SSE客户端断开：关闭异步生成器
+        await asyncio.wait_for(stream.aclose(), timeout=1)
+        return chunks
+
+    assert asyncio.run(consume()) == ["片段1", "片段2", "片段3"]
+    assert adapter.closed.is_set()
+    produced = adapter.produced
+    time.sleep(0.05)
+    assert adapter.produced == produced and produced < 10
+
+
+class FakeStream:
+    """智谱SDK流式响应替身"""
+
+    def __init__(self, texts):
+        self.texts = texts
+        self.closed = False
+
+    def __iter__(self):
+        for text in self.texts:
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+
+    def close(self):
+        self.closed = True
+
+
+def make_streaming_adapter(model, texts):
+    adapter = ZhipuAdapter(api_key="id.secret", model=model)
+    stream = FakeStream(texts)
+    create = lambda **kwargs: stream
+    adapter._client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    return adapter, stream
+
+
+def test_stream_disconnect_recorded_as_cancelled():
+    adapter, stream = make_streaming_adapter("test-cancel", ["a", "b", "c"])
+    chunks = adapter.stream_chat("p")
+    assert next(chunks) == "a"
+    # 模拟SSE客户端断开：生成器被close，抛入GeneratorExit
+    chunks.close()
+    assert stream.closed
+    assert LLM_REQUEST_SECONDS.stats(provider="zhipu", model="test-cancel", status="cancelled")[0] == 1
+    assert LLM_REQUEST_SECONDS.stats(provider="zhipu", model="test-cancel", status="error")[0] == 0
+
+    adapter, _ = make_streaming_adapter("test-complete", ["a", "b"])
+    assert list(adapter.stream_chat("p")) == ["a", "b"]
+    assert LLM_REQUEST_SECONDS.stats(provider="zhipu", model="test-complete", status="ok")[0] == 1
+
+
+if __name__ == "__main__":
+    tests = [(name, func) for name, func in list(globals().items()) if name.startswith("test_") and callable(func)]
+    failed = 0
+    for name, func in tests:
+        try:
+            func()
+            print(f"✅ {name}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {name}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} 通过")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+持续监控服务测试
+验证图形只在状态变化时产生事件、只对新触发调用AI、行情缺失时保持原状态
+
+用法:
+    python test_monitor_service.py
+    python -m pytest test_monitor_service.py -q
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.aigc.model_adapter import AIGCService, MockAIGCAdapter
+from src.monitors.data_collector import MockDataCollector, StockDataAggregator
+from src.monitors.monitor_service import MonitorService, parse_patterns, parse_watchlist
+from src.monitors.stock_monitor import PatternType, StockPatternMonitor
+
+
+class ScriptedCollector(MockDataCollector):
+    """按轮次返回指定价格的模拟采集器，统计各接口调用次数"""
+
+    def __init__(self):
+        super().__init__()
+        self.prices = {}
+        self.calls = {"stock": 0, "sector": 0, "index": 0}
+
+    def _quote(self, stock_code):
+        price = self.prices.get(stock_code)
+        if price is None:
+            return {}
+        return {
+            "股票代码": stock_code,
+            "股票名称": f"股票{stock_code}",
+            "开盘价": 10.0,
+            "实时价": price,
+            "最高价": max(10.0, price),
+            "涨停价": 11.0,
+            "板块名称": "测试板块",
+        }
+
+    def get_stock_realtime_data(self, stock_code):
+        self.calls["stock"] += 1
+        return self._quote(stock_code)
+
+    def get_stocks_realtime_data(self, stock_codes):
+        self.calls["stock"] += 1
+        return {code: self._quote(code) for code in stock_codes if code in self.prices}
+
+    def get_sector_data(self, sector_name):
+        self.calls["sector"] += 1
+        return super().get_sector_data(sector_name)
+
+    def get_market_index_data(self, index_name="上证指数"):
+        self.calls["index"] += 1
+        return super().get_market_index_data(index_name)
+
+
+class CountingAIGCAdapter(MockAIGCAdapter):
+    def __init__(self):
+        super().__init__()
+        self.prompts = 0
+
+    async def async_chat(self, prompt, **kwargs):
+        self.prompts += 1
+        return await super().async_chat(prompt, **kwargs)
+
+
+def make_service():
+    collector = ScriptedCollector()
+    adapter = CountingAIGCAdapter()
+    monitor = StockPatternMonitor(StockDataAggregator(collector), AIGCService(adapter))
+    service = MonitorService(monitor, ["600000", "000001"], [PatternType.OPENING_DIVE], interval=0.01)
+    return service, collector, adapter
+
+
+def test_edge_triggered():
+    service, collector, adapter = make_service()
+
+    # 第1轮：600000跌4%触发，000001正常
+    collector.prices = {"600000": 9.6, "000001": 10.0}
+    report = service.run_cycle()
+    assert [t.股票代码 for t in report.triggers] == ["600000"]
+    assert report.triggers[0].已处理 and adapter.prompts == 1
+
+    # 第2、3轮：图形持续，不重复产生事件，也不调用AI
+    for _ in range(2):
+        report = service.run_cycle()
+        assert report.triggers == [] and report.active == 1
+    assert adapter.prompts == 1
+
+    # 第4轮：回到开盘价，图形解除
+    collector.prices["600000"] = 10.0
+    report = service.run_cycle()
+    assert report.cleared == [("600000", PatternType.OPENING_DIVE)] and report.active == 0
+
+    # 第5轮：再次跳水，重新触发
+    collector.prices["600000"] = 9.5
+    report = service.run_cycle()
+    assert [t.股票代码 for t in report.triggers] == ["600000"] and adapter.prompts == 2
+
+
+def test_missing_quote_keeps_state():
+    service, collector, adapter = make_service()
+    collector.prices = {"600000": 9.6, "000001": 10.0}
+    service.run_cycle()
+
+    # 行情获取失败不视为图形解除，恢复后也不重复触发
+    del collector.prices["600000"]
+    report = service.run_cycle()
+    assert report.cleared == [] and report.active == 1
+    collector.prices["600000"] = 9.6
+    report = service.run_cycle()
+    assert report.triggers == [] and adapter.prompts == 1
+
+
+def test_batched_collection_per_cycle():
+    service, collector, _ = make_service()
+    collector.prices = {"600000": 9.6, "000001": 10.0}
+    service.run_cycle()
+    # 每轮：行情1次批量请求，指数各1次，板块1次
+    assert collector.calls == {"stock": 1, "sector": 1, "index": 2}
+
+
+def test_ai_failure_still_emits_trigger():
+    service, collector, adapter = make_service()
+
+    async def broken(prompt, **kwargs):
+        raise RuntimeError("模型不可用")
+
+    adapter.async_chat = broken
+    received = []
+    service.on_trigger = received.append
+    collector.prices = {"600000": 9.6}
+    report = service.run_cycle()
+    assert len(received) == 1 and not received[0].已处理 and report.error is None
+
+
+def test_run_forever_reports_lag():
+    service, collector, _ = make_service()
+    collector.prices = {"600000": 10.0}
+    service.run_forever(max_cycles=3)
+    assert service.cycles == 3
+    assert service.last_report.lag >= 0 and service.status()["last_cycle"]["cycle"] == 3
+
+
+def test_skipped_cycles_visible_to_callbacks():
+    service, collector, _ = make_service()
+    collector.prices = {"600000": 10.0}
+    seen = []
+    service.on_cycle = lambda report: seen.append(report.skipped_cycles)
+    service.run_cycle(skipped_cycles=2)
+    assert seen == [2]
+
+
+def test_parse_config():
+    assert parse_watchlist("600000, 000001，600000") == ["600000", "000001"]
+    assert parse_patterns("开盘跳水,冲板回落") == [PatternType.OPENING_DIVE, PatternType.SURGE_RETRACE]
+
+
+if __name__ == "__main__":
+    tests = [(name, func) for name, func in list(globals().items()) if name.startswith("test_") and callable(func)]
+    failed = 0
+    for name, func in tests:
+        try:
+            func()
+            print(f"✅ {name}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {name}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} 通过")
+    sys.exit(1 if failed else 0)
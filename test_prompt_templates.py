@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+精简版Prompt测试
+验证占位字段被去掉、板块/大盘涨跌幅为字符串或空值时仍能生成Prompt
+
+用法:
+    python test_prompt_templates.py
+    python -m pytest test_prompt_templates.py -q
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.templates.prompt_templates import TemplateType, generate_prompt
+
+
+def compact_prompt(**overrides):
+    data = {"股票代码": "600000", "股票名称": "浦发银行", "触发时间": "09:35", "开盘价": 10.5, "实时价": 10.2,
+            "板块名称": "银行", "板块涨跌幅": -1.2, "大盘名称": "上证指数", "大盘涨跌幅": 0.35, "最新消息": "无"}
+    data.update(overrides)
+    return generate_prompt("开盘跳水", data, template_type=TemplateType.COMPACT)
+
+
+def environment_line(prompt):
+    return next((line for line in prompt.splitlines() if line.startswith("环境：")), "")
+
+
+def test_compact_environment():
+    prompt = compact_prompt()
+    assert environment_line(prompt) == "环境：板块银行-1.2% 上证指数+0.35%"
+    assert "消息：" not in prompt
+
+
+def test_change_values_not_numeric():
+    # 接口返回字符串数值
+    assert environment_line(compact_prompt(板块涨跌幅="-1.2", 大盘涨跌幅="0.35")) == "环境：板块银行-1.2% 上证指数+0.35%"
+    # None/占位值被去掉，无法解析的值不输出涨跌幅
+    assert environment_line(compact_prompt(板块涨跌幅=None, 大盘涨跌幅="--")) == "环境：板块银行"
+    assert environment_line(compact_prompt(板块名称="未知", 大盘涨跌幅=None)) == ""
+
+
+if __name__ == "__main__":
+    tests = [(name, func) for name, func in list(globals().items()) if name.startswith("test_") and callable(func)]
+    failed = 0
+    for name, func in tests:
+        try:
+            func()
+            print(f"✅ {name}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {name}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} 通过")
+    sys.exit(1 if failed else 0)
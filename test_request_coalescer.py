@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+请求合并器测试
+验证同一个键的并发调用（同步、各线程独立事件循环的异步）只执行一次并共享结果或异常，
+新的分钟时间桶发起新的调用，请求完成后不缓存结果
+
+用法:
+    python test_request_coalescer.py
+    python -m pytest test_request_coalescer.py -q
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.utils.request_coalescer import RequestCoalescer, minute_bucket
+
+N = 8
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.005)
+    return condition()
+
+
+def run_concurrently(coalescer, call):
+    """N个线程并发调用call；首个调用阻塞到其余调用方都已加入等待后才返回"""
+    outcomes = [None] * N
+
+    def worker(i):
+        try:
+            outcomes[i] = ("ok", call())
+        except Exception as e:
+            outcomes[i] = ("error", e)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(N)]
+    for thread in threads:
+        thread.start()
+    assert wait_for(lambda: coalescer.stats["shared"] == N - 1)
+    return threads, outcomes
+
+
+def test_sync_callers_share_one_call():
+    coalescer = RequestCoalescer("test_sync")
+    release = threading.Event()
+    calls = []
+
+    def fetch(code):
+        calls.append(code)
+        release.wait(5)
+        return {"股票代码": code}
+
+    threads, outcomes = run_concurrently(coalescer, lambda: coalescer.run(("quote", "600000"), fetch, "600000"))
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert calls == ["600000"]
+    # 所有调用方拿到同一个结果对象
+    assert all(kind == "ok" and value is outcomes[0][1] for kind, value in outcomes)
+    assert coalescer.inflight_count() == 0
+
+
+def test_sync_callers_share_exception():
+    coalescer = RequestCoalescer("test_sync_error")
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        release.wait(5)
+        raise ConnectionError("offline")
+
+    threads, outcomes = run_concurrently(coalescer, lambda: coalescer.run("key", fetch))
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert all(kind == "error" and value is outcomes[0][1] for kind, value in outcomes)
+    assert isinstance(outcomes[0][1], ConnectionError)
+
+
+def test_async_callers_on_separate_loops_share_one_call():
+    coalescer = RequestCoalescer("test_async")
+    release = threading.Event()
+    calls = []
+
+    async def analyze():
+        calls.append(1)
+        await asyncio.get_running_loop().run_in_executor(None, release.wait, 5)
+        return "分析结果"
+
+    # 与Flask请求线程一样，每个线程有自己的事件循环
+    threads, outcomes = run_concurrently(
+        coalescer, lambda: asyncio.run(coalescer.run_async(("analysis", "600000"), analyze))
+    )
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1 and outcomes == [("ok", "分析结果")] * N
+
+    # 同一事件循环内的并发调用同样只执行一次，异常传给所有等待方
+    async def failing():
+        calls.append(2)
+        await asyncio.sleep(0.05)
+        raise RuntimeError("模型不可用")
+
+    async def gather():
+        return await asyncio.gather(*(coalescer.run_async("fail", failing) for _ in range(N)), return_exceptions=True)
+
+    errors = asyncio.run(gather())
+    assert calls.count(2) == 1 and all(isinstance(e, RuntimeError) for e in errors)
+
+
+def test_new_minute_bucket_starts_fresh_call():
+    coalescer = RequestCoalescer("test_bucket")
+    release = threading.Event()
+    calls = []
+
+    def fetch(bucket):
+        calls.append(bucket)
+        release.wait(5)
+        return bucket
+
+    first = minute_bucket(datetime(2026, 10, 19, 9, 30, 59))
+    second = minute_bucket(datetime(2026, 10, 19, 9, 31, 0))
+    assert (first, second) == ("202610190930", "202610190931")
+
+    # 上一分钟的调用还在进行时，新时间桶的调用不等待它
+    thread = threading.Thread(target=coalescer.run, args=(("quote", first), fetch, first))
+    thread.start()
+    assert wait_for(lambda: coalescer.inflight_count() == 1)
+    release.set()
+    assert coalescer.run(("quote", second), fetch, second) == second
+    thread.join()
+    assert calls == [first, second]
+
+    # 请求完成后不缓存：同一个键再次调用会重新执行
+    assert coalescer.run(("quote", second), fetch, second) == second
+    assert calls == [first, second, second] and coalescer.stats["shared"] == 0
+
+
+if __name__ == "__main__":
+    tests = [(name, func) for name, func in list(globals().items()) if name.startswith("test_") and callable(func)]
+    failed = 0
+    for name, func in tests:
+        try:
+            func()
+            print(f"✅ {name}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {name}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} 通过")
+    sys.exit(1 if failed else 0)
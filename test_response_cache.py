@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+AI分析结果缓存测试
+验证缓存键的量化规则（幅/比例字段0.5步长、价格3位有效数字、忽略触发时间）、TTL过期、LRU淘汰和SQLite磁盘层
+
+用法:
+    python test_response_cache.py
+    python -m pytest test_response_cache.py -q
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.aigc.response_cache import LLMResponseCache, make_cache_key, quantize_inputs
+
+
+def stock(**overrides):
+    data = {"股票代码": "600000", "触发时间": "09:35", "实时价": 9.876, "跌幅": 3.1, "成交额放大比例": 25.2}
+    data.update(overrides)
+    return data
+
+
+def key(**overrides):
+    return make_cache_key("glm-4", "完整版", "开盘跳水", stock(**overrides))
+
+
+def test_quantize_rules():
+    quantized = quantize_inputs(stock(最高价=1234.5, 是否ST=True))
+    assert "触发时间" not in quantized
+    assert quantized["跌幅"] == 3.0 and quantized["成交额放大比例"] == 25.0
+    assert quantized["实时价"] == 9.88 and quantized["最高价"] == 1230.0
+    assert quantized["股票代码"] == "600000" and quantized["是否ST"] is True
+
+
+def test_cache_key_buckets():
+    base = key()
+    # 触发时间不参与缓存键
+    assert key(触发时间="09:36") == base
+    # 同一个0.5%步长内、同一价位（3位有效数字）内的变化命中同一个键
+    assert key(跌幅=3.2, 成交额放大比例=24.9) == base
+    assert key(实时价=9.878) == base
+    # 跨步长、跨价位的变化得到不同的键
+    assert key(跌幅=3.3) != base
+    assert key(实时价=9.9) != base
+    assert make_cache_key("glm-4-flash", "完整版", "开盘跳水", stock()) != base
+    assert make_cache_key("glm-4", "简化版", "开盘跳水", stock()) != base
+
+
+def test_ttl_expiry_and_lru():
+    cache = LLMResponseCache(ttl_seconds=60, max_entries=2)
+    cache.set("a", "回复A")
+    assert cache.get("a") == "回复A"
+
+    # 模拟写入时间早于TTL
+    response, created_at = cache._memory["a"]
+    cache._memory["a"] = (response, created_at - 61)
+    assert cache.get("a") is None and len(cache) == 0
+
+    cache.set("a", "回复A")
+    cache.set("b", "回复B")
+    cache.get("a")
+    cache.set("c", "回复C")
+    # 最近最少使用的b被淘汰
+    assert cache.get("b") is None and cache.get("a") == "回复A" and cache.get("c") == "回复C"
+
+    cache.set("d", "")
+    assert cache.get("d") is None
+
+
+def test_sqlite_tier_survives_restart():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "cache", "llm.db")
+        cache = LLMResponseCache(ttl_seconds=60, disk_path=path)
+        cache.set("k", "磁盘回复")
+        cache._disk.close()
+
+        restarted = LLMResponseCache(ttl_seconds=60, disk_path=path)
+        assert len(restarted) == 0
+        assert restarted.get("k") == "磁盘回复" and len(restarted) == 1
+
+        # 磁盘层同样按TTL过期
+        restarted._disk.execute("UPDATE llm_cache SET created_at = created_at - 120")
+        restarted._disk.commit()
+        restarted._memory.clear()
+        assert restarted.get("k") is None
+
+        restarted.clear()
+        assert restarted._disk.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0] == 0
+        restarted._disk.close()
+
+
+if __name__ == "__main__":
+    tests = [(name, func) for name, func in list(globals().items()) if name.startswith("test_") and callable(func)]
+    failed = 0
+    for name, func in tests:
+        try:
+            func()
+            print(f"✅ {name}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {name}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} 通过")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+声明式图形规则等价性测试
+对比编译后的向量化规则与原逐条lambda规则在随机行情上的判定结果
+
+用法:
+    python test_rule_spec.py
+    python -m pytest test_rule_spec.py -q
+"""
+
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from src.models.stock_data import StockMarketData
+from src.monitors.rule_spec import DERIVED_COLUMNS, AllOf, CompiledRules, RuleFrame, RuleSpec, register_column, round2
+from src.monitors.stock_monitor import PATTERN_RULE_SPECS, PatternType
+
+
+# ---------- 原逐条实现（判定基准） ----------
+
+def legacy_opening_dive(data, minutes, drop_percent):
+    current_price = data.get("实时价") or 0
+    open_price = data.get("开盘价") or 0
+    open_minutes = data.get("开盘分钟数") or 0
+
+    if open_price == 0 or current_price == 0:
+        return False
+
+    drop_ratio = round((open_price - current_price) / open_price * 100, 2)
+    return open_minutes <= minutes and drop_ratio >= drop_percent
+
+
+def legacy_breakdown(data, ma_type):
+    current_price = data.get("实时价") or 0
+    ma_price = data.get(f"{ma_type}日均线") or 0
+    volume_increase = data.get("成交额放大比例") or 0
+
+    return current_price < ma_price and volume_increase > 20
+
+
+def legacy_support_breakdown(data):
+    current_price = data.get("实时价") or 0
+    support_price = data.get("前期平台支撑位") or 0
+    minutes_no_rebound = data.get("破位后未回弹分钟数") or 0
+    volume_increase = data.get("成交额放大比例") or 0
+
+    return current_price < support_price and minutes_no_rebound >= 3 and volume_increase > 15
+
+
+def legacy_surge_retrace(data, surge_percent=9.9, retrace_percent=5):
+    current_price = data.get("实时价") or 0
+    high_price = data.get("最高价") or 0
+    open_price = data.get("开盘价") or 0
+
+    if open_price == 0 or high_price == 0:
+        return False
+
+    surge = round((high_price - open_price) / open_price * 100, 2)
+    retrace = round((high_price - current_price) / high_price * 100, 2)
+    return surge >= surge_percent and retrace >= retrace_percent
+
+
+LEGACY_RULES = {
+    PatternType.OPENING_DIVE: [
+        lambda d: legacy_opening_dive(d, minutes=5, drop_percent=3),
+        lambda d: legacy_opening_dive(d, minutes=10, drop_percent=2),
+    ],
+    PatternType.BREAKDOWN_FALL: [
+        lambda d: legacy_breakdown(d, ma_type=5),
+        lambda d: legacy_breakdown(d, ma_type=20),
+        legacy_support_breakdown,
+    ],
+    PatternType.SURGE_RETRACE: [
+        lambda d: legacy_surge_retrace(d, retrace_percent=5),
+        lambda d: legacy_surge_retrace(d, surge_percent=8, retrace_percent=3),
+    ],
+}
+
+
+def legacy_first_match(pattern_type, data):
+    for i, rule in enumerate(LEGACY_RULES[pattern_type]):
+        if rule(data):
+            return i
+    return -1
+
+
+# ---------- 测试数据 ----------
+
+def random_records(count=20000, seed=41):
+    """随机行情，包含缺失值、0值以及恰好落在阈值上的价格"""
+    rng = random.Random(seed)
+
+    def maybe(value):
+        roll = rng.random()
+        if roll < 0.03:
+            return None
+        if roll < 0.06:
+            return 0
+        return value
+
+    records = []
+    for _ in range(count):
+        open_price = round(rng.uniform(2, 100), 2)
+        # 一部分样本的跌幅/涨幅恰好为整数百分比，覆盖阈值边界和四舍五入
+        if rng.random() < 0.3:
+            current = round(open_price * (1 - rng.choice([2, 3, 5, 8, 9.9]) / 100), 2)
+        else:
+            current = round(open_price * rng.uniform(0.9, 1.1), 2)
+        high = round(max(open_price, current) * rng.uniform(1.0, 1.15), 2)
+        records.append({
+            "开盘价": maybe(open_price),
+            "实时价": maybe(current),
+            "最高价": maybe(high),
+            "开盘分钟数": maybe(rng.randint(1, 15)),
+            "5日均线": maybe(round(open_price * rng.uniform(0.95, 1.05), 2)),
+            "20日均线": maybe(round(open_price * rng.uniform(0.9, 1.1), 2)),
+            "前期平台支撑位": maybe(round(open_price * rng.uniform(0.9, 1.05), 2)),
+            "破位后未回弹分钟数": maybe(rng.randint(0, 6)),
+            "成交额放大比例": maybe(rng.choice([15, 20, rng.uniform(0, 60)])),
+        })
+    return records
+
+
+RECORDS = random_records()
+
+
+# ---------- 测试 ----------
+
+def _assert_equivalent(pattern_type):
+    compiled = CompiledRules(PATTERN_RULE_SPECS[pattern_type])
+    indices = compiled.first_match(compiled.frame(RECORDS))
+    expected = np.array([legacy_first_match(pattern_type, record) for record in RECORDS])
+    mismatches = np.flatnonzero(indices != expected)
+    assert len(mismatches) == 0, f"{pattern_type.value}: {len(mismatches)}条不一致，例如 {RECORDS[mismatches[0]]}"
+    return int(np.count_nonzero(expected >= 0))
+
+
+def test_opening_dive_equivalence():
+    assert _assert_equivalent(PatternType.OPENING_DIVE) > 0
+
+
+def test_breakdown_equivalence():
+    assert _assert_equivalent(PatternType.BREAKDOWN_FALL) > 0
+
+
+def test_surge_retrace_equivalence():
+    assert _assert_equivalent(PatternType.SURGE_RETRACE) > 0
+
+
+def test_single_record_matches():
+    """单条判断（PatternRule.condition）与原实现一致"""
+    for pattern_type, specs in PATTERN_RULE_SPECS.items():
+        for spec, legacy in zip(specs, LEGACY_RULES[pattern_type]):
+            for record in RECORDS[:500]:
+                assert spec.matches(record) == legacy(record), (spec.name, record)
+
+
+def test_round2_matches_builtin_round():
+    rng = np.random.default_rng(7)
+    values = np.concatenate([
+        rng.uniform(-20, 20, 50000),
+        np.arange(-1000, 1000) / 200,  # x.xx5 边界
+    ])
+    expected = np.array([round(float(v), 2) for v in values])
+    assert np.array_equal(round2(values), expected)
+
+
+def test_derived_columns_shared():
+    """同一张表上派生列只计算一次"""
+    compiled = CompiledRules(PATTERN_RULE_SPECS[PatternType.SURGE_RETRACE])
+    frame = compiled.frame(RECORDS[:100])
+    compiled.evaluate(frame)
+    surge = frame.column("冲高幅度")
+    compiled.evaluate(frame)
+    assert frame.column("冲高幅度") is surge
+    assert compiled.fields == {"最高价", "开盘价", "实时价"}
+
+
+def test_empty_frame():
+    compiled = CompiledRules(PATTERN_RULE_SPECS[PatternType.OPENING_DIVE])
+    assert compiled.first_match(RuleFrame.from_records([], compiled.fields)).shape == (0,)
+
+
+def test_derived_columns_do_not_shadow_record_fields():
+    """派生列不能与行情记录字段同名，否则规则取不到记录中的值"""
+    assert not set(DERIVED_COLUMNS) & set(StockMarketData.model_fields)
+    try:
+        register_column("冲高幅度", ("最高价",))
+        assert False, "重复注册应报错"
+    except ValueError:
+        pass
+
+    # 冲板回落记录自带的回落幅度（相对触板价）与派生的高点回落幅度（相对最高价）各自取值
+    record = {"开盘价": 10.0, "最高价": 11.0, "实时价": 10.6, "回落幅度": 6.0}
+    assert not RuleSpec("派生", AllOf(("高点回落幅度", ">=", 5))).matches(record)
+    assert RuleSpec("记录", AllOf(("回落幅度", ">=", 5))).matches(record)
+
+
+if __name__ == "__main__":
+    tests = [(name, func) for name, func in list(globals().items()) if name.startswith("test_") and callable(func)]
+    failed = 0
+    for name, func in tests:
+        try:
+            func()
+            print(f"✅ {name}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {name}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} 通过")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,429 @@
+#!/usr/bin/env python3
+"""
+全市场向量化筛选等价性测试
+对比screen()与逐只判断的detect_pattern_type、游资票/散户最爱参考规则在随机行情上的结果，
+并验证单只判定函数与整批筛选结果一致
+
+用法:
+    python test_screener.py
+    python -m pytest test_screener.py -q
+"""
+
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from analyze import detect_pattern_type
+from src.monitors.screener import (
+    PATTERN_NAMES, QuoteSnapshot, is_retail_favorite_stock, is_speculative_stock, name_features, screen, screen_quotes
+)
+
+NAMES = ["浦发银行", "*ST明科", "ST宝德", "智能科技", "新能源材料", "华大生物医疗", "中芯半导体",
+         "软件信息", "环保化工", "文化传媒教育", "人工智能AI", "贵州茅台", ""]
+
+
+def random_quotes(count=20000, seed=39):
+    """随机行情，包含缺失昨收、0值、涨停/阈值附近的价格和各类名称"""
+    rng = random.Random(seed)
+
+    def maybe(value):
+        return 0 if rng.random() < 0.03 else value
+
+    quotes = []
+    for i in range(count):
+        prev_close = round(rng.uniform(1, 120), 2)
+        if rng.random() < 0.3:
+            change = rng.choice([-10, -9.9, -7, -5, -2, 0, 2, 3, 5, 7, 9.9, 10]) / 100
+        else:
+            change = rng.uniform(-0.11, 0.11)
+        price = round(prev_close * (1 + change), 2)
+        open_price = round(prev_close * rng.uniform(0.93, 1.07), 2)
+        high = round(max(price, open_price) * rng.uniform(1.0, 1.12), 2)
+        low = round(min(price, open_price) * rng.uniform(0.88, 1.0), 2)
+        quote = {
+            "股票代码": f"{600000 + i}",
+            "股票名称": rng.choice(NAMES),
+            "实时价": maybe(price),
+            "开盘价": maybe(open_price),
+            "最高价": maybe(high),
+            "最低价": maybe(low),
+            "昨收": maybe(prev_close),
+            "涨停价": round(prev_close * 1.1, 2),
+            "换手率": maybe(rng.choice([3, 5, 10, 15, 20, rng.uniform(0, 30)])),
+            "总市值": maybe(rng.choice([20e8, 40e8, 100e8, 200e8, rng.uniform(5e8, 5e11)])),
+            "成交额": maybe(rng.uniform(1e6, 5e10)),
+        }
+        # 一部分行情没有昨收字段（图形判定改用开盘价）
+        if rng.random() < 0.05:
+            del quote["昨收"]
+        quotes.append(quote)
+    return quotes
+
+
+def reference_speculative(real_data: dict) -> tuple:
+    """游资票判定的逐只参考实现（重构前app.is_speculative_stock的原始规则）"""
+    try:
+        current_price = real_data.get('实时价', 0)
+        open_price = real_data.get('开盘价', 0)
+        high_price = real_data.get('最高价', 0)
+        low_price = real_data.get('最低价', 0)
+        prev_close = real_data.get('昨收', 0)
+        amount = real_data.get('成交额', 0)  # 成交额（元）
+        turnover_rate = real_data.get('换手率', 0)  # 换手率
+        market_cap = real_data.get('总市值', 0)  # 总市值
+
+        if current_price <= 0 or prev_close <= 0:
+            return False, "", 0
+
+        risk_factors = []
+        risk_score = 0
+
+        # ========== 【第二问 看量能&换手】核心指标 ==========
+
+        # 1. 换手率判断（最关键指标）
+        if turnover_rate and turnover_rate > 0:
+            if turnover_rate >= 20:  # 连板期水平
+                risk_score += 40
+                risk_factors.append(f"⚠️ 超高换手({turnover_rate:.2f}%),连板特征")
+            elif turnover_rate >= 15:  # 游资票硬指标
+                risk_score += 30
+                risk_factors.append(f"⚠️ 高换手({turnover_rate:.2f}%),游资活跃")
+            elif turnover_rate >= 10:
+                risk_score += 15
+                risk_factors.append(f"换手率偏高({turnover_rate:.2f}%)")
+            elif turnover_rate <= 5:  # 机构票特征
+                risk_score -= 20  # 降低风险分数
+                risk_factors.append(f"✓ 低换手({turnover_rate:.2f}%),机构特征")
+
+        # ========== 【第三问 看走势&驱动】定性判断 ==========
+
+        # 2. 日内振幅判断（硬指标：游资票≥8%，机构票≤5%）
+        if high_price > 0 and low_price > 0:
+            amplitude = ((high_price - low_price) / low_price * 100)
+            if amplitude >= 12:  # 暴涨暴跌
+                risk_score += 30
+                risk_factors.append(f"⚠️ 巨幅震荡({amplitude:.2f}%),情绪化")
+            elif amplitude >= 8:  # 游资票硬指标
+                risk_score += 20
+                risk_factors.append(f"⚠️ 大振幅({amplitude:.2f}%),游资特征")
+            elif amplitude <= 5:  # 机构票特征
+                risk_score -= 15  # 降低风险分数
+                risk_factors.append(f"✓ 小振幅({amplitude:.2f}%),稳健")
+
+        # 3. 单日涨幅判断（连板/涨停特征）
+        change_percent = ((current_price - prev_close) / prev_close * 100)
+        if change_percent >= 9.9:  # 涨停
+            risk_score += 25
+            risk_factors.append(f"⚠️ 涨停({change_percent:+.2f}%)")
+        elif change_percent >= 7:  # 大涨
+            risk_score += 15
+            risk_factors.append(f"大涨({change_percent:+.2f}%)")
+        elif change_percent <= 3 and change_percent >= 0:  # 温和上涨（机构特征）
+            risk_score -= 10
+            risk_factors.append(f"✓ 温和上涨({change_percent:+.2f}%)")
+
+        # ========== 市值判断（辅助指标） ==========
+
+        if market_cap and market_cap > 0:
+            market_cap_yi = market_cap / 100000000  # 转换为亿
+
+            # 流通值40-200亿：游资票偏好区间
+            if 40 <= market_cap_yi <= 200:
+                if turnover_rate and turnover_rate >= 15:
+                    risk_score += 15
+                    risk_factors.append(f"中小盘+高换手(市值{market_cap_yi:.0f}亿)")
+                elif turnover_rate and turnover_rate >= 10:
+                    risk_score += 10
+                    risk_factors.append(f"中小盘(市值{market_cap_yi:.0f}亿)")
+
+            # 小于40亿：容易被控盘
+            elif market_cap_yi < 40:
+                if turnover_rate and turnover_rate >= 15:
+                    risk_score += 20
+                    risk_factors.append(f"⚠️ 小盘易控盘(市值{market_cap_yi:.0f}亿,换手{turnover_rate:.2f}%)")
+                elif turnover_rate and turnover_rate >= 10:
+                    risk_score += 10
+                    risk_factors.append(f"小盘股(市值{market_cap_yi:.0f}亿)")
+
+            # 大于100亿：机构票偏好
+            elif market_cap_yi >= 100:
+                if turnover_rate and turnover_rate <= 5:
+                    risk_score -= 15
+                    risk_factors.append(f"✓ 大盘低换手(市值{market_cap_yi:.0f}亿),机构偏好")
+
+        # ========== 情绪化走势特征 ==========
+
+        # 冲高回落（从高点回落>5%）
+        if high_price > 0 and current_price > 0:
+            pullback_from_high = ((high_price - current_price) / high_price * 100)
+            if pullback_from_high > 5:
+                risk_score += 15
+                risk_factors.append(f"⚠️ 冲高回落({pullback_from_high:.2f}%)")
+
+        # 开盘强势但回落
+        if open_price > 0 and current_price > 0 and open_price > prev_close:
+            open_change = ((open_price - prev_close) / prev_close * 100)
+            current_change = ((current_price - prev_close) / prev_close * 100)
+            if open_change > current_change and open_change > 3:
+                pullback = open_change - current_change
+                if pullback > 3:
+                    risk_score += 10
+                    risk_factors.append(f"开盘回落({pullback:.2f}%)")
+
+        # ========== 成交额异常放大判断 ==========
+
+        if market_cap and amount and market_cap > 0:
+            amount_ratio = (amount / market_cap * 100)
+            if amount_ratio > 40:
+                risk_score += 10
+                risk_factors.append(f"成交额异常({amount_ratio:.0f}%市值)")
+
+        # ========== 综合判断（终极速判口诀）==========
+
+        # 口诀1: 高换手(≥15%) + 大振幅(≥8%) + 中小盘 = 游资票
+        is_high_turnover = turnover_rate and turnover_rate >= 15
+        is_high_amplitude = False
+        if high_price > 0 and low_price > 0:
+            amplitude = ((high_price - low_price) / low_price * 100)
+            is_high_amplitude = amplitude >= 8
+        is_mid_small_cap = False
+        if market_cap and market_cap > 0:
+            market_cap_yi = market_cap / 100000000
+            is_mid_small_cap = market_cap_yi <= 200
+
+        # 满足游资票"三位一体"特征，直接判定
+        if is_high_turnover and is_high_amplitude and is_mid_small_cap:
+            is_speculative = True
+            if not any("三位一体" in f for f in risk_factors):
+                risk_factors.insert(0, "⚠️ 游资票三位一体(高换手+大振幅+中小盘)")
+        else:
+            # 否则按风险分数判断
+            # 风险分数 > 50 判定为游资票
+            is_speculative = risk_score > 50 or len([f for f in risk_factors if "⚠️" in f]) >= 2
+
+        reason = "、".join(risk_factors) if risk_factors else ""
+
+        return is_speculative, reason, max(0, risk_score)
+
+    except Exception as e:
+        print(f"检测游资票时出错: {e}")
+        return False, "", 0
+
+
+
+
+def reference_retail(real_data: dict) -> tuple:
+    """散户最爱判定的逐只参考实现（重构前app.is_retail_favorite_stock的原始规则）"""
+    try:
+        current_price = real_data.get('实时价', 0)
+        stock_name = real_data.get('股票名称', '')
+        open_price = real_data.get('开盘价', 0)
+        high_price = real_data.get('最高价', 0)
+        low_price = real_data.get('最低价', 0)
+        prev_close = real_data.get('昨收', 0)
+        turnover_rate = real_data.get('换手率', 0)
+        market_cap = real_data.get('总市值', 0)
+
+        if current_price <= 0 or not stock_name:
+            return False, "", 0
+
+        retail_factors = []
+        retail_score = 0
+
+        # ========== 1. 低价股判断（散户最爱）==========
+
+        if current_price < 5:  # 超低价股
+            retail_score += 30
+            retail_factors.append(f"💸 超低价股({current_price:.2f}元),散户最爱")
+        elif current_price < 10:  # 低价股
+            retail_score += 20
+            retail_factors.append(f"💸 低价股({current_price:.2f}元)")
+        elif current_price < 20:  # 中低价
+            retail_score += 10
+            retail_factors.append(f"价格适中({current_price:.2f}元)")
+        elif current_price >= 50:  # 高价股，散户不太买
+            retail_score -= 15
+            retail_factors.append(f"✓ 高价股({current_price:.2f}元),机构偏好")
+
+        # ========== 2. 小盘股判断（散户觉得好炒作）==========
+
+        if market_cap and market_cap > 0:
+            market_cap_yi = market_cap / 100000000
+
+            if market_cap_yi < 30:  # 超小盘
+                retail_score += 25
+                retail_factors.append(f"🎯 超小盘(市值{market_cap_yi:.0f}亿),易炒作")
+            elif market_cap_yi < 50:  # 小盘
+                retail_score += 15
+                retail_factors.append(f"🎯 小盘股(市值{market_cap_yi:.0f}亿)")
+            elif market_cap_yi < 100:  # 中盘
+                retail_score += 5
+            elif market_cap_yi >= 200:  # 大盘股，散户不太关注
+                retail_score -= 10
+                retail_factors.append(f"✓ 大盘股(市值{market_cap_yi:.0f}亿)")
+
+        # ========== 3. ST/*ST股票判断（散户赌重组）==========
+
+        if 'ST' in stock_name or '*ST' in stock_name or '退' in stock_name:
+            retail_score += 40
+            retail_factors.append(f"⚠️ 特殊处理股票({stock_name}),散户赌重组")
+
+        # ========== 4. 概念股名字判断（散户追热点）==========
+
+        _, concept_score, matched_concepts = name_features(stock_name)
+        retail_score += concept_score
+
+        if matched_concepts:
+            retail_factors.append(f"🔥 热门概念({','.join(matched_concepts)})")
+
+        # ========== 5. 高换手+高振幅组合（散户追涨杀跌）==========
+
+        is_high_turnover = turnover_rate and turnover_rate >= 10
+        is_high_amplitude = False
+        if high_price > 0 and low_price > 0 and prev_close > 0:
+            amplitude = ((high_price - low_price) / low_price * 100)
+            is_high_amplitude = amplitude >= 10
+            if amplitude >= 15:
+                retail_score += 15
+                retail_factors.append(f"🎢 巨幅波动({amplitude:.2f}%)")
+
+        # 散户最爱：高换手+高振幅
+        if is_high_turnover and is_high_amplitude:
+            retail_score += 20
+            retail_factors.append(f"🎲 高换手+高振幅,散户追涨杀跌")
+
+        # ========== 6. 涨停/跌停判断（散户最关注）==========
+
+        if prev_close > 0:
+            change_percent = ((current_price - prev_close) / prev_close * 100)
+
+            if change_percent >= 9.9:  # 涨停
+                retail_score += 25
+                retail_factors.append(f"🚀 涨停({change_percent:+.2f}%)")
+            elif change_percent <= -9.9:  # 跌停
+                retail_score += 20
+                retail_factors.append(f"💥 跌停({change_percent:+.2f}%),散户抄底")
+            elif change_percent >= 7:  # 大涨
+                retail_score += 15
+                retail_factors.append(f"大涨({change_percent:+.2f}%)")
+            elif change_percent <= -7:  # 大跌
+                retail_score += 15
+                retail_factors.append(f"大跌({change_percent:+.2f}%),散户抄底")
+
+        # ========== 7. 成交量异常放大（散户跟风）==========
+
+        if turnover_rate and turnover_rate > 0:
+            if turnover_rate >= 20:  # 超高换手
+                retail_score += 20
+                retail_factors.append(f"📊 超高换手({turnover_rate:.2f}%),散户跟风")
+            elif turnover_rate >= 15:  # 高换手
+                retail_score += 15
+                retail_factors.append(f"高换手({turnover_rate:.2f}%)")
+
+        # ========== 8. 冲高回落（散户追高被套）==========
+
+        if high_price > 0 and current_price > 0 and high_price > current_price:
+            pullback_from_high = ((high_price - current_price) / high_price * 100)
+            if pullback_from_high > 5:
+                retail_score += 10
+                retail_factors.append(f"⛰️ 冲高回落({pullback_from_high:.2f}%)")
+
+        # ========== 综合判断 ==========
+
+        # 低价 + 小盘 + 高换手 = 散户最爱组合
+        is_very_cheap = current_price < 10
+        is_very_small_cap = market_cap and (market_cap / 100000000) < 50
+        is_very_high_turnover = turnover_rate and turnover_rate >= 10
+
+        if is_very_cheap and is_very_small_cap and is_very_high_turnover:
+            retail_score += 15
+            if not any("散户最爱" in f for f in retail_factors):
+                retail_factors.insert(0, "🎯 散户最爱组合(低价+小盘+高换手)")
+
+        # 风险分数 > 40 判定为散户最爱
+        is_retail_favorite = retail_score > 40
+
+        reason = "、".join(retail_factors) if retail_factors else ""
+
+        return is_retail_favorite, reason, max(0, retail_score)
+
+    except Exception as e:
+        print(f"检测散户最爱股票时出错: {e}")
+        return False, "", 0
+
+
+QUOTES = random_quotes()
+RESULT = screen_quotes(QUOTES)
+
+
+def _mismatches(expected, actual):
+    return [i for i, (e, a) in enumerate(zip(expected, actual)) if e != a]
+
+
+def test_patterns_match_detect_pattern_type():
+    expected = [detect_pattern_type(q)[:2] for q in QUOTES]
+    actual = [(PATTERN_NAMES[c], int(conf)) for c, conf in zip(RESULT.pattern_code, RESULT.pattern_confidence)]
+    bad = _mismatches(expected, actual)
+    assert not bad, f"{len(bad)}条不一致，例如 {QUOTES[bad[0]]}: {expected[bad[0]]} != {actual[bad[0]]}"
+    assert len(set(expected)) >= 5
+
+
+def test_speculative_matches_reference():
+    expected = [(lambda r: (bool(r[0]), int(r[2])))(reference_speculative(q)) for q in QUOTES]
+    actual = list(zip(RESULT.speculative.tolist(), RESULT.speculative_score.tolist()))
+    bad = _mismatches(expected, actual)
+    assert not bad, f"{len(bad)}条不一致，例如 {QUOTES[bad[0]]}: {expected[bad[0]]} != {actual[bad[0]]}"
+    assert 0 < sum(e[0] for e in expected) < len(QUOTES)
+
+
+def test_retail_matches_reference():
+    expected = [(lambda r: (bool(r[0]), int(r[2])))(reference_retail(q)) for q in QUOTES]
+    actual = list(zip(RESULT.retail_favorite.tolist(), RESULT.retail_score.tolist()))
+    bad = _mismatches(expected, actual)
+    assert not bad, f"{len(bad)}条不一致，例如 {QUOTES[bad[0]]}: {expected[bad[0]]} != {actual[bad[0]]}"
+    assert 0 < sum(e[0] for e in expected) < len(QUOTES)
+
+
+def test_reasons_match():
+    """理由文本与逐只判断一致（抽样）"""
+    for i in range(0, len(QUOTES), 97):
+        quote = QUOTES[i]
+        assert RESULT.pattern_reason(i) == detect_pattern_type(quote)[2], quote
+        assert RESULT.speculative_reason(i) == reference_speculative(quote)[1], quote
+        assert RESULT.retail_reason(i) == reference_retail(quote)[1], quote
+
+
+def test_single_stock_wrappers_match_batch():
+    """单只判定（一行快照）与整批筛选结果一致"""
+    for i in range(0, len(QUOTES), 53):
+        quote = QUOTES[i]
+        assert is_speculative_stock(quote) == (
+            bool(RESULT.speculative[i]), RESULT.speculative_reason(i), int(RESULT.speculative_score[i])
+        ), quote
+        assert is_retail_favorite_stock(quote) == (
+            bool(RESULT.retail_favorite[i]), RESULT.retail_reason(i), int(RESULT.retail_score[i])
+        ), quote
+    assert is_speculative_stock({}) == (False, "", 0) and is_retail_favorite_stock({}) == (False, "", 0)
+
+
+def test_empty_snapshot():
+    result = screen(QuoteSnapshot([], []))
+    assert len(result) == 0 and result.to_rows() == []
+
+
+if __name__ == "__main__":
+    tests = [(name, func) for name, func in list(globals().items()) if name.startswith("test_") and callable(func)]
+    failed = 0
+    for name, func in tests:
+        try:
+            func()
+            print(f"✅ {name}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {name}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} 通过")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+股票 -> 板块反向索引测试
+验证行业/概念的紧凑存储、正反向查询、行情注入板块名称和实时涨跌幅（只读内存）、后台预热和数据源失败时的退避
+
+用法:
+    python test_sector_membership.py
+    python -m pytest test_sector_membership.py -q
+"""
+
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.monitors.data_collector import StockDataAggregator
+from src.monitors.market_snapshot import MarketSnapshotCollector
+from src.monitors.sector_membership import SectorIndex, SectorMembership
+from src.monitors.sector_scanner import SectorSnapshot
+from src.monitors.tencent_collector import TencentFinanceCollector
+
+
+def make_membership():
+    return SectorMembership(
+        ["600000", "000001", "300750", "688981"],
+        ["银行", "银行", "电池", ""],
+        [["上证50", "破净股"], ["深股通"], ["宁组合", "储能", "深股通"], []]
+    )
+
+
+def make_sectors():
+    return SectorSnapshot(
+        ["BK0475", "BK1033"], ["银行", "电池"],
+        price=np.array([1000.0, 900.0]), change_percent=np.array([-1.23, 2.5]), amount=np.array([1e10, 2e10])
+    )
+
+
+def test_compact_storage_and_lookups():
+    membership = make_membership()
+    assert membership.industry.dtype == np.int32 and membership.concept_ids.dtype == np.int32
+    assert membership.concept_offsets.tolist() == [0, 2, 3, 6, 6]
+    assert membership.industry_of("300750") == "电池" and membership.industry_of("688981") == ""
+    assert membership.concepts_of("300750") == ["宁组合", "储能", "深股通"]
+    assert membership.concepts_of("999999") == []
+    assert membership.members("银行") == ["600000", "000001"]
+    assert membership.members("深股通") == ["000001", "300750"]
+
+
+def make_index(**kwargs):
+    index = SectorIndex(make_membership, make_sectors, **kwargs)
+    assert index.refresh_membership() and index.refresh_sectors()
+    return index
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_annotate_quote():
+    index = make_index()
+    quote = {"股票代码": "600000", "板块名称": "未知"}
+    index.annotate(quote)
+    assert quote["板块名称"] == "银行" and quote["板块涨跌幅"] == -1.23
+    assert quote["概念板块"] == ["上证50", "破净股"]
+
+    # 不在索引中的股票保持原样
+    assert index.annotate({"股票代码": "688981", "板块名称": "未知"}) == {"股票代码": "688981", "板块名称": "未知"}
+    assert index.sector_data("电池") == {"涨跌幅": 2.5} and index.sector_data("未知") == {"涨跌幅": 0}
+
+
+def test_annotate_never_fetches():
+    calls = []
+
+    def provider():
+        calls.append(1)
+        return make_membership()
+
+    index = SectorIndex(provider, make_sectors)
+    # 尚未预热：板块字段保持原样，也不在请求路径上下载
+    for _ in range(5):
+        assert index.annotate({"股票代码": "600000", "板块名称": "未知"})["板块名称"] == "未知"
+    assert index.sector_data("银行") == {"涨跌幅": 0} and calls == []
+
+
+def test_background_warm_up():
+    release = threading.Event()
+
+    def slow_membership():
+        release.wait(5)
+        return make_membership()
+
+    index = SectorIndex(slow_membership, make_sectors).start()
+    try:
+        # 下载进行中，行情请求不等待
+        start = time.perf_counter()
+        assert index.annotate({"股票代码": "600000", "板块名称": "未知"})["板块名称"] == "未知"
+        assert time.perf_counter() - start < 0.1
+        release.set()
+        assert wait_for(lambda: not index.membership_stale)
+        assert index.annotate({"股票代码": "600000"})["板块涨跌幅"] == -1.23
+    finally:
+        index.stop(2)
+
+
+def test_provider_failure_backs_off():
+    calls = []
+
+    def offline():
+        calls.append(1)
+        raise ConnectionError("offline")
+
+    index = SectorIndex(offline, make_sectors, retry_interval=60).start()
+    try:
+        assert wait_for(lambda: calls and index.sector_data("电池") == {"涨跌幅": 2.5})
+        time.sleep(0.2)
+        assert len(calls) == 1 and index.membership_stale
+    finally:
+        index.stop(2)
+
+    # 部分结果先使用，之后继续重新下载
+    partial = make_membership()
+    partial.missing_pages = [2]
+    index = SectorIndex(lambda: partial, None)
+    assert not index.refresh_membership() and index.membership_stale
+    assert index.fields("600000")["板块名称"] == "银行"
+
+
+def test_membership_download_once_per_day():
+    collector = MarketSnapshotCollector()
+    pages = []
+    items = [
+        {"f12": "600000", "f100": "银行", "f103": "上证50,破净股"},
+        {"f12": "300750", "f100": "电池", "f103": "储能"},
+        {"f12": "920001", "f100": "-", "f103": "-"},
+    ]
+
+    def fetch_page(page, fields=None):
+        pages.append((page, fields))
+        return {"total": 3, "diff": items}
+
+    collector.pager.fetch_page = fetch_page
+    membership = collector.get_membership()
+    assert collector.get_membership() is membership and len(pages) == 1
+    assert pages[0][1] == "f12,f100,f103"
+    assert membership.industry_of("600000") == "银行" and membership.concepts_of("920001") == []
+
+
+def test_collector_and_aggregator_use_sector_index():
+    index = make_index()
+    collector = TencentFinanceCollector(sector_index=index)
+    assert collector.get_sector_data("电池") == {"涨跌幅": 2.5}
+
+    class FakeCollector(TencentFinanceCollector):
+        def get_stocks_realtime_data(self, stock_codes, chunk_size=60):
+            return {code: self.sector_index.annotate({"股票代码": code, "股票名称": "宁德时代", "实时价": 200,
+                                                      "开盘价": 201, "最高价": 202, "板块名称": "未知"})
+                    for code in stock_codes}
+
+        def get_market_index_data(self, index_name="上证指数"):
+            return {"涨跌幅": 0.5}
+
+    aggregator = StockDataAggregator(FakeCollector(sector_index=index))
+    data = aggregator.collect_batch_monitoring_data(["300750"], ["开盘跳水"], "09:40:00")["300750"]["开盘跳水"]
+    assert data["板块名称"] == "电池" and data["板块涨跌幅"] == 2.5
+
+
+if __name__ == "__main__":
+    tests = [(name, func) for name, func in list(globals().items()) if name.startswith("test_") and callable(func)]
+    failed = 0
+    for name, func in tests:
+        try:
+            func()
+            print(f"✅ {name}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {name}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} 通过")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+板块快照测试
+验证全部板块分页拉取一次后，不同数量的热门板块、按其他字段排序、按代码查询都不再请求接口，
+以及单页失败时重试、跳过并返回部分结果
+
+用法:
+    python test_sector_scanner.py
+    python -m pytest test_sector_scanner.py -q
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.monitors.sector_scanner import SectorScanner
+
+
+def make_scanner(total=250, max_age=30, failures=None):
+    """接口替身：total个板块，成交额随代码递增，涨跌幅随代码递减；failures为页码 -> 依次抛出的异常列表"""
+    items = [
+        {'f12': f"BK{i:04d}", 'f14': f"板块{i}", 'f2': 1000 + i, 'f3': round(5 - i * 0.04, 2), 'f6': i * 1e8}
+        for i in range(total)
+    ]
+    items[7]['f3'] = '-'  # 停牌等无效值
+    scanner = SectorScanner(max_age=max_age)
+    failures = {page: list(errors) for page, errors in (failures or {}).items()}
+    calls = []
+
+    def fetch_page(page, fields=None):
+        calls.append(page)
+        if failures.get(page):
+            raise failures[page].pop(0)
+        start = (page - 1) * scanner.pager.page_size
+        return {'total': total, 'diff': items[start:start + scanner.pager.page_size]}
+
+    scanner.pager.fetch_page = fetch_page
+    return scanner, calls
+
+
+def test_snapshot_fetched_once():
+    scanner, calls = make_scanner()
+    top5 = scanner.get_hot_sectors(top_n=5)
+    top10 = scanner.get_hot_sectors(top_n=10)
+    assert sorted(calls) == [1, 2, 3]
+    assert [s['sector_code'] for s in top5] == ["BK0249", "BK0248", "BK0247", "BK0246", "BK0245"]
+    assert top10[:5] == top5 and len(top10) == 10
+    assert len(scanner.get_sector_snapshot()) == 250
+
+
+def test_sort_and_lookup():
+    scanner, calls = make_scanner()
+    by_change = scanner.get_hot_sectors(top_n=3, sort_by="change_percent")
+    assert [s['sector_code'] for s in by_change] == ["BK0000", "BK0001", "BK0002"]
+    losers = scanner.get_sector_snapshot().top(2, sort_by="change_percent", ascending=True)
+    assert [s['sector_code'] for s in losers] == ["BK0249", "BK0248"]
+
+    assert scanner.get_sector("BK0007")['change_percent'] == 0
+    assert scanner.get_sector_snapshot().get_by_name("板块12")['sector_code'] == "BK0012"
+    assert scanner.get_sector("BK9999") is None
+    assert sorted(calls) == [1, 2, 3]
+
+
+def test_refresh_after_max_age():
+    scanner, calls = make_scanner(total=50, max_age=10)
+    scanner.get_hot_sectors(top_n=5)
+    scanner.get_sector_snapshot().timestamp -= 11
+    scanner.get_hot_sectors(top_n=5)
+    assert calls == [1, 1]
+
+
+def test_failed_page_returns_partial_snapshot():
+    scanner, calls = make_scanner(failures={2: [TimeoutError("read timeout")] * 2})
+    top = scanner.get_hot_sectors(top_n=3)
+    # 第2页（BK0100~BK0199）缺失，其余板块照常排序
+    assert [s['sector_code'] for s in top] == ["BK0249", "BK0248", "BK0247"]
+    snapshot = scanner.get_sector_snapshot()
+    assert len(snapshot) == 250 and snapshot.missing_pages == []
+    # 部分快照不复用，第二次调用重新拉取到完整结果
+    assert calls.count(1) == 2 and calls.count(2) == 3
+
+
+def test_error_code_page_is_retried():
+    class FakeResponse:
+        def __init__(self, body):
+            self.body = body
+
+        def json(self):
+            return self.body
+
+    class FakeSession:
+        def __init__(self):
+            self.pages = []
+
+        def get(self, url, params=None, timeout=None):
+            page = int(params['pn'])
+            self.pages.append(page)
+            if self.pages.count(page) == 1 and page == 2:
+                return FakeResponse({'rc': 102, 'data': None})
+            diff = [{'f12': f"BK{page:04d}", 'f14': f"板块{page}", 'f2': 1000, 'f3': 1.0, 'f6': page * 1e8}]
+            return FakeResponse({'rc': 0, 'data': {'total': 2, 'diff': diff}})
+
+    scanner = SectorScanner()
+    scanner.pager.page_size = 1
+    scanner.pager.session = FakeSession()
+    snapshot = scanner.fetch_sector_snapshot()
+    assert snapshot.codes == ["BK0001", "BK0002"] and snapshot.missing_pages == []
+    assert sorted(scanner.pager.session.pages) == [1, 2, 2]
+
+
+def test_fallback_on_error():
+    scanner = SectorScanner()
+
+    def fail(page, fields=None):
+        raise ConnectionError("offline")
+
+    scanner.pager.fetch_page = fail
+    assert [s['sector_code'] for s in scanner.get_hot_sectors(top_n=5)][:1] == ["BK0001"]
+    try:
+        scanner.get_hot_sectors(sort_by="volume")
+        assert False, "不支持的排序字段应报错"
+    except ValueError:
+        pass
+
+
+if __name__ == "__main__":
+    tests = [(name, func) for name, func in list(globals().items()) if name.startswith("test_") and callable(func)]
+    failed = 0
+    for name, func in tests:
+        try:
+            func()
+            print(f"✅ {name}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {name}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} 通过")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+静态股票属性表测试
+验证板块/涨跌幅限制判断、涨停价取整、属性表按下标并入快照、腾讯行情的涨跌停价
+
+用法:
+    python test_symbol_table.py
+    python -m pytest test_symbol_table.py -q
+"""
+
+import os
+import sys
+from datetime import date
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.monitors.screener import QuoteSnapshot, name_features
+from src.monitors.symbol_table import SymbolTable, board_of, limit_price, limit_ratio
+from src.monitors.tencent_collector import TencentFinanceCollector
+
+
+def test_board_and_limit_ratio():
+    assert board_of("600000") == "沪主板" and limit_ratio("600000", "浦发银行") == 0.10
+    assert board_of("000001") == "深主板"
+    assert board_of("300750") == "创业板" and limit_ratio("300750", "宁德时代") == 0.20
+    assert board_of("688981") == "科创板" and limit_ratio("688981", "中芯国际") == 0.20
+    assert board_of("830799") == "北交所" and limit_ratio("830799", "艾融软件") == 0.30
+    # 主板ST为5%，创业板ST仍为20%
+    assert limit_ratio("600091", "*ST明科") == 0.05
+    assert limit_ratio("300023", "ST宝德") == 0.20
+    assert board_of("00700") == "其他" and limit_ratio("AAPL") == 0.10
+
+
+def test_limit_price_rounding():
+    assert limit_price(10.05, 0.10) == 11.06
+    assert limit_price(10.0, 0.20) == 12.0
+    assert limit_price(3.33, 0.05, up=False) == 3.16
+    assert limit_price(0, 0.10) == 0
+    prices = limit_price(np.array([10.0, 20.0, 0.0]), np.array([0.1, 0.3, 0.1]))
+    assert prices.tolist() == [11.0, 26.0, 0.0]
+
+
+def test_table_joins_into_snapshot():
+    codes = ["600000", "300750", "600091", "688111"]
+    names = ["浦发银行", "宁德时代", "*ST明科", "金山办公软件"]
+    table = SymbolTable(codes, names, float_shares=[2.9e10, 3.9e9, 1e8, 4.6e8],
+                        float_market_cap=[2.9e11, 8e11, 1e9, 1.2e10], trade_date=date(2026, 10, 19))
+    assert len(table) == 4 and table.board.dtype == np.int8
+    assert table.attributes("600091")["涨跌幅限制"] == 0.05 and table.attributes("600091")["是否ST"]
+    assert table.attributes("688111")["概念"] == ["软件"] and table.attributes("688111")["市值分档"] == "中盘"
+    assert table.attributes("999999") == {}
+
+    # 顺序不同的快照按代码取下标，名称特征与逐个名称计算一致
+    order = [2, 0, 3, 1]
+    snapshot = QuoteSnapshot([codes[i] for i in order], [names[i] for i in order], symbols=table,
+                             prev_close=np.full(4, 10.0))
+    assert snapshot.symbol_ids.tolist() == order
+    assert snapshot.is_st.tolist() == [name_features(names[i])[0] for i in order]
+    assert snapshot.concept_score.tolist() == [name_features(names[i])[1] for i in order]
+    assert limit_price(snapshot.prev_close, table.limit_ratio[snapshot.symbol_ids]).tolist() == [10.5, 11.0, 12.0, 12.0]
+
+    # 盘中新出现的股票追加到表尾
+    assert table.extend(["600000", "920001"], ["浦发银行", "N新股"]) == 1
+    assert table.ids(["920001", "600000"]).tolist() == [4, 0]
+
+
+def test_tencent_limit_prices():
+    fields = [""] * 50
+    fields[1], fields[3], fields[4], fields[5] = "宁德时代", "210.00", "200.00", "201.00"
+    fields[33], fields[34], fields[36] = "212.00", "199.00", "1000"
+    data = TencentFinanceCollector._parse_fields("300750", fields)
+    assert data["涨停价"] == 240.0 and data["跌停价"] == 160.0
+
+    # 接口给出涨跌停价时以接口为准
+    fields[47], fields[48] = "240.01", "159.99"
+    data = TencentFinanceCollector._parse_fields("300750", fields)
+    assert data["涨停价"] == 240.01 and data["跌停价"] == 159.99
+
+
+if __name__ == "__main__":
+    tests = [(name, func) for name, func in list(globals().items()) if name.startswith("test_") and callable(func)]
+    failed = 0
+    for name, func in tests:
+        try:
+            func()
+            print(f"✅ {name}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {name}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} 通过")
+    sys.exit(1 if failed else 0)